@@ -6,14 +6,20 @@ from langchain_core.output_parsers import JsonOutputParser
 import vertexai
 from vertexai.preview.vision_models import ImageGenerationModel
 import uuid
+import time
 from utils import GCP_PROJECT_ID
 import re
 from langchain_core.messages import AIMessage
+from services.rateLimiter import (get_rate_limiter, is_rate_limited,
+                                  LLM_MAX_ATTEMPTS, PRIORITY_BATCH)
 # Import Firebase Storage
 from firebase_admin import storage
 
 vertexai.init(project = GCP_PROJECT_ID ,location = "us-central1")
 
+# Response size reserved in the token budget, matches max_tokens of the model
+MAX_RESPONSE_TOKENS = 1024
+
 class LLMService:
     """
     Service for interacting with Language Models
@@ -35,21 +41,28 @@ class LLMService:
             model=model_name,
             google_api_key=self.api_key,
             temperature=0.7,
-            max_tokens=1024
+            max_tokens=MAX_RESPONSE_TOKENS,
+            # Retries go through the shared rate limiter instead
+            max_retries=1
         )
         self.imageClient = ImageGenerationModel.from_pretrained("imagen-3.0-fast-generate-001")
     
     def generate_response(self, 
                           prompt_template: ChatPromptTemplate, 
                           input_data: Dict[str, Any], 
-                          output_parser: Optional[JsonOutputParser] = None):
+                          output_parser: Optional[JsonOutputParser] = None,
+                          priority: int = PRIORITY_BATCH):
         """
         Generate a response using the configured language model
         
+        Calls are admitted by the process wide rate limiter and 429s are
+        retried with jittered exponential backoff.
+        
         Args:
             prompt_template (ChatPromptTemplate): Prompt template
             input_data (Dict): Input data for the prompt
             output_parser (JsonOutputParser, optional): Output parser
+            priority (int, optional): Rate limiter priority class
         
         Returns:
             Generated response
@@ -61,8 +74,27 @@ class LLMService:
         if output_parser:
             chain = chain | output_parser
         
+        # Roughly four characters per token, plus the response budget
+        limiter = get_rate_limiter()
+        estimated_tokens = len(prompt_template.format(**input_data)) // 4 + MAX_RESPONSE_TOKENS
+        
         # Generate response
-        return chain.invoke(input_data)
+        for attempt in range(LLM_MAX_ATTEMPTS):
+            limiter.acquire(estimated_tokens, priority)
+            try:
+                response = chain.invoke(input_data)
+            except Exception as e:
+                if not is_rate_limited(e):
+                    raise
+                limiter.on_rate_limited()
+                if attempt + 1 == LLM_MAX_ATTEMPTS:
+                    raise
+                delay = limiter.backoff(attempt)
+                print(f"Rate limited (attempt {attempt + 1}/{LLM_MAX_ATTEMPTS}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            limiter.on_success()
+            return response
     
     def generate_and_upload_imagen_image(self, 
                                           prompt: str,) -> Optional[str]:
@@ -0,0 +1,158 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+from google.api_core.exceptions import ResourceExhausted
+
+# Priority classes of LLM calls, lower is served first
+PRIORITY_REALTIME = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BATCH = 2
+
+LLM_REQUESTS_PER_MINUTE = float(os.getenv('LLM_REQUESTS_PER_MINUTE', 60))
+LLM_TOKENS_PER_MINUTE = float(os.getenv('LLM_TOKENS_PER_MINUTE', 1_000_000))
+LLM_MAX_ATTEMPTS = int(os.getenv('LLM_MAX_ATTEMPTS', 5))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv('LLM_BACKOFF_BASE_SECONDS', 2.0))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv('LLM_BACKOFF_MAX_SECONDS', 60.0))
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """
+    Check whether an LLM error is a 429 quota error
+
+    LangChain wraps the Gemini errors, so the message is checked as well as the type.
+    """
+    message = str(error)
+    return isinstance(error, ResourceExhausted) or '429' in message or 'RESOURCE_EXHAUSTED' in message
+
+
+class _Bucket:
+    """Token bucket holding at most one minute of budget"""
+
+    def __init__(self, rate_per_minute: float, now: float):
+        self.capacity = float(rate_per_minute)
+        self.rate_per_second = rate_per_minute / 60.0
+        self.available = self.capacity
+        self.updated_at = now
+
+    def refill(self, now: float):
+        elapsed = max(0.0, now - self.updated_at)
+        self.available = min(self.capacity, self.available + elapsed * self.rate_per_second)
+        self.updated_at = now
+
+    def seconds_until(self, amount: float) -> float:
+        missing = min(amount, self.capacity) - self.available
+        return 0.0 if missing <= 0 else missing / self.rate_per_second
+
+
+class RateLimiter:
+    """
+    Limiter for Gemini requests and tokens per minute shared by all agents of the process
+
+    Both budgets are token buckets scaled by an AIMD factor: a 429 halves the rate
+    and pauses every caller until the request bucket refills, each success restores
+    a little of it. Waiting callers are admitted by priority class, then by arrival.
+    """
+
+    def __init__(self,
+                 requests_per_minute: float = LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = LLM_TOKENS_PER_MINUTE,
+                 min_rate_factor: float = 0.1,
+                 additive_increase: float = 0.05,
+                 backoff_base: float = LLM_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = LLM_BACKOFF_MAX_SECONDS):
+        """
+        Initialize RateLimiter
+
+        Args:
+            requests_per_minute (float): Request quota
+            tokens_per_minute (float): Token quota
+            min_rate_factor (float): Lowest fraction of the quota the limiter backs off to
+            additive_increase (float): Fraction of the quota restored per successful call
+            backoff_base (float): First retry delay in seconds
+            backoff_max (float): Retry delay cap in seconds
+        """
+        self.requests_per_minute = float(requests_per_minute)
+        self.tokens_per_minute = float(tokens_per_minute)
+        self.min_rate_factor = min_rate_factor
+        self.additive_increase = additive_increase
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_factor = 1.0
+
+        now = time.monotonic()
+        self._requests = _Bucket(self.requests_per_minute, now)
+        self._tokens = _Bucket(self.tokens_per_minute, now)
+        self._condition = threading.Condition()
+        self._waiters = []
+        self._arrivals = itertools.count()
+
+    def acquire(self, tokens: int = 0, priority: int = PRIORITY_INTERACTIVE):
+        """
+        Block until one request of the given token size fits both budgets
+
+        Args:
+            tokens (int): Estimated prompt plus response tokens of the request
+            priority (int): Priority class of the request
+        """
+        ticket = (priority, next(self._arrivals))
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._waiters[0] == ticket:
+                        now = time.monotonic()
+                        self._requests.refill(now)
+                        self._tokens.refill(now)
+                        wait = max(self._requests.seconds_until(1), self._tokens.seconds_until(tokens))
+                        if wait <= 0:
+                            self._requests.available -= 1
+                            self._tokens.available -= min(tokens, self._tokens.capacity)
+                            return
+                    self._condition.wait(wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def on_success(self):
+        """Restore part of the rate after a successful call"""
+        with self._condition:
+            self._set_rate_factor(self.rate_factor + self.additive_increase)
+
+    def on_rate_limited(self):
+        """Halve the rate and pause all callers after a 429"""
+        with self._condition:
+            self._set_rate_factor(self.rate_factor / 2)
+            self._requests.available = min(self._requests.available, 0.0)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay in seconds for a zero-based retry attempt"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _set_rate_factor(self, rate_factor: float):
+        now = time.monotonic()
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        self.rate_factor = min(1.0, max(self.min_rate_factor, rate_factor))
+        self._requests.rate_per_second = self.requests_per_minute * self.rate_factor / 60.0
+        self._tokens.rate_per_second = self.tokens_per_minute * self.rate_factor / 60.0
+        self._condition.notify_all()
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process wide RateLimiter, creating it on first use"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
@@ -1,11 +1,16 @@
 import logging
 from datetime import datetime
-from flask import Blueprint, request
-from app.InsightGenerator.AnalyzeLifeStage import analyze_life_stage
-from app.InsightGenerator.AnalyzeRetentionRisk import analyze_retention_risk
-from app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeSpendingPattern import analyze_spending_patterns
-from app.InsightGenerator.DetectLifeEvents import detect_life_events
+from flask import Blueprint, request, jsonify
+from config import Config
+from app.InsightGenerator.GenerateCustomerInsights import generate_insights_for_customers, generate_insights_in_bulk
+from app.db.BatchedWriter import BatchedFirestoreWriter
+from app.db.CustomerDataLoader import CustomerDataLoader
 from app.init import db_client
+from app.JobQueue.JobRunner import get_job_runner
+from app.utils.BatchPrediction import require_batch_backend
+from app.utils.ModelRouting import task_usage
+from app.utils.RateLimiter import PRIORITY_BATCH, llm_priority
+from app.utils.ResponseCache import get_response_cache
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -16,56 +21,104 @@ initial_insight_generation_bp = Blueprint('initial_insight_generation', __name__
 @initial_insight_generation_bp.route('/generate_initial_insights', methods=['POST'])
 def generate_initial_insights():
     """
-        Run the adaptive analytics engine to analyse new data
+        Queue initial insight generation for all customers as a background job.
+        Returns the job id immediately; poll /jobs/<job_id> for progress.
         """
     try:
-        # Initialize db connection
-        db = db_client
-        customers = None
-        if customers is None:
-            # Get all active customers
-            customers = db.collection('CustomerData').stream()
-
-        for customer in customers:
-            client_id = customer.id
-            customer_info = customer.to_dict()
-
-            # Fetch transactions associated with a specific client_id
-            transactions = db.collection('TransactionData') \
-                .document(str(client_id)) \
-                .collection('transactions') \
-                .stream()
-            transactions_list = [transaction.to_dict() for transaction in transactions]
-
-            app_activity = db.collection('AppActivity') \
-                .document(str(client_id)) \
-                .get()
-
-            # Retrieve the 'sessions' array
-            data = app_activity.to_dict()
-            sessions = data.get('sessions', [])
-
-            data = {
-                "customer_info": customer_info,
-                "transactions": transactions_list,
-                "app_activity": sessions}
-
-            insights = {}
-            insights["life_stage"] = analyze_life_stage(data)
-            insights["life_events"] = detect_life_events(data)
-            insights["retention_risk"] = analyze_retention_risk(data)
-            insights["spending_patterns"] = analyze_spending_patterns(transactions_list)
-
-            for key, value in insights.items():
-                value["created_at"] = datetime.now()
-                db.collection("CustomerData").document(client_id).collection(key).add(value)
-
-            db.collection("CustomerInsights").document(client_id).set(insights)
-
-        # Log results
-        logging.info(f"Analysis completed by analytics_engine at {datetime.now()}")
-
-        # Optional: Further processing or notifications based on analysis results
+        # Optional request override for the number of customers processed at once
+        payload = request.get_json(silent=True) or {}
+        max_customers = payload.get("max_concurrent_customers")
+        # Optional override for running the analyzers as one combined LLM call
+        fused = payload.get("fused")
+        # Optional override for submitting all prompts as one batch prediction job
+        bulk = payload.get("bulk", Config.BULK_LLM_SWEEPS)
+        if bulk:
+            try:
+                require_batch_backend()
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+
+        job_id = get_job_runner().submit(
+            'generate_initial_insights',
+            lambda reporter: _run_initial_insights_sweep(reporter, max_customers, fused, bulk),
+            params=payload)
+
+        return jsonify({'job_id': job_id, 'status_url': f'/jobs/{job_id}'}), 202
 
     except Exception as e:
-        logging.error(f"Error in running adaptive analytics: {e}")
+        logging.error(f"Error in queueing initial insight generation: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+def _run_initial_insights_sweep(reporter, max_customers=None, fused=None, bulk=False):
+    """Generate insights for all active customers, reporting progress to the job"""
+    # Initialize db connection
+    db = db_client
+    # The usage logged at the end covers this sweep only
+    task_usage.reset()
+
+    # Get all active customers; listed up front so the job reports its total
+    customers = list(db.collection('CustomerData').stream())
+    reporter.set_total(len(customers))
+
+    # Customer data is read concurrently and prefetched while earlier customers are analyzed;
+    # insights are written behind in batched commits. The sweep's LLM calls queue behind
+    # realtime trigger analyses
+    with llm_priority(PRIORITY_BATCH), CustomerDataLoader(db) as loader, BatchedFirestoreWriter(db) as writer:
+        # Customers are reported done once their insights are queued; a failed commit
+        # later replaces that outcome with the error
+        def persist_insights(client_id, insights):
+            _persist_insights(db, writer, client_id, insights, on_error=reporter.commit_error_handler(client_id))
+
+        if bulk:
+            # One combined prompt per customer, submitted as a single batch prediction job
+            summary = generate_insights_in_bulk(
+                loader.prefetch(customers),
+                load_customer_data=loader.load,
+                persist_insights=persist_insights,
+                on_customer_done=lambda client_id, error: reporter.record(client_id, error=error))
+        else:
+            summary = generate_insights_for_customers(
+                loader.prefetch(customers),
+                load_customer_data=loader.load,
+                persist_insights=persist_insights,
+                max_customers=max_customers,
+                fused=fused,
+                on_customer_done=lambda client_id, error: reporter.record(client_id, error=error))
+
+    if summary["failed"]:
+        logging.warning(f"Insight generation failed for customers: {list(summary['failed'])}")
+    if writer.errors:
+        logging.error(f"Failed to persist insights: {writer.errors}")
+
+    cache = get_response_cache()
+    if cache is not None:
+        logging.info(f"LLM response cache stats: {cache.stats()}")
+    # Per task latency, tokens, cost and escalations, for tuning the model routes
+    logging.info(f"LLM usage per task and model: {task_usage.summary()}")
+
+    # Log results
+    logging.info(f"Initial insight generation completed at {datetime.now()}")
+
+
+def _persist_insights(db, writer, client_id, insights, on_error=None):
+    """
+    Store each insight in its history subcollection and the latest set in CustomerInsights
+
+    Args:
+        db: Firestore client
+        writer (BatchedFirestoreWriter): Writer committing the insights
+        client_id (str): Customer the insights belong to
+        insights (dict): Insights per analysis
+        on_error (Callable, optional): Called with the error if the writes fail to commit
+    """
+    operations = []
+    for key, value in insights.items():
+        value["created_at"] = datetime.now()
+        history_ref = db.collection("CustomerData").document(client_id).collection(key).document()
+        operations.append((history_ref, value, False))
+
+    operations.append((db.collection("CustomerInsights").document(client_id), insights, False))
+
+    # The five writes of a customer are committed in one batch
+    writer.write(operations, on_error=on_error)
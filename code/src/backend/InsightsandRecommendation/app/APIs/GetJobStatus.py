@@ -0,0 +1,26 @@
+from flask import jsonify, Blueprint, request
+from app.JobQueue.JobRunner import get_job_runner
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+job_status_bp = Blueprint('job_status', __name__)
+
+
+@job_status_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """
+        Get the status and progress of a background job.
+        Pass ?include_results=true to also return per-customer results.
+        """
+    try:
+        include_results = request.args.get('include_results', 'false').lower() == 'true'
+        job = get_job_runner().get_job(job_id, include_results=include_results)
+        if job is None:
+            return jsonify({'error': f'Job {job_id} not found'}), 404
+
+        return jsonify(job), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
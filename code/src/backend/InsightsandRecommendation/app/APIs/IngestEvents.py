@@ -0,0 +1,33 @@
+import logging
+from flask import Blueprint, request, jsonify
+from app.AdaptiveAnalyticsEngine.services.realtime_triggers import get_realtime_pipeline
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ingest_events_bp = Blueprint('ingest_events', __name__)
+
+
+@ingest_events_bp.route('/ingest_events', methods=['POST'])
+def ingest_events():
+    """
+        Evaluate new transactions and app sessions against the realtime triggers.
+        Customers that trip a trigger are queued for an adaptive analysis; the
+        events themselves are expected to be stored in Firestore already.
+        Body: {"events": [{"client_id": ..., "transactions": [...], "sessions": [...]}]}
+        or a single such event.
+        """
+    try:
+        payload = request.get_json(silent=True) or {}
+        events = payload.get('events', [payload])
+        if not events or any(not isinstance(event, dict) or not event.get('client_id') for event in events):
+            return jsonify({'error': 'Every event needs a client_id'}), 400
+
+        pipeline = get_realtime_pipeline()
+        results = [pipeline.ingest(event['client_id'], event.get('transactions') or [], event.get('sessions') or [])
+                   for event in events]
+        return jsonify({'results': results}), 202
+
+    except Exception as e:
+        logging.error(f"Error in ingesting events: {e}")
+        return jsonify({'error': str(e)}), 500
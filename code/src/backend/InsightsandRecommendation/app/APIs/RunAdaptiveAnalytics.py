@@ -1,38 +1,143 @@
 import logging
 from datetime import datetime
-from flask import Blueprint, request
+from flask import Blueprint, request, jsonify
+from config import Config
 from app.AdaptiveAnalyticsEngine.analytics_engine import AnalyticsEngine
+from app.AdaptiveAnalyticsEngine.services.bulk_analysis import run_bulk_analysis
+from app.AdaptiveAnalyticsEngine.services.drift_detector import DriftSkipCounter
+from app.AdaptiveAnalyticsEngine.services.sharded_sweep import ShardedSweep
+from app.db.BatchedWriter import BatchedFirestoreWriter
 from app.init import db_client
+from app.JobQueue.JobRunner import get_job_runner
+from app.utils.BatchPrediction import require_batch_backend
+from app.utils.ModelRouting import task_usage
+from app.utils.RateLimiter import PRIORITY_BATCH, llm_priority
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Days of new data analyzed per customer unless the request sets 'days'
+DEFAULT_ANALYSIS_DAYS = 30
+
 run_adaptive_analytics_bp = Blueprint('run_adaptive_analytics', __name__)
 
 
 @run_adaptive_analytics_bp.route('/run_adaptive_analytics', methods=['POST'])
 def run_adaptive_analytics():
     """
-        Run the adaptive analytics engine to analyse new data
+        Queue the adaptive analytics engine run over all customers as a background job.
+        Returns the job id immediately; poll /jobs/<job_id> for progress.
         """
     try:
-        # Initialize db connection
-        db = db_client
-        customers = None
-        if customers is None:
-            # Get all active customers
-            customers = db.collection('CustomerData').stream()
+        payload = request.get_json(silent=True) or {}
+        # Optional number of days of new data each customer's analysis covers
+        days = int(payload.get('days', DEFAULT_ANALYSIS_DAYS))
+        if payload.get('num_shards'):
+            # Sharded, resumable sweep; other processes can join it with sweep_worker.py
+            sweep_id = payload.get('sweep_id') or datetime.now().strftime('%Y-%m-%d')
+            num_shards = int(payload['num_shards'])
+            job_func = lambda reporter: _run_sharded_sweep(reporter, sweep_id, num_shards, days)
+        elif payload.get('bulk', Config.BULK_LLM_SWEEPS):
+            # All LLM comparisons of the sweep are submitted as one batch prediction job
+            try:
+                require_batch_backend()
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            job_func = lambda reporter: _run_bulk_sweep(reporter, days)
+        else:
+            job_func = lambda reporter: _run_adaptive_analytics_sweep(reporter, days)
+        job_id = get_job_runner().submit('run_adaptive_analytics', job_func, params=payload)
+
+        return jsonify({'job_id': job_id, 'status_url': f'/jobs/{job_id}'}), 202
+
+    except Exception as e:
+        logging.error(f"Error in queueing daily analysis: {e}")
+        return jsonify({'error': str(e)}), 500
+
 
+def _run_adaptive_analytics_sweep(reporter, days=DEFAULT_ANALYSIS_DAYS):
+    """Run the analytics engine for every active customer, reporting progress to the job"""
+    # Initialize db connection
+    db = db_client
+    # The usage logged at the end covers this sweep only
+    task_usage.reset()
+
+    # Get all active customers; listed up front so the job reports its total
+    customers = list(db.collection('CustomerData').stream())
+    reporter.set_total(len(customers))
+
+    # Customers whose statistics did not drift skip the LLM comparison
+    skips = DriftSkipCounter()
+
+    # Insight updates of all customers are written behind in batched commits; the
+    # sweep's LLM calls queue behind realtime trigger analyses
+    with llm_priority(PRIORITY_BATCH), BatchedFirestoreWriter(db) as writer:
         for customer in customers:
             client_id = customer.id
-            engine = AnalyticsEngine(client_id)
-            result = engine.run_analysis()
-            logging.info(f"Processed customer {client_id}, detected {len(result['changes_detected'])} changes")
+            try:
+                # A failed commit of the customer's updates replaces its recorded outcome
+                engine = AnalyticsEngine(client_id,
+                                         writer=writer.with_error_handler(reporter.commit_error_handler(client_id)))
+                result = engine.run_analysis(days)
+                changes = result.get('profile_change_summary', {}).get('changed_metrics', []) if result else []
+                skips.record(result)
+                logging.info(f"Processed customer {client_id}, detected {len(changes)} changes")
+                reporter.record(client_id, result={'changes_detected': len(changes),
+                                                   'llm_skipped': bool(result and result.get('llm_skipped'))})
+            except Exception as e:
+                logging.error(f"Error in daily analysis for customer {client_id}: {e}")
+                reporter.record(client_id, error=str(e))
 
-        # Log results
-        logging.info(f"Analysis completed by analytics_engine at {datetime.now()}")
+    if writer.errors:
+        logging.error(f"Failed to persist insight updates: {writer.errors}")
 
-        # Optional: Further processing or notifications based on analysis results
+    # Log results
+    logging.info(f"LLM comparisons skipped by drift detection: {skips.summary()}")
+    logging.info(f"LLM usage per task and model: {task_usage.summary()}")
+    logging.info(f"Analysis completed by analytics_engine at {datetime.now()}")
 
-    except Exception as e:
-        logging.error(f"Error in daily analysis: {e}")
+
+def _run_sharded_sweep(reporter, sweep_id, num_shards, days=DEFAULT_ANALYSIS_DAYS):
+    """Claim and process shards of a sweep, checkpointing after every customer"""
+    sweep = ShardedSweep(db_client, sweep_id, num_shards, days=days)
+    # The total covers the whole sweep; customers handled by joining workers are not recorded on this job
+    clients_by_shard = sweep.list_clients_by_shard()
+    reporter.set_total(sum(len(client_ids) for client_ids in clients_by_shard.values()))
+
+    def on_customer_done(client_id, result, error):
+        changes = result.get('profile_change_summary', {}).get('changed_metrics', []) if result else []
+        outcome = None if error else {'changes_detected': len(changes),
+                                      'llm_skipped': bool(result and result.get('llm_skipped'))}
+        reporter.record(client_id, result=outcome, error=error)
+
+    summary = sweep.run(on_customer_done=on_customer_done, clients_by_shard=clients_by_shard)
+    logging.info(f"Sweep {sweep_id} worker {summary['worker_id']} finished shards {summary['shards']}: "
+                 f"{summary['processed']} processed, {summary['failed']} failed, "
+                 f"LLM comparisons skipped by drift detection: {summary['llm_skips']}")
+
+
+def _run_bulk_sweep(reporter, days=DEFAULT_ANALYSIS_DAYS):
+    """Run the analytics engine for every active customer with one batch prediction job"""
+    task_usage.reset()
+    customers = list(db_client.collection('CustomerData').stream())
+    reporter.set_total(len(customers))
+
+    def on_customer_done(client_id, result, error):
+        changes = result.get('profile_change_summary', {}).get('changed_metrics', []) if result else []
+        outcome = None if error else {'changes_detected': len(changes),
+                                      'llm_skipped': bool(result and result.get('llm_skipped'))}
+        reporter.record(client_id, result=outcome, error=error)
+
+    # Interactive fallbacks for failed batch results queue behind realtime trigger analyses
+    with llm_priority(PRIORITY_BATCH), BatchedFirestoreWriter(db_client) as writer:
+        engines = (AnalyticsEngine(customer.id,
+                                   writer=writer.with_error_handler(reporter.commit_error_handler(customer.id)))
+                   for customer in customers)
+        summary = run_bulk_analysis(engines, days, on_customer_done=on_customer_done)
+
+    if writer.errors:
+        logging.error(f"Failed to persist insight updates: {writer.errors}")
+    logging.info(f"Bulk sweep finished: {summary['processed']} processed, {summary['failed']} failed, "
+                 f"{summary['batch_requests']} batch requests, {summary['interactive_fallbacks']} interactive "
+                 f"fallbacks, LLM comparisons skipped by drift detection: {summary['llm_skips']}")
+    logging.info(f"LLM usage per task and model: {task_usage.summary()}")
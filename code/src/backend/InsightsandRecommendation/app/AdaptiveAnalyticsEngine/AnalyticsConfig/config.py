@@ -2,5 +2,12 @@ DEFAULT_CONFIG = {
     'historical_window_days': 90,  # Look back period
     'significance_threshold': 0.3,  # Threshold for detecting meaningful changes
     'analysis_frequency': '15 Days',  # How often to run comprehensive analysis
-    'realtime_triggers': ['large_transaction', 'new_product_interaction', 'life_event']
-}
\ No newline at end of file
+    'realtime_triggers': ['large_transaction', 'new_product_interaction', 'life_event'],
+    'realtime_cooldown': '6 Hours',  # Minimum time between trigger-driven analyses of a customer
+    'realtime_analysis_days': 30,  # Days of new data analyzed by a trigger-driven analysis
+    'large_transaction_threshold': 1000,  # Transaction amount that trips the large_transaction trigger
+    'product_pages': ['cards', 'loans', 'mortgage', 'investments', 'insurance', 'savings'],
+    'product_history_days': 180,  # Product pages visited in this many days are not new to the customer
+    'life_event_keywords': ['wedding', 'bridal', 'baby', 'maternity', 'pediatric', 'daycare', 'moving',
+                            'real estate', 'mortgage', 'university', 'tuition', 'funeral', 'hospital']
+}
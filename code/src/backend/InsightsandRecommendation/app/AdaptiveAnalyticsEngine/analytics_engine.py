@@ -4,19 +4,26 @@ from app.AdaptiveAnalyticsEngine.services.summarize_data import summarize_data
 from app.AdaptiveAnalyticsEngine.AnalyticsConfig.config import DEFAULT_CONFIG
 from app.init import db_client
 from app.AdaptiveAnalyticsEngine.services.data_fetcher import DataFetcher
+from app.AdaptiveAnalyticsEngine.services.drift_detector import detect_drift
+from app.AdaptiveAnalyticsEngine.services.spending_statistics_store import SpendingStatisticsStore
+from app.InsightGenerator.AnalyzeSpendingPattern.IncrementalSpendingStatistics import SpendingStatisticsState
 import logging
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+INSIGHT_FIELDS = ["life_stage", "life_events", "spending_patterns", "retention_risk"]
+
 class AnalyticsEngine:
-    def __init__(self, client_id, config=None):
+    def __init__(self, client_id, config=None, writer=None):
         """
         Initialize AdaptiveEngine
 
         Args:
             client_id (str): Unique identifier for the client
             config (dict, optional): Configuration settings. Defaults to None.
+            writer (BatchedFirestoreWriter, optional): Shared writer batching the insight updates.
+                Insights are written directly if None.
         """
         try:
             if not client_id:
@@ -32,8 +39,9 @@ class AnalyticsEngine:
 
             # Initialize services
             try:
-                self.data_fetcher = DataFetcher(self.client_id, self.db)
-                self.customer_insights_updater = CustomerDataUpdater(self.db, self.client_id)
+                self.data_fetcher = DataFetcher(self.db, self.client_id)
+                self.customer_insights_updater = CustomerDataUpdater(self.client_id, self.db, writer)
+                self.spending_statistics_store = SpendingStatisticsStore(self.db, self.client_id)
             except Exception as e:
                 logger.error(f"Failed to initialize services: {str(e)}")
                 raise
@@ -42,16 +50,54 @@ class AnalyticsEngine:
             logger.error(f"Failed to initialize AnalyticsEngine: {str(e)}")
             raise
 
-    def run_analysis(self, days=30):
+    def run_analysis(self, days=30, skip_drift_check=False):
         """
         Run comprehensive data on new data and compare with historical context data
 
         Args:
             days (int, optional): Number of days of data to analyze. Defaults to 1.
+            skip_drift_check (bool, optional): Always run the LLM comparison, e.g. for analyses
+                started by a realtime trigger. Defaults to False.
 
         Returns:
             dict: Analysis results including detected changes
         """
+        try:
+            prepared = self.prepare_analysis(days, skip_drift_check)
+            if 'result' in prepared:
+                return prepared['result']
+
+            # Analyze with LLM and generate insights
+            try:
+                insights = analyze_with_llm(prepared['prompt'])
+                if not insights:
+                    logger.warning("Failed to generate insights")
+            except Exception as e:
+                logger.error(f"Failed to analyze with LLM: {str(e)}")
+                raise
+
+            return self.complete_analysis(prepared, insights)
+
+        except Exception as e:
+            logger.error(f"Failed to run analysis: {str(e)}")
+            raise
+
+    def prepare_analysis(self, days=30, skip_drift_check=False):
+        """
+        Everything of run_analysis before the LLM comparison
+
+        Fetches and summarizes the new data, folds it into the running spending
+        statistics and checks for drift. Bulk sweeps submit the returned prompt
+        of many customers as one batch prediction job.
+
+        Args:
+            days (int, optional): Number of days of data to analyze. Defaults to 30.
+            skip_drift_check (bool, optional): Go to the LLM comparison regardless of drift. Defaults to False.
+
+        Returns:
+            dict: {'result': ...} with the final result if the LLM comparison is skipped,
+                otherwise {'prompt': ..., 'current_insights': ...} for complete_analysis
+        """
         try:
             if not isinstance(days, int) or days <= 0:
                 raise ValueError("days must be a positive integer")
@@ -83,34 +129,91 @@ class AnalyticsEngine:
                 logger.error(f"Failed to summarize data: {str(e)}")
                 raise
 
-            # Prepare context for LLM analysis
+            # Fold the new transactions into the running spending statistics
             try:
-                llm_context = prepare_llm_context(historical_context, new_data_summaries)
-                if not llm_context:
-                    logger.warning("Failed to prepare LLM context")
+                new_data_summaries["spending_statistics"] = self.update_spending_statistics(new_data)
             except Exception as e:
-                logger.error(f"Failed to prepare LLM context: {str(e)}")
+                logger.error(f"Failed to update spending statistics: {str(e)}")
                 raise
 
-            # Analyze with LLM and generate insights
+            # Only customers whose statistics drifted beyond the significance threshold go to the LLM
             try:
-                insights = analyze_with_llm(llm_context)
-                if not insights:
-                    logger.warning("Failed to generate insights")
+                drift = None if skip_drift_check else detect_drift(
+                    historical_context, new_data_summaries, days,
+                    self.config.get('significance_threshold', DEFAULT_CONFIG['significance_threshold']),
+                    new_data.get('transactions') if isinstance(new_data, dict) else None)
             except Exception as e:
-                logger.error(f"Failed to analyze with LLM: {str(e)}")
+                logger.error(f"Failed to detect drift: {str(e)}")
                 raise
+            if drift is not None and not drift['exceeded']:
+                logger.info(f"Skipping LLM comparison for client {self.client_id}: drift {drift['score']} "
+                            f"within threshold {drift['threshold']}")
+                return {'result': {
+                    'profile_change_summary': {
+                        'total_changes_detected': 0,
+                        'change_significance': 'minor',
+                        'changed_metrics': []
+                    },
+                    'drift': drift,
+                    'llm_skipped': True
+                }}
 
-            # Update customer insights
+            # Prepare context for LLM analysis
             try:
-                self.customer_insights_updater.update_customer_insights(self.client_id, insights)
-                logger.info(f"Successfully updated insights for client {self.client_id}")
+                llm_context = prepare_llm_context(historical_context, new_data_summaries)
+                if not llm_context:
+                    logger.warning("Failed to prepare LLM context")
             except Exception as e:
-                logger.error(f"Failed to update customer insights: {str(e)}")
+                logger.error(f"Failed to prepare LLM context: {str(e)}")
                 raise
 
-            return insights
+            current_insights = {key: historical_context.get(key) for key in INSIGHT_FIELDS} \
+                if isinstance(historical_context, dict) else {}
+            return {'prompt': llm_context, 'current_insights': current_insights}
 
         except Exception as e:
-            logger.error(f"Failed to run analysis: {str(e)}")
+            logger.error(f"Failed to prepare analysis: {str(e)}")
+            raise
+
+    def complete_analysis(self, prepared, insights):
+        """
+        Update the customer insights with the LLM comparison of a prepared analysis
+
+        Args:
+            prepared (dict): prepare_analysis output holding a prompt
+            insights (dict): LLM analysis of the prompt
+
+        Returns:
+            dict: The insights
+        """
+        # Update customer insights
+        try:
+            self.customer_insights_updater.update_customer_insights(prepared['current_insights'], insights)
+            logger.info(f"Successfully updated insights for client {self.client_id}")
+        except Exception as e:
+            logger.error(f"Failed to update customer insights: {str(e)}")
             raise
+
+        return insights
+
+    def update_spending_statistics(self, new_data):
+        """
+        Fold new transactions into the client's persisted running spending aggregates
+
+        Args:
+            new_data (dict): New data as returned by DataFetcher.fetch_new_data
+
+        Returns:
+            dict: Spending statistics derived from the running aggregates, empty if the
+                client has no transactions
+        """
+        state = self.spending_statistics_store.load()
+        if state is None:
+            # First run for this client: seed the running aggregates from the full history once
+            state = SpendingStatisticsState()
+            state.fold(self.data_fetcher.fetch_transaction_history())
+        elif isinstance(new_data, dict):
+            state.fold(new_data.get("transactions"))
+
+        self.spending_statistics_store.save(state)
+        return state.statistics() if state.count else {}
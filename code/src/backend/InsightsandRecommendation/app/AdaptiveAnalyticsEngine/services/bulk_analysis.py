@@ -0,0 +1,76 @@
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from app.AdaptiveAnalyticsEngine.services.drift_detector import DriftSkipCounter
+from app.AdaptiveAnalyticsEngine.services.llm_based_analysis import analyze_with_llm, parse_batch_response
+from app.utils.BatchPrediction import batch_request_line, run_batch_job
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+def run_bulk_analysis(engines: Iterable, days: int = 30, backend=None, work_dir: Optional[str] = None,
+                      on_customer_done: Optional[Callable[[str, Optional[Dict], Optional[str]], None]] = None
+                      ) -> Dict[str, Any]:
+    """
+    Run the adaptive analytics of many customers with one batch prediction job
+
+    Every engine prepares its analysis; customers whose spending drifted get their
+    comparison prompt written to a JSONL job file, which is submitted at once. The
+    results are then fanned back out to each engine's insight updater. Customers
+    whose batch result is missing or off-schema fall back to an interactive call.
+
+    Args:
+        engines (Iterable): AnalyticsEngine per customer, created lazily by the caller
+        days (int): Number of days of data to analyze
+        backend (optional): Batch prediction backend. Defaults to Config.LLM_BATCH_BACKEND.
+        work_dir (str, optional): Directory for the job files. Defaults to Config.LLM_BATCH_DIR.
+        on_customer_done (Callable, optional): Called with (client_id, result, error) per customer
+
+    Returns:
+        dict: Processed and failed counts, batch requests and LLM comparisons skipped by drift detection
+    """
+    summary = {"processed": 0, "failed": 0, "batch_requests": 0, "interactive_fallbacks": 0}
+    skips = DriftSkipCounter()
+    # client_id -> (engine, prepared analysis)
+    pending = {}
+
+    def record(client_id, result, error):
+        if error is None:
+            summary["processed"] += 1
+            skips.record(result)
+        else:
+            logger.error(f"Bulk analysis failed for customer {client_id}: {error}")
+            summary["failed"] += 1
+        if on_customer_done is not None:
+            on_customer_done(client_id, result, error)
+
+    def request_lines():
+        for engine in engines:
+            try:
+                prepared = engine.prepare_analysis(days)
+            except Exception as e:
+                record(engine.client_id, None, str(e))
+                continue
+            if 'result' in prepared:
+                record(engine.client_id, prepared['result'], None)
+                continue
+            pending[engine.client_id] = (engine, prepared)
+            yield batch_request_line(engine.client_id, prepared['prompt'], json_response=True)
+
+    results = run_batch_job(request_lines(), backend, work_dir)
+    summary["batch_requests"] = len(pending)
+
+    for client_id, (engine, prepared) in pending.items():
+        try:
+            insights = parse_batch_response(results.get(client_id))
+            if 'error' in insights:
+                logger.warning(f"Retrying customer {client_id} interactively: {insights['error']}")
+                summary["interactive_fallbacks"] += 1
+                insights = analyze_with_llm(prepared['prompt'])
+            record(client_id, engine.complete_analysis(prepared, insights), None)
+        except Exception as e:
+            record(client_id, None, str(e))
+
+    summary["llm_skips"] = skips.summary()
+    return summary
@@ -1,13 +1,15 @@
 class CustomerDataUpdater:
-    def __init__(self, client_id, firestore_client):
+    def __init__(self, client_id, firestore_client, writer=None):
         """
         Initialize CustomerDataUpdater with Firestore client
 
         Args:
             firestore_client (firestore.Client): Firestore client
+            writer (BatchedFirestoreWriter, optional): Batches the insight writes. Writes directly if None.
         """
         self.db = firestore_client
         self.client_id = client_id
+        self.writer = writer
 
     def update_customer_insights(self, old_insights, llm_analysis):
         """
@@ -32,7 +34,9 @@ class CustomerDataUpdater:
             "Life Stage": "life_stage",
             "Life Events": "life_event"
         }
-        if llm_analysis["total_changes_detected"] < 1:
+        total_changes = llm_analysis.get("profile_change_summary", {}).get(
+            "total_changes_detected", llm_analysis.get("total_changes_detected", 0))
+        if total_changes < 1:
             return None
 
         # Track if any changes occurred
@@ -54,4 +58,7 @@ class CustomerDataUpdater:
         if insights_changed:
             # Create a new document with updated insights
             customer_ref = self.db.collection('CustomerInsights').document(self.client_id)
-            customer_ref.set(updated_insights, merge=False)
+            if self.writer is not None:
+                self.writer.set(customer_ref, updated_insights, merge=False)
+            else:
+                customer_ref.set(updated_insights, merge=False)
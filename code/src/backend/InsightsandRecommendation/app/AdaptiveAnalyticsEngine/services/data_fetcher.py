@@ -1,5 +1,9 @@
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from app.db.AppActivityStore import fetch_sessions_since
+
+CUSTOMER_DATA_FIELDS = ["life_stage", "life_events", "spending_patterns", "retention_risk"]
 
 
 class DataFetcher:
@@ -24,29 +28,22 @@ class DataFetcher:
         Returns:
             dict: Dictionary containing transaction and app activity data
         """
-        transactions_cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+        cutoff = datetime.now() - timedelta(days=days)
+        transactions_cutoff_date = cutoff.strftime('%Y-%m-%d')
 
-        # Fetch new transactions
-        transactions = self.db.collection('TransactionData').document(self.client_id) \
+        # Fetch new transactions and website interactions concurrently
+        transactions_query = self.db.collection('TransactionData').document(self.client_id) \
             .collection('transactions') \
-            .where('Transaction_Date', '>=', transactions_cutoff_date) \
-            .stream()
-
-        # Fetch new website interactions
-        app_activity = self.db.collection('AppActivity').document(self.client_id).get()
+            .where('Transaction_Date', '>=', transactions_cutoff_date)
 
-        data = app_activity.to_dict() or {}
-        sessions = data.get('sessions', [])
-
-        # Filter sessions by cutoff date
-        app_activity_cutoff_date = datetime.now() - timedelta(days=days)
-        filtered_sessions = [
-            session for session in sessions
-            if datetime.fromisoformat(session['date']) >= app_activity_cutoff_date
-        ]
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            transactions = executor.submit(lambda: [t.to_dict() for t in transactions_query.stream()])
+            # Sessions filtered by cutoff date; bucketed layouts only read the buckets in the window
+            sessions = executor.submit(fetch_sessions_since, self.db, self.client_id, cutoff)
+            transactions, filtered_sessions = transactions.result(), sessions.result()
 
         # Convert to pandas dataframes for analysis
-        transaction_data = pd.DataFrame([t.to_dict() for t in transactions])
+        transaction_data = pd.DataFrame(transactions)
         app_activity_data = pd.DataFrame(filtered_sessions)
 
         return {
@@ -54,6 +51,18 @@ class DataFetcher:
             'app_activity': app_activity_data
         }
 
+    def fetch_transaction_history(self):
+        """
+        Fetches the full transaction history of the client
+
+        Returns:
+            pd.DataFrame: All transactions of the client
+        """
+        transactions = self.db.collection('TransactionData').document(self.client_id) \
+            .collection('transactions') \
+            .stream()
+        return pd.DataFrame([t.to_dict() for t in transactions])
+
     def fetch_historical_context(self):
         """
         Fetches aggregated historical data and previous insights
@@ -61,19 +70,22 @@ class DataFetcher:
         Returns:
             dict: Historical context data for the client
         """
-        customer_data_fields = ["life_stage", "life_events", "spending_patterns", "retention_risk"]
-
-        latest_historical_context = {"basic_customer_data": self.db.collection('CustomerData').document(
-            self.client_id).get().to_dict()}
+        customer_ref = self.db.collection('CustomerData').document(self.client_id)
 
-        for key in customer_data_fields:
-            latest_doc = self.db.collection('CustomerData').document(self.client_id) \
-                .collection(key) \
+        def fetch_latest(key):
+            return customer_ref.collection(key) \
                 .order_by('created_at', direction='DESCENDING') \
                 .limit(1) \
                 .get()
 
-            for doc in latest_doc:
-                latest_historical_context[key] = doc.to_dict()
+        # The base document and the latest document of each insight history are read concurrently
+        with ThreadPoolExecutor(max_workers=len(CUSTOMER_DATA_FIELDS) + 1) as executor:
+            basic_customer_data = executor.submit(customer_ref.get)
+            latest_docs = {key: executor.submit(fetch_latest, key) for key in CUSTOMER_DATA_FIELDS}
+
+            latest_historical_context = {"basic_customer_data": basic_customer_data.result().to_dict()}
+            for key in CUSTOMER_DATA_FIELDS:
+                for doc in latest_docs[key].result():
+                    latest_historical_context[key] = doc.to_dict()
 
         return latest_historical_context
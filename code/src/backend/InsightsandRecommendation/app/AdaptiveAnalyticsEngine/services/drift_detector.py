@@ -0,0 +1,199 @@
+import math
+import threading
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from app.InsightGenerator.AnalyzeSpendingPattern.MerchantServiceEssence import categorize_merchants
+
+# Transactions fetched over `days` are scaled to a 30 day month
+DAYS_PER_MONTH = 30
+
+
+def _number(value) -> Optional[float]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _shares(totals: Dict[str, Any]) -> Dict[str, float]:
+    """Normalize non-negative totals to shares summing to 1"""
+    totals = {key: value for key, value in ((key, _number(value)) for key, value in (totals or {}).items())
+              if value is not None and value > 0}
+    grand_total = sum(totals.values())
+    return {key: value / grand_total for key, value in totals.items()} if grand_total else {}
+
+
+def _relative_change(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old is None or new is None:
+        return None
+    if old == 0:
+        return 0.0 if new == 0 else math.inf
+    return abs(new - old) / abs(old)
+
+
+def _distribution_shift(old: Dict[str, float], new: Dict[str, float]) -> Optional[float]:
+    """Total variation distance between two share distributions, in [0, 1]"""
+    if not old or not new:
+        return None
+    return 0.5 * sum(abs(new.get(key, 0.0) - old.get(key, 0.0)) for key in set(old) | set(new))
+
+
+def spending_type_shares(transactions) -> Dict[str, float]:
+    """
+    Spending type mix of the given transactions alone
+
+    Args:
+        transactions (pd.DataFrame | List[Dict]): Transactions with Merchant and Transaction_Amount
+
+    Returns:
+        dict: Spending type -> share of the spend, empty without spend
+    """
+    df = pd.DataFrame(transactions) if not isinstance(transactions, pd.DataFrame) else transactions
+    if df.empty or 'Merchant' not in df.columns or 'Transaction_Amount' not in df.columns:
+        return {}
+    amounts = pd.to_numeric(df['Transaction_Amount'], errors='coerce')
+    totals = amounts.groupby(categorize_merchants(df['Merchant']).to_numpy(), observed=True).sum()
+    return _shares(totals.to_dict())
+
+
+def baseline_metrics(spending_patterns: Optional[Dict]) -> Optional[Dict[str, Any]]:
+    """
+    Spending metrics of the stored spending_patterns insight
+
+    Args:
+        spending_patterns (dict): Latest spending_patterns document, as produced by
+            analyze_spending_patterns, or its statistical_spend_insights
+
+    Returns:
+        dict: Monthly spend, average transaction and category / spending type shares,
+            or None if the document holds no statistical insights
+    """
+    if not isinstance(spending_patterns, dict):
+        return None
+    insights = spending_patterns.get('statistical_spend_insights', spending_patterns)
+    if not isinstance(insights, dict) or 'spending_category_insights' not in insights:
+        return None
+
+    category_insights = insights.get('spending_category_insights') or {}
+    monthly_spending = (insights.get('time_based_patterns') or {}).get('monthly_spending')
+    monthly_totals = [_number(month.get('total_monthly_spend')) for month in monthly_spending] \
+        if isinstance(monthly_spending, list) else []
+    monthly_totals = [total for total in monthly_totals if total is not None]
+
+    return {
+        'monthly_spend': sum(monthly_totals) / len(monthly_totals) if monthly_totals else None,
+        'average_transaction': _number((category_insights.get('spending_summary') or {})
+                                       .get('average_transaction_amount')),
+        'category_shares': _shares({record.get('Merchant_Category'): record.get('Total_Spending')
+                                    for record in category_insights.get('merchant_category_breakdown') or []}),
+        'spending_type_shares': _shares((insights.get('spending_discipline') or {})
+                                        .get('spending_type_distribution')),
+    }
+
+
+def current_metrics(new_data_summaries: Dict, days: int, transactions=None) -> Optional[Dict[str, Any]]:
+    """
+    The same spending metrics for the new data of summarize_data
+
+    Args:
+        new_data_summaries (dict): summarize_data output
+        days (int): Number of days the new data covers
+        transactions (pd.DataFrame | List[Dict], optional): The new transactions, for the spending type
+            mix of the window. The mix is not compared if None.
+
+    Returns:
+        dict: Metrics comparable with baseline_metrics, or None if there are no new transactions
+    """
+    transactions_summary = (new_data_summaries or {}).get('transactions_summary') or {}
+    total_spent = _number(transactions_summary.get('total_spent'))
+    num_transactions = _number(transactions_summary.get('num_transactions'))
+    if not num_transactions or total_spent is None:
+        return None
+
+    # Only the window's transactions: the running spending statistics cover the whole history
+    # and would dilute a recent shift in the spending type mix
+    return {
+        'monthly_spend': total_spent / days * DAYS_PER_MONTH,
+        'average_transaction': total_spent / num_transactions,
+        'category_shares': _shares((transactions_summary.get('merchant_categories') or {}).get('sum')),
+        'spending_type_shares': spending_type_shares(transactions) if transactions is not None else {},
+    }
+
+
+def detect_drift(historical_context: Dict, new_data_summaries: Dict, days: int, threshold: float,
+                 transactions=None) -> Dict[str, Any]:
+    """
+    Deterministic check whether the new data moved the customer's spending profile
+
+    Compares the new data summaries with the stored spending_patterns aggregates:
+    relative change of monthly spend and average transaction, and the total
+    variation distance of the merchant category and spending type mixes. The
+    drift score is the largest of these and is significant above threshold.
+
+    Args:
+        historical_context (dict): DataFetcher.fetch_historical_context output
+        new_data_summaries (dict): summarize_data output
+        days (int): Number of days the new data covers
+        threshold (float): The significance_threshold of the analytics config
+        transactions (pd.DataFrame | List[Dict], optional): The new transactions, for the spending type mix
+
+    Returns:
+        dict: Drift score, per metric drift, whether the threshold is exceeded and why
+    """
+    baseline = baseline_metrics((historical_context or {}).get('spending_patterns')
+                                if isinstance(historical_context, dict) else None)
+    if baseline is None:
+        # Nothing to compare with: the LLM comparison decides
+        return {'score': None, 'threshold': threshold, 'exceeded': True, 'reason': 'no_baseline', 'metrics': {}}
+
+    current = current_metrics(new_data_summaries, days, transactions)
+    if current is None:
+        return {'score': 0.0, 'threshold': threshold, 'exceeded': False, 'reason': 'no_new_transactions',
+                'metrics': {}}
+
+    metrics = {
+        'monthly_spend': _relative_change(baseline['monthly_spend'], current['monthly_spend']),
+        'average_transaction': _relative_change(baseline['average_transaction'], current['average_transaction']),
+        'category_mix': _distribution_shift(baseline['category_shares'], current['category_shares']),
+        'spending_type_mix': _distribution_shift(baseline['spending_type_shares'], current['spending_type_shares']),
+    }
+    metrics = {name: round(value, 4) if math.isfinite(value) else value
+               for name, value in metrics.items() if value is not None}
+    score = max(metrics.values(), default=0.0)
+    exceeded = score > threshold
+    return {
+        'score': score,
+        'threshold': threshold,
+        'exceeded': exceeded,
+        'reason': max(metrics, key=metrics.get) if exceeded else 'within_threshold',
+        'metrics': metrics,
+    }
+
+
+class DriftSkipCounter:
+    """Counts per sweep how many customers skipped the LLM comparison"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.analyzed = 0
+        self.skipped = 0
+
+    def record(self, result: Optional[Dict]) -> None:
+        """Record the run_analysis result of a customer"""
+        with self._lock:
+            self.analyzed += 1
+            if isinstance(result, dict) and result.get('llm_skipped'):
+                self.skipped += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """Customers analyzed, LLM calls made and saved, and the skip rate"""
+        with self._lock:
+            return {
+                'analyzed': self.analyzed,
+                'llm_calls': self.analyzed - self.skipped,
+                'llm_calls_saved': self.skipped,
+                'skip_rate': round(self.skipped / self.analyzed, 4) if self.analyzed else 0.0,
+            }
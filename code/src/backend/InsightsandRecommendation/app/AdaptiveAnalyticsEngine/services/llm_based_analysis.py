@@ -1,11 +1,79 @@
 import json
+from typing import Any, List, TypedDict
+from app.AdaptiveAnalyticsEngine.services.data_fetcher import CUSTOMER_DATA_FIELDS
 from app.utils.GenerateContentService import generate_content
+from app.utils.StreamingJsonValidator import SchemaViolation, StreamingJsonValidator
+
+# Schema of the change analysis requested in prepare_llm_context; the streamed
+# response is validated against it while it is generated
+PROFILE_CHANGE_SCHEMA = {
+    "type": "object",
+    "required": ["profile_change_summary"],
+    "properties": {
+        "profile_change_summary": {
+            "type": "object",
+            "required": ["total_changes_detected", "changed_metrics"],
+            "properties": {
+                "total_changes_detected": {"type": "integer"},
+                "change_significance": {"type": "string", "enum": ["minor", "moderate", "substantial"]},
+                "changed_metrics": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "required": ["metric_name", "new_value"],
+                        "additionalProperties": True,
+                        "properties": {
+                            "metric_name": {"type": "string", "enum": CUSTOMER_DATA_FIELDS},
+                            "old_value": {},
+                            "new_value": {},
+                            "change_percentage": {"type": ["number", "string", "null"]},
+                            "change_significance": {"type": "string", "enum": ["minor", "significant"]},
+                            "confidence_level": {"type": "string", "enum": ["low", "medium", "high"]},
+                            "potential_implications": {"type": "array", "items": {"type": "string"}},
+                        },
+                    },
+                },
+            },
+        },
+        "overall_profile_shift": {
+            "type": "object",
+            "properties": {
+                "primary_direction": {"type": "string", "enum": ["positive", "negative", "neutral"]},
+                "key_observations": {"type": "array", "items": {"type": "string"}},
+            },
+        },
+    },
+}
+
+
+class ChangedMetric(TypedDict, total=False):
+    metric_name: str
+    old_value: Any
+    new_value: Any
+    change_percentage: Any
+    change_significance: str
+    confidence_level: str
+    potential_implications: List[str]
+
+
+class ProfileChangeSummary(TypedDict, total=False):
+    total_changes_detected: int
+    change_significance: str
+    changed_metrics: List[ChangedMetric]
+
+
+class ProfileChangeAnalysis(TypedDict, total=False):
+    """Parsed change analysis; error and raw_response are set instead when generation failed"""
+    profile_change_summary: ProfileChangeSummary
+    overall_profile_shift: dict
+    error: str
+    raw_response: str
 
 
 def prepare_llm_context(historical_context, new_data_summary):
     """Prepares context for LLM analysis with specific customer data fields"""
 
-    customer_data_fields = ["life_stage", "life_events", "spending_patterns", "retention_risk"]
+    customer_data_fields = CUSTOMER_DATA_FIELDS
 
     llm_prompt = f"""
 
@@ -81,11 +149,14 @@ Proceed with a meticulous and intelligent analysis of the customer profile trans
 
     return llm_prompt
 
-def analyze_with_llm(prompt):
+def analyze_with_llm(prompt) -> ProfileChangeAnalysis:
     """Sends data to LLM for analysis and insights generation"""
 
-    # Call Gemini API
-    response = generate_content(prompt, json_response=True)
+    # Call Gemini API; off-schema responses are aborted while streaming and retried
+    response = generate_content(prompt, json_response=True, response_schema=PROFILE_CHANGE_SCHEMA,
+                                task="profile_change")
+    if response is None:
+        return {"error": "No schema-conforming response from Gemini"}
 
     # Parse response
     try:
@@ -95,5 +166,20 @@ def analyze_with_llm(prompt):
         # Handle case where response isn't valid JSON
         return {
             "error": "Could not parse Gemini response",
-            "raw_response": response.text
+            "raw_response": response
+        }
+
+def parse_batch_response(response) -> ProfileChangeAnalysis:
+    """Validates and parses a response to the analysis prompt returned by a batch prediction job"""
+    if response is None:
+        return {"error": "No response in the batch prediction results"}
+
+    validator = StreamingJsonValidator(PROFILE_CHANGE_SCHEMA)
+    try:
+        validator.feed(response)
+        return json.loads(validator.close())
+    except (SchemaViolation, json.JSONDecodeError) as e:
+        return {
+            "error": f"Off-schema batch response: {str(e)}",
+            "raw_response": response
         }
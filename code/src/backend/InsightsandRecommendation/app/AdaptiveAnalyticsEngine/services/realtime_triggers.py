@@ -0,0 +1,308 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import AbstractSet, Any, Callable, Dict, Iterable, List, Optional, Set
+
+from config import Config
+from app.AdaptiveAnalyticsEngine.AnalyticsConfig.config import DEFAULT_CONFIG
+from app.utils.RateLimiter import PRIORITY_REALTIME, llm_priority
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+LARGE_TRANSACTION = "large_transaction"
+NEW_PRODUCT_INTERACTION = "new_product_interaction"
+LIFE_EVENT = "life_event"
+
+# Customers whose visited product pages are kept in memory between events
+KNOWN_PRODUCTS_CACHE_SIZE = 10_000
+
+_FREQUENCY_UNITS = {"minute": "minutes", "hour": "hours", "day": "days", "week": "weeks"}
+
+
+def parse_frequency(frequency: str) -> timedelta:
+    """
+    Parse a config frequency such as '15 Days' or '6 Hours'
+
+    Args:
+        frequency (str): Count followed by minutes, hours, days or weeks
+
+    Returns:
+        timedelta: The frequency as a duration
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]+?)s?\s*", str(frequency))
+    if not match or match.group(2).lower() not in _FREQUENCY_UNITS:
+        raise ValueError(f"Unsupported frequency: {frequency}")
+    return timedelta(**{_FREQUENCY_UNITS[match.group(2).lower()]: float(match.group(1))})
+
+
+class TriggerRules:
+    """
+    Cheap per-event checks for the realtime_triggers of the analytics config.
+
+    Thresholds, page sets and keyword patterns are compiled once, so evaluating
+    an incoming transaction or session is a few comparisons and one regex
+    search, without reading anything from Firestore.
+    """
+
+    def __init__(self, config: Optional[Dict] = None):
+        """
+        Initialize TriggerRules
+
+        Args:
+            config (dict, optional): Analytics configuration. Defaults to DEFAULT_CONFIG.
+        """
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        self.enabled = frozenset(config['realtime_triggers'])
+        self.large_transaction_threshold = float(config['large_transaction_threshold'])
+        self.product_pages = frozenset(page.lower() for page in config['product_pages'])
+        keywords = sorted(config['life_event_keywords'], key=len, reverse=True)
+        self.life_event_pattern = re.compile(
+            r"\b(?:" + "|".join(re.escape(keyword) for keyword in keywords) + r")", re.IGNORECASE) \
+            if keywords else None
+
+    def evaluate_transaction(self, transaction: Dict) -> Set[str]:
+        """Triggers tripped by a single transaction"""
+        triggers = set()
+        if LARGE_TRANSACTION in self.enabled:
+            try:
+                amount = abs(float(transaction.get('Transaction_Amount')))
+            except (TypeError, ValueError):
+                amount = 0.0
+            if amount >= self.large_transaction_threshold:
+                triggers.add(LARGE_TRANSACTION)
+        if LIFE_EVENT in self.enabled and self.life_event_pattern is not None:
+            text = f"{transaction.get('Merchant') or ''} {transaction.get('Merchant_Category') or ''}"
+            if self.life_event_pattern.search(text):
+                triggers.add(LIFE_EVENT)
+        return triggers
+
+    def product_pages_visited(self, sessions: Iterable[Dict]) -> Set[str]:
+        """Product pages, lower cased, visited in the given sessions"""
+        return {str(page).lower() for session in sessions for page in session.get('visited') or []
+                if str(page).lower() in self.product_pages}
+
+    def evaluate_session(self, session: Dict, known_products: AbstractSet[str] = frozenset()) -> Set[str]:
+        """Triggers tripped by a single app session; product pages in known_products are not new"""
+        if NEW_PRODUCT_INTERACTION in self.enabled and self.product_pages_visited([session]) - known_products:
+            return {NEW_PRODUCT_INTERACTION}
+        return set()
+
+    def evaluate(self, transactions: Iterable[Dict] = (), sessions: Iterable[Dict] = (),
+                 known_products: AbstractSet[str] = frozenset()) -> Set[str]:
+        """Triggers tripped by any of the given transactions and sessions"""
+        triggers = set()
+        for transaction in transactions:
+            triggers |= self.evaluate_transaction(transaction)
+        for session in sessions:
+            triggers |= self.evaluate_session(session, known_products)
+        return triggers
+
+
+def load_visited_pages(client_id: str, before: datetime, days: int) -> Set[str]:
+    """Pages of the client's app sessions in the days before the given date"""
+    # Imported here: the Firestore client is created with the app
+    from app.init import db_client
+    from app.db.AppActivityStore import fetch_sessions_since
+    sessions = fetch_sessions_since(db_client, client_id, before - timedelta(days=days))
+    return {page for session in sessions if datetime.fromisoformat(session['date']) < before
+            for page in session.get('visited') or []}
+
+
+def _earliest_session(sessions: Iterable[Dict]) -> datetime:
+    dates = []
+    for session in sessions:
+        try:
+            dates.append(datetime.fromisoformat(str(session['date'])))
+        except (KeyError, ValueError):
+            continue
+    return min(dates) if dates else datetime.now()
+
+
+def _start_timer(delay: float, callback: Callable[[], None]) -> None:
+    timer = threading.Timer(delay, callback)
+    timer.daemon = True
+    timer.start()
+
+
+def run_triggered_analysis(client_id: str, days: int):
+    """Run the adaptive analytics engine for one customer"""
+    # Imported here: the engine binds the Firestore client at import time
+    from app.AdaptiveAnalyticsEngine.analytics_engine import AnalyticsEngine
+    # A tripped trigger is itself the signal, so the window-level drift check is not applied
+    return AnalyticsEngine(client_id).run_analysis(days, skip_drift_check=True)
+
+
+class RealtimeTriggerPipeline:
+    """
+    Event-driven path of the adaptive analytics: incoming transactions and
+    sessions are checked against the trigger rules and only customers that
+    trip a trigger are queued for AnalyticsEngine.run_analysis.
+
+    A customer is analyzed at most once per cooldown. Triggers arriving while its
+    analysis is queued, running or cooling down are deferred into one follow-up
+    analysis, started once the running analysis has finished and the cooldown has passed.
+    """
+
+    def __init__(self, config: Optional[Dict] = None, analyze: Optional[Callable[[str, int], Any]] = None,
+                 max_workers: Optional[int] = None, clock: Callable[[], float] = time.monotonic,
+                 visited_pages: Optional[Callable[[str, datetime], Iterable[str]]] = None,
+                 schedule: Optional[Callable[[float, Callable[[], None]], Any]] = None):
+        """
+        Initialize RealtimeTriggerPipeline
+
+        Args:
+            config (dict, optional): Analytics configuration. Defaults to DEFAULT_CONFIG.
+            analyze (Callable, optional): Runs the analysis of a client for the given days.
+                Defaults to the adaptive analytics engine.
+            max_workers (int, optional): Concurrent analyses. Defaults to Config.REALTIME_TRIGGER_WORKERS.
+            clock (Callable, optional): Monotonic clock in seconds
+            visited_pages (Callable, optional): Returns the pages a client visited before a date, to tell
+                new product interactions apart. Defaults to the client's recent app sessions.
+            schedule (Callable, optional): Calls a callback after a delay in clock seconds, for
+                deferred analyses. Defaults to a timer thread.
+        """
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        self.rules = TriggerRules(config)
+        self.cooldown = parse_frequency(config['realtime_cooldown']).total_seconds()
+        self.analysis_days = int(config['realtime_analysis_days'])
+        product_history_days = int(config['product_history_days'])
+        self.analyze = analyze or run_triggered_analysis
+        self.visited_pages = visited_pages or \
+            (lambda client_id, before: load_visited_pages(client_id, before, product_history_days))
+        self.schedule = schedule or _start_timer
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or Config.REALTIME_TRIGGER_WORKERS,
+                                           thread_name_prefix="realtime-trigger")
+        self._lock = threading.Lock()
+        self._active: Set[str] = set()
+        self._last_started: Dict[str, float] = {}
+        self._deferred: Dict[str, Set[str]] = {}
+        self._known_products: "OrderedDict[str, Set[str]]" = OrderedDict()
+        self._closed = False
+
+    def ingest(self, client_id: str, transactions: Iterable[Dict] = (), sessions: Iterable[Dict] = ()) -> Dict:
+        """
+        Evaluate the new events of a customer and queue an analysis if a trigger trips
+
+        Args:
+            client_id (str): Unique identifier for the client
+            transactions (Iterable[Dict]): New transactions of the client
+            sessions (Iterable[Dict]): New app sessions of the client
+
+        Returns:
+            Dict: Tripped triggers and whether an analysis was queued
+        """
+        client_id = str(client_id)
+        sessions = list(sessions)
+        known_products = self._product_history(client_id, sessions) \
+            if NEW_PRODUCT_INTERACTION in self.rules.enabled else frozenset()
+        triggers = sorted(self.rules.evaluate(transactions, sessions, known_products))
+        status = self._enqueue(client_id, triggers) if triggers else "not_triggered"
+        return {"client_id": client_id, "triggers": triggers, "status": status}
+
+    def _product_history(self, client_id: str, sessions: List[Dict]) -> Set[str]:
+        """Product pages the customer visited before these sessions, which then join its history"""
+        visited = self.rules.product_pages_visited(sessions)
+        if not visited:
+            return set()
+        with self._lock:
+            known = self._known_products.get(client_id)
+            if known is not None:
+                self._known_products.move_to_end(client_id)
+                previous = set(known)
+                known |= visited
+                return previous
+
+        # First event of the customer since start up: read its session history once
+        try:
+            previous = {str(page).lower() for page in self.visited_pages(client_id, _earliest_session(sessions))}
+            previous &= self.rules.product_pages
+        except Exception as e:
+            logger.error(f"Failed to load visited pages of customer {client_id}: {str(e)}")
+            return set()
+        with self._lock:
+            self._known_products.setdefault(client_id, set()).update(previous | visited)
+            self._known_products.move_to_end(client_id)
+            while len(self._known_products) > KNOWN_PRODUCTS_CACHE_SIZE:
+                self._known_products.popitem(last=False)
+        return previous
+
+    def _remaining_cooldown(self, client_id: str) -> float:
+        last_started = self._last_started.get(client_id)
+        return 0.0 if last_started is None else max(self.cooldown - (self.clock() - last_started), 0.0)
+
+    def _enqueue(self, client_id: str, triggers: List[str]) -> str:
+        delay = None
+        with self._lock:
+            if client_id in self._active or self._remaining_cooldown(client_id) > 0:
+                status = "coalesced" if client_id in self._active else "cooling_down"
+                if client_id not in self._deferred and status == "cooling_down":
+                    delay = self._remaining_cooldown(client_id)
+                self._deferred.setdefault(client_id, set()).update(triggers)
+            else:
+                status = "queued"
+                triggers = sorted(set(triggers) | self._deferred.pop(client_id, set()))
+                self._active.add(client_id)
+                self._last_started[client_id] = self.clock()
+
+        if status == "queued":
+            self.executor.submit(self._run, client_id, triggers)
+        elif delay is not None:
+            # A running analysis schedules the deferred one when it finishes
+            self.schedule(delay, lambda: self._run_deferred(client_id))
+        return status
+
+    def _run_deferred(self, client_id: str) -> None:
+        with self._lock:
+            if self._closed or client_id in self._active or client_id not in self._deferred:
+                return
+            delay = self._remaining_cooldown(client_id)
+            if delay == 0:
+                triggers = sorted(self._deferred.pop(client_id))
+                self._active.add(client_id)
+                self._last_started[client_id] = self.clock()
+
+        if delay > 0:
+            self.schedule(delay, lambda: self._run_deferred(client_id))
+            return
+        logger.info(f"Starting deferred analysis of customer {client_id}")
+        self.executor.submit(self._run, client_id, triggers)
+
+    def _run(self, client_id: str, triggers: List[str]) -> None:
+        try:
+            # Triggered analyses are admitted to the LLM quota ahead of batch sweeps
+            with llm_priority(PRIORITY_REALTIME):
+                self.analyze(client_id, self.analysis_days)
+            logger.info(f"Triggered analysis of customer {client_id} completed ({', '.join(triggers)})")
+        except Exception as e:
+            logger.error(f"Triggered analysis of customer {client_id} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._active.discard(client_id)
+                delay = self._remaining_cooldown(client_id) if client_id in self._deferred else None
+            if delay is not None:
+                self.schedule(delay, lambda: self._run_deferred(client_id))
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop accepting analyses and optionally wait for the queued ones; deferred analyses are dropped"""
+        with self._lock:
+            self._closed = True
+        self.executor.shutdown(wait=wait)
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_realtime_pipeline() -> RealtimeTriggerPipeline:
+    """Return the process wide RealtimeTriggerPipeline, creating it on first use"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = RealtimeTriggerPipeline()
+        return _pipeline
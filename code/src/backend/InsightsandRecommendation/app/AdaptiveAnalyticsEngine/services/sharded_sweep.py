@@ -0,0 +1,332 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from firebase_admin import firestore
+
+from config import Config
+from app.AdaptiveAnalyticsEngine.services.drift_detector import DriftSkipCounter
+from app.utils.RateLimiter import PRIORITY_BATCH, llm_priority
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+SHARD_STATUS_PENDING = "pending"
+SHARD_STATUS_CLAIMED = "claimed"
+SHARD_STATUS_COMPLETED = "completed"
+
+
+def shard_for_client(client_id, num_shards):
+    """
+    Map a client id to a shard using a stable hash, so every worker process
+    agrees on shard membership regardless of PYTHONHASHSEED
+
+    Args:
+        client_id (str): Unique identifier for the client
+        num_shards (int): Total number of shards in the sweep
+
+    Returns:
+        int: Shard number in [0, num_shards)
+    """
+    digest = hashlib.md5(str(client_id).encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % num_shards
+
+
+def default_worker_id():
+    """Identify the current worker process"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class FirestoreCheckpointStore:
+    """
+    Shard claims and checkpoints stored in the SweepCheckpoints collection.
+    Claims are made inside a Firestore transaction so concurrent workers
+    on different hosts never own the same shard.
+    """
+
+    def __init__(self, firestore_client, collection_name="SweepCheckpoints"):
+        """
+        Initialize FirestoreCheckpointStore
+
+        Args:
+            firestore_client (firestore.Client): Firestore client
+            collection_name (str): Collection holding one document per shard
+        """
+        self.db = firestore_client
+        self.collection_name = collection_name
+
+    def _shard_ref(self, sweep_id, shard):
+        return self.db.collection(self.collection_name).document(f"{sweep_id}_{shard:04d}")
+
+    def claim_shard(self, sweep_id, shard, worker_id, lease_seconds):
+        """
+        Claim a shard if it is unclaimed, already owned by this worker, or its lease expired
+
+        Returns:
+            dict: Shard checkpoint if claimed, None otherwise
+        """
+        shard_ref = self._shard_ref(sweep_id, shard)
+
+        @firestore.transactional
+        def claim(transaction):
+            snapshot = shard_ref.get(transaction=transaction)
+            checkpoint = snapshot.to_dict() if snapshot.exists else {
+                "sweep_id": sweep_id,
+                "shard": shard,
+                "status": SHARD_STATUS_PENDING,
+                "last_client_id": None,
+                "failed_client_ids": [],
+                "processed": 0,
+            }
+            if not _is_claimable(checkpoint, worker_id):
+                return None
+
+            checkpoint.update(_claim_fields(worker_id, lease_seconds))
+            transaction.set(shard_ref, checkpoint)
+            return checkpoint
+
+        return claim(self.db.transaction())
+
+    def save_checkpoint(self, sweep_id, shard, worker_id, last_client_id, processed, failed_client_ids,
+                        lease_seconds, completed=False):
+        """Record the last finished customer of a shard and renew the worker's lease"""
+        fields = {
+            "last_client_id": last_client_id,
+            "processed": processed,
+            "failed_client_ids": failed_client_ids,
+            **_claim_fields(worker_id, lease_seconds),
+            "status": SHARD_STATUS_COMPLETED if completed else SHARD_STATUS_CLAIMED,
+        }
+        self._shard_ref(sweep_id, shard).set(fields, merge=True)
+
+
+class SQLiteCheckpointStore:
+    """
+    Shard claims and checkpoints stored in a local SQLite database.
+    Lets several worker processes on one host share a sweep without Firestore.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sweep_checkpoints (
+                    sweep_id TEXT NOT NULL,
+                    shard INTEGER NOT NULL,
+                    checkpoint TEXT NOT NULL,
+                    PRIMARY KEY (sweep_id, shard)
+                )""")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+
+    def claim_shard(self, sweep_id, shard, worker_id, lease_seconds):
+        """Claim a shard atomically; returns the checkpoint if claimed, None otherwise"""
+        with self._lock:
+            conn = self._connect()
+            try:
+                # BEGIN IMMEDIATE takes the write lock so claims are serialized across processes
+                conn.execute("BEGIN IMMEDIATE")
+                row = conn.execute("SELECT checkpoint FROM sweep_checkpoints WHERE sweep_id = ? AND shard = ?",
+                                   (sweep_id, shard)).fetchone()
+                checkpoint = json.loads(row[0]) if row else {
+                    "sweep_id": sweep_id,
+                    "shard": shard,
+                    "status": SHARD_STATUS_PENDING,
+                    "last_client_id": None,
+                    "failed_client_ids": [],
+                    "processed": 0,
+                }
+                if not _is_claimable(checkpoint, worker_id):
+                    conn.execute("ROLLBACK")
+                    return None
+
+                checkpoint.update(_claim_fields(worker_id, lease_seconds))
+                conn.execute("INSERT OR REPLACE INTO sweep_checkpoints (sweep_id, shard, checkpoint) VALUES (?, ?, ?)",
+                             (sweep_id, shard, json.dumps(checkpoint, default=str)))
+                conn.execute("COMMIT")
+                return checkpoint
+            finally:
+                conn.close()
+
+    def save_checkpoint(self, sweep_id, shard, worker_id, last_client_id, processed, failed_client_ids,
+                        lease_seconds, completed=False):
+        """Record the last finished customer of a shard and renew the worker's lease"""
+        checkpoint = {
+            "sweep_id": sweep_id,
+            "shard": shard,
+            "last_client_id": last_client_id,
+            "processed": processed,
+            "failed_client_ids": failed_client_ids,
+            **_claim_fields(worker_id, lease_seconds),
+            "status": SHARD_STATUS_COMPLETED if completed else SHARD_STATUS_CLAIMED,
+        }
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute("INSERT OR REPLACE INTO sweep_checkpoints (sweep_id, shard, checkpoint) VALUES (?, ?, ?)",
+                             (sweep_id, shard, json.dumps(checkpoint, default=str)))
+            finally:
+                conn.close()
+
+
+def create_checkpoint_store(firestore_client):
+    """Create the checkpoint store configured by Config.SWEEP_CHECKPOINT_BACKEND"""
+    backend = Config.SWEEP_CHECKPOINT_BACKEND
+    if backend == "firestore":
+        return FirestoreCheckpointStore(firestore_client)
+    if backend == "sqlite":
+        return SQLiteCheckpointStore(Config.SWEEP_CHECKPOINT_PATH)
+    raise ValueError(f"Unsupported sweep checkpoint backend: {backend}")
+
+
+def _claim_fields(worker_id, lease_seconds):
+    now = datetime.now()
+    return {
+        "status": SHARD_STATUS_CLAIMED,
+        "worker_id": worker_id,
+        "lease_expires_at": (now + timedelta(seconds=lease_seconds)).isoformat(),
+        "updated_at": now.isoformat(),
+    }
+
+
+def _is_claimable(checkpoint, worker_id):
+    if checkpoint.get("status") == SHARD_STATUS_COMPLETED:
+        return False
+    if checkpoint.get("status") == SHARD_STATUS_PENDING or checkpoint.get("worker_id") == worker_id:
+        return True
+    lease_expires_at = checkpoint.get("lease_expires_at")
+    return not lease_expires_at or datetime.fromisoformat(str(lease_expires_at)) < datetime.now()
+
+
+class ShardedSweep:
+    """
+    Resumable sweep over CustomerData split into hash shards.
+
+    Each worker process claims shards one at a time, runs the customers of the
+    shard in client id order and checkpoints after every customer. A worker that
+    crashes leaves its shard claimed until the lease expires; the next worker to
+    claim it resumes after the last checkpointed customer.
+    """
+
+    def __init__(self, firestore_client, sweep_id, num_shards, checkpoint_store=None, worker_id=None,
+                 process_customer=None, lease_seconds=None, days=30):
+        """
+        Initialize ShardedSweep
+
+        Args:
+            firestore_client (firestore.Client): Firestore client used to list customers
+            sweep_id (str): Identifier shared by all workers of the sweep, e.g. '2025-03-01'
+            num_shards (int): Number of shards the customer id space is split into
+            checkpoint_store (optional): Claim/checkpoint store. Defaults to the configured store.
+            worker_id (str, optional): Identifier of this worker. Defaults to host and pid.
+            process_customer (Callable, optional): Called with each client_id and days. Defaults to
+                AnalyticsEngine(client_id).run_analysis(days).
+            lease_seconds (int, optional): How long a claim stays valid without a checkpoint.
+                Defaults to Config.SWEEP_LEASE_SECONDS.
+            days (int): Days of new data analyzed per customer
+        """
+        if not sweep_id:
+            raise ValueError("sweep_id cannot be empty")
+        if not isinstance(num_shards, int) or num_shards <= 0:
+            raise ValueError("num_shards must be a positive integer")
+
+        self.db = firestore_client
+        self.sweep_id = str(sweep_id)
+        self.num_shards = num_shards
+        self.checkpoint_store = checkpoint_store or create_checkpoint_store(firestore_client)
+        self.worker_id = worker_id or default_worker_id()
+        self.process_customer = process_customer or _run_engine_analysis
+        self.lease_seconds = lease_seconds or Config.SWEEP_LEASE_SECONDS
+        self.days = days
+
+    def list_clients_by_shard(self):
+        """List all client ids once, partitioned into shards, each in processing order"""
+        # select([]) fetches document ids only, not the customer payloads
+        documents = self.db.collection('CustomerData').select([]).stream()
+        clients_by_shard = {shard: [] for shard in range(self.num_shards)}
+        for doc in documents:
+            clients_by_shard[shard_for_client(doc.id, self.num_shards)].append(doc.id)
+        return {shard: sorted(client_ids) for shard, client_ids in clients_by_shard.items()}
+
+    def run(self, on_customer_done=None, clients_by_shard=None):
+        """
+        Claim and process shards until no claimable shard is left
+
+        Args:
+            on_customer_done (Callable, optional): Called with (client_id, result, error) per customer
+            clients_by_shard (dict, optional): Result of list_clients_by_shard when the caller has
+                already listed the customers. Listed on the first claimed shard otherwise.
+
+        Returns:
+            dict: Summary with claimed shards, processed/failed counts and LLM comparisons
+                skipped by drift detection for this worker
+        """
+        summary = {"worker_id": self.worker_id, "shards": [], "processed": 0, "failed": 0}
+        skips = DriftSkipCounter()
+        # Customers are listed once per run, on the first claimed shard
+        for shard in range(self.num_shards):
+            checkpoint = self.checkpoint_store.claim_shard(self.sweep_id, shard, self.worker_id,
+                                                           self.lease_seconds)
+            if checkpoint is None:
+                continue
+
+            logger.info(f"Worker {self.worker_id} claimed shard {shard} of sweep {self.sweep_id}, "
+                        f"resuming after {checkpoint.get('last_client_id')}")
+            summary["shards"].append(shard)
+            if clients_by_shard is None:
+                clients_by_shard = self.list_clients_by_shard()
+            # Sweep LLM calls queue behind realtime trigger analyses
+            with llm_priority(PRIORITY_BATCH):
+                processed, failed = self._run_shard(shard, clients_by_shard[shard], checkpoint,
+                                                    on_customer_done, skips)
+            summary["processed"] += processed
+            summary["failed"] += failed
+
+        summary["llm_skips"] = skips.summary()
+        return summary
+
+    def _run_shard(self, shard, client_ids, checkpoint, on_customer_done, skips):
+        last_client_id = checkpoint.get("last_client_id")
+        failed_client_ids = list(checkpoint.get("failed_client_ids") or [])
+        processed = checkpoint.get("processed") or 0
+        processed_now, failed_now = 0, 0
+
+        for client_id in client_ids:
+            if last_client_id is not None and client_id <= last_client_id:
+                continue
+
+            result, error = None, None
+            try:
+                result = self.process_customer(client_id, self.days)
+                skips.record(result)
+                processed_now += 1
+            except Exception as e:
+                logger.error(f"Sweep {self.sweep_id} failed for customer {client_id}: {str(e)}")
+                error = str(e)
+                failed_client_ids.append(client_id)
+                failed_now += 1
+
+            processed += 1
+            last_client_id = client_id
+            self.checkpoint_store.save_checkpoint(self.sweep_id, shard, self.worker_id, last_client_id,
+                                                  processed, failed_client_ids, self.lease_seconds)
+            if on_customer_done is not None:
+                on_customer_done(client_id, result, error)
+
+        self.checkpoint_store.save_checkpoint(self.sweep_id, shard, self.worker_id, last_client_id,
+                                              processed, failed_client_ids, self.lease_seconds, completed=True)
+        logger.info(f"Shard {shard} of sweep {self.sweep_id} completed")
+        return processed_now, failed_now
+
+
+def _run_engine_analysis(client_id, days):
+    # Imported lazily so AnalyticsEngine binds db_client after the app has initialized it
+    from app.AdaptiveAnalyticsEngine.analytics_engine import AnalyticsEngine
+    return AnalyticsEngine(client_id).run_analysis(days)
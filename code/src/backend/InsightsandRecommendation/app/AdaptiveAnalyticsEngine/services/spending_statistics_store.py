@@ -0,0 +1,35 @@
+from app.InsightGenerator.AnalyzeSpendingPattern.IncrementalSpendingStatistics import SpendingStatisticsState
+
+
+class SpendingStatisticsStore:
+    def __init__(self, firestore_client, client_id, collection_name='SpendingStatistics'):
+        """
+        Initialize SpendingStatisticsStore with Firestore client and client ID
+
+        Args:
+            firestore_client (firestore.Client): Firestore client
+            client_id (str): Unique identifier for the client
+            collection_name (str): Collection holding one running-aggregate document per client
+        """
+        self.db = firestore_client
+        self.client_id = str(client_id)
+        self.collection_name = collection_name
+
+    def _state_ref(self):
+        return self.db.collection(self.collection_name).document(self.client_id)
+
+    def load(self):
+        """
+        Load the persisted running spending aggregates of the client
+
+        Returns:
+            SpendingStatisticsState: Persisted state, or None if the client has no state yet
+        """
+        snapshot = self._state_ref().get()
+        if not snapshot.exists:
+            return None
+        return SpendingStatisticsState(snapshot.to_dict())
+
+    def save(self, state):
+        """Persist the running spending aggregates of the client"""
+        self._state_ref().set(state.to_dict())
@@ -1,3 +1,6 @@
+from app.InsightGenerator.AnalyzeSpendingPattern.SpendingAggregates import SpendingAggregates
+
+
 def summarize_data(new_data):
     transactions_summary = summarize_transactions(new_data["transactions"])
     app_activity_summary = _summarize_app_activity(new_data["app_activity"])
@@ -12,15 +15,18 @@ def summarize_transactions(transactions_df):
     if transactions_df.empty:
         return {}
 
+    aggregates = SpendingAggregates(transactions_df)
+    largest = transactions_df.loc[aggregates.amounts.idxmax()]
+
     return {
-        'total_spent': transactions_df['Transaction_Amount'].sum(),
+        'total_spent': aggregates.amounts.sum(),
         'num_transactions': len(transactions_df),
-        'merchant_categories': transactions_df.groupby('Merchant_Category')['Transaction_Amount'].agg(['sum', 'count']).to_dict(),
-        'merchants': transactions_df.groupby('Merchant')['Transaction_Amount'].agg(['sum', 'count']).to_dict(),
+        'merchant_categories': aggregates.category_stats.to_dict(),
+        'merchants': aggregates.merchant_stats.to_dict(),
         'largest_transaction': {
-            'amount': transactions_df['Transaction_Amount'].max(),
-            'merchant': transactions_df.loc[transactions_df['Transaction_Amount'].idxmax(), 'Merchant'],
-            'merchant_category': transactions_df.loc[transactions_df['Transaction_Amount'].idxmax(), 'Merchant_Category']
+            'amount': aggregates.amounts.max(),
+            'merchant': largest['Merchant'],
+            'merchant_category': largest['Merchant_Category']
         }
     }
 
@@ -0,0 +1,231 @@
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from config import Config
+from app.InsightGenerator.AnalyzeLifeStage import analyze_life_stage, schema as life_stage_schema
+from app.InsightGenerator.AnalyzeRetentionRisk import (
+    RETENTION_RISK_KEYS, analyze_retention_risk, schema as retention_risk_schema)
+from app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeSpendingPattern import (
+    analyze_spending_patterns, compute_spending_statistics, llm_analyze_spending_insights)
+from app.InsightGenerator.DetectLifeEvents import detect_life_events
+from app.InsightGenerator.StatisticalScorers import analyze_statistically
+from app.utils.GenerateContentService import generate_content
+from app.utils.PromptCompactor import compact_transactions
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+SPENDING_ANALYSIS_KEYS = ['spending_profile', 'financial_behavior', 'risk_assessment',
+                          'personalized_recommendations', 'anomaly_detection']
+
+combined_schema = {
+    "type": "object",
+    "properties": {
+        "life_stage": life_stage_schema,
+        "life_events": {
+            "type": "object",
+            "properties": {
+                "detected_events": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "event_type": {"type": "string"},
+                            "timing": {"type": "string"},
+                            "probability": {"type": "number"},
+                            "supporting_evidence": {"type": "array", "items": {"type": "string"}}
+                        }
+                    }
+                }
+            },
+            "required": ["detected_events"]
+        },
+        "retention_risk": retention_risk_schema,
+        "spending_analysis": {
+            "type": "object",
+            "properties": {key: {"type": "object"} for key in SPENDING_ANALYSIS_KEYS},
+            "required": SPENDING_ANALYSIS_KEYS
+        }
+    },
+    "required": ["life_stage", "life_events", "retention_risk", "spending_analysis"]
+}
+
+
+def _has_keys(section: Any, keys: List[str]) -> bool:
+    return isinstance(section, dict) and all(key in section for key in keys)
+
+
+def _valid_life_events(section: Any) -> bool:
+    return _has_keys(section, ["detected_events"]) and isinstance(section["detected_events"], list)
+
+
+SECTION_VALIDATORS = {
+    "life_stage": lambda section: _has_keys(section, life_stage_schema["required"]),
+    "life_events": _valid_life_events,
+    "retention_risk": lambda section: _has_keys(section, RETENTION_RISK_KEYS),
+    "spending_analysis": lambda section: _has_keys(section, SPENDING_ANALYSIS_KEYS),
+}
+
+SECTION_INSTRUCTIONS = {
+    "life_stage": "Identify primary and alternative life stages with confidence levels (0-100), key indicators "
+                  "and reasoning.",
+    "life_events": "Identify likely major life events (e.g., moving, new job, marriage, children, travel), their "
+                   "approximate timing, probability and the transactions or patterns supporting each conclusion.",
+    "retention_risk": "Assess overall attrition risk (low, medium, high), risk and protective factors, the most "
+                      "effective retention strategies and the probability of attrition in the next 6 months.",
+    "spending_analysis": "Interpret the spending profile, financial behavior, risk assessment, personalized "
+                         "recommendations and anomalies, leveraging both the pre-computed statistics and the "
+                         "transaction data.",
+}
+
+# Sections computed by the statistical scorers instead of the LLM when Config.STATISTICAL_INSIGHT_SCORERS is set
+STATISTICAL_SECTIONS = ("life_stage", "retention_risk")
+
+
+def llm_sections() -> List[str]:
+    """Sections of the combined analysis answered by the LLM"""
+    if Config.STATISTICAL_INSIGHT_SCORERS:
+        return [name for name in SECTION_VALIDATORS if name not in STATISTICAL_SECTIONS]
+    return list(SECTION_VALIDATORS)
+
+
+def statistical_insights(data: Dict) -> Dict[str, Any]:
+    """
+    Sections computed by the statistical scorers, empty unless Config.STATISTICAL_INSIGHT_SCORERS is set
+
+    Args:
+        data (Dict): Customer data with 'customer_info', 'transactions' and 'app_activity' keys
+
+    Returns:
+        Dict: Section name -> result, in the same shape as the individual analyzers
+    """
+    if not Config.STATISTICAL_INSIGHT_SCORERS:
+        return {}
+    # Both sections come from one scoring of the customer's features
+    return analyze_statistically(data, STATISTICAL_SECTIONS)
+
+
+def get_combined_analysis_prompt(data: Dict, spending_statistics: Dict) -> str:
+    """Build one prompt covering the LLM sections: life stage, life events, retention risk and spending analysis"""
+    sections = llm_sections()
+    schema = {
+        "type": "object",
+        "properties": {name: combined_schema["properties"][name] for name in sections},
+        "required": sections
+    }
+    instructions = "\n".join(f"{number}. {name}: {SECTION_INSTRUCTIONS[name]}"
+                              for number, name in enumerate(sections, start=1))
+    return f"""
+As a senior financial analyst specializing in customer segmentation, journey mapping, retention and spending behavior,
+analyze this customer and produce {len(sections)} analyses in a single JSON response.
+
+Customer Information:
+{json.dumps(data['customer_info'], separators=(',', ':'), default=str)}
+
+Transaction Data (compact columnar JSON, most recent first; older history may be summarized by month):
+{compact_transactions(data['transactions'])}
+
+Pre-computed Spending Statistics:
+{json.dumps(spending_statistics, separators=(',', ':'), default=str)}
+
+Analysis Instructions:
+{instructions}
+
+Required Response Format:
+Use the following JSON Schema to structure your JSON response-
+{json.dumps(schema, separators=(',', ':'))}
+
+Use ONLY the provided data. Respond ONLY with the JSON object.
+"""
+
+
+def analyze_combined_insights(data: Dict) -> Dict[str, Any]:
+    """
+    Run the four initial insight analyses with a single LLM call.
+
+    Each section of the combined response is validated separately; sections that are
+    missing or malformed are recomputed with the individual analyzer. With
+    Config.STATISTICAL_INSIGHT_SCORERS set, life stage and retention risk come from the
+    statistical scorers and are left out of the prompt.
+
+    Args:
+        data (Dict): Customer data with 'customer_info' and 'transactions' keys
+
+    Returns:
+        Dict: Insight key -> result, in the same shape as the individual analyzers
+    """
+    if not isinstance(data, dict) or 'customer_info' not in data or 'transactions' not in data:
+        raise ValueError("Input data must contain 'customer_info' and 'transactions' keys")
+
+    spending_statistics = safe_spending_statistics(data['transactions'])
+    precomputed = statistical_insights(data)
+
+    response = None
+    try:
+        response = generate_content(get_combined_analysis_prompt(data, spending_statistics or {}),
+                                    json_response=True, task="combined_insights")
+    except Exception as e:
+        logger.error(f"Combined insight analysis failed, falling back to individual analyzers: {str(e)}")
+
+    return combined_insights_from_response(response, spending_statistics, lambda: data, precomputed)
+
+
+def safe_spending_statistics(transactions) -> Optional[Dict]:
+    """Spending statistics for the combined prompt, or None if they cannot be computed"""
+    try:
+        return compute_spending_statistics(transactions)
+    except Exception as e:
+        logger.error(f"Failed to compute spending statistics: {str(e)}")
+        return None
+
+
+def combined_insights_from_response(response: Optional[str], spending_statistics: Optional[Dict],
+                                    load_data: Callable[[], Dict],
+                                    precomputed: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Build the insights from a combined analysis response
+
+    Args:
+        response (str): JSON response to the combined prompt, None if the call failed
+        spending_statistics (Dict): Statistics embedded in the prompt, None if they failed
+        load_data (Callable): Returns the customer data; only called when a section has to be
+            recomputed with its individual analyzer
+        precomputed (Dict, optional): Sections already computed outside the LLM, see statistical_insights
+
+    Returns:
+        Dict: Insight key -> result, in the same shape as the individual analyzers
+    """
+    sections = {}
+    try:
+        sections = json.loads(response) if response else {}
+        if not isinstance(sections, dict):
+            sections = {}
+    except Exception as e:
+        logger.error(f"Combined insight analysis failed, falling back to individual analyzers: {str(e)}")
+
+    precomputed = precomputed or {}
+    sections.update(precomputed)
+    valid = {name: name in precomputed or validator(sections.get(name))
+             for name, validator in SECTION_VALIDATORS.items()}
+    failed_sections = [name for name, is_valid in valid.items() if not is_valid]
+    if failed_sections:
+        logger.warning(f"Falling back to individual analyzers for sections: {failed_sections}")
+
+    data = load_data() if failed_sections or spending_statistics is None else None
+    insights = {
+        "life_stage": sections["life_stage"] if valid["life_stage"] else analyze_life_stage(data),
+        "life_events": sections["life_events"] if valid["life_events"] else detect_life_events(data),
+        "retention_risk": sections["retention_risk"] if valid["retention_risk"] else analyze_retention_risk(data),
+    }
+
+    if spending_statistics is None:
+        insights["spending_patterns"] = analyze_spending_patterns(data['transactions'])
+    else:
+        insights["spending_patterns"] = {
+            'statistical_spend_insights': spending_statistics,
+            'llm_analysis': sections["spending_analysis"] if valid["spending_analysis"]
+            else llm_analyze_spending_insights(spending_statistics, data['transactions'])
+        }
+
+    return insights
@@ -2,6 +2,7 @@ from typing import Dict
 import json
 import logging
 from app.utils.GenerateContentService import generate_content
+from app.utils.PromptCompactor import compact_transactions
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -21,8 +22,8 @@ def analyze_life_stage(data: Dict) -> Dict:
             Customer Information:
             {json.dumps(data['customer_info'], indent=2)}
 
-            Transaction Data (Complete Records):
-            {json.dumps(data['transactions'], indent=2)}
+            Transaction Data (compact columnar JSON, most recent first; older history may be summarized by month):
+            {compact_transactions(data['transactions'])}
 
             Analysis Instructions:
              - Identify primary and potential alternative life stages
@@ -43,7 +44,7 @@ def analyze_life_stage(data: Dict) -> Dict:
 
         try:
             # Call Gemini API
-            response = generate_content(prompt, json_response=True)
+            response = generate_content(prompt, json_response=True, task="life_stage")
         except Exception as e:
             logger.error(f"Error calling Gemini API: {str(e)}")
             return {
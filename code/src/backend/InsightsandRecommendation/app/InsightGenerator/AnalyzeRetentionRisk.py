@@ -1,6 +1,22 @@
 from typing import Dict
 import json
 from app.utils.GenerateContentService import generate_content
+from app.utils.PromptCompactor import compact_transactions
+
+RETENTION_RISK_KEYS = ['attrition_risk_level', 'risk_factors', 'protective_factors', 'retention_strategies',
+                       'attrition_probability']
+
+schema = {
+    "type": "object",
+    "properties": {
+        "attrition_risk_level": {"type": "string", "enum": ["low", "medium", "high"]},
+        "risk_factors": {"type": "array", "items": {"type": "string"}},
+        "protective_factors": {"type": "array", "items": {"type": "string"}},
+        "retention_strategies": {"type": "array", "items": {"type": "string"}},
+        "attrition_probability": {"type": "number"}
+    },
+    "required": RETENTION_RISK_KEYS
+}
 
 
 def analyze_retention_risk(data: Dict) -> Dict:
@@ -12,8 +28,8 @@ def analyze_retention_risk(data: Dict) -> Dict:
     Customer Information:
     {json.dumps(data['customer_info'], indent=2)}
 
-    Transaction Data (Complete Records):
-    {json.dumps(data['transactions'], indent=2)}
+    Transaction Data (compact columnar JSON, most recent first; older history may be summarized by month):
+    {compact_transactions(data['transactions'])}
 
     Based on this information:
     1. Assess this customer's overall attrition risk (low, medium, high)
@@ -24,8 +40,11 @@ def analyze_retention_risk(data: Dict) -> Dict:
     Format your response as JSON with keys: 'attrition_risk_level', 'risk_factors', 'protective_factors', 'retention_strategies', 'attrition_probability'
     """
 
-    # Call Gemini API
-    response = generate_content(prompt, json_response=True)
+    # Call Gemini API; the fast model's response escalates if it misses a key or uses another risk level
+    response = generate_content(prompt, json_response=True, response_schema={**schema, "additionalProperties": True},
+                                task="retention_risk")
+    if response is None:
+        return {"error": "No schema-conforming response from Gemini"}
 
     # Parse response
     try:
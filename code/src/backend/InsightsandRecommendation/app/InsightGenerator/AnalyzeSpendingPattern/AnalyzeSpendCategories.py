@@ -1,19 +1,22 @@
 import pandas as pd
+from app.InsightGenerator.AnalyzeSpendingPattern.SpendingAggregates import SpendingAggregates
 
 # Comprehensive Category Spending Analysis
-def analyze_categories(df: pd.DataFrame):
+def analyze_categories(df: pd.DataFrame, aggregates: SpendingAggregates = None):
+    aggregates = aggregates or SpendingAggregates(df)
+
     # Analysis dictionary to store different insights
     analysis = {}
 
     # Total Spending by Merchant Category
-    category_spending = df.groupby('Merchant_Category')['Transaction_Amount'].agg(['sum', 'count']).reset_index()
+    category_spending = aggregates.category_stats.reset_index()
     category_spending.columns = ['Merchant_Category', 'Total_Spending', 'Transaction_Count']
     category_spending['Average_Transaction'] = category_spending['Total_Spending'] / category_spending[
         'Transaction_Count']
     analysis['merchant_category_breakdown'] = category_spending.to_dict(orient='records')
 
     # Total Spending by Individual Merchant
-    merchant_spending = df.groupby('Merchant')['Transaction_Amount'].agg(['sum', 'count']).reset_index()
+    merchant_spending = aggregates.merchant_stats.reset_index()
     merchant_spending.columns = ['Merchant', 'Total_Spending', 'Transaction_Count']
     merchant_spending['Average_Transaction'] = merchant_spending['Total_Spending'] / merchant_spending[
         'Transaction_Count']
@@ -26,12 +29,13 @@ def analyze_categories(df: pd.DataFrame):
     analysis['top_merchant_categories'] = top_categories.head(3).to_dict(orient='records')
 
     # Basic Statistical Summary
+    amount_summary = aggregates.amount_summary
     analysis['spending_summary'] = {
-        'total_amount_spent': df['Transaction_Amount'].sum(),
-        'average_transaction_amount': df['Transaction_Amount'].mean(),
-        'median_transaction_amount': df['Transaction_Amount'].median(),
-        'max_transaction_amount': df['Transaction_Amount'].max(),
-        'min_transaction_amount': df['Transaction_Amount'].min()
+        'total_amount_spent': amount_summary['sum'],
+        'average_transaction_amount': amount_summary['mean'],
+        'median_transaction_amount': amount_summary['median'],
+        'max_transaction_amount': amount_summary['max'],
+        'min_transaction_amount': amount_summary['min']
     }
 
     return analysis
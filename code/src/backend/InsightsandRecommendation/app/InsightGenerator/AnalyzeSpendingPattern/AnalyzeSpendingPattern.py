@@ -5,7 +5,55 @@ import pandas as pd
 from app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeSpendCategories import analyze_categories
 from app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeSpendingDiscipline import analyze_spending_discipline
 from app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeTimePatterns import analyze_time_patterns
+from app.InsightGenerator.AnalyzeSpendingPattern.SpendingAggregates import SpendingAggregates
+from app.InsightGenerator.AnalyzeSpendingPattern.TransactionSchema import transactions_frame
 from app.utils.GenerateContentService import generate_content
+from app.utils.PromptCompactor import compact_transactions
+
+
+def prepare_transactions(transactions) -> pd.DataFrame:
+    """
+    Convert list of transaction dictionaries (or a raw transactions DataFrame) to cleaned DataFrame
+    following the shared transaction schema
+    """
+    return transactions_frame(transactions)
+
+
+def compute_spending_statistics(transactions: List[Dict[str, str]]) -> Dict[str, Any]:
+    """
+    Statistical part of the spending analysis, without any LLM call.
+    Args:
+        transactions (List[Dict[str, str]]): List of transaction dictionaries
+    Returns:
+        Dict containing category, time-based and discipline insights
+    """
+    transactions_df = prepare_transactions(transactions)
+
+    # Typed columns and groupbys shared by all analyzers
+    aggregates = SpendingAggregates(transactions_df)
+
+    # Category Analysis
+    spending_category_analysis = analyze_categories(transactions_df, aggregates)
+
+    # Time-based Analysis
+    time_analysis = analyze_time_patterns(transactions_df, aggregates)
+
+    # Spending Discipline
+    discipline_analysis = analyze_spending_discipline(transactions_df, aggregates)
+
+    # Combine all insights
+    return {
+        'spending_category_insights': spending_category_analysis,
+        'time_based_patterns': time_analysis,
+        'spending_discipline': discipline_analysis,
+        'additional_insights': {
+            'total_transactions': len(transactions_df),
+            'date_range': {
+                'start': aggregates.earliest_date.strftime('%Y-%m-%d'),
+                'end': aggregates.most_recent_date.strftime('%Y-%m-%d')
+            }
+        }
+    }
 
 
 def analyze_spending_patterns(transactions: List[Dict[str, str]]) -> Dict[str, Any]:
@@ -16,60 +64,9 @@ def analyze_spending_patterns(transactions: List[Dict[str, str]]) -> Dict[str, A
     Returns:
         Dict containing detailed spending insights
     """
-
-    # Convert transactions to DataFrame
-    def prepare_transactions(transactions) -> pd.DataFrame:
-        """
-        Convert list of transaction dictionaries to cleaned DataFrame
-        """
-        if not transactions:
-            return pd.DataFrame()
-
-        # Create DataFrame
-        df = pd.DataFrame(transactions)
-
-        # Ensure required columns exist
-        required_cols = ['Transaction_Amount', 'Transaction_Date', 'Merchant_Category']
-        for col in required_cols:
-            if col not in df.columns:
-                raise ValueError(f"Missing required column: {col}")
-
-        # Convert amount to numeric
-        df['Transaction_Amount'] = pd.to_numeric(df['Transaction_Amount'], errors='coerce')
-
-        # Parse date with flexible format
-        df['Transaction_Date'] = pd.to_datetime(df['Transaction_Date'], errors='coerce')
-
-        # Drop rows with invalid data
-        df.dropna(subset=['Transaction_Amount', 'Transaction_Date'], inplace=True)
-        return df
-
     # Perform Analyses
     try:
-        transactions_df = prepare_transactions(transactions)
-
-        # Category Analysis
-        spending_category_analysis = analyze_categories(transactions_df)
-
-        # Time-based Analysis
-        time_analysis = analyze_time_patterns(transactions_df)
-
-        # Spending Discipline
-        discipline_analysis = analyze_spending_discipline(transactions_df)
-
-        # Combine all insights
-        combined_insights = {
-            'spending_category_insights': spending_category_analysis,
-            'time_based_patterns': time_analysis,
-            'spending_discipline': discipline_analysis,
-            'additional_insights': {
-                'total_transactions': len(transactions_df),
-                'date_range': {
-                    'start': transactions_df['Transaction_Date'].min().strftime('%Y-%m-%d'),
-                    'end': transactions_df['Transaction_Date'].max().strftime('%Y-%m-%d')
-                }
-            }
-        }
+        combined_insights = compute_spending_statistics(transactions)
 
         llm_insights = llm_analyze_spending_insights(combined_insights, transactions)
         comprehensive_report = {
@@ -91,7 +88,7 @@ def llm_analyze_spending_insights(insights, transactions) -> Dict:
     prompt = get_spending_analysis_prompt(insights=insights, transactions=transactions)
 
     # Call Gemini API
-    response = generate_content(prompt, json_response=True)
+    response = generate_content(prompt, json_response=True, task="spending_analysis")
 
     # Parse response
     try:
@@ -167,8 +164,8 @@ ADDITIONAL CONTEXT:
 - Total Transactions: {insights.get('additional_insights', {}).get('total_transactions', 'N/A')}
 - Date Range: {json.dumps(insights.get('additional_insights', {}).get('date_range', {}), indent=2)}
 
-TRANSACTION DATA SAMPLE (First 10 transactions):
-{json.dumps(transactions[:1000], indent=2)}
+TRANSACTION DATA (compact columnar JSON, most recent first; older history may be summarized by month):
+{compact_transactions(transactions)}
 
 CRITICAL CONSTRAINTS FOR RESPONSE:
 1. Use ONLY the provided data for analysis
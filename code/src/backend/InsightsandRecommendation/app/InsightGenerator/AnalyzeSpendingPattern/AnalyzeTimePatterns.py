@@ -1,22 +1,26 @@
 import pandas as pd
 from datetime import datetime, timedelta
+from app.InsightGenerator.AnalyzeSpendingPattern.SpendingAggregates import SpendingAggregates
 
 
-def analyze_time_patterns(df: pd.DataFrame):
+def analyze_time_patterns(df: pd.DataFrame, aggregates: SpendingAggregates = None):
     """
     Analyze spending patterns for the last 12 months and last 12 weeks
 
     Args:
         df (pd.DataFrame): DataFrame with Transaction_Date and Transaction_Amount columns
+        aggregates (SpendingAggregates, optional): Shared aggregates of df. Built from df if None.
 
     Returns:
         Dict containing monthly and weekly spending statistics
     """
-    # Ensure Transaction_Date is datetime
-    df['Transaction_Date'] = pd.to_datetime(df['Transaction_Date'])
+    # Dates are parsed once by the shared aggregates
+    aggregates = aggregates or SpendingAggregates(df)
+    dates = aggregates.dates
+    amounts = aggregates.amounts
 
     # Find the most recent date in the dataset
-    most_recent_date = df['Transaction_Date'].max()
+    most_recent_date = aggregates.most_recent_date
 
     # JSON serializable conversion function
     def convert_to_serializable(obj):
@@ -35,11 +39,10 @@ def analyze_time_patterns(df: pd.DataFrame):
     def get_monthly_spending():
         # Filter for last 12 months
         twelve_months_ago = most_recent_date - pd.DateOffset(months=12)
-        monthly_df = df[df['Transaction_Date'] >= twelve_months_ago]
+        in_window = dates >= twelve_months_ago
 
         # Group by month
-        monthly_spending = monthly_df.groupby(monthly_df['Transaction_Date'].dt.to_period('M'))[
-            'Transaction_Amount'].agg([
+        monthly_spending = amounts[in_window].groupby(aggregates.months[in_window]).agg([
             ('total_monthly_spend', 'sum'),
             ('avg_daily_spend', 'mean'),
             ('transaction_count', 'count'),
@@ -56,10 +59,10 @@ def analyze_time_patterns(df: pd.DataFrame):
     def get_weekly_spending():
         # Filter for last 12 weeks
         twelve_weeks_ago = most_recent_date - timedelta(weeks=12)
-        weekly_df = df[df['Transaction_Date'] >= twelve_weeks_ago]
+        in_window = dates >= twelve_weeks_ago
 
         # Group by week
-        weekly_spending = weekly_df.groupby(weekly_df['Transaction_Date'].dt.to_period('W'))['Transaction_Amount'].agg([
+        weekly_spending = amounts[in_window].groupby(aggregates.weeks[in_window]).agg([
             ('total_weekly_spend', 'sum'),
             ('avg_daily_spend', 'mean'),
             ('transaction_count', 'count'),
@@ -93,7 +96,7 @@ def analyze_time_patterns(df: pd.DataFrame):
     except Exception as e:
         results['monthly_spending'] = {
             'error': str(e),
-            'available_months': len(df['Transaction_Date'].dt.to_period('M').unique())
+            'available_months': len(aggregates.months.unique())
         }
 
     # Add weekly spending if data is available
@@ -106,7 +109,7 @@ def analyze_time_patterns(df: pd.DataFrame):
     except Exception as e:
         results['weekly_spending'] = {
             'error': str(e),
-            'available_weeks': len(df['Transaction_Date'].dt.to_period('W').unique())
+            'available_weeks': len(aggregates.weeks.unique())
         }
 
     return results
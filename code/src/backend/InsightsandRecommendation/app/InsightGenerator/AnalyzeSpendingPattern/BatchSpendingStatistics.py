@@ -0,0 +1,254 @@
+from collections import defaultdict
+from datetime import timedelta
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import pandas as pd
+from app.db.ParquetStore import iter_transaction_buckets
+from app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeSpendingPattern import prepare_transactions
+from app.InsightGenerator.AnalyzeSpendingPattern.MerchantServiceEssence import SPENDING_TYPES, categorize_merchants
+
+CLIENT_ID = 'client_id'
+
+SPENDING_COLUMNS = [CLIENT_ID, 'Merchant', 'Merchant_Category', 'Transaction_Amount', 'Transaction_Date']
+
+PERIOD_AGGREGATIONS = [
+    ('avg_daily_spend', 'mean'),
+    ('transaction_count', 'count'),
+    ('min_spend', 'min'),
+    ('max_spend', 'max')
+]
+
+
+def build_transactions_frame(transactions_by_client: Dict[str, List[Dict[str, str]]]) -> pd.DataFrame:
+    """
+    Flatten per-customer transaction lists into one long frame keyed by client_id
+
+    Args:
+        transactions_by_client (Dict[str, List[Dict[str, str]]]): client_id -> transaction dictionaries
+
+    Returns:
+        pd.DataFrame: One row per transaction with a client_id column
+    """
+    rows = [{**transaction, CLIENT_ID: str(client_id)}
+            for client_id, transactions in transactions_by_client.items()
+            for transaction in transactions or []]
+    return pd.DataFrame(rows)
+
+
+def _records_by_client(frame: pd.DataFrame, keep_index: bool = True) -> Dict[str, List[Dict]]:
+    """Split a frame indexed by (client_id, ...) into per-client record lists"""
+    records = defaultdict(list)
+    clients = frame.index.get_level_values(0)
+    if keep_index:
+        frame = frame.reset_index(level=list(range(1, frame.index.nlevels)))
+    for client_id, record in zip(clients, frame.to_dict(orient='records')):
+        records[client_id].append(record)
+    return records
+
+
+def _period_spending(amounts: pd.Series, clients: pd.Series, periods: pd.Series, in_window: pd.Series,
+                     total_column: str, change_column: str) -> Dict[str, List[Dict]]:
+    """Per-client spend statistics for each period inside the client's analysis window"""
+    spending = amounts[in_window].groupby([clients[in_window], periods[in_window]]).agg(
+        [(total_column, 'sum')] + PERIOD_AGGREGATIONS).sort_index()
+
+    # Add percentage change, restarting at each client's first period
+    spending[change_column] = spending[total_column].groupby(level=0).pct_change() * 100
+    spending = spending.round(0)
+    return _records_by_client(spending, keep_index=False)
+
+
+def compute_spending_statistics_batch(transactions_df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    Statistical spending analysis for many customers at once.
+
+    Computes the same insights as compute_spending_statistics (category breakdown,
+    monthly and weekly time patterns, volatility, frequency and spending type
+    distribution) with grouped vectorized operations over one long frame, instead of
+    running the per-customer analyzers on thousands of small frames.
+
+    Args:
+        transactions_df (pd.DataFrame): Transactions of all customers with a client_id column,
+            e.g. from build_transactions_frame
+
+    Returns:
+        Dict[str, Dict[str, Any]]: client_id -> spending statistics. Customers without valid
+            transactions are omitted.
+    """
+    if transactions_df is None or transactions_df.empty:
+        return {}
+    if CLIENT_ID not in transactions_df.columns:
+        raise ValueError(f"Missing required column: {CLIENT_ID}")
+
+    # Copied so cleaning the batch does not mutate the caller's frame
+    df = prepare_transactions(transactions_df.copy())
+    if df.empty:
+        return {}
+
+    # Type and derive every column once for the whole batch
+    clients = df[CLIENT_ID].astype(str).rename(CLIENT_ID)
+    amounts = df['Transaction_Amount']
+    dates = df['Transaction_Date']
+    categories = df['Merchant_Category']
+    spending_types = categorize_merchants(df['Merchant']).rename('Spending_Type')
+    months = dates.dt.to_period('M')
+    weeks = dates.dt.to_period('W')
+
+    amount_summary = amounts.groupby(clients).agg(['sum', 'mean', 'median', 'max', 'min', 'std', 'count'])
+    date_bounds = dates.groupby(clients).agg(['min', 'max'])
+    most_recent_dates = date_bounds['max']
+    twelve_months_ago = most_recent_dates - pd.DateOffset(months=12)
+    twelve_weeks_ago = most_recent_dates - timedelta(weeks=12)
+
+    # Category analysis
+    category_spending = amounts.groupby([clients, categories], observed=True).agg(['sum', 'count'])
+    category_spending.columns = ['Total_Spending', 'Transaction_Count']
+    category_spending['Average_Transaction'] = category_spending['Total_Spending'] / category_spending[
+        'Transaction_Count']
+    category_breakdown = _records_by_client(category_spending)
+    top_categories = _records_by_client(
+        category_spending.reset_index(level=1)
+        .sort_values([CLIENT_ID, 'Total_Spending'], ascending=[True, False], kind='stable')
+        .groupby(level=0).head(3)
+        .set_index(categories.name, append=True))
+
+    # Time-based analysis, each customer windowed on its own most recent date
+    monthly_spending = _period_spending(amounts, clients, months,
+                                        dates >= twelve_months_ago.reindex(clients).to_numpy(),
+                                        'total_monthly_spend', 'month_over_month_change')
+    weekly_spending = _period_spending(amounts, clients, weeks,
+                                       dates >= twelve_weeks_ago.reindex(clients).to_numpy(),
+                                       'total_weekly_spend', 'week_over_week_change')
+
+    # Spending discipline
+    spending_volatility = (amount_summary['std'] / amount_summary['mean']).round(2)
+    date_range_days = (date_bounds['max'] - date_bounds['min']).dt.days + 1
+
+    spending_breakdown = amounts.groupby([clients, spending_types, categories], observed=True).agg([
+        ('total_spend', 'sum'),
+        ('transaction_count', 'count'),
+        ('avg_transaction', 'mean'),
+    ])
+    client_totals = amount_summary['sum'].reindex(spending_breakdown.index.get_level_values(0)).to_numpy()
+    spending_breakdown['percentage'] = (spending_breakdown['total_spend'] / client_totals * 100).round(2)
+    breakdown_records = _records_by_client(spending_breakdown)
+
+    type_spend = spending_breakdown['total_spend'].groupby(level=[0, 1], observed=True).sum()
+    breakdown_totals = spending_breakdown['total_spend'].groupby(level=0).sum()
+    type_distribution = type_spend / breakdown_totals.reindex(type_spend.index.get_level_values(0)).to_numpy() * 100
+
+    monthly_by_type = amounts.groupby([clients, months.astype(str).rename('Transaction_Month'), spending_types],
+                                      observed=True).sum().round(2)
+    average_monthly_by_type = monthly_by_type.groupby(level=[0, 2], observed=True).mean()
+
+    # Emit per-customer insight dicts in the shape of compute_spending_statistics
+    client_months = defaultdict(set)
+    monthly_values = defaultdict(dict)
+    for (client_id, month, spending_type), value in monthly_by_type.items():
+        client_months[client_id].add(month)
+        monthly_values[client_id][(spending_type, month)] = value
+
+    distributions = defaultdict(dict)
+    for (client_id, spending_type), value in type_distribution.items():
+        distributions[client_id][spending_type] = value
+
+    average_monthly = defaultdict(dict)
+    for (client_id, spending_type), value in average_monthly_by_type.items():
+        average_monthly[client_id][spending_type] = value
+
+    statistics = {}
+    for client_id, summary in amount_summary.iterrows():
+        most_recent_date = most_recent_dates[client_id]
+        observed_types = [spending_type for spending_type in SPENDING_TYPES
+                          if spending_type in average_monthly[client_id]]
+        client_month_list = sorted(client_months[client_id])
+        values = monthly_values[client_id]
+
+        statistics[client_id] = {
+            'spending_category_insights': {
+                'merchant_category_breakdown': category_breakdown[client_id],
+                'top_merchant_categories': top_categories[client_id],
+                'spending_summary': {
+                    'total_amount_spent': summary['sum'],
+                    'average_transaction_amount': summary['mean'],
+                    'median_transaction_amount': summary['median'],
+                    'max_transaction_amount': summary['max'],
+                    'min_transaction_amount': summary['min']
+                }
+            },
+            'time_based_patterns': {
+                'metadata': {
+                    'most_recent_date': str(most_recent_date),
+                    'analysis_period_start': {
+                        '12_months_ago': str(twelve_months_ago[client_id]),
+                        '12_weeks_ago': str(twelve_weeks_ago[client_id])
+                    }
+                },
+                'monthly_spending': monthly_spending.get(client_id),
+                'weekly_spending': weekly_spending.get(client_id)
+            },
+            'spending_discipline': {
+                'spending_volatility': spending_volatility[client_id],
+                # Rounded in Python, matching the per-customer analyzer at .5 boundaries
+                'transaction_frequency': round(int(summary['count']) / int(date_range_days[client_id]), 2),
+                'spending_breakdown': breakdown_records[client_id],
+                'monthly_spending_trend': {
+                    spending_type: {month: values.get((spending_type, month), float('nan'))
+                                    for month in client_month_list}
+                    for spending_type in observed_types
+                },
+                'average_monthly_spending': [average_monthly[client_id][spending_type]
+                                             for spending_type in observed_types],
+                'spending_type_distribution': distributions[client_id]
+            },
+            'additional_insights': {
+                'total_transactions': int(summary['count']),
+                'date_range': {
+                    'start': date_bounds['min'][client_id].strftime('%Y-%m-%d'),
+                    'end': most_recent_date.strftime('%Y-%m-%d')
+                }
+            }
+        }
+
+    return statistics
+
+
+def compute_spending_statistics_chunks(transactions_by_client: Iterable[Tuple[str, List[Dict[str, str]]]],
+                                       chunk_size: int = 500) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Batched statistical spending analysis over a stream of customers.
+
+    Groups the stream into chunks of chunk_size customers and runs one
+    compute_spending_statistics_batch per chunk, so memory use is bounded by the chunk.
+
+    Args:
+        transactions_by_client (Iterable[Tuple[str, List[Dict[str, str]]]]): (client_id, transactions) pairs
+        chunk_size (int): Customers analyzed per batch
+
+    Yields:
+        Tuple[str, Dict[str, Any]]: client_id and its spending statistics
+    """
+    customers = iter(transactions_by_client)
+    while True:
+        chunk = dict(islice(customers, chunk_size))
+        if not chunk:
+            return
+        yield from compute_spending_statistics_batch(build_transactions_frame(chunk)).items()
+
+
+def compute_spending_statistics_parquet(root: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Full-book statistical spending analysis over an ingested Parquet store.
+
+    Reads only the columns the analysis needs, one client bucket at a time, so
+    memory use is bounded by the largest bucket rather than the whole book.
+
+    Args:
+        root (str): Root directory written by app.db.ParquetStore.ingest_transactions
+
+    Yields:
+        Tuple[str, Dict[str, Any]]: client_id and its spending statistics
+    """
+    for _, transactions_df in iter_transaction_buckets(root, columns=SPENDING_COLUMNS):
+        yield from compute_spending_statistics_batch(transactions_df).items()
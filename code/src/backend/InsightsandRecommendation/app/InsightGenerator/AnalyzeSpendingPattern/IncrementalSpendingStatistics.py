@@ -0,0 +1,378 @@
+import hashlib
+import json
+import math
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeSpendingPattern import prepare_transactions
+from app.InsightGenerator.AnalyzeSpendingPattern.MerchantServiceEssence import SPENDING_TYPES, categorize_merchants
+
+STATE_VERSION = 2
+
+DAY_FORMAT = '%Y-%m-%d'
+
+# Log-spaced amount histogram: every bin value is within this relative error of the amounts it
+# holds, so the median is approximate but the bin count stays bounded (about 1150 bins per sign
+# from a cent to a hundred million) however many distinct amounts a customer has
+HISTOGRAM_RELATIVE_ACCURACY = 0.01
+HISTOGRAM_MIN_AMOUNT = 0.01
+_HISTOGRAM_GAMMA = (1 + HISTOGRAM_RELATIVE_ACCURACY) / (1 - HISTOGRAM_RELATIVE_ACCURACY)
+
+
+def histogram_bins(amounts) -> np.ndarray:
+    """
+    Signed log-spaced bin index of each amount
+
+    Bin 0 holds amounts under HISTOGRAM_MIN_AMOUNT in magnitude; bin k > 0 holds amounts in
+    (HISTOGRAM_MIN_AMOUNT * gamma^(k-2), HISTOGRAM_MIN_AMOUNT * gamma^(k-1)], negative bins mirror them.
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    magnitude = np.abs(amounts)
+    with np.errstate(divide='ignore'):
+        index = np.ceil(np.log(magnitude / HISTOGRAM_MIN_AMOUNT) / math.log(_HISTOGRAM_GAMMA)) + 1
+    return np.where(magnitude < HISTOGRAM_MIN_AMOUNT, 0, np.sign(amounts) * index).astype(int)
+
+
+def histogram_bin_value(index: int) -> float:
+    """Amount representing a histogram bin, within HISTOGRAM_RELATIVE_ACCURACY of its amounts"""
+    if index == 0:
+        return 0.0
+    upper = HISTOGRAM_MIN_AMOUNT * _HISTOGRAM_GAMMA ** (abs(index) - 1)
+    return math.copysign(2 * upper / (_HISTOGRAM_GAMMA + 1), index)
+
+
+def _divide(numerator: float, denominator: float) -> float:
+    """Float division like the pandas path: x / 0 is +-inf and 0 / 0 is nan instead of raising"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(numerator) / denominator)
+
+
+def _migrate_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Upgrade a serialized state of an earlier version"""
+    if state.get('version') == 1:
+        # Version 1 kept one histogram entry per distinct cent amount
+        histogram = {}
+        for amount, count in state.get('amount_histogram', {}).items():
+            key = str(int(histogram_bins([float(amount)])[0]))
+            histogram[key] = histogram.get(key, 0) + count
+        state = {**state, 'version': 2, 'amount_histogram': histogram}
+    return state
+
+
+def _transaction_key(record: Dict) -> str:
+    """Stable fingerprint of a cleaned transaction, used to skip already folded rows"""
+    return hashlib.md5(json.dumps(record, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class SpendingStatisticsState:
+    """
+    Running spending aggregates of one customer.
+
+    New transactions are folded into per-day buckets, category and spending type
+    sums and counts, monthly spend per spending type, a Welford mean/variance and
+    a log-spaced histogram of amounts for the median. The insights of
+    compute_spending_statistics are derived from these aggregates, so a daily run
+    costs time proportional to the new transactions instead of the customer's
+    whole history.
+
+    Day buckets are only kept for the 12 month analysis window. Transactions are
+    folded at most once: rows dated before the last folded day are ignored and rows
+    on that day are matched against the fingerprints already folded.
+    """
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        """
+        Initialize SpendingStatisticsState
+
+        Args:
+            state (dict, optional): Serialized state from to_dict. Starts empty if None.
+        """
+        state = _migrate_state(state or {})
+        if state and state.get('version') != STATE_VERSION:
+            raise ValueError(f"Unsupported spending statistics state version: {state.get('version')}")
+
+        self.count = state.get('count', 0)
+        self.mean = state.get('mean', 0.0)
+        self.m2 = state.get('m2', 0.0)
+        self.total = state.get('total', 0.0)
+        self.min = state.get('min')
+        self.max = state.get('max')
+        self.earliest_date = pd.Timestamp(state['earliest_date']) if state.get('earliest_date') else None
+        self.most_recent_date = pd.Timestamp(state['most_recent_date']) if state.get('most_recent_date') else None
+        self.amount_histogram = dict(state.get('amount_histogram', {}))
+        self.daily = {day: list(bucket) for day, bucket in state.get('daily', {}).items()}
+        self.categories = {category: list(bucket) for category, bucket in state.get('categories', {}).items()}
+        self.type_categories = {spending_type: {category: list(bucket) for category, bucket in buckets.items()}
+                                for spending_type, buckets in state.get('type_categories', {}).items()}
+        self.monthly_by_type = {month: dict(spend) for month, spend in state.get('monthly_by_type', {}).items()}
+        self.watermark_date = state.get('watermark_date')
+        self.watermark_keys = set(state.get('watermark_keys', []))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the state to JSON and Firestore compatible values"""
+        return {
+            'version': STATE_VERSION,
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'earliest_date': self.earliest_date.isoformat() if self.earliest_date is not None else None,
+            'most_recent_date': self.most_recent_date.isoformat() if self.most_recent_date is not None else None,
+            'amount_histogram': self.amount_histogram,
+            'daily': self.daily,
+            'categories': self.categories,
+            'type_categories': self.type_categories,
+            'monthly_by_type': self.monthly_by_type,
+            'watermark_date': self.watermark_date,
+            'watermark_keys': sorted(self.watermark_keys),
+        }
+
+    def fold(self, transactions) -> int:
+        """
+        Fold new transactions into the running aggregates
+
+        Args:
+            transactions: List of transaction dictionaries or a transactions DataFrame,
+                e.g. DataFetcher.fetch_new_data()['transactions']
+
+        Returns:
+            int: Number of transactions folded in
+        """
+        if isinstance(transactions, pd.DataFrame):
+            transactions = transactions.copy()
+        df = prepare_transactions(transactions)
+        if df.empty:
+            return 0
+
+        # Skip transactions folded by an earlier run with an overlapping fetch window
+        days = df['Transaction_Date'].dt.normalize()
+        if self.watermark_date is not None:
+            watermark = pd.Timestamp(self.watermark_date)
+            on_watermark = days == watermark
+            already_folded = pd.Series(False, index=df.index)
+            if on_watermark.any():
+                keys = [_transaction_key(record) for record in df[on_watermark].to_dict(orient='records')]
+                already_folded[on_watermark] = [key in self.watermark_keys for key in keys]
+            keep = (days > watermark) | (on_watermark & ~already_folded)
+            df, days = df[keep], days[keep]
+            if df.empty:
+                return 0
+
+        amounts = df['Transaction_Amount']
+        categories = df['Merchant_Category']
+        spending_types = categorize_merchants(df['Merchant']).rename('Spending_Type')
+
+        self._fold_moments(amounts)
+        self._fold_histogram(amounts)
+        self._fold_daily(amounts, days)
+
+        for category, (total, count) in amounts.groupby(categories, observed=True).agg(['sum', 'count']).iterrows():
+            bucket = self.categories.setdefault(category, [0.0, 0])
+            bucket[0] += float(total)
+            bucket[1] += int(count)
+
+        type_category_stats = amounts.groupby([spending_types, categories], observed=True).agg(['sum', 'count'])
+        for (spending_type, category), (total, count) in type_category_stats.iterrows():
+            bucket = self.type_categories.setdefault(spending_type, {}).setdefault(category, [0.0, 0])
+            bucket[0] += float(total)
+            bucket[1] += int(count)
+
+        months = df['Transaction_Date'].dt.to_period('M').astype(str)
+        for (month, spending_type), total in amounts.groupby([months, spending_types], observed=True).sum().items():
+            spend = self.monthly_by_type.setdefault(month, {})
+            spend[spending_type] = spend.get(spending_type, 0.0) + float(total)
+
+        self._advance_watermark(df, days)
+        return len(df)
+
+    def _fold_moments(self, amounts: pd.Series):
+        # Merge the batch mean and variance with Chan et al.'s parallel Welford update
+        batch_count = len(amounts)
+        batch_mean = float(amounts.mean())
+        batch_m2 = float(((amounts - batch_mean) ** 2).sum())
+
+        count = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean += delta * batch_count / count
+        self.m2 += batch_m2 + delta ** 2 * self.count * batch_count / count
+        self.count = count
+        self.total += float(amounts.sum())
+
+        batch_min, batch_max = float(amounts.min()), float(amounts.max())
+        self.min = batch_min if self.min is None else min(self.min, batch_min)
+        self.max = batch_max if self.max is None else max(self.max, batch_max)
+
+    def _fold_histogram(self, amounts: pd.Series):
+        # Firestore map keys must be strings
+        for index, count in pd.Series(histogram_bins(amounts)).value_counts().items():
+            key = str(int(index))
+            self.amount_histogram[key] = self.amount_histogram.get(key, 0) + int(count)
+
+    def _fold_daily(self, amounts: pd.Series, days: pd.Series):
+        batch_earliest, batch_most_recent = days.min(), days.max()
+        self.earliest_date = batch_earliest if self.earliest_date is None else min(self.earliest_date,
+                                                                                    batch_earliest)
+        self.most_recent_date = batch_most_recent if self.most_recent_date is None else max(
+            self.most_recent_date, batch_most_recent)
+
+        for day, (total, count, minimum, maximum) in amounts.groupby(days).agg(
+                ['sum', 'count', 'min', 'max']).iterrows():
+            key = day.strftime(DAY_FORMAT)
+            bucket = self.daily.get(key)
+            if bucket is None:
+                self.daily[key] = [float(total), int(count), float(minimum), float(maximum)]
+            else:
+                self.daily[key] = [bucket[0] + float(total), bucket[1] + int(count),
+                                   min(bucket[2], float(minimum)), max(bucket[3], float(maximum))]
+
+        # Only the 12 month analysis window needs day resolution
+        window_start = (self.most_recent_date - pd.DateOffset(months=12)).strftime(DAY_FORMAT)
+        self.daily = {day: bucket for day, bucket in self.daily.items() if day >= window_start}
+
+    def _advance_watermark(self, df: pd.DataFrame, days: pd.Series):
+        last_day = days.max()
+        keys = {_transaction_key(record) for record in df[days == last_day].to_dict(orient='records')}
+        last_day = last_day.strftime(DAY_FORMAT)
+        if self.watermark_date is None or last_day > self.watermark_date:
+            self.watermark_date = last_day
+            self.watermark_keys = keys
+        elif last_day == self.watermark_date:
+            self.watermark_keys |= keys
+
+    def _median(self) -> float:
+        amounts = sorted((histogram_bin_value(int(index)), count) for index, count in self.amount_histogram.items())
+        middle = [(self.count - 1) // 2, self.count // 2]
+        values, seen = [], 0
+        for amount, count in amounts:
+            seen += count
+            while middle and middle[0] < seen:
+                values.append(amount)
+                middle.pop(0)
+            if not middle:
+                break
+        return sum(values) / len(values)
+
+    def _period_spending(self, daily: pd.DataFrame, periods, total_column: str, change_column: str):
+        if daily.empty:
+            return None
+
+        spending = daily.groupby(periods).agg(
+            total=('sum', 'sum'), count=('count', 'sum'), min=('min', 'min'), max=('max', 'max')).sort_index()
+        spending = pd.DataFrame({
+            total_column: spending['total'],
+            'avg_daily_spend': spending['total'] / spending['count'],
+            'transaction_count': spending['count'],
+            'min_spend': spending['min'],
+            'max_spend': spending['max'],
+        })
+
+        # Add percentage change
+        spending[change_column] = spending[total_column].pct_change() * 100
+        return spending.round(0).to_dict(orient='records')
+
+    def statistics(self) -> Dict[str, Any]:
+        """
+        Derive the spending insights from the running aggregates
+
+        Returns:
+            Dict in the shape of compute_spending_statistics
+        """
+        if not self.count:
+            raise ValueError("No transactions have been folded into the spending statistics")
+
+        most_recent_date = self.most_recent_date
+        twelve_months_ago = most_recent_date - pd.DateOffset(months=12)
+        twelve_weeks_ago = most_recent_date - timedelta(weeks=12)
+
+        # Category analysis
+        category_breakdown = [{
+            'Merchant_Category': category,
+            'Total_Spending': total,
+            'Transaction_Count': count,
+            'Average_Transaction': total / count
+        } for category, (total, count) in sorted(self.categories.items())]
+        top_categories = sorted(category_breakdown, key=lambda row: row['Total_Spending'], reverse=True)[:3]
+
+        # Time-based analysis over the day buckets of the analysis window
+        daily = pd.DataFrame.from_dict(self.daily, orient='index', columns=['sum', 'count', 'min', 'max'])
+        daily.index = pd.to_datetime(daily.index)
+        monthly = daily[daily.index >= twelve_months_ago]
+        weekly = daily[daily.index >= twelve_weeks_ago]
+
+        # Spending discipline
+        std = (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else float('nan')
+        date_range_days = (most_recent_date - self.earliest_date).days + 1
+
+        spending_breakdown = [{
+            'Spending_Type': spending_type,
+            'Merchant_Category': category,
+            'total_spend': total,
+            'transaction_count': count,
+            'avg_transaction': total / count,
+            'percentage': round(_divide(total, self.total) * 100, 2)
+        } for spending_type in SPENDING_TYPES
+            for category, (total, count) in sorted(self.type_categories.get(spending_type, {}).items())]
+        type_totals = {spending_type: sum(total for total, _ in self.type_categories[spending_type].values())
+                       for spending_type in SPENDING_TYPES if spending_type in self.type_categories}
+        breakdown_total = sum(type_totals.values())
+
+        months = sorted(self.monthly_by_type)
+        observed_types = [spending_type for spending_type in SPENDING_TYPES
+                          if any(spending_type in self.monthly_by_type[month] for month in months)]
+        monthly_spending_trend = {
+            spending_type: {month: round(self.monthly_by_type[month][spending_type], 2)
+                            if spending_type in self.monthly_by_type[month] else float('nan')
+                            for month in months}
+            for spending_type in observed_types
+        }
+        average_monthly_spending = []
+        for spending_type in observed_types:
+            values = [value for value in monthly_spending_trend[spending_type].values() if not pd.isna(value)]
+            average_monthly_spending.append(sum(values) / len(values))
+
+        return {
+            'spending_category_insights': {
+                'merchant_category_breakdown': category_breakdown,
+                'top_merchant_categories': top_categories,
+                'spending_summary': {
+                    'total_amount_spent': self.total,
+                    'average_transaction_amount': self.mean,
+                    'median_transaction_amount': self._median(),
+                    'max_transaction_amount': self.max,
+                    'min_transaction_amount': self.min
+                }
+            },
+            'time_based_patterns': {
+                'metadata': {
+                    'most_recent_date': str(most_recent_date),
+                    'analysis_period_start': {
+                        '12_months_ago': str(twelve_months_ago),
+                        '12_weeks_ago': str(twelve_weeks_ago)
+                    }
+                },
+                'monthly_spending': self._period_spending(monthly, monthly.index.to_period('M'),
+                                                          'total_monthly_spend', 'month_over_month_change'),
+                'weekly_spending': self._period_spending(weekly, weekly.index.to_period('W'),
+                                                         'total_weekly_spend', 'week_over_week_change')
+            },
+            'spending_discipline': {
+                'spending_volatility': round(_divide(std, self.mean), 2),
+                'transaction_frequency': round(self.count / date_range_days, 2),
+                'spending_breakdown': spending_breakdown,
+                'monthly_spending_trend': monthly_spending_trend,
+                'average_monthly_spending': average_monthly_spending,
+                'spending_type_distribution': {spending_type: _divide(total, breakdown_total) * 100
+                                               for spending_type, total in type_totals.items()}
+            },
+            'additional_insights': {
+                'total_transactions': self.count,
+                'date_range': {
+                    'start': self.earliest_date.strftime(DAY_FORMAT),
+                    'end': most_recent_date.strftime(DAY_FORMAT)
+                }
+            }
+        }
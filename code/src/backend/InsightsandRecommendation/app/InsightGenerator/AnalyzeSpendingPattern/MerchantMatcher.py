@@ -0,0 +1,107 @@
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Characters treated as token separators when normalizing merchant strings
+_SEPARATORS = re.compile(r"[\s\-–—_/,.*#()'\"]+")
+# Store numbers, terminal ids and reference codes, e.g. "0162345", "#123", "NYC01"
+_NOISE_TOKEN = re.compile(r".*\d.*")
+
+
+def normalize_merchant(merchant: str) -> Tuple[str, ...]:
+    """
+    Normalize a raw merchant string into comparable tokens:
+    upper-cased, punctuation stripped and tokens containing digits dropped.
+
+    Args:
+        merchant (str): Raw merchant string from the card feed
+
+    Returns:
+        Tuple[str, ...]: Normalized tokens
+    """
+    tokens = _SEPARATORS.split(str(merchant).upper())
+    return tuple(token for token in tokens if token and not _NOISE_TOKEN.fullmatch(token))
+
+
+class MerchantMatcher:
+    """
+    Resolves raw merchant strings to known merchants and their spending type.
+
+    Known names are normalized into a token trie. A raw string matches the longest
+    known name that appears as a run of its tokens, preferring the earliest start
+    (single word names must lead the string), so "UNITED AIRLINES 0162345" and
+    "Hilton Hotels NYC" resolve to UNITED AIRLINES and HILTON HOTELS.
+    Resolutions are memoized, so repeated merchants cost O(1).
+    """
+
+    _TERMINAL = "__merchant__"
+
+    def __init__(self, merchant_spending_type: Dict[str, str], merchant_groups: Dict[str, List[str]],
+                 default_spending_type: str, memo_size: int = 100_000):
+        """
+        Initialize MerchantMatcher
+
+        Args:
+            merchant_spending_type (dict): Merchant name -> spending type
+            merchant_groups (dict): Merchant group -> merchant names, e.g. MerchantInfo.merchant_info
+            default_spending_type (str): Spending type for group members without an explicit type
+            memo_size (int): Number of resolved raw strings kept in the memo cache
+        """
+        self.spending_types = {}
+        for merchant, spending_type in merchant_spending_type.items():
+            self.spending_types.setdefault(normalize_merchant(merchant), (merchant, spending_type))
+
+        # Group members without an explicit type inherit the most common type of their group
+        for merchants in merchant_groups.values():
+            known_types = [merchant_spending_type[m] for m in merchants if m in merchant_spending_type]
+            group_type = Counter(known_types).most_common(1)[0][0] if known_types else default_spending_type
+            for merchant in merchants:
+                self.spending_types.setdefault(normalize_merchant(merchant), (merchant, group_type))
+
+        self._trie = {}
+        for tokens, entry in self.spending_types.items():
+            if not tokens:
+                continue
+            node = self._trie
+            for token in tokens:
+                node = node.setdefault(token, {})
+            node[self._TERMINAL] = entry
+
+        self.resolve = lru_cache(maxsize=memo_size)(self._resolve)
+
+    def _longest_match_from(self, tokens: Tuple[str, ...], start: int) -> Tuple[int, Optional[Tuple[str, str]]]:
+        node, best_length, best_entry = self._trie, 0, None
+        for position in range(start, len(tokens)):
+            node = node.get(tokens[position])
+            if node is None:
+                break
+            if self._TERMINAL in node:
+                best_length, best_entry = position - start + 1, node[self._TERMINAL]
+        return best_length, best_entry
+
+    def _resolve(self, merchant: str) -> Optional[Tuple[str, str]]:
+        tokens = normalize_merchant(merchant)
+        if not tokens:
+            return None
+
+        exact = self.spending_types.get(tokens)
+        if exact is not None:
+            return exact
+
+        for start in range(len(tokens)):
+            length, entry = self._longest_match_from(tokens, start)
+            # Single word names (e.g. DELTA, SAS) only match at the start of the string
+            if entry is not None and (start == 0 or length > 1):
+                return entry
+        return None
+
+    def spending_type(self, merchant: str) -> Optional[str]:
+        """
+        Spending type of a raw merchant string
+
+        Returns:
+            str: Spending type, or None if the merchant is not recognized
+        """
+        match = self.resolve(merchant)
+        return match[1] if match else None
@@ -1,3 +1,8 @@
+import numpy as np
+import pandas as pd
+from app.InsightGenerator.AnalyzeSpendingPattern.MerchantInfo import merchant_info
+from app.InsightGenerator.AnalyzeSpendingPattern.MerchantMatcher import MerchantMatcher
+
 merchant_spending_type = {
     "Veterinary Services": "essential",
     "Agricultural Co-operatives": "essential",
@@ -605,7 +610,54 @@ merchant_spending_type = {
 def categorize_merchant(merchant):
     if merchant in merchant_spending_type:
         return merchant_spending_type[merchant]
-    else:
-        print("Merchant category not mapped to essence: ", merchant)
+
+    # Fall back to normalized / fuzzy matching for raw card feed strings
+    spending_type = merchant_matcher.spending_type(merchant)
+    if spending_type is not None:
+        return spending_type
+    print("Merchant category not mapped to essence: ", merchant)
 
     return 'semi-essential'
+
+
+# Spending types in sorted order, so grouping on the categorical column orders
+# groups the same way as grouping on the plain strings
+SPENDING_TYPES = sorted(set(merchant_spending_type.values()))
+DEFAULT_SPENDING_TYPE = 'semi-essential'
+spending_type_dtype = pd.CategoricalDtype(SPENDING_TYPES)
+
+# Normalized matching index over known merchants and merchant groups, built once at import
+merchant_matcher = MerchantMatcher(merchant_spending_type, merchant_info, DEFAULT_SPENDING_TYPE)
+
+# Precompiled lookup table: merchant -> integer spending type code
+_merchant_index = pd.Index(list(merchant_spending_type.keys()))
+_merchant_type_codes = np.array([SPENDING_TYPES.index(spending_type)
+                                 for spending_type in merchant_spending_type.values()], dtype=np.int8)
+_default_type_code = np.int8(SPENDING_TYPES.index(DEFAULT_SPENDING_TYPE))
+
+
+def categorize_merchants(merchants: pd.Series) -> pd.Series:
+    """
+    Vectorized categorize_merchant over a merchant column.
+    Each distinct merchant is resolved once and the codes are broadcast back with take.
+
+    Args:
+        merchants (pd.Series): Merchant names
+
+    Returns:
+        pd.Series: Categorical spending type per row, 'semi-essential' for unrecognized merchants
+    """
+    row_codes, unique_merchants = pd.factorize(merchants)
+    positions = _merchant_index.get_indexer(unique_merchants)
+    unique_type_codes = np.where(positions >= 0, _merchant_type_codes.take(positions), _default_type_code)
+
+    # Distinct merchants without an exact match go through the memoized fuzzy matcher
+    for position in np.flatnonzero(positions < 0):
+        spending_type = merchant_matcher.spending_type(unique_merchants[position])
+        if spending_type is not None:
+            unique_type_codes[position] = SPENDING_TYPES.index(spending_type)
+
+    # factorize marks missing merchants with -1; they fall back to the default type as well
+    type_codes = np.append(unique_type_codes, _default_type_code).astype(np.int8).take(row_codes)
+    return pd.Series(pd.Categorical.from_codes(type_codes, dtype=spending_type_dtype),
+                     index=merchants.index, name=merchants.name)
@@ -0,0 +1,95 @@
+from functools import cached_property
+
+import pandas as pd
+from app.InsightGenerator.AnalyzeSpendingPattern.MerchantServiceEssence import categorize_merchants
+from app.InsightGenerator.AnalyzeSpendingPattern.TransactionSchema import to_transaction_schema
+
+
+class SpendingAggregates:
+    """
+    Shared aggregation layer for the spending analyzers.
+
+    The transaction frame is typed once with the shared transaction schema and each
+    derived column or groupby aggregate is computed on first use and then served
+    to every analyzer, instead of each analyzer re-parsing dates and re-grouping
+    the same frame.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Initialize SpendingAggregates
+
+        Args:
+            df (pd.DataFrame): Transactions with Transaction_Amount, Transaction_Date,
+                Merchant and Merchant_Category columns
+        """
+        self.df = to_transaction_schema(df)
+
+    @property
+    def amounts(self) -> pd.Series:
+        return self.df['Transaction_Amount']
+
+    @property
+    def dates(self) -> pd.Series:
+        return self.df['Transaction_Date']
+
+    @cached_property
+    def most_recent_date(self) -> pd.Timestamp:
+        return self.dates.max()
+
+    @cached_property
+    def earliest_date(self) -> pd.Timestamp:
+        return self.dates.min()
+
+    @cached_property
+    def months(self) -> pd.Series:
+        """Monthly period of each transaction"""
+        return self.dates.dt.to_period('M')
+
+    @cached_property
+    def weeks(self) -> pd.Series:
+        """Weekly period of each transaction"""
+        return self.dates.dt.to_period('W')
+
+    @cached_property
+    def spending_types(self) -> pd.Series:
+        """Essential / semi-essential / discretionary type of each transaction"""
+        return categorize_merchants(self.df['Merchant']).rename('Spending_Type')
+
+    @cached_property
+    def amount_summary(self) -> dict:
+        """Overall amount statistics"""
+        amounts = self.amounts
+        return {
+            'sum': amounts.sum(),
+            'mean': amounts.mean(),
+            'median': amounts.median(),
+            'max': amounts.max(),
+            'min': amounts.min(),
+            'std': amounts.std(),
+        }
+
+    @cached_property
+    def category_stats(self) -> pd.DataFrame:
+        """Sum and count of amounts per Merchant_Category"""
+        return self.df.groupby('Merchant_Category', observed=True)['Transaction_Amount'].agg(['sum', 'count'])
+
+    @cached_property
+    def merchant_stats(self) -> pd.DataFrame:
+        """Sum and count of amounts per Merchant"""
+        return self.df.groupby('Merchant', observed=True)['Transaction_Amount'].agg(['sum', 'count'])
+
+    @cached_property
+    def spending_type_category_stats(self) -> pd.DataFrame:
+        """Spend statistics per (spending type, merchant category)"""
+        return self.amounts.groupby([self.spending_types, self.df['Merchant_Category']], observed=True).agg([
+            ('total_spend', 'sum'),
+            ('transaction_count', 'count'),
+            ('avg_transaction', 'mean'),
+        ])
+
+    @cached_property
+    def monthly_spending_by_type(self) -> pd.DataFrame:
+        """Total spend per month (rows) and spending type (columns)"""
+        months = self.months.astype(str).rename('Transaction_Month')
+        return self.amounts.groupby([months, self.spending_types], observed=True).sum().unstack()
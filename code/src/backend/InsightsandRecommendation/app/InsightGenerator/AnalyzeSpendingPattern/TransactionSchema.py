@@ -0,0 +1,151 @@
+import threading
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+# Amounts stay float64: float32 cannot hold cent amounts above ~100k exactly,
+# which would shift the totals reported in the insights
+AMOUNT_DTYPE = np.dtype('float64')
+DATE_DTYPE = np.dtype('datetime64[ns]')
+
+REQUIRED_COLUMNS = ['Transaction_Amount', 'Transaction_Date', 'Merchant_Category']
+CATEGORICAL_COLUMNS = ['Merchant', 'Merchant_Category']
+
+
+class CategoryDictionary:
+    """
+    Process-wide dictionary of the values of a categorical transaction column.
+
+    Every typed frame encodes its column against the same sorted categories, so
+    customer frames concatenate and compare on integer codes, and categorical
+    groupbys list groups in the same alphabetical order as string groupbys.
+    The dictionary only grows; new values extend it under a lock.
+    """
+
+    def __init__(self, values: Iterable[str] = ()):
+        self._lock = threading.Lock()
+        self.dtype = pd.CategoricalDtype(sorted(set(values)))
+
+    def encode(self, values: pd.Series) -> pd.Series:
+        """
+        Encode a column against the dictionary, adding values seen for the first time
+
+        Args:
+            values (pd.Series): Raw strings, or a categorical column typed against an older dictionary
+
+        Returns:
+            pd.Series: Categorical column with the current dictionary dtype
+        """
+        dtype = self.dtype
+        if values.dtype == dtype:
+            return values
+
+        # Each distinct value is looked up once and the codes are broadcast back with take
+        row_codes, uniques = pd.factorize(values)
+        uniques = pd.Index(np.asarray(uniques, dtype=object).astype(str))
+        positions = dtype.categories.get_indexer(uniques)
+        if (positions < 0).any():
+            dtype = self._extend(uniques[positions < 0])
+            positions = dtype.categories.get_indexer(uniques)
+
+        # factorize marks missing values with -1, which is also the categorical missing code
+        codes = np.append(positions, -1).take(row_codes)
+        return pd.Series(pd.Categorical.from_codes(codes, dtype=dtype), index=values.index, name=values.name)
+
+    def _extend(self, new_values: pd.Index) -> pd.CategoricalDtype:
+        with self._lock:
+            categories = self.dtype.categories.union(new_values).sort_values()
+            if len(categories) != len(self.dtype.categories):
+                self.dtype = pd.CategoricalDtype(categories)
+            return self.dtype
+
+
+category_dictionaries: Dict[str, CategoryDictionary] = {column: CategoryDictionary() for column in CATEGORICAL_COLUMNS}
+
+
+def _dates(values: pd.Series) -> pd.Series:
+    dates = pd.to_datetime(values, errors='coerce')
+    # Timezone-aware dates keep their zone; naive ones share one resolution
+    if isinstance(dates.dtype, pd.DatetimeTZDtype):
+        return dates
+    return dates.astype(DATE_DTYPE)
+
+
+def to_transaction_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Type the transaction columns present in df, leaving invalid values as missing
+
+    Amounts become float64, dates datetime64 and Merchant / Merchant_Category
+    categoricals over the shared category dictionaries. Columns that already
+    have their schema dtype are not converted again.
+
+    Args:
+        df (pd.DataFrame): Transactions with raw or typed columns
+
+    Returns:
+        pd.DataFrame: A new frame with typed columns
+    """
+    typed_columns = {}
+    if 'Transaction_Amount' in df.columns and df['Transaction_Amount'].dtype != AMOUNT_DTYPE:
+        typed_columns['Transaction_Amount'] = pd.to_numeric(df['Transaction_Amount'], errors='coerce') \
+            .astype(AMOUNT_DTYPE)
+    if 'Transaction_Date' in df.columns and df['Transaction_Date'].dtype != DATE_DTYPE:
+        typed_columns['Transaction_Date'] = _dates(df['Transaction_Date'])
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            typed_columns[column] = category_dictionaries[column].encode(df[column])
+    return df.assign(**typed_columns) if typed_columns else df
+
+
+def validate_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Check that df follows the transaction schema
+
+    Args:
+        df (pd.DataFrame): Typed transactions
+
+    Returns:
+        pd.DataFrame: df, unchanged
+
+    Raises:
+        ValueError: If a required column is missing or a column has the wrong dtype
+    """
+    for column in REQUIRED_COLUMNS:
+        if column not in df.columns:
+            raise ValueError(f"Missing required column: {column}")
+
+    if not pd.api.types.is_datetime64_any_dtype(df['Transaction_Date']):
+        raise ValueError(f"Column Transaction_Date has dtype {df['Transaction_Date'].dtype}, expected {DATE_DTYPE}")
+
+    if df['Transaction_Amount'].dtype != AMOUNT_DTYPE:
+        raise ValueError(f"Column Transaction_Amount has dtype {df['Transaction_Amount'].dtype}, "
+                         f"expected {AMOUNT_DTYPE}")
+
+    # Frames typed before the dictionary grew hold a subset of its categories
+    for column in CATEGORICAL_COLUMNS:
+        if column not in df.columns:
+            continue
+        if not isinstance(df[column].dtype, pd.CategoricalDtype) or \
+                not df[column].cat.categories.isin(category_dictionaries[column].dtype.categories).all():
+            raise ValueError(f"Column {column} is not encoded with the shared category dictionary")
+    return df
+
+
+def transactions_frame(transactions) -> pd.DataFrame:
+    """
+    Build a typed transaction frame from transaction dictionaries or a raw DataFrame
+
+    Rows with an invalid amount or date are dropped.
+
+    Args:
+        transactions: List of transaction dictionaries or a transactions DataFrame
+
+    Returns:
+        pd.DataFrame: Transactions following the schema, empty if there are none
+    """
+    if transactions is None or len(transactions) == 0:
+        return pd.DataFrame()
+
+    df = validate_transactions(to_transaction_schema(pd.DataFrame(transactions)))
+    return df.dropna(subset=['Transaction_Amount', 'Transaction_Date'])
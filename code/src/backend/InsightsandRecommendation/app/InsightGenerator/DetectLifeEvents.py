@@ -1,6 +1,7 @@
 import json
 from typing import Dict
 from app.utils.GenerateContentService import generate_content
+from app.utils.PromptCompactor import compact_transactions
 
 
 def detect_life_events(data: Dict) -> Dict:
@@ -12,8 +13,8 @@ def detect_life_events(data: Dict) -> Dict:
         Customer Information:
         {json.dumps(data['customer_info'], indent=2)}
 
-        Transaction Data (Complete Records):
-        {json.dumps(data['transactions'], indent=2)}
+        Transaction Data (compact columnar JSON, most recent first; older history may be summarized by month):
+        {compact_transactions(data['transactions'])}
 
         Please identify:
         1. Any likely major life events suggested by these transactions (e.g., moving, new job, marriage, children, travel)
@@ -25,7 +26,7 @@ def detect_life_events(data: Dict) -> Dict:
         """
 
     # Call Gemini API
-    response = generate_content(prompt, json_response=True)
+    response = generate_content(prompt, json_response=True, task="life_events")
 
     # Parse response
     try:
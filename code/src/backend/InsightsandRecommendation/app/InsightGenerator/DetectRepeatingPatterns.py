@@ -48,7 +48,7 @@ def detect_repeating_patterns(transactions: pd.DataFrame) -> Dict:
     """
 
     # Call Gemini API
-    response = generate_content(prompt, json_response=True)
+    response = generate_content(prompt, json_response=True, task="repeating_patterns")
 
     # Parse response
     try:
@@ -0,0 +1,211 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from config import Config
+from app.InsightGenerator.AnalyzeCombinedInsights import (
+    analyze_combined_insights, combined_insights_from_response, get_combined_analysis_prompt,
+    safe_spending_statistics, statistical_insights)
+from app.InsightGenerator.AnalyzeLifeStage import analyze_life_stage
+from app.InsightGenerator.AnalyzeRetentionRisk import analyze_retention_risk
+from app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeSpendingPattern import analyze_spending_patterns
+from app.InsightGenerator.DetectLifeEvents import detect_life_events
+from app.InsightGenerator.StatisticalScorers import (
+    analyze_life_stage_statistically, analyze_retention_risk_statistically)
+from app.utils import GeminiResponseEditor
+from app.utils.BatchPrediction import batch_request_line, run_batch_job
+from app.utils.RateLimiter import with_current_priority
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Insight key -> analyzer. Each analyzer receives the customer data dict.
+INSIGHT_ANALYZERS = {
+    "life_stage": analyze_life_stage_statistically if Config.STATISTICAL_INSIGHT_SCORERS else analyze_life_stage,
+    "life_events": detect_life_events,
+    "retention_risk": analyze_retention_risk_statistically if Config.STATISTICAL_INSIGHT_SCORERS
+    else analyze_retention_risk,
+    "spending_patterns": lambda data: analyze_spending_patterns(data["transactions"]),
+}
+
+
+def generate_customer_insights(data: Dict, executor: Optional[ThreadPoolExecutor] = None,
+                               fused: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Run the four insight analyzers for a single customer in parallel.
+
+    Args:
+        data (Dict): Customer data with 'customer_info', 'transactions' and 'app_activity' keys
+        executor (ThreadPoolExecutor, optional): Pool to run the analyzers on. Runs serially if None.
+        fused (bool, optional): Run all analyzers as one combined LLM call. Defaults to
+            Config.FUSED_INSIGHT_ANALYSIS.
+
+    Returns:
+        Dict: Insight key -> analyzer result
+    """
+    if Config.FUSED_INSIGHT_ANALYSIS if fused is None else fused:
+        return analyze_combined_insights(data)
+
+    if executor is None:
+        return {key: analyzer(data) for key, analyzer in INSIGHT_ANALYZERS.items()}
+
+    futures = {key: executor.submit(with_current_priority(analyzer), data)
+               for key, analyzer in INSIGHT_ANALYZERS.items()}
+    return {key: future.result() for key, future in futures.items()}
+
+
+def generate_insights_for_customers(customers: Iterable,
+                                    load_customer_data: Callable[[Any], Dict],
+                                    persist_insights: Callable[[str, Dict], None],
+                                    max_customers: Optional[int] = None,
+                                    fused: Optional[bool] = None,
+                                    on_customer_done: Optional[Callable[[str, Optional[str]], None]] = None
+                                    ) -> Dict[str, Any]:
+    """
+    Generate initial insights for many customers with bounded concurrency.
+
+    Up to `max_customers` customers are processed at once and the analyzers of each
+    customer run in parallel. The number of in-flight Gemini calls is additionally
+    capped process-wide by Config.MAX_INFLIGHT_LLM_CALLS. A failure for one customer
+    is logged and recorded without aborting the rest of the batch.
+
+    Args:
+        customers (Iterable): Customer documents, each exposing an `id` attribute
+        load_customer_data (Callable): Builds the analyzer input dict for a customer document
+        persist_insights (Callable): Stores the generated insights for a client_id
+        max_customers (int, optional): Number of customers processed concurrently.
+            Defaults to Config.MAX_CONCURRENT_CUSTOMERS.
+        fused (bool, optional): Use one combined LLM call per customer. Defaults to
+            Config.FUSED_INSIGHT_ANALYSIS.
+        on_customer_done (Callable, optional): Called with (client_id, error) as each customer
+            finishes. error is None on success.
+
+    Returns:
+        Dict: Summary with processed client ids and per-customer errors
+    """
+    max_customers = max_customers or Config.MAX_CONCURRENT_CUSTOMERS
+    if max_customers < 1:
+        raise ValueError("max_customers must be a positive integer")
+
+    summary = {"processed": [], "failed": {}}
+
+    def process_customer(customer, analyzer_executor):
+        client_id = str(customer.id)
+        data = load_customer_data(customer)
+        insights = generate_customer_insights(data, analyzer_executor, fused)
+        persist_insights(client_id, insights)
+        return client_id
+
+    with ThreadPoolExecutor(max_workers=max_customers * len(INSIGHT_ANALYZERS),
+                            thread_name_prefix="insight-analyzer") as analyzer_executor, \
+            ThreadPoolExecutor(max_workers=max_customers,
+                               thread_name_prefix="insight-customer") as customer_executor:
+        futures = {}
+        for customer in customers:
+            # Keep a bounded window of submitted customers so large collections are not
+            # materialized in memory all at once
+            if len(futures) >= max_customers * 2:
+                _collect_completed(futures, summary, on_customer_done, wait_for_one=True)
+            # The pool threads run the LLM calls with the priority class of the calling sweep
+            futures[customer_executor.submit(with_current_priority(process_customer), customer,
+                                             analyzer_executor)] = str(customer.id)
+
+        _collect_completed(futures, summary, on_customer_done)
+
+    logger.info(f"Generated insights for {len(summary['processed'])} customers, "
+                f"{len(summary['failed'])} failed")
+    return summary
+
+
+def generate_insights_in_bulk(customers: Iterable,
+                              load_customer_data: Callable[[Any], Dict],
+                              persist_insights: Callable[[str, Dict], None],
+                              backend=None,
+                              work_dir: Optional[str] = None,
+                              on_customer_done: Optional[Callable[[str, Optional[str]], None]] = None
+                              ) -> Dict[str, Any]:
+    """
+    Generate initial insights for many customers through one batch prediction job.
+
+    The combined analysis prompt of every customer is written to a JSONL job file
+    and submitted at once, so throughput depends on the batch service rather than on
+    per-request latency. The results are then fanned back out to persist_insights.
+    Sections missing from a result are recomputed with the individual analyzers,
+    which reloads that customer's data. With Config.STATISTICAL_INSIGHT_SCORERS set, life
+    stage and retention risk are scored while the job file is written and left out of the prompts.
+
+    Args:
+        customers (Iterable): Customer documents, each exposing an `id` attribute
+        load_customer_data (Callable): Builds the analyzer input dict for a customer document
+        persist_insights (Callable): Stores the generated insights for a client_id
+        backend (optional): Batch prediction backend. Defaults to Config.LLM_BATCH_BACKEND.
+        work_dir (str, optional): Directory for the job files. Defaults to Config.LLM_BATCH_DIR.
+        on_customer_done (Callable, optional): Called with (client_id, error) as each customer
+            finishes. error is None on success.
+
+    Returns:
+        Dict: Summary with processed client ids and per-customer errors
+    """
+    summary = {"processed": [], "failed": {}}
+    # client_id -> (customer document, spending statistics, statistical insights); the customer data itself is not kept
+    pending = {}
+
+    def record(client_id, error):
+        if error is None:
+            summary["processed"].append(client_id)
+        else:
+            logger.error(f"Failed to generate insights for customer {client_id}: {error}")
+            summary["failed"][client_id] = error
+        if on_customer_done is not None:
+            on_customer_done(client_id, error)
+
+    def request_lines():
+        for customer in customers:
+            client_id = str(customer.id)
+            try:
+                data = load_customer_data(customer)
+                spending_statistics = safe_spending_statistics(data['transactions'])
+                precomputed = statistical_insights(data)
+                line = batch_request_line(client_id, get_combined_analysis_prompt(data, spending_statistics or {}),
+                                          json_response=True)
+            except Exception as e:
+                record(client_id, str(e))
+                continue
+            pending[client_id] = (customer, spending_statistics, precomputed)
+            yield line
+
+    results = run_batch_job(request_lines(), backend, work_dir)
+
+    for client_id, (customer, spending_statistics, precomputed) in pending.items():
+        try:
+            response = results.get(client_id)
+            if response is not None:
+                response = GeminiResponseEditor.remove_special_chars(response)
+            insights = combined_insights_from_response(response, spending_statistics,
+                                                       lambda: load_customer_data(customer), precomputed)
+            persist_insights(client_id, insights)
+            record(client_id, None)
+        except Exception as e:
+            record(client_id, str(e))
+
+    logger.info(f"Generated insights in bulk for {len(summary['processed'])} customers, "
+                f"{len(summary['failed'])} failed")
+    return summary
+
+
+def _collect_completed(futures: Dict, summary: Dict, on_customer_done: Optional[Callable] = None,
+                       wait_for_one: bool = False) -> None:
+    """Move finished customer futures into the batch summary"""
+    for future in as_completed(list(futures)):
+        client_id = futures.pop(future)
+        error = None
+        try:
+            summary["processed"].append(future.result())
+        except Exception as e:
+            logger.error(f"Failed to generate insights for customer {client_id}: {str(e)}")
+            error = str(e)
+            summary["failed"][client_id] = error
+        if on_customer_done is not None:
+            on_customer_done(client_id, error)
+        if wait_for_one:
+            return
@@ -0,0 +1,504 @@
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.InsightGenerator.AnalyzeLifeStage import schema as life_stage_schema
+from app.InsightGenerator.AnalyzeRetentionRisk import RETENTION_RISK_KEYS, schema as retention_risk_schema
+from app.InsightGenerator.AnalyzeSpendingPattern.TransactionSchema import to_transaction_schema
+from app.utils.GenerateContentService import generate_content
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+CLIENT_ID = 'client_id'
+
+LIFE_STAGES = life_stage_schema["properties"]["primary_life_stage"]["enum"]
+
+# Typical age of each life stage: (center, spread) of a Gaussian log prior
+STAGE_AGE_PRIORS = {
+    "student": (21, 3),
+    "young_adult": (27, 4),
+    "family_formation": (34, 5),
+    "mid_career": (43, 6),
+    "empty_nester": (54, 5),
+    "pre_retirement": (61, 4),
+    "retirement": (71, 6),
+}
+
+# Merchant categories counted towards each spending signal
+CATEGORY_SIGNALS = {
+    "education": r"educat|tuition|school|universit|college|book",
+    "family": r"child|baby|toy|kid|daycare|school",
+    "home": r"home|furniture|hardware|mortgage|real estate|rent",
+    "health": r"health|medical|pharm|doctor|hospital|dental",
+    "travel": r"travel|airline|hotel|accommodation|cruise",
+}
+
+# Log score added to a life stage per 10% of spend in a signal's categories (share capped at 50%)
+STAGE_SIGNAL_WEIGHTS = {
+    "education": {"student": 1.2, "young_adult": 0.3},
+    "family": {"family_formation": 1.2, "mid_career": 0.5},
+    "home": {"family_formation": 0.4, "mid_career": 0.3, "young_adult": 0.2},
+    "health": {"pre_retirement": 0.4, "retirement": 0.8},
+    "travel": {"empty_nester": 0.6, "retirement": 0.3, "young_adult": 0.2},
+}
+MARRIED_WEIGHTS = {"family_formation": 0.7, "mid_career": 0.4, "empty_nester": 0.3, "student": -0.7}
+
+# Life stage results below this confidence, or this close to the runner-up, are borderline
+LIFE_STAGE_MIN_CONFIDENCE = 45
+LIFE_STAGE_MIN_MARGIN = 10
+MIN_ALTERNATIVE_CONFIDENCE = 10
+
+# Logistic attrition model: log-odds contributions of the activity features
+RETENTION_WEIGHTS = {
+    "intercept": -1.5,
+    "days_inactive": 0.04,       # per day without transactions beyond two weeks, up to 120 days
+    "activity_drop": 1.5,        # relative drop of the transaction count, last 90 vs previous 90 days
+    "spend_drop": 1.0,           # relative drop of spend over the same windows
+    "session_drop": 1.0,         # relative drop of app sessions, last 30 vs previous 30 days
+    "days_without_session": 0.02,  # per day without app sessions beyond a week, up to 60 days
+    "tenure_years": -0.3,        # per year of transaction history, up to 5 years
+    "distinct_categories": -0.08,  # per spending category used, up to 10
+}
+RETENTION_LEVELS = [(0.3, "low"), (0.6, "medium"), (1.0, "high")]
+# Probabilities this close to a level boundary, or customers with fewer transactions, are borderline
+RETENTION_BORDERLINE_MARGIN = 0.05
+RETENTION_MIN_TRANSACTIONS = 5
+
+RETENTION_STRATEGIES = {
+    "inactive": "Send a personalized re-engagement offer on the customer's most used categories",
+    "activity_drop": "Reach out with a relationship manager check-in about changing needs",
+    "spend_drop": "Offer targeted cashback on the categories where spend declined",
+    "app_disengaged": "Promote app features and notifications relevant to recent transactions",
+    "new_customer": "Run the onboarding journey to build early product usage",
+}
+DEFAULT_RETENTION_STRATEGY = "Maintain engagement with personalized product recommendations"
+
+TRANSACTION_FEATURES = ['transaction_count', 'total_spend', 'tenure_days', 'days_since_transaction',
+                        'recent_count', 'prior_count', 'recent_spend', 'prior_spend', 'distinct_categories'] + \
+                       [f'{signal}_share' for signal in CATEGORY_SIGNALS]
+SESSION_FEATURES = ['days_since_session', 'recent_sessions', 'prior_sessions']
+
+
+def _naive(dates: pd.Series) -> pd.Series:
+    return dates.dt.tz_convert(None) if isinstance(dates.dtype, pd.DatetimeTZDtype) else dates
+
+
+def _as_of(as_of) -> pd.Timestamp:
+    as_of = pd.Timestamp(as_of if as_of is not None else datetime.now())
+    return as_of.tz_convert(None) if as_of.tzinfo is not None else as_of
+
+
+def _transaction_features(transactions: Optional[pd.DataFrame], as_of: pd.Timestamp) -> pd.DataFrame:
+    if transactions is None or transactions.empty:
+        return pd.DataFrame(columns=TRANSACTION_FEATURES, dtype=float)
+
+    df = to_transaction_schema(transactions[[CLIENT_ID, 'Transaction_Amount', 'Transaction_Date',
+                                             'Merchant_Category']])
+    df = df.dropna(subset=['Transaction_Amount', 'Transaction_Date'])
+    days_ago = (as_of - _naive(df['Transaction_Date'])).dt.days
+    spend = df['Transaction_Amount'].abs()
+    recent = days_ago <= 90
+    prior = (days_ago > 90) & (days_ago <= 180)
+    codes = df['Merchant_Category'].cat.codes.to_numpy()
+
+    frame = pd.DataFrame({
+        CLIENT_ID: df[CLIENT_ID].astype(str),
+        'days_ago': days_ago,
+        'spend': spend,
+        'recent': recent.astype(int),
+        'prior': prior.astype(int),
+        'recent_spend': spend.where(recent, 0.0),
+        'prior_spend': spend.where(prior, 0.0),
+        'category': pd.Series(codes, index=df.index).where(codes >= 0),
+    })
+    # Each category is matched against the signal patterns once, rows look their category up by code
+    categories = df['Merchant_Category'].cat.categories
+    for signal, pattern in CATEGORY_SIGNALS.items():
+        in_signal = np.append(categories.str.contains(pattern, case=False, regex=True), False)[codes]
+        frame[signal] = spend.where(in_signal, 0.0)
+
+    grouped = frame.groupby(CLIENT_ID)
+    features = grouped.agg(
+        transaction_count=('spend', 'size'),
+        total_spend=('spend', 'sum'),
+        tenure_days=('days_ago', 'max'),
+        days_since_transaction=('days_ago', 'min'),
+        recent_count=('recent', 'sum'),
+        prior_count=('prior', 'sum'),
+        recent_spend=('recent_spend', 'sum'),
+        prior_spend=('prior_spend', 'sum'),
+        distinct_categories=('category', 'nunique'),
+    )
+    signal_spend = grouped[list(CATEGORY_SIGNALS)].sum()
+    total = features['total_spend'].where(features['total_spend'] > 0)
+    for signal in CATEGORY_SIGNALS:
+        features[f'{signal}_share'] = (signal_spend[signal] / total).fillna(0.0)
+    return features
+
+
+def _session_features(sessions: Optional[pd.DataFrame], as_of: pd.Timestamp) -> pd.DataFrame:
+    if sessions is None or sessions.empty:
+        return pd.DataFrame(columns=SESSION_FEATURES, dtype=float)
+
+    dates = _naive(pd.to_datetime(sessions['date'], errors='coerce', utc=True, format='ISO8601'))
+    days_ago = (as_of - dates).dt.days
+    frame = pd.DataFrame({
+        CLIENT_ID: sessions[CLIENT_ID].astype(str),
+        'days_ago': days_ago,
+        'recent': (days_ago <= 30).astype(int),
+        'prior': ((days_ago > 30) & (days_ago <= 60)).astype(int),
+    }).dropna(subset=['days_ago'])
+    return frame.groupby(CLIENT_ID).agg(
+        days_since_session=('days_ago', 'min'),
+        recent_sessions=('recent', 'sum'),
+        prior_sessions=('prior', 'sum'),
+    )
+
+
+def customer_features(customers: pd.DataFrame, transactions: Optional[pd.DataFrame] = None,
+                      sessions: Optional[pd.DataFrame] = None, as_of=None) -> pd.DataFrame:
+    """
+    Per customer features of the statistical scorers, computed with groupbys over whole tables
+
+    Args:
+        customers (pd.DataFrame): One row per customer with client_id and the customer_info fields
+            (age, marital_status, ...)
+        transactions (pd.DataFrame, optional): Transactions with client_id, Transaction_Amount,
+            Transaction_Date and Merchant_Category, e.g. ParquetStore.read_transactions
+        sessions (pd.DataFrame, optional): App sessions with client_id and date,
+            e.g. ParquetStore.read_app_activity
+        as_of (datetime, optional): Date the features are computed at. Defaults to now.
+
+    Returns:
+        pd.DataFrame: Features indexed by client_id, missing where a customer has no data
+    """
+    as_of = _as_of(as_of)
+    info = customers.assign(**{CLIENT_ID: customers[CLIENT_ID].astype(str)}) \
+        .drop_duplicates(CLIENT_ID).set_index(CLIENT_ID)
+    features = pd.DataFrame(index=info.index)
+    features['age'] = pd.to_numeric(info['age'], errors='coerce') if 'age' in info else np.nan
+    features['married'] = info['marital_status'].astype(str).str.lower().eq('married') \
+        if 'marital_status' in info else False
+    return features.join(_transaction_features(transactions, as_of)) \
+        .join(_session_features(sessions, as_of)) \
+        .astype({column: float for column in TRANSACTION_FEATURES + SESSION_FEATURES})
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _stage_weights(weights: Dict[str, float]) -> np.ndarray:
+    return np.array([weights.get(stage, 0.0) for stage in LIFE_STAGES])
+
+
+def score_life_stage(features: pd.DataFrame) -> pd.DataFrame:
+    """
+    Score the life stage of every customer
+
+    Each stage gets a log score from a Gaussian age prior, the share of spend in
+    stage-typical categories and marital status; a softmax turns the scores into
+    confidences. The results follow AnalyzeLifeStage.schema.
+
+    Args:
+        features (pd.DataFrame): customer_features output
+
+    Returns:
+        pd.DataFrame: life_stage result and life_stage_borderline flag per client_id
+    """
+    rows = np.arange(len(features))
+    age = features['age'].to_numpy(dtype=float)
+    centers = np.array([STAGE_AGE_PRIORS[stage][0] for stage in LIFE_STAGES])
+    spreads = np.array([STAGE_AGE_PRIORS[stage][1] for stage in LIFE_STAGES])
+
+    # Unknown ages leave the prior flat
+    terms = {"age": np.nan_to_num(-0.5 * ((age[:, None] - centers) / spreads) ** 2)}
+    for signal, weights in STAGE_SIGNAL_WEIGHTS.items():
+        share = np.clip(features[f'{signal}_share'].fillna(0.0).to_numpy(dtype=float), 0, 0.5)
+        terms[signal] = (share * 10)[:, None] * _stage_weights(weights)
+    married = features['married'].fillna(False).to_numpy(dtype=bool)
+    terms["marital_status"] = married[:, None] * _stage_weights(MARRIED_WEIGHTS)
+
+    confidence = _softmax(sum(terms.values())) * 100
+    order = np.argsort(-confidence, axis=1)
+    primary, runner_up = order[:, 0], order[:, 1]
+    primary_confidence = confidence[rows, primary]
+    borderline = (primary_confidence < LIFE_STAGE_MIN_CONFIDENCE) | \
+        (primary_confidence - confidence[rows, runner_up] < LIFE_STAGE_MIN_MARGIN) | np.isnan(age)
+
+    # Evidence of each factor for the primary stage, relative to its average over all stages
+    evidence = {name: term[rows, primary] - term.mean(axis=1) for name, term in terms.items()}
+
+    details = {"age": [f"Age {value:.0f}" for value in age],
+               "marital_status": np.where(married, "Married", "Not married")}
+    for signal in STAGE_SIGNAL_WEIGHTS:
+        details[signal] = [f"{share * 100:.0f}% of spend on {signal} related categories"
+                           for share in features[f'{signal}_share'].fillna(0.0)]
+
+    results = []
+    for i in rows:
+        alternatives = [stage for stage in order[i, 1:3] if confidence[i, stage] >= MIN_ALTERNATIVE_CONFIDENCE]
+        positive = {name: values[i] for name, values in evidence.items() if values[i] > 0}
+        total = sum(positive.values())
+        indicators = [{"category": "demographics" if name in ("age", "marital_status") else "spending",
+                       "details": str(details[name][i]),
+                       "weight": round(float(value / total), 2)}
+                      for name, value in sorted(positive.items(), key=lambda item: -item[1])]
+        results.append({
+            "primary_life_stage": LIFE_STAGES[primary[i]],
+            "alternative_life_stages": [LIFE_STAGES[stage] for stage in alternatives],
+            "confidence_level": {
+                "primary_stage": round(float(primary_confidence[i]), 1),
+                "alternative_stages": [{"stage": LIFE_STAGES[stage], "confidence": round(float(confidence[i, stage]), 1)}
+                                       for stage in alternatives],
+            },
+            "key_indicators": indicators,
+            "reasoning": f"Statistical scorer: {LIFE_STAGES[primary[i]]} with {primary_confidence[i]:.0f}% confidence "
+                         f"from {', '.join(positive) or 'no distinctive signals'}.",
+        })
+    return pd.DataFrame({"life_stage": results, "life_stage_borderline": borderline}, index=features.index)
+
+
+def _relative_drop(recent: pd.Series, prior: pd.Series) -> pd.Series:
+    return (1 - recent / prior.where(prior > 0)).clip(0, 1).fillna(0.0)
+
+
+def score_retention_risk(features: pd.DataFrame) -> pd.DataFrame:
+    """
+    Score the attrition risk of every customer
+
+    A logistic model over transaction recency, the trend of transaction count,
+    spend and app sessions, tenure and category breadth gives the attrition
+    probability; its level, risk and protective factors and strategies follow
+    the retention_risk keys.
+
+    Args:
+        features (pd.DataFrame): customer_features output
+
+    Returns:
+        pd.DataFrame: retention_risk result and retention_risk_borderline flag per client_id
+    """
+    weights = RETENTION_WEIGHTS
+    days_inactive = (features['days_since_transaction'] - 14).clip(0, 120).fillna(120)
+    activity_drop = _relative_drop(features['recent_count'], features['prior_count'])
+    spend_drop = _relative_drop(features['recent_spend'], features['prior_spend'])
+    session_drop = _relative_drop(features['recent_sessions'], features['prior_sessions'])
+    days_without_session = (features['days_since_session'] - 7).clip(0, 60).fillna(0.0)
+    tenure_years = (features['tenure_days'] / 365).clip(0, 5).fillna(0.0)
+    categories = features['distinct_categories'].clip(0, 10).fillna(0.0)
+
+    log_odds = weights["intercept"] + weights["days_inactive"] * days_inactive + \
+        weights["activity_drop"] * activity_drop + weights["spend_drop"] * spend_drop + \
+        weights["session_drop"] * session_drop + weights["days_without_session"] * days_without_session + \
+        weights["tenure_years"] * tenure_years + weights["distinct_categories"] * categories
+    probability = 1 / (1 + np.exp(-log_odds))
+
+    boundaries = np.array([threshold for threshold, _ in RETENTION_LEVELS[:-1]])
+    level_index = np.searchsorted(boundaries, probability.to_numpy(), side='right')
+    near_boundary = np.abs(probability.to_numpy()[:, None] - boundaries).min(axis=1) < RETENTION_BORDERLINE_MARGIN
+    borderline = near_boundary | (features['transaction_count'].fillna(0) < RETENTION_MIN_TRANSACTIONS).to_numpy()
+
+    risks = {
+        "inactive": features['days_since_transaction'].isna() | (features['days_since_transaction'] > 30),
+        "activity_drop": activity_drop >= 0.3,
+        "spend_drop": spend_drop >= 0.3,
+        "app_disengaged": (session_drop >= 0.5) | (features['days_since_session'] > 30),
+        "new_customer": features['tenure_days'].fillna(0) < 182,
+    }
+    protections = {
+        "long_tenure": features['tenure_days'] >= 3 * 365,
+        "broad_usage": features['distinct_categories'] >= 8,
+        "growing_activity": (features['prior_count'] > 0) & (features['recent_count'] >= features['prior_count']),
+        "active_app_user": features['days_since_session'] <= 7,
+    }
+
+    risk_masks = [(name, mask.to_numpy()) for name, mask in risks.items()]
+    protection_masks = [(name, mask.to_numpy()) for name, mask in protections.items()]
+    probabilities = probability.to_numpy()
+    levels = [RETENTION_LEVELS[index][1] for index in level_index]
+    rows = features[['days_since_transaction', 'days_since_session', 'tenure_days', 'distinct_categories']] \
+        .assign(activity_drop=activity_drop, spend_drop=spend_drop).to_dict('records')
+
+    results = []
+    for i, row in enumerate(rows):
+        risk_names = [name for name, mask in risk_masks if mask[i]]
+        results.append({
+            "attrition_risk_level": levels[i],
+            "risk_factors": [_risk_factor(name, row) for name in risk_names],
+            "protective_factors": [_protective_factor(name, row) for name, mask in protection_masks if mask[i]],
+            "retention_strategies": [RETENTION_STRATEGIES[name] for name in risk_names] or
+                                    [DEFAULT_RETENTION_STRATEGY],
+            "attrition_probability": round(float(probabilities[i]), 2),
+        })
+    return pd.DataFrame({"retention_risk": results, "retention_risk_borderline": borderline}, index=features.index)
+
+
+def _risk_factor(name: str, row: Dict) -> str:
+    if name == "inactive":
+        if pd.isna(row['days_since_transaction']):
+            return "No card transactions on record"
+        return f"No card transactions in the last {row['days_since_transaction']:.0f} days"
+    if name == "activity_drop":
+        return f"Transaction count down {row['activity_drop'] * 100:.0f}% versus the previous 90 days"
+    if name == "spend_drop":
+        return f"Spending down {row['spend_drop'] * 100:.0f}% versus the previous 90 days"
+    if name == "app_disengaged":
+        if row['days_since_session'] > 30:
+            return f"No app sessions in the last {row['days_since_session']:.0f} days"
+        return "App sessions down by half or more versus the previous 30 days"
+    return "New relationship with under six months of transaction history"
+
+
+def _protective_factor(name: str, row: Dict) -> str:
+    if name == "long_tenure":
+        return f"Long relationship with {row['tenure_days'] / 365:.1f} years of transaction history"
+    if name == "broad_usage":
+        return f"Card used across {row['distinct_categories']:.0f} spending categories"
+    if name == "growing_activity":
+        return "Stable or growing transaction activity"
+    return "Active app user in the last week"
+
+
+def score_customers(customers: pd.DataFrame, transactions: Optional[pd.DataFrame] = None,
+                    sessions: Optional[pd.DataFrame] = None, as_of=None) -> pd.DataFrame:
+    """
+    Score life stage and retention risk for a whole customer table
+
+    Args:
+        customers (pd.DataFrame): One row per customer with client_id and the customer_info fields
+        transactions (pd.DataFrame, optional): Transactions with a client_id column
+        sessions (pd.DataFrame, optional): App sessions with a client_id column
+        as_of (datetime, optional): Date the scores are computed at. Defaults to now.
+
+    Returns:
+        pd.DataFrame: Features, life_stage, retention_risk and their borderline flags per client_id
+    """
+    features = customer_features(customers, transactions, sessions, as_of)
+    return features.join(score_life_stage(features)).join(score_retention_risk(features))
+
+
+def feature_summary(row: pd.Series) -> Dict:
+    """JSON friendly features of one scored customer, as sent to the LLM"""
+    return {name: (None if pd.isna(value) else round(float(value), 3) if not isinstance(value, (bool, np.bool_))
+                   else bool(value))
+            for name, value in row.items() if name in ['age', 'married'] + TRANSACTION_FEATURES + SESSION_FEATURES}
+
+
+def explain_with_llm(insight: str, result: Dict, features: Dict) -> Dict:
+    """
+    Have the LLM review a borderline statistical result
+
+    Only the computed features and the statistical result are sent, not the
+    transaction history. The LLM confirms or adjusts the result in the same
+    schema and explains it; the statistical result is kept if the call fails.
+
+    Args:
+        insight (str): 'life_stage' or 'retention_risk'
+        result (Dict): Statistical result
+        features (Dict): Features the result was computed from
+
+    Returns:
+        Dict: Result following the insight's schema
+    """
+    schema = life_stage_schema if insight == "life_stage" else retention_risk_schema
+    required = life_stage_schema["required"] if insight == "life_stage" else RETENTION_RISK_KEYS
+    prompt = f"""
+    As a customer analytics specialist, review a statistical {insight.replace('_', ' ')} assessment that came out
+    borderline. Confirm it or adjust it, and explain the reasoning in terms of the features.
+
+    Customer Features (as of today; shares are fractions of total spend, days count back from today):
+    {json.dumps(features, separators=(',', ':'))}
+
+    Statistical Assessment:
+    {json.dumps(result, separators=(',', ':'))}
+
+    Use ONLY the provided features. Respond ONLY with JSON following this JSON Schema-
+    {json.dumps(schema, separators=(',', ':'))}
+    """
+    response_schema = {**schema, "additionalProperties": True} if insight == "retention_risk" else None
+    try:
+        response = generate_content(prompt, json_response=True, response_schema=response_schema, task=insight)
+        explained = json.loads(response) if response else None
+    except Exception as e:
+        logger.error(f"Failed to explain borderline {insight}: {str(e)}")
+        explained = None
+    if isinstance(explained, dict) and all(key in explained for key in required):
+        return explained
+    return result
+
+
+def _single_customer(data: Dict) -> pd.Series:
+    if not isinstance(data, dict) or 'customer_info' not in data or 'transactions' not in data:
+        raise ValueError("Input data must contain 'customer_info' and 'transactions' keys")
+    customers = pd.DataFrame([{**(data['customer_info'] or {}), CLIENT_ID: "customer"}])
+    transactions = pd.DataFrame(data['transactions'] or [])
+    if not transactions.empty:
+        transactions = transactions.assign(**{CLIENT_ID: "customer"})
+        if 'Merchant_Category' not in transactions:
+            transactions['Merchant_Category'] = None
+    sessions = pd.DataFrame(data.get('app_activity') or [])
+    if not sessions.empty:
+        sessions = sessions.assign(**{CLIENT_ID: "customer"})
+    return score_customers(customers, transactions, sessions).iloc[0]
+
+
+def _scored_result(scored: pd.Series, insight: str, explain: bool) -> Dict:
+    if explain and scored[f'{insight}_borderline']:
+        return explain_with_llm(insight, scored[insight], feature_summary(scored))
+    return scored[insight]
+
+
+def analyze_statistically(data: Dict, insights: Iterable[str] = ("life_stage", "retention_risk"),
+                          explain: bool = True) -> Dict[str, Dict]:
+    """
+    Several statistical insights of one customer, scoring the customer once
+
+    Args:
+        data (Dict): Customer data with 'customer_info', 'transactions' and 'app_activity' keys
+        insights (Iterable[str]): Insights to return, 'life_stage' and/or 'retention_risk'
+        explain (bool): Have the LLM review borderline results
+
+    Returns:
+        Dict: Insight -> result in the format of the matching LLM analyzer
+    """
+    scored = _single_customer(data)
+    return {insight: _scored_result(scored, insight, explain) for insight in insights}
+
+
+def analyze_life_stage_statistically(data: Dict, explain: bool = True) -> Dict:
+    """
+    Life stage of one customer from the statistical scorer, in the analyze_life_stage format
+
+    Args:
+        data (Dict): Customer data with 'customer_info', 'transactions' and 'app_activity' keys
+        explain (bool): Have the LLM review borderline results
+
+    Returns:
+        Dict: Life stage following AnalyzeLifeStage.schema
+    """
+    return analyze_statistically(data, ["life_stage"], explain)["life_stage"]
+
+
+def analyze_retention_risk_statistically(data: Dict, explain: bool = True) -> Dict:
+    """
+    Retention risk of one customer from the statistical scorer, in the analyze_retention_risk format
+
+    Args:
+        data (Dict): Customer data with 'customer_info', 'transactions' and 'app_activity' keys
+        explain (bool): Have the LLM review borderline results
+
+    Returns:
+        Dict: Retention risk with the RETENTION_RISK_KEYS
+    """
+    return analyze_statistically(data, ["retention_risk"], explain)["retention_risk"]
+
+
+def borderline_customers(scored: pd.DataFrame) -> List[str]:
+    """Client ids with a borderline life stage or retention result"""
+    return scored.index[scored['life_stage_borderline'] | scored['retention_risk_borderline']].tolist()
@@ -0,0 +1,93 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+from app.JobQueue.JobStore import (create_job_store, JOB_STATUS_RUNNING, JOB_STATUS_COMPLETED,
+                                   JOB_STATUS_FAILED)
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class JobReporter:
+    """Handle passed to a running job for reporting progress to the job store"""
+
+    def __init__(self, store, job_id: str):
+        self.store = store
+        self.job_id = job_id
+
+    def set_total(self, total: int) -> None:
+        """Set the number of customers the job will process, once known"""
+        self.store.update_job(self.job_id, total=total)
+
+    def record(self, client_id: str, result: Any = None, error: Optional[str] = None) -> None:
+        """Record the outcome of a single customer"""
+        self.store.record_result(self.job_id, client_id, result=result, error=error)
+
+    def commit_error_handler(self, client_id: str) -> Callable[[str], None]:
+        """BatchedFirestoreWriter on_error callback recording a failed commit of the customer's writes"""
+        return lambda error: self.record(client_id, error=f"Failed to persist results: {error}")
+
+
+class JobRunner:
+    """
+    Runs long-running sweeps on a background worker pool and tracks them in a job store.
+    """
+
+    def __init__(self, store=None, max_workers: Optional[int] = None):
+        """
+        Initialize JobRunner
+
+        Args:
+            store (optional): Job store. Defaults to the store configured in Config.
+            max_workers (int, optional): Number of jobs run concurrently. Defaults to Config.JOB_WORKERS.
+        """
+        self.store = store or create_job_store()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or Config.JOB_WORKERS,
+                                           thread_name_prefix="job-worker")
+
+    def submit(self, job_type: str, job_func: Callable[[JobReporter], Any], params: Optional[Dict] = None) -> str:
+        """
+        Queue a job for background execution
+
+        Args:
+            job_type (str): Kind of job, e.g. 'generate_initial_insights'
+            job_func (Callable): Function running the job. Receives a JobReporter.
+            params (dict, optional): Request parameters stored with the job
+
+        Returns:
+            str: Job id to poll via the job store
+        """
+        job_id = self.store.create_job(job_type, params)
+        self.executor.submit(self._run, job_id, job_func)
+        logger.info(f"Queued {job_type} job {job_id}")
+        return job_id
+
+    def _run(self, job_id: str, job_func: Callable[[JobReporter], Any]) -> None:
+        self.store.update_job(job_id, status=JOB_STATUS_RUNNING)
+        try:
+            job_func(JobReporter(self.store, job_id))
+            self.store.update_job(job_id, status=JOB_STATUS_COMPLETED)
+            logger.info(f"Job {job_id} completed")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            self.store.update_job(job_id, status=JOB_STATUS_FAILED, error=str(e))
+
+    def get_job(self, job_id: str, include_results: bool = False) -> Optional[Dict]:
+        """Fetch job state from the job store"""
+        return self.store.get_job(job_id, include_results=include_results)
+
+
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Return the process wide JobRunner, creating it on first use"""
+    global _job_runner
+    with _job_runner_lock:
+        if _job_runner is None:
+            _job_runner = JobRunner()
+        return _job_runner
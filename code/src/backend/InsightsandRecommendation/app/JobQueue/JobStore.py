@@ -0,0 +1,223 @@
+import json
+import sqlite3
+import threading
+import uuid
+from contextlib import closing, contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from config import Config
+
+JOB_STATUS_QUEUED = "queued"
+JOB_STATUS_RUNNING = "running"
+JOB_STATUS_COMPLETED = "completed"
+JOB_STATUS_FAILED = "failed"
+
+
+class InMemoryJobStore:
+    """
+    Job store keeping job state in process memory.
+    Suitable for local runs with a single server process.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def create_job(self, job_type: str, params: Optional[Dict] = None) -> str:
+        """
+        Register a new queued job
+
+        Args:
+            job_type (str): Kind of job, e.g. 'run_adaptive_analytics'
+            params (dict, optional): Request parameters the job was started with
+
+        Returns:
+            str: Job id
+        """
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "job_type": job_type,
+                "params": params or {},
+                "status": JOB_STATUS_QUEUED,
+                "created_at": now,
+                "updated_at": now,
+                "total": None,
+                "processed": 0,
+                "failed": 0,
+                "error": None,
+            }
+            self._results[job_id] = {}
+        return job_id
+
+    def update_job(self, job_id: str, **fields) -> None:
+        """Update top level job fields such as status, total or error"""
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(fields)
+            job["updated_at"] = datetime.now().isoformat()
+
+    def record_result(self, job_id: str, client_id: str, result: Any = None, error: Optional[str] = None) -> None:
+        """
+        Record the outcome of a single customer and advance job progress.
+        A customer recorded again is counted once: an error replaces an earlier success, e.g. when
+        its writes fail to commit after it was reported done, and a success never replaces an error.
+
+        Args:
+            job_id (str): Job id
+            client_id (str): Customer processed by the job
+            result (Any, optional): JSON serializable result for the customer
+            error (str, optional): Error message if the customer failed
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+            previous = self._results[job_id].get(str(client_id))
+            if previous is not None:
+                if previous["status"] == JOB_STATUS_FAILED:
+                    return
+                job["processed"] -= 1
+            self._results[job_id][str(client_id)] = {
+                "status": JOB_STATUS_FAILED if error else JOB_STATUS_COMPLETED,
+                "result": result,
+                "error": error,
+            }
+            job["failed" if error else "processed"] += 1
+            job["updated_at"] = datetime.now().isoformat()
+
+    def get_job(self, job_id: str, include_results: bool = False) -> Optional[Dict]:
+        """
+        Fetch a job by id
+
+        Args:
+            job_id (str): Job id
+            include_results (bool): Whether to include per-customer results
+
+        Returns:
+            dict: Job state, or None if the job does not exist
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+            if include_results:
+                job["results"] = dict(self._results[job_id])
+        return job
+
+
+class SQLiteJobStore:
+    """
+    Job store persisting job state to a SQLite database so that job status
+    survives server restarts and can be shared between worker processes on one host.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    job_type TEXT NOT NULL,
+                    params TEXT,
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    total INTEGER,
+                    processed INTEGER NOT NULL DEFAULT 0,
+                    failed INTEGER NOT NULL DEFAULT 0,
+                    error TEXT
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_results (
+                    job_id TEXT NOT NULL,
+                    client_id TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    PRIMARY KEY (job_id, client_id)
+                )""")
+
+    @contextmanager
+    def _connect(self):
+        # sqlite3's own context manager only commits or rolls back; the connection is closed explicitly
+        with closing(sqlite3.connect(self.db_path, timeout=30)) as conn, conn:
+            yield conn
+
+    def create_job(self, job_type: str, params: Optional[Dict] = None) -> str:
+        """Register a new queued job and return its id"""
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, job_type, params, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, job_type, json.dumps(params or {}), JOB_STATUS_QUEUED, now, now))
+        return job_id
+
+    def update_job(self, job_id: str, **fields) -> None:
+        """Update top level job fields such as status, total or error"""
+        allowed = {"status", "total", "error"}
+        unknown = set(fields) - allowed
+        if unknown:
+            raise ValueError(f"Unknown job fields: {sorted(unknown)}")
+
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        values = list(fields.values()) + [datetime.now().isoformat(), job_id]
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ?", values)
+
+    def record_result(self, job_id: str, client_id: str, result: Any = None, error: Optional[str] = None) -> None:
+        """Record the outcome of a single customer and advance job progress; an error replaces an earlier success"""
+        counter = "failed" if error else "processed"
+        with self._lock, self._connect() as conn:
+            previous = conn.execute("SELECT status FROM job_results WHERE job_id = ? AND client_id = ?",
+                                    (job_id, str(client_id))).fetchone()
+            if previous is not None:
+                if previous[0] == JOB_STATUS_FAILED:
+                    return
+                conn.execute("UPDATE jobs SET processed = processed - 1 WHERE job_id = ?", (job_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO job_results (job_id, client_id, status, result, error) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job_id, str(client_id), JOB_STATUS_FAILED if error else JOB_STATUS_COMPLETED,
+                 json.dumps(result, default=str), error))
+            conn.execute(
+                f"UPDATE jobs SET {counter} = {counter} + 1, updated_at = ? WHERE job_id = ?",
+                (datetime.now().isoformat(), job_id))
+
+    def get_job(self, job_id: str, include_results: bool = False) -> Optional[Dict]:
+        """Fetch a job by id, optionally with per-customer results"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = dict(row)
+            job["params"] = json.loads(job["params"] or "{}")
+            if include_results:
+                rows = conn.execute(
+                    "SELECT client_id, status, result, error FROM job_results WHERE job_id = ?", (job_id,))
+                job["results"] = {
+                    r["client_id"]: {
+                        "status": r["status"],
+                        "result": json.loads(r["result"]) if r["result"] else None,
+                        "error": r["error"],
+                    }
+                    for r in rows
+                }
+        return job
+
+
+def create_job_store():
+    """Create the job store configured by Config.JOB_STORE_BACKEND"""
+    backend = Config.JOB_STORE_BACKEND
+    if backend == "memory":
+        return InMemoryJobStore()
+    if backend == "sqlite":
+        return SQLiteJobStore(Config.JOB_STORE_PATH)
+    raise ValueError(f"Unsupported job store backend: {backend}")
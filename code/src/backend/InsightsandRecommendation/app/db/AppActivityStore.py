@@ -0,0 +1,235 @@
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from config import Config
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# 'document' keeps all sessions in the 'sessions' array of AppActivity/{client_id};
+# 'daily' and 'monthly' store them in AppActivity/{client_id}/session_buckets/{YYYY-MM-DD | YYYY-MM}
+#
+# Cutover from 'document' to a bucketed layout:
+#   1. Dual-write: set APP_ACTIVITY_WRITE_LAYOUTS=document,<layout> so append_sessions keeps both current
+#   2. Run migrate_app_activity.py --layout <layout> to copy the existing session history into buckets
+#   3. Switch readers with APP_ACTIVITY_LAYOUT=<layout>
+#   4. Once no reader uses the document layout, stop dual-writing with APP_ACTIVITY_WRITE_LAYOUTS=<layout>
+APP_ACTIVITY_LAYOUTS = ("document", "daily", "monthly")
+BUCKET_COLLECTION = "session_buckets"
+
+_BUCKET_FORMATS = {"daily": "%Y-%m-%d", "monthly": "%Y-%m"}
+
+
+def _resolve_layout(layout: Optional[str]) -> str:
+    layout = layout or Config.APP_ACTIVITY_LAYOUT
+    if layout not in APP_ACTIVITY_LAYOUTS:
+        raise ValueError(f"Unsupported app activity layout: {layout}")
+    return layout
+
+
+def bucket_id(session_date: datetime, layout: str) -> str:
+    """Id of the bucket document holding sessions of the given date"""
+    return session_date.strftime(_BUCKET_FORMATS[layout])
+
+
+def bucket_ids_between(start: datetime, end: datetime, layout: str) -> List[str]:
+    """
+    Ids of the bucket documents covering [start, end]
+
+    Args:
+        start (datetime): Start of the window
+        end (datetime): End of the window
+        layout (str): 'daily' or 'monthly'
+
+    Returns:
+        List[str]: Bucket ids in chronological order
+    """
+    ids = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day <= end:
+        bucket = bucket_id(day, layout)
+        if not ids or ids[-1] != bucket:
+            ids.append(bucket)
+        day += timedelta(days=1)
+    return ids
+
+
+def _write_layouts(layouts: Optional[Iterable[str]]) -> List[str]:
+    if layouts is None:
+        configured = Config.APP_ACTIVITY_WRITE_LAYOUTS
+        layouts = configured.split(',') if configured else [Config.APP_ACTIVITY_LAYOUT]
+    return [_resolve_layout(layout.strip()) for layout in layouts]
+
+
+def _bucket_collection(db, client_id: str):
+    return db.collection('AppActivity').document(client_id).collection(BUCKET_COLLECTION)
+
+
+def fetch_sessions_since(db, client_id: str, cutoff: datetime, layout: Optional[str] = None) -> List[Dict]:
+    """
+    Fetch the app sessions of a client dated on or after cutoff
+
+    With a bucketed layout only the bucket documents inside the window are read,
+    instead of the whole session history.
+
+    Args:
+        db (firestore.Client): Firestore client
+        client_id (str): Unique identifier for the client
+        cutoff (datetime): Earliest session date to return
+        layout (str, optional): Storage layout. Defaults to Config.APP_ACTIVITY_LAYOUT.
+
+    Returns:
+        List[Dict]: Sessions in the window
+    """
+    layout = _resolve_layout(layout)
+    if layout == "document":
+        data = db.collection('AppActivity').document(client_id).get().to_dict() or {}
+        sessions = data.get('sessions', [])
+    else:
+        bucket_collection = _bucket_collection(db, client_id)
+        references = [bucket_collection.document(bucket)
+                      for bucket in bucket_ids_between(cutoff, datetime.now(), layout)]
+        sessions = []
+        for snapshot in db.get_all(references):
+            sessions.extend((snapshot.to_dict() or {}).get('sessions', []))
+
+    # The first bucket can start before the cutoff
+    return [session for session in sessions if datetime.fromisoformat(session['date']) >= cutoff]
+
+
+def fetch_all_sessions(db, client_ids: List[str], layout: Optional[str] = None) -> Dict[str, List[Dict]]:
+    """
+    Fetch the complete app session history of several clients
+
+    Args:
+        db (firestore.Client): Firestore client
+        client_ids (List[str]): Unique identifiers of the clients
+        layout (str, optional): Storage layout. Defaults to Config.APP_ACTIVITY_LAYOUT.
+
+    Returns:
+        Dict[str, List[Dict]]: client_id -> sessions
+    """
+    layout = _resolve_layout(layout)
+    sessions = {}
+    if layout == "document":
+        # One batch read for all clients
+        references = [db.collection('AppActivity').document(client_id) for client_id in client_ids]
+        for snapshot in db.get_all(references):
+            sessions[snapshot.id] = (snapshot.to_dict() or {}).get('sessions', [])
+        return sessions
+
+    # Bucket ids sort chronologically, the default document order
+    for client_id in client_ids:
+        sessions[client_id] = [session
+                               for bucket in _bucket_collection(db, client_id).stream()
+                               for session in (bucket.to_dict() or {}).get('sessions', [])]
+    return sessions
+
+
+def bucket_sessions(sessions: Iterable[Dict], layout: str) -> Dict[str, List[Dict]]:
+    """Group sessions by the id of their bucket document"""
+    buckets = defaultdict(list)
+    for session in sessions:
+        buckets[bucket_id(datetime.fromisoformat(session['date']), layout)].append(session)
+    return dict(buckets)
+
+
+def append_sessions(db, client_id: str, sessions: Iterable[Dict], layouts: Optional[Iterable[str]] = None,
+                    writer=None) -> None:
+    """
+    Append new app sessions of a client to every layout being written
+
+    The affected documents are read once and rewritten with the new sessions appended;
+    sessions already stored are skipped, so a retried append does not duplicate them.
+    Appends of the same client are expected to be serialized by the caller.
+
+    Args:
+        db (firestore.Client): Firestore client
+        client_id (str): Unique identifier for the client
+        sessions (Iterable[Dict]): New sessions, each with an ISO 'date'
+        layouts (Iterable[str], optional): Layouts to write. Defaults to Config.APP_ACTIVITY_WRITE_LAYOUTS.
+        writer (BatchedFirestoreWriter, optional): Writer batching the writes. Commits directly if None.
+    """
+    sessions = list(sessions)
+    if not sessions:
+        return
+
+    updates = {}
+    for layout in _write_layouts(layouts):
+        if layout == "document":
+            reference = db.collection('AppActivity').document(client_id)
+            updates[reference.path] = (reference, None, sessions)
+            continue
+        bucket_collection = _bucket_collection(db, client_id)
+        for bucket, grouped in bucket_sessions(sessions, layout).items():
+            reference = bucket_collection.document(bucket)
+            updates[reference.path] = (reference, bucket, grouped)
+
+    # get_all does not guarantee the order of the snapshots
+    stored = {snapshot.reference.path: (snapshot.to_dict() or {}).get('sessions', [])
+              for snapshot in db.get_all([reference for reference, _, _ in updates.values()])}
+
+    operations = []
+    for path, (reference, bucket, new_sessions) in updates.items():
+        existing = stored.get(path, [])
+        seen = {json.dumps(session, sort_keys=True, default=str) for session in existing}
+        added = [session for session in new_sessions if json.dumps(session, sort_keys=True, default=str) not in seen]
+        if not added:
+            continue
+        data = {'sessions': existing + added}
+        if bucket is not None:
+            data['bucket'] = bucket
+        operations.append((reference, data, True))
+
+    if writer is not None:
+        writer.write(operations)
+        return
+    batch = db.batch()
+    for reference, data, merge in operations:
+        batch.set(reference, data, merge=merge)
+    batch.commit()
+
+
+def migrate_app_activity(db, writer, layout: str, client_ids: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """
+    Copy the 'sessions' array of AppActivity documents into bucket documents
+
+    The source documents are left untouched, so the migration can be re-run and
+    readers can be switched to the bucketed layout once it has completed. New sessions
+    should already be dual-written by append_sessions, since the buckets are overwritten
+    with the copy of each source document.
+
+    Args:
+        db (firestore.Client): Firestore client
+        writer (BatchedFirestoreWriter): Writer batching the bucket writes
+        layout (str): 'daily' or 'monthly'
+        client_ids (Iterable[str], optional): Clients to migrate. Defaults to every AppActivity document.
+
+    Returns:
+        Dict[str, int]: Number of migrated clients, buckets and sessions
+    """
+    if _resolve_layout(layout) == "document":
+        raise ValueError("Migration target must be a bucketed layout")
+
+    if client_ids is None:
+        snapshots = db.collection('AppActivity').stream()
+    else:
+        snapshots = db.get_all([db.collection('AppActivity').document(str(client_id)) for client_id in client_ids])
+
+    summary = {"clients": 0, "buckets": 0, "sessions": 0}
+    for snapshot in snapshots:
+        sessions = (snapshot.to_dict() or {}).get('sessions', [])
+        buckets = bucket_sessions(sessions, layout)
+        bucket_collection = _bucket_collection(db, snapshot.id)
+        writer.write([(bucket_collection.document(bucket), {'bucket': bucket, 'sessions': grouped}, False)
+                      for bucket, grouped in buckets.items()])
+
+        summary["clients"] += 1
+        summary["buckets"] += len(buckets)
+        summary["sessions"] += len(sessions)
+
+    logger.info(f"Migrated app activity to {layout} buckets: {summary}")
+    return summary
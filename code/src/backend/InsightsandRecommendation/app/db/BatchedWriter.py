@@ -0,0 +1,214 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+# Firestore rejects write batches with more operations than this
+MAX_BATCH_OPERATIONS = 500
+
+
+class BatchedFirestoreWriter:
+    """
+    Write-behind writer that groups Firestore mutations into WriteBatch commits.
+
+    Writes are queued and committed by a background thread once a batch is full or
+    the oldest queued write has waited flush_interval seconds. The writes of one
+    write() call are committed in the same batch. Failed commits are retried with
+    exponential backoff, and a write's on_error callback is told if its batch still
+    fails; writers block while max_pending operations are queued or being committed,
+    so a slow Firestore cannot grow the queue without bound.
+    """
+
+    def __init__(self, firestore_client, max_batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None, max_pending: Optional[int] = None,
+                 max_retries: Optional[int] = None, retry_backoff: float = 0.5):
+        """
+        Initialize BatchedFirestoreWriter
+
+        Args:
+            firestore_client (firestore.Client): Firestore client
+            max_batch_size (int, optional): Operations per commit, at most 500.
+                Defaults to Config.FIRESTORE_WRITE_BATCH_SIZE.
+            flush_interval (float, optional): Seconds a write may wait before its batch is committed.
+                Defaults to Config.FIRESTORE_WRITE_FLUSH_SECONDS.
+            max_pending (int, optional): Queued and in-flight operations before writers block.
+                Defaults to Config.FIRESTORE_WRITE_MAX_PENDING.
+            max_retries (int, optional): Retries of a failed commit. Defaults to Config.FIRESTORE_WRITE_MAX_RETRIES.
+            retry_backoff (float): Seconds before the first retry, doubled on each further retry
+        """
+        self.db = firestore_client
+        self.max_batch_size = min(max_batch_size or Config.FIRESTORE_WRITE_BATCH_SIZE, MAX_BATCH_OPERATIONS)
+        self.flush_interval = flush_interval if flush_interval is not None else Config.FIRESTORE_WRITE_FLUSH_SECONDS
+        self.max_pending = max(max_pending or Config.FIRESTORE_WRITE_MAX_PENDING, self.max_batch_size)
+        self.max_retries = max_retries if max_retries is not None else Config.FIRESTORE_WRITE_MAX_RETRIES
+        self.retry_backoff = retry_backoff
+
+        self.committed = 0
+        self.errors = []
+
+        self._groups = deque()
+        self._queued = 0
+        self._in_flight = 0
+        self._oldest_queued_at = None
+        self._flush_requests = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="firestore-writer", daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def set(self, reference, data: Dict[str, Any], merge: bool = False,
+            on_error: Optional[Callable[[str], None]] = None) -> None:
+        """Queue a set of the document at reference"""
+        self.write([(reference, data, merge)], on_error)
+
+    def add(self, collection_reference, data: Dict[str, Any], on_error: Optional[Callable[[str], None]] = None):
+        """
+        Queue the creation of a document with an auto-generated id, like CollectionReference.add
+
+        Returns:
+            DocumentReference: Reference of the document to be created
+        """
+        reference = collection_reference.document()
+        self.set(reference, data, on_error=on_error)
+        return reference
+
+    def write(self, operations: List[Tuple[Any, Dict[str, Any], bool]],
+              on_error: Optional[Callable[[str], None]] = None) -> None:
+        """
+        Queue (reference, data, merge) set operations to be committed together
+
+        Blocks while the writer already holds max_pending operations.
+
+        Args:
+            operations (List[Tuple]): (reference, data, merge) set operations
+            on_error (Callable, optional): Called with the error message, on the writer thread,
+                if the commit of these operations fails after all retries
+        """
+        # Groups larger than a batch cannot be committed atomically and are split
+        groups = [operations[start:start + self.max_batch_size]
+                  for start in range(0, len(operations), self.max_batch_size)]
+        with self._condition:
+            for group in groups:
+                if self._closed:
+                    raise RuntimeError("BatchedFirestoreWriter is closed")
+                while self._queued + self._in_flight + len(group) > self.max_pending:
+                    self._condition.wait()
+                if not self._groups:
+                    self._oldest_queued_at = time.monotonic()
+                self._groups.append((group, on_error))
+                self._queued += len(group)
+            self._condition.notify_all()
+
+    def with_error_handler(self, on_error: Callable[[str], None]) -> 'ErrorHandlingWriter':
+        """View of the writer whose writes report failed commits to on_error"""
+        return ErrorHandlingWriter(self, on_error)
+
+    def flush(self) -> None:
+        """Commit all queued writes and wait until they are done"""
+        with self._condition:
+            self._flush_requests += 1
+            self._condition.notify_all()
+            while self._queued or self._in_flight:
+                self._condition.wait()
+            self._flush_requests -= 1
+
+    def close(self) -> None:
+        """Commit all queued writes and stop the background thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        if self.errors:
+            logger.error(f"{len(self.errors)} Firestore write batches failed after retries")
+
+    def _batch_ready(self) -> bool:
+        if not self._groups:
+            return False
+        if self._closed or self._flush_requests or self._queued >= self.max_batch_size:
+            return True
+        return time.monotonic() - self._oldest_queued_at >= self.flush_interval
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._batch_ready():
+                    if self._closed and not self._groups:
+                        return
+                    timeout = None
+                    if self._groups:
+                        timeout = max(self.flush_interval - (time.monotonic() - self._oldest_queued_at), 0)
+                    self._condition.wait(timeout=timeout)
+
+                operations, error_handlers = [], []
+                while self._groups and len(operations) + len(self._groups[0][0]) <= self.max_batch_size:
+                    group, on_error = self._groups.popleft()
+                    operations.extend(group)
+                    if on_error is not None and on_error not in error_handlers:
+                        error_handlers.append(on_error)
+                self._queued -= len(operations)
+                self._in_flight = len(operations)
+                self._oldest_queued_at = time.monotonic() if self._groups else None
+
+            self._commit(operations, error_handlers)
+
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
+
+    def _commit(self, operations: List[Tuple[Any, Dict[str, Any], bool]],
+                error_handlers: List[Callable[[str], None]]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                batch = self.db.batch()
+                for reference, data, merge in operations:
+                    batch.set(reference, data, merge=merge)
+                batch.commit()
+                self.committed += len(operations)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.error(f"Failed to commit {len(operations)} Firestore writes: {str(e)}")
+                    self.errors.append(str(e))
+                    for on_error in error_handlers:
+                        try:
+                            on_error(str(e))
+                        except Exception as handler_error:
+                            logger.error(f"Write error handler failed: {str(handler_error)}")
+                    return
+                logger.warning(f"Retrying Firestore write batch after error: {str(e)}")
+                time.sleep(self.retry_backoff * 2 ** attempt)
+
+
+class ErrorHandlingWriter:
+    """
+    BatchedFirestoreWriter view passing one on_error callback with every write, e.g. to
+    report a failed commit against the customer whose analysis queued the writes
+    """
+
+    def __init__(self, writer: BatchedFirestoreWriter, on_error: Callable[[str], None]):
+        self.writer = writer
+        self.on_error = on_error
+
+    def set(self, reference, data: Dict[str, Any], merge: bool = False) -> None:
+        """Queue a set of the document at reference"""
+        self.writer.set(reference, data, merge, on_error=self.on_error)
+
+    def add(self, collection_reference, data: Dict[str, Any]):
+        """Queue the creation of a document with an auto-generated id"""
+        return self.writer.add(collection_reference, data, on_error=self.on_error)
+
+    def write(self, operations: List[Tuple[Any, Dict[str, Any], bool]]) -> None:
+        """Queue (reference, data, merge) set operations to be committed together"""
+        self.writer.write(operations, on_error=self.on_error)
@@ -0,0 +1,136 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from config import Config
+from app.db.AppActivityStore import fetch_all_sessions
+
+
+class CustomerDataLoader:
+    """
+    Loads the analyzer input of customers with concurrent Firestore reads.
+
+    The transaction stream and the app sessions of a customer are read at the same
+    time, AppActivity documents of upcoming customers are fetched with one get_all
+    batch read, and prefetch() keeps the data of the next customers loading
+    while the current ones are in LLM analysis.
+    """
+
+    def __init__(self, firestore_client, max_workers: Optional[int] = None, lookahead: Optional[int] = None,
+                 batch_size: Optional[int] = None):
+        """
+        Initialize CustomerDataLoader
+
+        Args:
+            firestore_client (firestore.Client): Firestore client
+            max_workers (int, optional): Concurrent Firestore reads. Defaults to Config.FIRESTORE_READ_WORKERS.
+            lookahead (int, optional): Customers prefetched ahead of the consumer.
+                Defaults to Config.FIRESTORE_PREFETCH_CUSTOMERS.
+            batch_size (int, optional): Customers whose app sessions are read together. Defaults to lookahead.
+        """
+        self.db = firestore_client
+        self.lookahead = lookahead or Config.FIRESTORE_PREFETCH_CUSTOMERS
+        self.batch_size = batch_size or self.lookahead
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or Config.FIRESTORE_READ_WORKERS,
+                                            thread_name_prefix="firestore-read")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Stop the read pool"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def prefetch(self, customers: Iterable) -> Iterator:
+        """
+        Yield customers unchanged while their data is loaded ahead in the background
+
+        Args:
+            customers (Iterable): Customer documents, each exposing an `id` attribute
+
+        Yields:
+            Customer documents in their original order
+        """
+        customers = iter(customers)
+        upcoming = deque()
+        while True:
+            while len(upcoming) < self.lookahead:
+                batch = list(islice(customers, self.batch_size))
+                if not batch:
+                    break
+                self._submit(batch)
+                upcoming.extend(batch)
+
+            if not upcoming:
+                return
+            yield upcoming.popleft()
+
+    def load(self, customer) -> Dict[str, Any]:
+        """
+        Build the analyzer input dict for a customer document
+
+        Args:
+            customer: Customer document exposing `id` and `to_dict()`
+
+        Returns:
+            Dict: Customer data with 'customer_info', 'transactions' and 'app_activity' keys
+        """
+        client_id = str(customer.id)
+        with self._lock:
+            reads = self._pending.pop(client_id, None)
+        if reads is None:
+            reads = self._submit([customer], register=False)[client_id]
+
+        transactions, app_activity = reads
+        return {
+            "customer_info": customer.to_dict(),
+            "transactions": transactions.result(),
+            "app_activity": app_activity.result().get(client_id, [])}
+
+    def _submit(self, customers: List, register: bool = True) -> Dict[str, tuple]:
+        client_ids = [str(customer.id) for customer in customers]
+        app_activity = self._executor.submit(fetch_all_sessions, self.db, client_ids)
+        if hasattr(self.db, 'stream_many'):
+            # The local store reads the transactions of the whole batch in one query
+            transactions = self._executor.submit(self._fetch_transactions_bulk, client_ids)
+            reads = {client_id: (_ItemFuture(transactions, client_id), app_activity) for client_id in client_ids}
+        else:
+            reads = {client_id: (self._executor.submit(self._fetch_transactions, client_id), app_activity)
+                     for client_id in client_ids}
+        if register:
+            with self._lock:
+                self._pending.update(reads)
+        return reads
+
+    def _fetch_transactions(self, client_id: str) -> List[Dict]:
+        """Fetch the transactions associated with a client_id"""
+        transactions = self.db.collection('TransactionData') \
+            .document(client_id) \
+            .collection('transactions') \
+            .stream()
+        return [transaction.to_dict() for transaction in transactions]
+
+    def _fetch_transactions_bulk(self, client_ids: List[str]) -> Dict[str, List[Dict]]:
+        """Fetch the transactions of several clients with one bulk read"""
+        paths = {f"TransactionData/{client_id}/transactions": client_id for client_id in client_ids}
+        documents = self.db.stream_many(paths)
+        return {client_id: [transaction.to_dict() for transaction in documents[path]]
+                for path, client_id in paths.items()}
+
+
+class _ItemFuture:
+    """One client's entry of a future resolving to a client_id -> value dict"""
+
+    def __init__(self, future, client_id: str):
+        self._future = future
+        self._client_id = client_id
+
+    def result(self):
+        return self._future.result()[self._client_id]
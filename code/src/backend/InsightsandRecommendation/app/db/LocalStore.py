@@ -0,0 +1,300 @@
+import json
+import math
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+DESCENDING = "DESCENDING"
+ASCENDING = "ASCENDING"
+
+_OPERATORS = {"==": "=", "<": "<", "<=": "<=", ">": ">", ">=": ">=", "!=": "!="}
+
+
+def _encode(value):
+    # Datetimes and non-finite floats are tagged so they round-trip and the
+    # stored text stays valid JSON for SQLite's json functions
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return {"__float__": repr(value)}
+    return value
+
+
+def _decode(obj):
+    if len(obj) == 1 and "__datetime__" in obj:
+        return datetime.fromisoformat(obj["__datetime__"])
+    if len(obj) == 1 and "__float__" in obj:
+        return float(obj["__float__"])
+    return obj
+
+
+def _dumps(data: Dict) -> str:
+    return json.dumps(_encode(data), allow_nan=False)
+
+
+def _field_expression(field: str) -> str:
+    path = "$." + ".".join(f'"{part}"' for part in field.split("."))
+    return f"COALESCE(json_extract(data, '{path}.\"__datetime__\"'), json_extract(data, '{path}'))"
+
+
+def _merge(current: Dict, update: Dict) -> Dict:
+    merged = dict(current)
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class LocalDocumentSnapshot:
+    """Snapshot of a local document, mirroring firestore.DocumentSnapshot"""
+
+    def __init__(self, reference, data: Optional[Dict]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict]:
+        return None if self._data is None else dict(self._data)
+
+    def get(self, field: str):
+        return (self._data or {}).get(field)
+
+
+class LocalDocumentReference:
+    """Reference to a local document, mirroring firestore.DocumentReference"""
+
+    def __init__(self, store, path: str):
+        self._store = store
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name: str):
+        return LocalCollectionReference(self._store, f"{self.path}/{name}")
+
+    def get(self) -> LocalDocumentSnapshot:
+        return self._store.get_all([self])[0]
+
+    def set(self, data: Dict, merge: bool = False) -> None:
+        batch = self._store.batch()
+        batch.set(self, data, merge=merge)
+        batch.commit()
+
+    def update(self, data: Dict) -> None:
+        self.set(data, merge=True)
+
+    def delete(self) -> None:
+        batch = self._store.batch()
+        batch.delete(self)
+        batch.commit()
+
+
+class LocalQuery:
+    """Query over one local collection, mirroring firestore.Query"""
+
+    def __init__(self, store, collection_path: str, filters=(), orders=(), limit_count=None, fields=None):
+        self._store = store
+        self._collection_path = collection_path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit_count
+        self._fields = fields
+
+    def _copy(self, **changes):
+        params = {"filters": self._filters, "orders": self._orders, "limit_count": self._limit,
+                  "fields": self._fields}
+        params.update(changes)
+        return LocalQuery(self._store, self._collection_path, **params)
+
+    def where(self, field: str, op: str, value) -> "LocalQuery":
+        if op not in _OPERATORS:
+            raise ValueError(f"Unsupported query operator: {op}")
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field: str, direction: str = ASCENDING) -> "LocalQuery":
+        return self._copy(orders=self._orders + ((field, direction),))
+
+    def limit(self, count: int) -> "LocalQuery":
+        return self._copy(limit_count=count)
+
+    def select(self, fields: Iterable[str]) -> "LocalQuery":
+        return self._copy(fields=list(fields))
+
+    def stream(self):
+        sql = "SELECT path, data FROM documents WHERE parent = ?"
+        params: List[Any] = [self._collection_path]
+        for field, op, value in self._filters:
+            sql += f" AND {_field_expression(field)} {_OPERATORS[op]} ?"
+            params.append(value)
+        order_terms = [f"{_field_expression(field)} {'DESC' if direction == DESCENDING else 'ASC'}"
+                       for field, direction in self._orders]
+        sql += " ORDER BY " + ", ".join(order_terms + ["doc_id"])
+        if self._limit is not None:
+            sql += " LIMIT ?"
+            params.append(self._limit)
+
+        for path, data in self._store.execute(sql, params):
+            yield self._store.snapshot(path, data, self._fields)
+
+    def get(self) -> List[LocalDocumentSnapshot]:
+        return list(self.stream())
+
+
+class LocalCollectionReference(LocalQuery):
+    """Reference to a local collection, mirroring firestore.CollectionReference"""
+
+    def __init__(self, store, path: str):
+        super().__init__(store, path)
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id: Optional[str] = None) -> LocalDocumentReference:
+        return LocalDocumentReference(self._store, f"{self.path}/{document_id or uuid.uuid4().hex[:20]}")
+
+    def add(self, data: Dict):
+        reference = self.document()
+        reference.set(data)
+        return None, reference
+
+
+class LocalWriteBatch:
+    """Atomic group of writes, mirroring firestore.WriteBatch"""
+
+    def __init__(self, store):
+        self._store = store
+        self._operations = []
+
+    def set(self, reference, data: Dict, merge: bool = False) -> None:
+        self._operations.append(("set", reference.path, data, merge))
+
+    def update(self, reference, data: Dict) -> None:
+        self._operations.append(("set", reference.path, data, True))
+
+    def delete(self, reference) -> None:
+        self._operations.append(("delete", reference.path, None, False))
+
+    def commit(self) -> None:
+        self._store.apply(self._operations)
+        self._operations = []
+
+
+class LocalDocumentStore:
+    """
+    SQLite-backed document store exposing the subset of the Firestore client API
+    used by the pipeline, so the analytics can run offline against a local file.
+
+    Documents are keyed by path and indexed by their parent collection, so a
+    customer's subcollection is one indexed range read. Query filters and
+    ordering run inside SQLite on the JSON document bodies, and stream_many
+    reads the same subcollection of many clients in one query.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Initialize LocalDocumentStore
+
+        Args:
+            db_path (str): SQLite database file, created if missing
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                path TEXT PRIMARY KEY,
+                parent TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                data TEXT NOT NULL
+            )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_parent ON documents (parent, doc_id)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections are not shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql: str, params: Iterable = ()) -> List[tuple]:
+        return self._connection().execute(sql, list(params)).fetchall()
+
+    def snapshot(self, path: str, data: Optional[str], fields: Optional[List[str]] = None) -> LocalDocumentSnapshot:
+        document = None if data is None else json.loads(data, object_hook=_decode)
+        if document is not None and fields is not None:
+            document = {field: document[field] for field in fields if field in document}
+        return LocalDocumentSnapshot(LocalDocumentReference(self, path), document)
+
+    def collection(self, name: str) -> LocalCollectionReference:
+        return LocalCollectionReference(self, name)
+
+    def batch(self) -> LocalWriteBatch:
+        return LocalWriteBatch(self)
+
+    def get_all(self, references: Iterable) -> List[LocalDocumentSnapshot]:
+        """Read several documents in one query; missing documents have exists == False"""
+        paths = [reference.path for reference in references]
+        found = {}
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(paths), 500):
+            chunk = paths[start:start + 500]
+            found.update(self.execute(
+                f"SELECT path, data FROM documents WHERE path IN ({','.join('?' * len(chunk))})", chunk))
+        return [self.snapshot(path, found.get(path)) for path in paths]
+
+    def stream_many(self, collection_paths: Iterable[str]) -> Dict[str, List[LocalDocumentSnapshot]]:
+        """
+        Bulk read of several collections, e.g. the transactions of many clients
+
+        Args:
+            collection_paths (Iterable[str]): Paths such as 'TransactionData/{client_id}/transactions'
+
+        Returns:
+            Dict[str, List[LocalDocumentSnapshot]]: collection path -> documents ordered by id
+        """
+        paths = list(collection_paths)
+        documents = {path: [] for path in paths}
+        for start in range(0, len(paths), 500):
+            chunk = paths[start:start + 500]
+            rows = self.execute(f"SELECT parent, path, data FROM documents WHERE parent IN "
+                                f"({','.join('?' * len(chunk))}) ORDER BY parent, doc_id", chunk)
+            for parent, path, data in rows:
+                documents[parent].append(self.snapshot(path, data))
+        return documents
+
+    def apply(self, operations: List[tuple]) -> None:
+        """Apply (kind, path, data, merge) writes in one transaction"""
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for kind, path, data, merge in operations:
+                    if kind == "delete":
+                        conn.execute("DELETE FROM documents WHERE path = ?", (path,))
+                        continue
+                    if merge:
+                        row = conn.execute("SELECT data FROM documents WHERE path = ?", (path,)).fetchone()
+                        if row is not None:
+                            data = _merge(json.loads(row[0], object_hook=_decode), data)
+                    parent, doc_id = path.rsplit("/", 1)
+                    conn.execute("INSERT OR REPLACE INTO documents (path, parent, doc_id, data) VALUES (?, ?, ?, ?)",
+                                 (path, parent, doc_id, _dumps(data)))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
@@ -0,0 +1,288 @@
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from app.AdaptiveAnalyticsEngine.services.sharded_sweep import shard_for_client
+
+CLIENT_ID = 'client_id'
+CLIENT_BUCKET = 'client_bucket'
+MONTH = 'month'
+
+TRANSACTIONS_DATASET = 'transactions'
+APP_ACTIVITY_DATASET = 'app_activity'
+
+DEFAULT_NUM_BUCKETS = 64
+
+# Written beside the partitions of each dataset; Arrow skips files starting with '_' when discovering it
+METADATA_FILE = '_store.json'
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.fs
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("The pyarrow package is required for the Parquet transaction store") from e
+    return pyarrow
+
+
+def _partitioning():
+    pa = _pyarrow()
+    return pa.dataset.partitioning(pa.schema([(CLIENT_BUCKET, pa.int32()), (MONTH, pa.string())]), flavor='hive')
+
+
+def _with_partition_columns(df: pd.DataFrame, date_column: str, num_buckets: int) -> pd.DataFrame:
+    # Hash each distinct client once instead of once per row. Buckets use the sweep's shard hash,
+    # so a sweep with num_shards == num_buckets reads exactly one bucket directory per shard
+    clients = df[CLIENT_ID].astype(str)
+    codes, unique_clients = pd.factorize(clients)
+    buckets = pd.Series([shard_for_client(client_id, num_buckets) for client_id in unique_clients], dtype='int32')
+    return df.assign(**{
+        CLIENT_ID: clients,
+        CLIENT_BUCKET: buckets.to_numpy().take(codes),
+        MONTH: df[date_column].dt.strftime('%Y-%m'),
+    })
+
+
+def _read_export(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Read a CSV, JSON lines, JSON records or Parquet export in chunks"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        yield from pd.read_csv(path, chunksize=chunk_rows)
+    elif extension in ('.jsonl', '.ndjson'):
+        yield from pd.read_json(path, lines=True, chunksize=chunk_rows)
+    elif extension == '.json':
+        yield pd.read_json(path)
+    elif extension == '.parquet':
+        pa = _pyarrow()
+        for batch in pa.parquet.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported export format: {extension}")
+
+
+def _prepare_output(root: str, dataset: str, overwrite: bool) -> str:
+    output = os.path.join(root, dataset)
+    if os.path.isdir(output) and os.listdir(output):
+        if not overwrite:
+            raise ValueError(f"{output} already contains data; pass overwrite=True to replace it")
+        shutil.rmtree(output)
+    return output
+
+
+def _write_metadata(output: str, num_buckets: int) -> None:
+    os.makedirs(output, exist_ok=True)
+    with open(os.path.join(output, METADATA_FILE), 'w') as f:
+        json.dump({'num_buckets': num_buckets}, f)
+
+
+def _num_buckets(root: str, dataset: str) -> Optional[int]:
+    """Bucket count the dataset was ingested with, or None for stores written without metadata"""
+    try:
+        with open(os.path.join(root, dataset, METADATA_FILE)) as f:
+            return json.load(f)['num_buckets']
+    except FileNotFoundError:
+        return None
+
+
+def _write(df: pd.DataFrame, output: str, schema) -> None:
+    pa = _pyarrow()
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+    pa.dataset.write_dataset(table, output, format='parquet', partitioning=_partitioning(),
+                             basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                             existing_data_behavior='overwrite_or_ignore')
+
+
+def transactions_schema():
+    """Arrow schema of the ingested transactions"""
+    pa = _pyarrow()
+    return pa.schema([
+        (CLIENT_ID, pa.string()),
+        ('Merchant', pa.string()),
+        ('Merchant_Category', pa.string()),
+        ('Transaction_Amount', pa.float64()),
+        ('Transaction_Date', pa.timestamp('ms')),
+        (CLIENT_BUCKET, pa.int32()),
+        (MONTH, pa.string()),
+    ])
+
+
+def app_activity_schema():
+    """Arrow schema of the ingested app sessions, one row per session"""
+    pa = _pyarrow()
+    return pa.schema([
+        (CLIENT_ID, pa.string()),
+        ('date', pa.timestamp('ms')),
+        ('session_duration', pa.float64()),
+        ('visited', pa.list_(pa.string())),
+        (CLIENT_BUCKET, pa.int32()),
+        (MONTH, pa.string()),
+    ])
+
+
+def ingest_transactions(export_path: str, root: str, num_buckets: int = DEFAULT_NUM_BUCKETS,
+                        client_id_column: str = CLIENT_ID, chunk_rows: int = 500_000,
+                        overwrite: bool = False) -> int:
+    """
+    Load a transaction export into Parquet partitioned by client bucket and month
+
+    Args:
+        export_path (str): CSV, JSON lines, JSON records or Parquet file with one row per transaction
+        root (str): Root directory of the Parquet store
+        num_buckets (int): Number of client hash buckets
+        client_id_column (str): Column of the export holding the client id
+        chunk_rows (int): Rows read and written per chunk
+        overwrite (bool): Replace previously ingested transactions
+
+    Returns:
+        int: Number of transactions written
+    """
+    output = _prepare_output(root, TRANSACTIONS_DATASET, overwrite)
+    _write_metadata(output, num_buckets)
+    schema = transactions_schema()
+    written = 0
+    for chunk in _read_export(export_path, chunk_rows):
+        chunk = chunk.rename(columns={client_id_column: CLIENT_ID})
+        missing = [name for name in schema.names[:5] if name not in chunk.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {missing}")
+
+        # Typed once at ingestion, so readers do not re-parse amounts and dates
+        chunk = chunk.assign(
+            Transaction_Amount=pd.to_numeric(chunk['Transaction_Amount'], errors='coerce'),
+            Transaction_Date=pd.to_datetime(chunk['Transaction_Date'], errors='coerce'),
+        ).dropna(subset=[CLIENT_ID, 'Transaction_Amount', 'Transaction_Date'])
+        if chunk.empty:
+            continue
+
+        chunk = _with_partition_columns(chunk, 'Transaction_Date', num_buckets)
+        _write(chunk[schema.names], output, schema)
+        written += len(chunk)
+    return written
+
+
+def ingest_app_activity(export_path: str, root: str, num_buckets: int = DEFAULT_NUM_BUCKETS,
+                        client_id_column: str = CLIENT_ID, chunk_rows: int = 500_000,
+                        overwrite: bool = False) -> int:
+    """
+    Load an app activity export into Parquet partitioned by client bucket and month
+
+    The export has one row per client with a 'sessions' array, like the AppActivity
+    documents, or one row per session with a 'date' column.
+
+    Returns:
+        int: Number of sessions written
+    """
+    output = _prepare_output(root, APP_ACTIVITY_DATASET, overwrite)
+    _write_metadata(output, num_buckets)
+    schema = app_activity_schema()
+    written = 0
+    for chunk in _read_export(export_path, chunk_rows):
+        chunk = chunk.rename(columns={client_id_column: CLIENT_ID})
+        if 'sessions' in chunk.columns:
+            sessions = chunk[[CLIENT_ID, 'sessions']].explode('sessions').dropna(subset=['sessions'])
+            chunk = pd.concat([sessions[[CLIENT_ID]].reset_index(drop=True),
+                               pd.json_normalize(sessions['sessions'].tolist())], axis=1)
+
+        chunk = chunk.assign(
+            date=pd.to_datetime(chunk['date'], errors='coerce', format='ISO8601'),
+            session_duration=pd.to_numeric(chunk.get('session_duration'), errors='coerce'),
+            visited=chunk['visited'] if 'visited' in chunk.columns else None,
+        ).dropna(subset=[CLIENT_ID, 'date'])
+        if chunk.empty:
+            continue
+
+        chunk = _with_partition_columns(chunk, 'date', num_buckets)
+        _write(chunk[schema.names], output, schema)
+        written += len(chunk)
+    return written
+
+
+def _dataset(root: str, name: str):
+    pa = _pyarrow()
+    # Memory-mapped reads let the OS page cache serve repeated scans
+    filesystem = pa.fs.LocalFileSystem(use_mmap=True)
+    return pa.dataset.dataset(os.path.join(root, name), format='parquet', partitioning=_partitioning(),
+                              filesystem=filesystem)
+
+
+def _filter(date_column: str, client_ids: Optional[Iterable[str]], num_buckets: Optional[int],
+            start: Optional[datetime], end: Optional[datetime]):
+    pa = _pyarrow()
+    field = pa.dataset.field
+    expression = None
+
+    def combine(condition):
+        return condition if expression is None else expression & condition
+
+    if client_ids is not None:
+        client_ids = [str(client_id) for client_id in client_ids]
+        if num_buckets:
+            # Partition pruning: only the buckets of the requested clients are opened
+            expression = combine(field(CLIENT_BUCKET).isin(
+                sorted({shard_for_client(client_id, num_buckets) for client_id in client_ids})))
+        expression = combine(field(CLIENT_ID).isin(client_ids))
+    if start is not None:
+        expression = combine(field(MONTH) >= start.strftime('%Y-%m'))
+        expression = combine(field(date_column) >= pa.scalar(pd.Timestamp(start).to_pydatetime(),
+                                                             type=pa.timestamp('ms')))
+    if end is not None:
+        expression = combine(field(MONTH) <= end.strftime('%Y-%m'))
+        expression = combine(field(date_column) <= pa.scalar(pd.Timestamp(end).to_pydatetime(),
+                                                             type=pa.timestamp('ms')))
+    return expression
+
+
+def read_transactions(root: str, client_ids: Optional[Iterable[str]] = None, columns: Optional[List[str]] = None,
+                      start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Read ingested transactions with column projection and predicate pushdown
+
+    Reads of given clients only open their buckets, using the bucket count stored at ingestion.
+
+    Args:
+        root (str): Root directory of the Parquet store
+        client_ids (Iterable[str], optional): Clients to read. Defaults to all clients.
+        columns (List[str], optional): Columns to read. Defaults to all columns.
+        start (datetime, optional): Earliest Transaction_Date
+        end (datetime, optional): Latest Transaction_Date
+
+    Returns:
+        pd.DataFrame: Typed transactions with a client_id column
+    """
+    table = _dataset(root, TRANSACTIONS_DATASET).to_table(
+        columns=columns, filter=_filter('Transaction_Date', client_ids, _num_buckets(root, TRANSACTIONS_DATASET),
+                                        start, end))
+    return table.to_pandas()
+
+
+def read_app_activity(root: str, client_ids: Optional[Iterable[str]] = None, columns: Optional[List[str]] = None,
+                      start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
+    """Read ingested app sessions with column projection and predicate pushdown, see read_transactions"""
+    table = _dataset(root, APP_ACTIVITY_DATASET).to_table(
+        columns=columns, filter=_filter('date', client_ids, _num_buckets(root, APP_ACTIVITY_DATASET), start, end))
+    return table.to_pandas()
+
+
+def iter_transaction_buckets(root: str, columns: Optional[List[str]] = None) -> Iterator[Tuple[int, pd.DataFrame]]:
+    """
+    Read the transactions one client bucket at a time, for full-book recomputes
+    whose memory use is bounded by the largest bucket
+
+    Yields:
+        Tuple[int, pd.DataFrame]: Bucket number and the transactions of its clients
+    """
+    pa = _pyarrow()
+    dataset = _dataset(root, TRANSACTIONS_DATASET)
+    buckets = sorted({int(name.split('=', 1)[1]) for name in os.listdir(os.path.join(root, TRANSACTIONS_DATASET))
+                      if name.startswith(f"{CLIENT_BUCKET}=")})
+    for bucket in buckets:
+        table = dataset.to_table(columns=columns, filter=pa.dataset.field(CLIENT_BUCKET) == bucket)
+        yield bucket, table.to_pandas()
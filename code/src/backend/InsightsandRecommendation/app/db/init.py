@@ -5,6 +5,13 @@ from firebase_admin import credentials, firestore
 FIREBASE_CREDENTIALS = Config.FIREBASE_SERVICE_ACCOUNT_FILE
 
 def init_db():
+    if Config.STORAGE_BACKEND == "local":
+        # Offline runs, backfills and load tests against a local SQLite document store
+        from app.db.LocalStore import LocalDocumentStore
+        return LocalDocumentStore(Config.LOCAL_STORE_PATH)
+    if Config.STORAGE_BACKEND != "firestore":
+        raise ValueError(f"Unsupported storage backend: {Config.STORAGE_BACKEND}")
+
     cred = credentials.Certificate(FIREBASE_CREDENTIALS)
     firebase_admin.initialize_app(cred)
 
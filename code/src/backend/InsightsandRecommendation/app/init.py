@@ -17,10 +17,14 @@ def create_app():
     from app.APIs.RunAdaptiveAnalytics import run_adaptive_analytics_bp
     from app.APIs.GenerateInitialInsights import initial_insight_generation_bp
     from app.APIs.GetSocialMediaInsights import social_media_insights_bp
+    from app.APIs.GetJobStatus import job_status_bp
+    from app.APIs.IngestEvents import ingest_events_bp
     app.secret_key = os.urandom(24)  # Use a strong secret key in production
     app.permanent_session_lifetime = timedelta(days=5)  # Set session lifetime
     app.config.from_object(Config)
     app.register_blueprint(run_adaptive_analytics_bp)
     app.register_blueprint(initial_insight_generation_bp)
     app.register_blueprint(social_media_insights_bp)
+    app.register_blueprint(job_status_bp)
+    app.register_blueprint(ingest_events_bp)
     return app
@@ -0,0 +1,307 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from config import Config
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+INPUT_FILE = "input.jsonl"
+OUTPUT_FILE = "output.jsonl"
+
+# Request label carrying the hashed key, for batch services that echo the request but not extra fields
+KEY_LABEL = "batch_key"
+
+GENERATION_CONFIG = {"temperature": 1}
+
+
+def _key_label(key: str) -> str:
+    # Label values are limited to lowercase letters, digits, '-' and '_'
+    return hashlib.md5(str(key).encode("utf-8")).hexdigest()
+
+
+def batch_request_line(key: str, prompt: str, system_instruction: str = " ", json_response: bool = False,
+                       generation_config: Optional[Dict] = None) -> Dict:
+    """
+    Build one line of a batch prediction job file
+
+    The request follows the Gemini GenerateContentRequest JSON format with the same
+    default generation config as generate_content.
+
+    Args:
+        key (str): Identifier the result is returned under, e.g. the client id
+        prompt (str): The input prompt
+        system_instruction (str): System instructions for the model
+        json_response (bool): Whether to expect JSON response
+        generation_config (dict, optional): Additional configuration for generation
+
+    Returns:
+        dict: The job file line
+    """
+    config = GENERATION_CONFIG | (generation_config or {})
+    if json_response:
+        config["response_mime_type"] = "application/json"
+
+    request = {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generation_config": config,
+        "labels": {KEY_LABEL: _key_label(key)},
+    }
+    if system_instruction and system_instruction.strip():
+        request["system_instruction"] = {"parts": [{"text": system_instruction}]}
+    return {"key": str(key), "request": request}
+
+
+def write_job_file(path: str, lines: Iterable[Dict]) -> List[str]:
+    """
+    Write job file lines as JSONL
+
+    Returns:
+        List[str]: Keys of the written requests, in file order
+    """
+    keys = []
+    with open(path, "w", encoding="utf-8") as job_file:
+        for line in lines:
+            job_file.write(json.dumps(line, separators=(",", ":"), default=str) + "\n")
+            keys.append(line["key"])
+    return keys
+
+
+def _response_text(result: Dict) -> Optional[str]:
+    if result.get("status"):
+        return None
+    candidates = (result.get("response") or {}).get("candidates") or []
+    if not candidates:
+        return None
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    text = "".join(part.get("text", "") for part in parts)
+    return text or None
+
+
+def read_results(path: str, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+    """
+    Read a batch prediction output file
+
+    Args:
+        path (str): JSONL output with one {key, request, response, status} result per line
+        keys (Iterable[str]): Keys of the submitted requests
+
+    Returns:
+        Dict[str, Optional[str]]: Response text per key, None for failed or missing results
+    """
+    keys_by_label = {_key_label(key): key for key in keys}
+    results = {key: None for key in keys_by_label.values()}
+    if not os.path.exists(path):
+        return results
+
+    with open(path, encoding="utf-8") as output_file:
+        for number, raw_line in enumerate(output_file, start=1):
+            if not raw_line.strip():
+                continue
+            try:
+                result = json.loads(raw_line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed line {number} of batch output {path}")
+                continue
+            key = result.get("key")
+            if key is None:
+                label = ((result.get("request") or {}).get("labels") or {}).get(KEY_LABEL)
+                key = keys_by_label.get(label)
+            if key in results:
+                results[key] = _response_text(result)
+                if results[key] is None:
+                    logger.warning(f"Batch request {key} failed: {result.get('status') or 'empty response'}")
+    return results
+
+
+def _predict_interactively(request: Dict) -> Optional[str]:
+    # Imported here: the batch module must not require a configured Gemini client
+    from app.utils.GenerateContentService import generate_content
+    from app.utils.RateLimiter import PRIORITY_BATCH
+
+    prompt = "".join(part.get("text", "") for part in request["contents"][0]["parts"])
+    system_instruction = "".join(part.get("text", "")
+                                 for part in (request.get("system_instruction") or {}).get("parts", [])) or " "
+    return generate_content(prompt, system_instruction, generation_config=request.get("generation_config"),
+                            priority=PRIORITY_BATCH)
+
+
+class LocalBatchPredictionBackend:
+    """
+    Runs a job file in-process, one request after another, writing the output
+    file in the batch prediction format. For development and tests.
+    """
+
+    def __init__(self, predict: Optional[Callable[[Dict], Optional[str]]] = None):
+        """
+        Initialize LocalBatchPredictionBackend
+
+        Args:
+            predict (Callable, optional): Returns the response text for a request dict.
+                Defaults to interactive generate_content calls.
+        """
+        self.predict = predict or _predict_interactively
+
+    def run(self, input_path: str, output_path: str) -> None:
+        """Predict every request of input_path and write the results to output_path"""
+        with open(input_path, encoding="utf-8") as input_file, \
+                open(output_path, "w", encoding="utf-8") as output_file:
+            for raw_line in input_file:
+                if not raw_line.strip():
+                    continue
+                line = json.loads(raw_line)
+                result = {"key": line["key"], "request": line["request"], "status": ""}
+                try:
+                    text = self.predict(line["request"])
+                    if text is None:
+                        result["status"] = "No response"
+                    else:
+                        result["response"] = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+                except Exception as e:
+                    result["status"] = str(e)
+                output_file.write(json.dumps(result, separators=(",", ":"), default=str) + "\n")
+
+
+def _vertex():
+    try:
+        import vertexai
+        from google.cloud import storage
+        from vertexai import batch_prediction
+    except ImportError as e:
+        raise ImportError("The google-cloud-aiplatform package is required for the vertex batch "
+                          "prediction backend") from e
+    return vertexai, storage, batch_prediction
+
+
+class VertexBatchPredictionBackend:
+    """Submits job files to Vertex AI batch prediction through a Cloud Storage staging prefix"""
+
+    def __init__(self, gcs_uri: str, model_name: str, project: Optional[str] = None,
+                 location: str = "us-central1", poll_seconds: float = 60, keep_files: bool = False):
+        """
+        Initialize VertexBatchPredictionBackend
+
+        Args:
+            gcs_uri (str): gs:// prefix the job input and output are staged under
+            model_name (str): Vertex AI Gemini model, e.g. gemini-1.5-pro-002
+            project (str, optional): Google Cloud project. Defaults to the environment's project.
+            location (str): Vertex AI region
+            poll_seconds (float): Interval between job state checks
+            keep_files (bool): Keep the staged input and output objects instead of deleting them
+        """
+        if not gcs_uri or not gcs_uri.startswith("gs://"):
+            raise ValueError("The vertex batch prediction backend requires a gs:// staging URI")
+        self.gcs_uri = gcs_uri.rstrip("/")
+        self.model_name = model_name
+        self.project = project
+        self.location = location
+        self.poll_seconds = poll_seconds
+        self.keep_files = keep_files
+
+    def run(self, input_path: str, output_path: str) -> None:
+        """Upload input_path, run the batch prediction job and download its results to output_path"""
+        vertexai, storage, batch_prediction = _vertex()
+        vertexai.init(project=self.project, location=self.location)
+        client = storage.Client(project=self.project)
+
+        job_prefix = f"{self.gcs_uri}/{os.path.basename(os.path.dirname(os.path.abspath(input_path)))}"
+        input_uri = f"{job_prefix}/{INPUT_FILE}"
+        storage.Blob.from_string(input_uri, client=client).upload_from_filename(input_path)
+
+        try:
+            job = batch_prediction.BatchPredictionJob.submit(source_model=self.model_name, input_dataset=input_uri,
+                                                             output_uri_prefix=f"{job_prefix}/output")
+            logger.info(f"Submitted batch prediction job {job.resource_name} for {input_uri}")
+            while not job.has_ended:
+                time.sleep(self.poll_seconds)
+                job.refresh()
+            if not job.has_succeeded:
+                raise RuntimeError(f"Batch prediction job {job.resource_name} failed: {job.error}")
+
+            # The output location is a directory of one or more predictions JSONL files
+            bucket_name, _, prefix = job.output_location[len("gs://"):].partition("/")
+            with open(output_path, "w", encoding="utf-8") as output_file:
+                for blob in client.list_blobs(bucket_name, prefix=prefix):
+                    if blob.name.endswith(".jsonl"):
+                        text = blob.download_as_text()
+                        output_file.write(text if text.endswith("\n") else text + "\n")
+        finally:
+            if not self.keep_files:
+                self._delete_staged(client, job_prefix)
+
+    @staticmethod
+    def _delete_staged(client, job_prefix: str) -> None:
+        """Delete the staged input and output objects of a job"""
+        bucket_name, _, prefix = job_prefix[len("gs://"):].partition("/")
+        try:
+            for blob in client.list_blobs(bucket_name, prefix=f"{prefix}/"):
+                blob.delete()
+        except Exception as e:
+            logger.error(f"Failed to delete staged batch files under {job_prefix}: {str(e)}")
+
+
+def require_batch_backend() -> None:
+    """Raise if bulk sweeps are requested without an explicitly configured batch backend"""
+    if not Config.LLM_BATCH_BACKEND:
+        raise ValueError("Bulk sweeps require LLM_BATCH_BACKEND: 'vertex' for batch prediction, "
+                         "or 'local' to run the job file with interactive calls")
+
+
+def create_batch_backend(backend_name: Optional[str] = None):
+    """Create the batch prediction backend selected by Config.LLM_BATCH_BACKEND"""
+    if backend_name is None:
+        require_batch_backend()
+        backend_name = Config.LLM_BATCH_BACKEND
+    if backend_name == "local":
+        return LocalBatchPredictionBackend()
+    if backend_name == "vertex":
+        return VertexBatchPredictionBackend(Config.LLM_BATCH_GCS_URI, Config.LLM_BATCH_MODEL,
+                                            Config.LLM_BATCH_PROJECT, Config.LLM_BATCH_LOCATION,
+                                            Config.LLM_BATCH_POLL_SECONDS, Config.LLM_BATCH_KEEP_FILES)
+    raise ValueError(f"Unsupported batch prediction backend: {backend_name}")
+
+
+def run_batch_job(lines: Iterable[Dict], backend=None, work_dir: Optional[str] = None,
+                  keep_files: Optional[bool] = None) -> Dict[str, Optional[str]]:
+    """
+    Write the requests to a job file, run it on the batch backend and read the results
+
+    Args:
+        lines (Iterable[Dict]): Job file lines built with batch_request_line
+        backend (optional): Batch prediction backend. Defaults to create_batch_backend().
+        work_dir (str, optional): Directory the job files are written to. Defaults to Config.LLM_BATCH_DIR.
+        keep_files (bool, optional): Keep the job files after the results are read.
+            Defaults to Config.LLM_BATCH_KEEP_FILES.
+
+    Returns:
+        Dict[str, Optional[str]]: Response text per request key, None for failed requests
+    """
+    backend = backend or create_batch_backend()
+    keep_files = Config.LLM_BATCH_KEEP_FILES if keep_files is None else keep_files
+    job_dir = os.path.join(work_dir or Config.LLM_BATCH_DIR,
+                           f"job-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(job_dir)
+    input_path = os.path.join(job_dir, INPUT_FILE)
+    output_path = os.path.join(job_dir, OUTPUT_FILE)
+
+    try:
+        keys = write_job_file(input_path, lines)
+        if not keys:
+            return {}
+        logger.info(f"Running batch prediction job {job_dir} with {len(keys)} requests")
+        backend.run(input_path, output_path)
+        results = read_results(output_path, keys)
+        logger.info(f"Batch prediction job {job_dir} returned {sum(text is not None for text in results.values())} "
+                    f"of {len(keys)} responses")
+        return results
+    finally:
+        # The job files hold the customers' full prompts
+        if not keep_files:
+            shutil.rmtree(job_dir, ignore_errors=True)
@@ -0,0 +1,96 @@
+import json
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import google.generativeai as genai
+from config import Config
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+SAFETY_SETTINGS = [
+    {
+        "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
+        "threshold": "BLOCK_NONE"
+    },
+]
+
+
+class GeminiModelRegistry:
+    """
+    Builds each (model, system_instruction, generation_config) combination once
+    and shares the configured GenerativeModel between calls and threads.
+    GenerativeModel holds no per-request state, so one instance can serve
+    concurrent generate_content calls.
+    """
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key
+        self._models = {}
+        self._configured = False
+        self._lock = threading.Lock()
+
+    def _configure(self) -> None:
+        api_key = self.api_key or Config.GEMINI_API_KEY
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY is not set")
+        genai.configure(api_key=api_key)
+        self._configured = True
+
+    @staticmethod
+    def _model_key(model_name: str, system_instruction: str, generation_config: Dict,
+                   safety_settings: List[Dict]) -> tuple:
+        return (
+            model_name,
+            system_instruction,
+            json.dumps(generation_config, sort_keys=True, default=str),
+            json.dumps(safety_settings, sort_keys=True, default=str),
+        )
+
+    def get_model(self, model_name: str, system_instruction: str = " ", generation_config: Optional[Dict] = None,
+                  safety_settings: Optional[List[Dict]] = None) -> genai.GenerativeModel:
+        """
+        Return the shared model for a configuration, building it on first use
+
+        Args:
+            model_name (str): Gemini model name, e.g. 'models/gemini-1.5-pro-latest'
+            system_instruction (str): System instructions for the model
+            generation_config (dict, optional): Generation configuration
+            safety_settings (list, optional): Safety settings. Defaults to SAFETY_SETTINGS.
+
+        Returns:
+            genai.GenerativeModel: Configured model
+        """
+        generation_config = generation_config or {}
+        safety_settings = safety_settings if safety_settings is not None else SAFETY_SETTINGS
+        key = self._model_key(model_name, system_instruction, generation_config, safety_settings)
+
+        # Lock-free fast path once the model exists
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                if not self._configured:
+                    self._configure()
+                model = genai.GenerativeModel(
+                    model_name,
+                    system_instruction=system_instruction,
+                    generation_config=generation_config,
+                    safety_settings=safety_settings,
+                )
+                self._models[key] = model
+                logger.info(f"Initialized Gemini model {model_name} ({len(self._models)} cached configurations)")
+        return model
+
+    def clear(self) -> None:
+        """Drop cached models, e.g. after rotating the API key"""
+        with self._lock:
+            self._models.clear()
+            self._configured = False
+
+
+model_registry = GeminiModelRegistry()
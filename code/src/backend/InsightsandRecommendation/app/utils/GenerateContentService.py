@@ -1,11 +1,17 @@
 import json
 import time
 import logging
+import threading
 from config import Config
 from dotenv import load_dotenv
-import google.generativeai as genai
 from google.api_core.exceptions import DeadlineExceeded, ResourceExhausted
 from app.utils import GeminiResponseEditor
+from app.utils.ResponseCache import get_response_cache
+from app.utils.GeminiModelRegistry import model_registry
+from app.utils.ModelRouting import get_route, response_confidence, route_models, task_usage
+from app.utils.PromptCompactor import estimate_tokens
+from app.utils.RateLimiter import get_rate_limiter
+from app.utils.StreamingJsonValidator import SchemaViolation, StreamingJsonValidator
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -17,7 +23,57 @@ except Exception as e:
     logger.error(f"Failed to load environment variables: {str(e)}")
     raise
 
-def generate_content(prompt, system_instruction=" ", json_response=False, generation_config=None):
+# Global cap on in-flight Gemini requests, shared by every thread in the process
+llm_call_semaphore = threading.BoundedSemaphore(Config.MAX_INFLIGHT_LLM_CALLS)
+
+# Response size assumed by the rate limiter when the config sets no max_output_tokens
+DEFAULT_RESPONSE_TOKENS = 2048
+
+def _generate_validated(model, prompt, response_schema):
+    """
+    Stream the response, validating it against the schema as chunks arrive
+
+    Raises:
+        SchemaViolation: With the text received before the abort as its received_text attribute
+    """
+    validator = StreamingJsonValidator(response_schema)
+    received = []
+    try:
+        # Raising out of the loop stops consuming the stream at the first off-schema token
+        for chunk in model.generate_content(prompt, stream=True):
+            received.append(chunk.text)
+            validator.feed(chunk.text)
+        return validator.close()
+    except SchemaViolation as e:
+        e.received_text = "".join(received)
+        raise
+
+
+def _token_counts(response):
+    """Prompt and response token counts reported by the API for a response, if any"""
+    usage = getattr(response, "usage_metadata", None)
+    counts = (getattr(usage, "prompt_token_count", None), getattr(usage, "candidates_token_count", None))
+    return counts if all(isinstance(count, int) for count in counts) else None
+
+
+def _accepts(text, route, json_response):
+    """Whether a cascade keeps a response instead of escalating it"""
+    if text is None:
+        return False
+    if not json_response:
+        return True
+    try:
+        result = json.loads(text)
+    except json.JSONDecodeError:
+        return False
+    if "confidence_field" in route:
+        confidence = response_confidence(result, route["confidence_field"])
+        return confidence is not None and confidence >= route.get("min_confidence", 0)
+    return isinstance(result, dict)
+
+
+def generate_content(prompt, system_instruction=" ", json_response=False, generation_config=None, use_cache=True,
+                     response_schema=None, priority=None, task=None):
     """
     Generate content using the Gemini API with retry logic and error handling.
     
@@ -26,6 +82,14 @@ def generate_content(prompt, system_instruction=" ", json_response=False, genera
         system_instruction (str): System instructions for the model
         json_response (bool): Whether to expect JSON response
         generation_config (dict): Additional configuration for generation
+        use_cache (bool): Whether to serve and store the response in the LLM response cache
+        response_schema (dict, optional): Schema of the expected JSON response. The response is
+            streamed and validated incrementally; an off-schema response is aborted and retried.
+        priority (int, optional): Rate limiter priority class, see app.utils.RateLimiter.
+            Defaults to the priority of the calling thread.
+        task (str, optional): Task type selecting the model route, see app.utils.ModelRouting.
+            Routes that escalate try a fast model first and regenerate with the next model
+            when its response is off-schema, unparseable or below the route's confidence.
         
     Returns:
         str: Generated content or None if all attempts fail
@@ -36,18 +100,12 @@ def generate_content(prompt, system_instruction=" ", json_response=False, genera
             
         if generation_config is None:
             generation_config = {}
-            
-        try:
-            GEMINI_API_KEY = Config.GEMINI_API_KEY
-            if not GEMINI_API_KEY:
-                raise ValueError("GEMINI_API_KEY is not set")
-            genai.configure(api_key=GEMINI_API_KEY)
-        except Exception as e:
-            logger.error(f"Failed to configure Gemini API: {str(e)}")
-            raise
 
+        route = get_route(task)
+        models = route_models(route)
+            
         GENERATION_CONFIG = {
-            "temperature": 1,
+            "temperature": route["temperature"],
             #"top_p": 0.95,
             #"top_k": 0,
         }
@@ -55,69 +113,139 @@ def generate_content(prompt, system_instruction=" ", json_response=False, genera
             GENERATION_CONFIG["response_mime_type"] = "application/json"
 
         combined_generation_config = GENERATION_CONFIG | generation_config
-        SAFETY_SETTINGS = [
-            {
-                "category": "HARM_CATEGORY_DANGEROUS_CONTENT",
-                "threshold": "BLOCK_NONE"
-            },
-        ]
 
-        try:
-            model = genai.GenerativeModel(
-                "models/gemini-1.5-pro-latest",
-                system_instruction=system_instruction,
-                generation_config=combined_generation_config,
-                safety_settings=SAFETY_SETTINGS,
-            )
-        except Exception as e:
-            logger.error(f"Failed to initialize Gemini model: {str(e)}")
-            raise
+        # Serve identical requests from the response cache
+        cache = get_response_cache() if use_cache else None
+        cache_key = None
+        if cache is not None:
+            key_config = combined_generation_config if response_schema is None \
+                else combined_generation_config | {"response_schema": response_schema}
+            cache_key = cache.make_key(" > ".join(models), prompt, system_instruction, key_config)
+            cached_response = cache.get(cache_key)
+            if cached_response is not None:
+                return cached_response
 
-        max_attempts = 3
-        last_error = None
-        
-        for attempt in range(max_attempts):
-            try:
-                response = model.generate_content(prompt)
-                if not response or not response.text:
-                    raise ValueError("Empty response from Gemini API")
-                    
-                formatted_text = GeminiResponseEditor.remove_special_chars(response.text)
-                return formatted_text
-                
-            except DeadlineExceeded as e:
-                last_error = e
-                logger.warning(f"Deadline exceeded (attempt {attempt + 1}/{max_attempts}). Retrying in 1 second...")
-                time.sleep(1)
-                
-            except json.JSONDecodeError as e:
-                last_error = e
-                logger.warning(f"JSON decode error (attempt {attempt + 1}/{max_attempts}). Retrying in 1 second...")
-                time.sleep(1)
-                
-            except ResourceExhausted as e:
-                last_error = e
-                logger.warning(f"Resource exhausted (attempt {attempt + 1}/{max_attempts}). Retrying in 10 seconds...")
-                time.sleep(10)
-                
-            except ValueError as e:
-                last_error = e
-                if response is not None:
-                    logger.warning(f"Value error details: {response.prompt_feedback}")
-                    logger.warning(f"Finish reason: {response.candidates[0].finish_reason}")
-                    logger.warning(f"Safety ratings: {response.candidates[0].safety_ratings}")
-                time.sleep(1)
-                
-            except Exception as e:
-                last_error = e
-                logger.error(f"Unexpected error during content generation: {str(e)}")
-                time.sleep(1)
-
-        # If all retries fail
-        error_msg = f"Failed to generate content after {max_attempts} attempts. Last error: {str(last_error)}"
-        logger.error(error_msg)
+        for position, model_name in enumerate(models):
+            escalates = position + 1 < len(models)
+            started = time.monotonic()
+            text, prompt_tokens, response_tokens = _generate_with_model(
+                model_name, prompt, system_instruction, combined_generation_config, response_schema, priority,
+                abort_on_violation=escalates)
+            accepted = _accepts(text, route, json_response) if escalates else text is not None
+            task_usage.record(task or "default", model_name, time.monotonic() - started, prompt_tokens,
+                              response_tokens, succeeded=text is not None, escalated=escalates and not accepted)
+            if accepted:
+                if cache is not None:
+                    cache.set(cache_key, text)
+                return text
+            if escalates:
+                logger.info(f"Escalating {task} from {model_name} to {models[position + 1]}")
         return None
 
     except Exception as e:
         logger.error(f"Critical error in generate_content: {str(e)}")
         raise
+
+
+def _generate_with_model(model_name, prompt, system_instruction, generation_config, response_schema, priority,
+                         abort_on_violation=False):
+    """
+    Call one model with retries
+
+    Returns:
+        tuple: Response text or None if all attempts fail, prompt tokens and response tokens
+    """
+    try:
+        # Configured models are built once per configuration and shared across threads
+        model = model_registry.get_model(model_name, system_instruction, generation_config)
+    except Exception as e:
+        logger.error(f"Failed to initialize Gemini model: {str(e)}")
+        raise
+
+    # Every attempt takes its requests and tokens from the shared per-minute quota
+    limiter = get_rate_limiter()
+    prompt_tokens = estimate_tokens(str(prompt)) + estimate_tokens(str(system_instruction or ""))
+    estimated_tokens = prompt_tokens + int(generation_config.get("max_output_tokens", DEFAULT_RESPONSE_TOKENS))
+    sent_tokens, received_tokens = 0, 0
+
+    max_attempts = Config.LLM_MAX_ATTEMPTS
+    last_error = None
+    
+    for attempt in range(max_attempts):
+        response = None
+        limiter.acquire(estimated_tokens, priority)
+        sent_tokens += prompt_tokens
+        try:
+            if response_schema is not None:
+                with llm_call_semaphore:
+                    validated_text = _generate_validated(model, prompt, response_schema)
+                response_tokens = estimate_tokens(validated_text)
+                # Streamed responses carry no usage metadata; settle the estimate with the text received
+                limiter.on_success(estimated_tokens, prompt_tokens + response_tokens)
+                received_tokens += response_tokens
+                return validated_text, sent_tokens, received_tokens
+
+            with llm_call_semaphore:
+                response = model.generate_content(prompt)
+            counts = _token_counts(response)
+            limiter.on_success(estimated_tokens, sum(counts) if counts else None)
+            if counts:
+                sent_tokens += counts[0] - prompt_tokens
+                received_tokens += counts[1]
+            if not response or not response.text:
+                raise ValueError("Empty response from Gemini API")
+            if not counts:
+                received_tokens += estimate_tokens(response.text)
+                
+            formatted_text = GeminiResponseEditor.remove_special_chars(response.text)
+            return formatted_text, sent_tokens, received_tokens
+            
+        except DeadlineExceeded as e:
+            last_error = e
+            logger.warning(f"Deadline exceeded (attempt {attempt + 1}/{max_attempts}). Retrying in 1 second...")
+            time.sleep(1)
+            
+        except json.JSONDecodeError as e:
+            last_error = e
+            logger.warning(f"JSON decode error (attempt {attempt + 1}/{max_attempts}). Retrying in 1 second...")
+            time.sleep(1)
+            
+        except SchemaViolation as e:
+            last_error = e
+            # The aborted stream only consumed the tokens received before the abort
+            response_tokens = estimate_tokens(getattr(e, "received_text", ""))
+            limiter.on_success(estimated_tokens, prompt_tokens + response_tokens)
+            received_tokens += response_tokens
+            logger.warning(f"Off-schema response aborted (attempt {attempt + 1}/{max_attempts}): {str(e)}")
+            if abort_on_violation:
+                # The cascade escalates to the next model instead of resampling this one
+                break
+            # Retried right away: the next sample is independent of the aborted one
+
+        except ResourceExhausted as e:
+            last_error = e
+            limiter.on_rate_limited()
+            if attempt + 1 < max_attempts:
+                delay = limiter.backoff(attempt)
+                logger.warning(f"Resource exhausted (attempt {attempt + 1}/{max_attempts}). "
+                               f"Retrying in {delay:.1f} seconds...")
+                time.sleep(delay)
+            
+        except ValueError as e:
+            last_error = e
+            if response is not None:
+                logger.warning(f"Value error details: {response.prompt_feedback}")
+                logger.warning(f"Finish reason: {response.candidates[0].finish_reason}")
+                logger.warning(f"Safety ratings: {response.candidates[0].safety_ratings}")
+            time.sleep(1)
+            
+        except Exception as e:
+            last_error = e
+            logger.error(f"Unexpected error during content generation: {str(e)}")
+            time.sleep(1)
+
+    # If all retries fail
+    error_msg = f"Failed to generate content with {model_name} after {attempt + 1} attempts. " \
+                f"Last error: {str(last_error)}"
+    logger.error(error_msg)
+    return None, sent_tokens, received_tokens
@@ -0,0 +1,173 @@
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+PRO_MODEL = "models/gemini-1.5-pro-latest"
+FLASH_MODEL = "models/gemini-1.5-flash-latest"
+
+DEFAULT_TASK = "default"
+
+# Task type -> route. The task's model is tried first; if the route escalates, a
+# response that fails validation or reports a confidence (at the dotted
+# confidence_field) below min_confidence is regenerated with escalate_to.
+# Overridden per task by the LLM_MODEL_ROUTES JSON setting.
+DEFAULT_MODEL_ROUTES = {
+    DEFAULT_TASK: {"model": PRO_MODEL, "temperature": 1},
+    "life_stage": {"model": FLASH_MODEL, "temperature": 0.2, "escalate_to": PRO_MODEL,
+                   "confidence_field": "confidence_level.primary_stage", "min_confidence": 60},
+    "life_events": {"model": FLASH_MODEL, "temperature": 0.4, "escalate_to": PRO_MODEL},
+    "retention_risk": {"model": FLASH_MODEL, "temperature": 0.2, "escalate_to": PRO_MODEL},
+    "repeating_patterns": {"model": FLASH_MODEL, "temperature": 0.4, "escalate_to": PRO_MODEL},
+    "spending_analysis": {"model": PRO_MODEL, "temperature": 1},
+    "combined_insights": {"model": PRO_MODEL, "temperature": 1},
+    "profile_change": {"model": PRO_MODEL, "temperature": 1},
+}
+
+# USD per million prompt / response tokens, for the cost estimates of the usage report
+MODEL_PRICES = {
+    PRO_MODEL: {"prompt": 1.25, "response": 5.00},
+    FLASH_MODEL: {"prompt": 0.075, "response": 0.30},
+}
+
+
+# Fields a route may set, with their JSON types
+ROUTE_FIELDS = {
+    "model": str,
+    "temperature": (int, float),
+    "escalate_to": str,
+    "confidence_field": str,
+    "min_confidence": (int, float),
+}
+
+
+def build_model_routes(overrides: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    The routing table: DEFAULT_MODEL_ROUTES with per task overrides
+
+    Args:
+        overrides (str, optional): JSON object of task type -> route fields, as in Config.LLM_MODEL_ROUTES
+
+    Returns:
+        Dict[str, Dict]: Task type -> route
+
+    Raises:
+        ValueError: If the overrides are not a JSON object of routes with known, correctly typed fields
+    """
+    routes = {task: dict(route) for task, route in DEFAULT_MODEL_ROUTES.items()}
+    try:
+        parsed = json.loads(overrides) if overrides else {}
+    except json.JSONDecodeError as e:
+        raise ValueError(f"LLM_MODEL_ROUTES is not valid JSON: {str(e)}") from e
+    if not isinstance(parsed, dict):
+        raise ValueError("LLM_MODEL_ROUTES must be a JSON object of task type -> route")
+
+    for task, route in parsed.items():
+        if not isinstance(route, dict):
+            raise ValueError(f"LLM_MODEL_ROUTES route of {task} must be a JSON object")
+        for field, value in route.items():
+            expected = ROUTE_FIELDS.get(field)
+            if expected is None:
+                raise ValueError(f"Unknown field {field} in the LLM_MODEL_ROUTES route of {task}")
+            if isinstance(value, bool) or not isinstance(value, expected):
+                raise ValueError(f"Invalid {field} {value!r} in the LLM_MODEL_ROUTES route of {task}")
+        routes[task] = {**routes.get(task, {}), **route}
+    return routes
+
+
+# Parsed and validated once at import, so a bad LLM_MODEL_ROUTES fails at start up
+# instead of on every LLM call
+MODEL_ROUTES = build_model_routes(Config.LLM_MODEL_ROUTES)
+
+
+def model_routes() -> Dict[str, Dict]:
+    """The routing table: DEFAULT_MODEL_ROUTES with the per task overrides of Config.LLM_MODEL_ROUTES"""
+    return MODEL_ROUTES
+
+
+def get_route(task: Optional[str] = None) -> Dict[str, Any]:
+    """Route of a task type, falling back to the default route for unknown tasks"""
+    return {**MODEL_ROUTES[DEFAULT_TASK], **MODEL_ROUTES.get(task or DEFAULT_TASK, {})}
+
+
+def route_models(route: Dict) -> List[str]:
+    """Models a route tries, in order"""
+    escalate_to = route.get("escalate_to")
+    return [route["model"]] + ([escalate_to] if escalate_to and escalate_to != route["model"] else [])
+
+
+def response_confidence(result: Any, field: str) -> Optional[float]:
+    """Numeric value at a dotted path of a parsed response, or None if absent"""
+    for part in field.split("."):
+        if not isinstance(result, dict):
+            return None
+        result = result.get(part)
+    try:
+        return float(result)
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_cost(model_name: str, prompt_tokens: int, response_tokens: int) -> float:
+    """Estimated USD cost of a call, 0 for models without a price"""
+    prices = MODEL_PRICES.get(model_name)
+    if prices is None:
+        return 0.0
+    return (prompt_tokens * prices["prompt"] + response_tokens * prices["response"]) / 1_000_000
+
+
+class TaskUsageTracker:
+    """Per task and model call counts, latency, tokens and estimated cost, for tuning the routing table"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usage = {}
+
+    def record(self, task: str, model_name: str, latency: float, prompt_tokens: int, response_tokens: int,
+               succeeded: bool, escalated: bool = False) -> None:
+        """
+        Record one model's part of a generate_content call
+
+        Args:
+            task (str): Task type of the call
+            model_name (str): Model that was called
+            latency (float): Seconds spent on the model, retries included
+            prompt_tokens (int): Prompt tokens sent
+            response_tokens (int): Response tokens received
+            succeeded (bool): Whether the model returned a response
+            escalated (bool): Whether the response was rejected and escalated to the next model
+        """
+        with self._lock:
+            usage = self._usage.setdefault((task, model_name), {
+                "calls": 0, "failures": 0, "escalations": 0, "latency_seconds": 0.0,
+                "prompt_tokens": 0, "response_tokens": 0, "cost_usd": 0.0})
+            usage["calls"] += 1
+            usage["failures"] += 0 if succeeded else 1
+            usage["escalations"] += 1 if escalated else 0
+            usage["latency_seconds"] += latency
+            usage["prompt_tokens"] += prompt_tokens
+            usage["response_tokens"] += response_tokens
+            usage["cost_usd"] += estimate_cost(model_name, prompt_tokens, response_tokens)
+
+    def summary(self) -> Dict[str, Dict[str, Dict]]:
+        """Task -> model -> totals, with average latency and escalation rate"""
+        with self._lock:
+            summary = {}
+            for (task, model_name), usage in sorted(self._usage.items()):
+                summary.setdefault(task, {})[model_name] = {
+                    **usage,
+                    "latency_seconds": round(usage["latency_seconds"], 3),
+                    "average_latency_seconds": round(usage["latency_seconds"] / usage["calls"], 3),
+                    "escalation_rate": round(usage["escalations"] / usage["calls"], 4),
+                    "cost_usd": round(usage["cost_usd"], 6),
+                }
+            return summary
+
+    def reset(self) -> None:
+        """Start a new reporting period"""
+        with self._lock:
+            self._usage.clear()
+
+
+task_usage = TaskUsageTracker()
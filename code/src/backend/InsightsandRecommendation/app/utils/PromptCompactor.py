@@ -0,0 +1,116 @@
+import json
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from config import Config
+
+# Gemini tokenizers average roughly four characters per token for JSON-like text
+CHARS_PER_TOKEN = 4
+
+DATE_FIELD = "Transaction_Date"
+AMOUNT_FIELD = "Transaction_Amount"
+CATEGORY_FIELD = "Merchant_Category"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a prompt fragment without calling the API"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _to_columnar(transactions: List[Dict], columns: List[str]) -> Dict:
+    return {
+        "columns": columns,
+        "rows": [[transaction.get(column) for column in columns] for transaction in transactions],
+    }
+
+
+def _summarize_by_month(transactions: List[Dict], top_categories: int = 3) -> List[Dict]:
+    """Aggregate transactions into monthly count/total and top categories by spend"""
+    months = defaultdict(lambda: {"count": 0, "total": 0.0, "categories": defaultdict(float)})
+    for transaction in transactions:
+        month = str(transaction.get(DATE_FIELD) or "unknown")[:7]
+        try:
+            amount = float(transaction.get(AMOUNT_FIELD) or 0)
+        except (TypeError, ValueError):
+            amount = 0.0
+        bucket = months[month]
+        bucket["count"] += 1
+        bucket["total"] += amount
+        bucket["categories"][transaction.get(CATEGORY_FIELD) or "unknown"] += amount
+
+    summary = []
+    for month in sorted(months, reverse=True):
+        bucket = months[month]
+        categories = sorted(bucket["categories"].items(), key=lambda item: item[1], reverse=True)
+        summary.append({
+            "month": month,
+            "count": bucket["count"],
+            "total": round(bucket["total"], 2),
+            "top_categories": {name: round(total, 2) for name, total in categories[:top_categories]},
+        })
+    return summary
+
+
+def compact_transactions(transactions: List[Dict], token_budget: Optional[int] = None) -> str:
+    """
+    Render transactions for a prompt in a compact, token-budgeted form.
+
+    Transactions are emitted most recent first as a columnar JSON table without
+    indentation. If the full history exceeds the budget, the most recent
+    transactions are kept verbatim and older history is replaced by monthly
+    aggregates (count, total and top categories).
+
+    Args:
+        transactions (List[Dict]): Raw transaction records
+        token_budget (int, optional): Approximate token budget. Defaults to
+            Config.PROMPT_TRANSACTION_TOKEN_BUDGET.
+
+    Returns:
+        str: Compact JSON representation within the token budget
+    """
+    token_budget = token_budget or Config.PROMPT_TRANSACTION_TOKEN_BUDGET
+    if not transactions:
+        return _dumps({"columns": [], "rows": []})
+
+    columns = sorted({key for transaction in transactions for key in transaction})
+    ordered = sorted(transactions, key=lambda transaction: str(transaction.get(DATE_FIELD) or ""), reverse=True)
+
+    full = _dumps(_to_columnar(ordered, columns))
+    if estimate_tokens(full) <= token_budget:
+        return full
+
+    # Estimate per-row cost to find how many recent rows fit next to the summary of the rest
+    header_tokens = estimate_tokens(_dumps({"columns": columns, "rows": []}))
+    row_tokens = [estimate_tokens(_dumps([transaction.get(column) for column in columns])) + 1
+                  for transaction in ordered]
+
+    recent_count = len(ordered)
+    older_summary = []
+    while recent_count > 0:
+        older_summary = _summarize_by_month(ordered[recent_count:]) if recent_count < len(ordered) else []
+        used = header_tokens + sum(row_tokens[:recent_count]) + estimate_tokens(_dumps(older_summary))
+        if used <= token_budget:
+            break
+        # Drop recent rows in chunks proportional to the overshoot
+        overshoot = used - token_budget
+        average_row = max(1, sum(row_tokens[:recent_count]) // recent_count)
+        recent_count = max(0, recent_count - max(1, overshoot // average_row))
+
+    older_summary = _summarize_by_month(ordered[recent_count:])
+    compacted = {
+        "recent_transactions": _to_columnar(ordered[:recent_count], columns),
+        "older_history_monthly_summary": older_summary,
+    }
+    rendered = _dumps(compacted)
+
+    # Very long tenures: keep only the most recent months of the summary
+    while estimate_tokens(rendered) > token_budget and compacted["older_history_monthly_summary"]:
+        compacted["older_history_monthly_summary"] = compacted["older_history_monthly_summary"][:-1]
+        compacted["summary_truncated"] = True
+        rendered = _dumps(compacted)
+
+    return rendered
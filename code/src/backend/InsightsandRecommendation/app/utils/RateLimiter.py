@@ -0,0 +1,220 @@
+import functools
+import heapq
+import itertools
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from config import Config
+
+# Priority classes of LLM calls, lower is served first
+PRIORITY_REALTIME = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BATCH = 2
+
+_priority = threading.local()
+
+
+def current_priority() -> int:
+    """Priority class of the LLM calls made by the current thread"""
+    return getattr(_priority, "value", PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Run the LLM calls made by the current thread inside the block with the given priority class"""
+    previous = getattr(_priority, "value", None)
+    _priority.value = priority
+    try:
+        yield
+    finally:
+        if previous is None:
+            del _priority.value
+        else:
+            _priority.value = previous
+
+
+def with_current_priority(func: Callable) -> Callable:
+    """
+    Bind func to the priority class of the calling thread, for tasks submitted to a
+    worker pool whose threads do not inherit the thread-local priority
+    """
+    priority = current_priority()
+
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        with llm_priority(priority):
+            return func(*args, **kwargs)
+
+    return run
+
+
+class TokenBucket:
+    """Bucket holding at most one minute of budget, refilled continuously at rate_per_minute"""
+
+    def __init__(self, rate_per_minute: float, now: float):
+        self.capacity = float(rate_per_minute)
+        self.rate_per_second = rate_per_minute / 60.0
+        self.available = self.capacity
+        self.updated_at = now
+
+    def refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self.updated_at)
+        self.available = min(self.capacity, self.available + elapsed * self.rate_per_second)
+        self.updated_at = now
+
+    def seconds_until(self, amount: float) -> float:
+        # A request larger than the whole bucket waits for a full bucket instead of forever
+        missing = min(amount, self.capacity) - self.available
+        return 0.0 if missing <= 0 else missing / self.rate_per_second
+
+
+class AdaptiveRateLimiter:
+    """
+    Process-wide limiter for Gemini requests per minute and tokens per minute.
+
+    Both budgets are token buckets whose refill rate is scaled by an AIMD factor:
+    a 429 halves the rate and empties the request bucket, so every waiting caller
+    pauses instead of retrying into the same quota window, and each success
+    adds back a small fraction of the configured rate. Callers queue by priority
+    class, then by arrival, so realtime trigger analyses are admitted ahead of
+    batch sweeps. Failed attempts are retried after a jittered exponential backoff.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 min_rate_factor: float = 0.1, additive_increase: float = 0.05,
+                 backoff_base: Optional[float] = None, backoff_max: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic, rng: Optional[random.Random] = None):
+        """
+        Initialize AdaptiveRateLimiter
+
+        Args:
+            requests_per_minute (float, optional): Request quota. Defaults to Config.LLM_REQUESTS_PER_MINUTE.
+            tokens_per_minute (float, optional): Token quota. Defaults to Config.LLM_TOKENS_PER_MINUTE.
+            min_rate_factor (float): Lowest fraction of the quota the limiter backs off to
+            additive_increase (float): Fraction of the quota restored per successful call
+            backoff_base (float, optional): First retry delay in seconds. Defaults to Config.LLM_BACKOFF_BASE_SECONDS.
+            backoff_max (float, optional): Retry delay cap in seconds. Defaults to Config.LLM_BACKOFF_MAX_SECONDS.
+            clock (Callable, optional): Monotonic clock in seconds
+            rng (random.Random, optional): Source of the backoff jitter
+        """
+        self.requests_per_minute = float(requests_per_minute or Config.LLM_REQUESTS_PER_MINUTE)
+        self.tokens_per_minute = float(tokens_per_minute or Config.LLM_TOKENS_PER_MINUTE)
+        self.min_rate_factor = min_rate_factor
+        self.additive_increase = additive_increase
+        self.backoff_base = backoff_base if backoff_base is not None else Config.LLM_BACKOFF_BASE_SECONDS
+        self.backoff_max = backoff_max if backoff_max is not None else Config.LLM_BACKOFF_MAX_SECONDS
+        self.clock = clock
+        self.rng = rng or random.Random()
+
+        now = clock()
+        self.rate_factor = 1.0
+        self._requests = TokenBucket(self.requests_per_minute, now)
+        self._tokens = TokenBucket(self.tokens_per_minute, now)
+        self._condition = threading.Condition()
+        self._waiters = []
+        self._arrivals = itertools.count()
+        self.rate_limited = 0
+
+    def acquire(self, tokens: int = 0, priority: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until one request of the given token size fits both budgets and take it
+
+        Args:
+            tokens (int): Estimated prompt plus response tokens of the request
+            priority (int, optional): Priority class. Defaults to the priority of the current thread.
+            timeout (float, optional): Longest wait in seconds. Defaults to waiting indefinitely.
+
+        Returns:
+            bool: True if the request was admitted, False on timeout
+        """
+        ticket = (current_priority() if priority is None else priority, next(self._arrivals))
+        deadline = None if timeout is None else self.clock() + timeout
+        with self._condition:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    wait = None
+                    # Only the first waiter takes budget, so a batch caller cannot
+                    # drain a refill that a queued realtime caller is waiting for
+                    if self._waiters[0] == ticket:
+                        now = self.clock()
+                        self._requests.refill(now)
+                        self._tokens.refill(now)
+                        wait = max(self._requests.seconds_until(1), self._tokens.seconds_until(tokens))
+                        if wait <= 0:
+                            self._requests.available -= 1
+                            self._tokens.available -= min(tokens, self._tokens.capacity)
+                            return True
+                    if deadline is not None:
+                        remaining = deadline - self.clock()
+                        if remaining <= 0:
+                            return False
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._condition.wait(wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._condition.notify_all()
+
+    def on_success(self, estimated_tokens: int = 0, actual_tokens: Optional[int] = None) -> None:
+        """
+        Record a successful call: restore part of the rate and settle the token estimate
+
+        Args:
+            estimated_tokens (int): Tokens taken by acquire for the call
+            actual_tokens (int, optional): Tokens the API reported for the call
+        """
+        with self._condition:
+            if actual_tokens is not None:
+                self._tokens.refill(self.clock())
+                self._tokens.available = min(self._tokens.capacity,
+                                             self._tokens.available + estimated_tokens - actual_tokens)
+            self._set_rate_factor(self.rate_factor + self.additive_increase)
+
+    def on_rate_limited(self) -> None:
+        """Record a 429: halve the rate and pause all callers until the request bucket refills"""
+        with self._condition:
+            self.rate_limited += 1
+            self._set_rate_factor(self.rate_factor / 2)
+            self._requests.refill(self.clock())
+            self._requests.available = min(self._requests.available, 0.0)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay in seconds for the given zero-based retry attempt"""
+        return self.rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def stats(self) -> Dict[str, float]:
+        """Current rate factor, effective quotas and the number of 429s seen"""
+        with self._condition:
+            return {
+                "rate_factor": round(self.rate_factor, 4),
+                "requests_per_minute": round(self.requests_per_minute * self.rate_factor, 2),
+                "tokens_per_minute": round(self.tokens_per_minute * self.rate_factor, 2),
+                "rate_limited": self.rate_limited,
+                "waiting": len(self._waiters),
+            }
+
+    def _set_rate_factor(self, rate_factor: float) -> None:
+        now = self.clock()
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        self.rate_factor = min(1.0, max(self.min_rate_factor, rate_factor))
+        self._requests.rate_per_second = self.requests_per_minute * self.rate_factor / 60.0
+        self._tokens.rate_per_second = self.tokens_per_minute * self.rate_factor / 60.0
+        self._condition.notify_all()
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Return the process wide AdaptiveRateLimiter, creating it on first use"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = AdaptiveRateLimiter()
+        return _rate_limiter
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from typing import Dict, Optional
+
+from config import Config
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+class InMemoryCacheBackend:
+    """Process local LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCacheBackend:
+    """On-disk LRU cache so responses survive restarts and are shared by processes on one host"""
+
+    def __init__(self, db_path: str, max_entries: int):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_response_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_response_cache (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        # sqlite3's own context manager only commits or rolls back; the connection is closed explicitly
+        with closing(sqlite3.connect(self.db_path, timeout=30)) as conn, conn:
+            yield conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM llm_response_cache WHERE cache_key = ?",
+                               (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM llm_response_cache WHERE cache_key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_response_cache SET last_access = ? WHERE cache_key = ?", (now, key))
+            return row[0]
+
+    def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache (cache_key, value, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?)", (key, value, now + ttl_seconds, now))
+            # Drop expired entries, then least recently used ones beyond the size bound
+            conn.execute("DELETE FROM llm_response_cache WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM llm_response_cache WHERE cache_key IN ("
+                "SELECT cache_key FROM llm_response_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,))
+
+
+class RedisCacheBackend:
+    """
+    Cache stored in Redis or any Redis protocol compatible server.
+    Expiry uses Redis TTLs; size bounded LRU eviction is delegated to the
+    server's maxmemory-policy (e.g. allkeys-lru).
+    """
+
+    def __init__(self, url: str, key_prefix: str = "llm_response_cache:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("The redis package is required for the redis LLM cache backend") from e
+        self.client = redis.Redis.from_url(url)
+        self.key_prefix = key_prefix
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.key_prefix + key)
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, key: str, value: str, ttl_seconds: int) -> None:
+        self.client.set(self.key_prefix + key, value, ex=ttl_seconds)
+
+
+class LLMResponseCache:
+    """
+    Content addressed cache of LLM responses.
+    Keys are a hash of model name, system instruction, generation config and prompt,
+    so any change to the customer data or the prompt template is a cache miss.
+    """
+
+    def __init__(self, backend, ttl_seconds: int):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, system_instruction: str, generation_config: Dict) -> str:
+        """Hash the inputs that determine a model response"""
+        payload = json.dumps({
+            "model": model_name,
+            "system_instruction": system_instruction,
+            "generation_config": generation_config,
+            "prompt": prompt,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {str(e)}")
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        try:
+            self.backend.set(key, value, self.ttl_seconds)
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def stats(self) -> Dict:
+        """Hit/miss counters since process start"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+    """Return the process wide LLM response cache, or None if caching is disabled"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            backend_name = Config.LLM_CACHE_BACKEND
+            if backend_name == "none":
+                return None
+            if backend_name == "memory":
+                backend = InMemoryCacheBackend(Config.LLM_CACHE_MAX_ENTRIES)
+            elif backend_name == "sqlite":
+                backend = SQLiteCacheBackend(Config.LLM_CACHE_PATH, Config.LLM_CACHE_MAX_ENTRIES)
+            elif backend_name == "redis":
+                backend = RedisCacheBackend(Config.LLM_CACHE_REDIS_URL)
+            else:
+                raise ValueError(f"Unsupported LLM cache backend: {backend_name}")
+            _response_cache = LLMResponseCache(backend, Config.LLM_CACHE_TTL_SECONDS)
+        return _response_cache
@@ -0,0 +1,290 @@
+import json
+from typing import Any, Dict, List, Optional
+
+_WHITESPACE = " \t\r\n"
+# Markdown fence characters tolerated around the JSON document, e.g. ```json ... ```
+_FENCE = "`json"
+_SCALAR_CHARS = set("0123456789+-.eEtruefalsn")
+
+_PY_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+class SchemaViolation(ValueError):
+    """Raised as soon as streamed output can no longer match the expected schema"""
+
+
+def _types(schema: Dict) -> Optional[List[str]]:
+    schema_type = schema.get("type")
+    if schema_type is None:
+        return None
+    return [schema_type] if isinstance(schema_type, str) else list(schema_type)
+
+
+def _matches_type(value: Any, types: Optional[List[str]]) -> bool:
+    if types is None:
+        return True
+    for schema_type in types:
+        if schema_type == "integer":
+            if isinstance(value, int) and not isinstance(value, bool):
+                return True
+        elif schema_type == "number":
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return True
+        elif isinstance(value, _PY_TYPES[schema_type]):
+            return True
+    return False
+
+
+def _first_char_types(char: str) -> List[str]:
+    """JSON types a value starting with char can have"""
+    if char == "{":
+        return ["object"]
+    if char == "[":
+        return ["array"]
+    if char == '"':
+        return ["string"]
+    if char in "tf":
+        return ["boolean"]
+    if char == "n":
+        return ["null"]
+    if char == "-" or char.isdigit():
+        return ["integer", "number"]
+    return []
+
+
+class StreamingJsonValidator:
+    """
+    Incremental JSON parser validating a streamed LLM response against a schema.
+
+    Chunks are fed as they arrive. The document structure, object keys, value
+    types and string enums are checked as soon as each token is complete (and
+    enums already on each string prefix), so an off-schema response is detected
+    after its first wrong token instead of after the whole response.
+
+    The schema is a small JSON Schema subset: type (or list of types),
+    properties, required, additionalProperties (defaults to False when properties
+    are given), items and enum. Enums compare case-insensitively.
+    """
+
+    def __init__(self, schema: Dict):
+        """
+        Initialize StreamingJsonValidator
+
+        Args:
+            schema (dict): Schema of the top level value
+        """
+        self.schema = schema
+        self._chunks = []
+        self._stack = []
+        self._expect = "prefix"
+        self._pending = schema
+        self._token = None
+        self._string_schema = None
+        self._escape = False
+
+    def feed(self, chunk: str) -> None:
+        """
+        Consume the next chunk of the response
+
+        Raises:
+            SchemaViolation: If the response received so far cannot match the schema
+        """
+        self._chunks.append(chunk)
+        for char in chunk:
+            self._consume(char)
+
+    def close(self) -> str:
+        """
+        Finish the stream
+
+        Returns:
+            str: The JSON document, without surrounding markdown fences
+
+        Raises:
+            SchemaViolation: If the response is incomplete or does not match the schema
+        """
+        if self._expect == "scalar":
+            self._finish_scalar()
+        if self._expect != "done":
+            raise SchemaViolation("Response ended before the JSON document was complete")
+        text = "".join(self._chunks).strip(_WHITESPACE + "`")
+        if text.startswith("json"):
+            text = text[len("json"):]
+        return text.strip(_WHITESPACE)
+
+    # Parser states: prefix (before the document, skipping a markdown fence), value,
+    # string, scalar, key_or_end, key, colon, comma_or_end, item_or_end, done
+
+    def _consume(self, char: str) -> None:
+        expect = self._expect
+        if expect == "string":
+            self._consume_string(char)
+            return
+        if expect == "scalar":
+            if char in _SCALAR_CHARS:
+                self._token.append(char)
+                return
+            self._finish_scalar()
+            expect = self._expect
+        if char in _WHITESPACE:
+            return
+
+        if expect == "prefix":
+            if char in _FENCE:
+                return
+            self._start_value(char)
+        elif expect == "done":
+            if char != "`":
+                raise SchemaViolation(f"Unexpected {char!r} after the JSON document")
+        elif expect == "value":
+            self._start_value(char)
+        elif expect == "item_or_end":
+            if char == "]":
+                self._end_container()
+            else:
+                self._pending = self._stack[-1]["schema"].get("items", {})
+                self._start_value(char)
+        elif expect in ("key_or_end", "key"):
+            if char == "}" and expect == "key_or_end":
+                self._end_container()
+            elif char == '"':
+                self._start_string(None)
+            else:
+                raise SchemaViolation(f"Expected an object key, got {char!r}")
+        elif expect == "colon":
+            if char != ":":
+                raise SchemaViolation(f"Expected ':', got {char!r}")
+            self._expect = "value"
+        elif expect == "comma_or_end":
+            frame = self._stack[-1]
+            closing = "}" if frame["kind"] == "object" else "]"
+            if char == ",":
+                if frame["kind"] == "object":
+                    self._expect = "key"
+                else:
+                    self._pending = frame["schema"].get("items", {})
+                    self._expect = "value"
+            elif char == closing:
+                self._end_container()
+            else:
+                raise SchemaViolation(f"Expected ',' or {closing!r}, got {char!r}")
+
+    def _start_value(self, char: str) -> None:
+        schema = self._pending
+        types = _types(schema)
+        possible = _first_char_types(char)
+        if not possible:
+            raise SchemaViolation(f"Unexpected {char!r} where a value was expected")
+        if types is not None and not set(possible) & set(types):
+            raise SchemaViolation(f"Expected {'/'.join(types)} at {self._path()}, got {possible[0]}")
+
+        if char == "{":
+            self._stack.append({"kind": "object", "schema": schema, "keys": set(), "key": None})
+            self._expect = "key_or_end"
+        elif char == "[":
+            self._stack.append({"kind": "array", "schema": schema, "index": 0})
+            self._expect = "item_or_end"
+        elif char == '"':
+            self._start_string(schema)
+        else:
+            self._token = [char]
+            self._expect = "scalar"
+
+    def _start_string(self, schema: Optional[Dict]) -> None:
+        # schema is None while reading an object key
+        self._token = ['"']
+        self._string_schema = schema
+        self._escape = False
+        self._expect = "string"
+
+    def _consume_string(self, char: str) -> None:
+        self._token.append(char)
+        if self._escape:
+            self._escape = False
+            return
+        if char == "\\":
+            self._escape = True
+            return
+        if char != '"':
+            if self._string_schema is not None and "enum" in self._string_schema:
+                self._check_enum_prefix()
+            return
+
+        value = json.loads("".join(self._token))
+        self._token = None
+        if self._string_schema is None:
+            self._accept_key(value)
+        else:
+            self._accept_value(value, self._string_schema)
+
+    def _check_enum_prefix(self) -> None:
+        raw = "".join(self._token[1:])
+        if "\\" in raw:
+            return
+        prefix = raw.lower()
+        if not any(str(option).lower().startswith(prefix) for option in self._string_schema["enum"]):
+            raise SchemaViolation(f"Value at {self._path()} is not one of {self._string_schema['enum']}")
+
+    def _finish_scalar(self) -> None:
+        token = "".join(self._token)
+        self._token = None
+        try:
+            value = json.loads(token)
+        except json.JSONDecodeError:
+            raise SchemaViolation(f"Invalid JSON literal {token!r} at {self._path()}")
+        self._accept_value(value, self._pending)
+
+    def _accept_key(self, key: str) -> None:
+        frame = self._stack[-1]
+        schema = frame["schema"]
+        properties = schema.get("properties")
+        if properties is not None and key not in properties and not schema.get("additionalProperties", False):
+            raise SchemaViolation(f"Unexpected key {key!r} at {self._path()}")
+        frame["keys"].add(key)
+        frame["key"] = key
+        self._pending = (properties or {}).get(key, {})
+        self._expect = "colon"
+
+    def _accept_value(self, value: Any, schema: Dict) -> None:
+        if not _matches_type(value, _types(schema)):
+            raise SchemaViolation(f"Expected {'/'.join(_types(schema))} at {self._path()}, got {value!r}")
+        if "enum" in schema and str(value).lower() not in {str(option).lower() for option in schema["enum"]}:
+            raise SchemaViolation(f"Value {value!r} at {self._path()} is not one of {schema['enum']}")
+        self._value_done()
+
+    def _end_container(self) -> None:
+        frame = self._stack.pop()
+        if frame["kind"] == "object":
+            missing = [key for key in frame["schema"].get("required", []) if key not in frame["keys"]]
+            if missing:
+                self._stack.append(frame)
+                raise SchemaViolation(f"Missing required keys {missing} at {self._path()}")
+        self._value_done()
+
+    def _value_done(self) -> None:
+        if not self._stack:
+            self._expect = "done"
+            return
+        frame = self._stack[-1]
+        if frame["kind"] == "array":
+            frame["index"] += 1
+        else:
+            # Errors until the next key are reported at the object itself
+            frame["key"] = None
+        self._expect = "comma_or_end"
+
+    def _path(self) -> str:
+        parts = ["$"]
+        for frame in self._stack:
+            if frame["kind"] == "object":
+                if frame["key"] is not None:
+                    parts.append(f".{frame['key']}")
+            else:
+                parts.append(f"[{frame['index']}]")
+        return "".join(parts)
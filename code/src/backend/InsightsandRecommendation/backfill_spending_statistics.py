@@ -0,0 +1,50 @@
+import argparse
+import logging
+from datetime import datetime
+from app.init import create_app
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute the statistical spending insights of all customers "
+                                                 "in batches and store them as their latest spending_patterns")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Customers analyzed per batch")
+    parser.add_argument("--parquet-root", help="Read the transactions from a Parquet store written by "
+                                               "ingest_parquet.py, one client bucket at a time, instead of Firestore")
+    args = parser.parse_args()
+
+    # Initializes the Firestore client
+    create_app()
+
+    from app.init import db_client
+    from app.db.BatchedWriter import BatchedFirestoreWriter
+    from app.db.CustomerDataLoader import CustomerDataLoader
+    from app.InsightGenerator.AnalyzeSpendingPattern.BatchSpendingStatistics import (
+        compute_spending_statistics_chunks, compute_spending_statistics_parquet)
+
+    count = 0
+    with CustomerDataLoader(db_client) as loader, BatchedFirestoreWriter(db_client) as writer:
+        if args.parquet_root:
+            results = compute_spending_statistics_parquet(args.parquet_root)
+        else:
+            customers = db_client.collection('CustomerData').stream()
+            transactions = ((customer.id, loader.load(customer)['transactions'])
+                            for customer in loader.prefetch(customers))
+            results = compute_spending_statistics_chunks(transactions, args.chunk_size)
+
+        for client_id, statistics in results:
+            # Drift detection and the adaptive analysis read the latest spending_patterns document;
+            # the LLM spending analysis is left to the insight sweeps
+            history_ref = db_client.collection("CustomerData").document(client_id) \
+                .collection("spending_patterns").document()
+            writer.set(history_ref, {'statistical_spend_insights': statistics, 'created_at': datetime.now()})
+            count += 1
+
+    if writer.errors:
+        logging.error(f"{len(writer.errors)} write batches failed; re-run the backfill")
+    logging.info(f"Stored spending statistics of {count} customers")
+
+
+if __name__ == '__main__':
+    main()
@@ -6,3 +6,82 @@ load_dotenv()
 class Config:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     FIREBASE_SERVICE_ACCOUNT_FILE = os.getenv("FIREBASE_SERVICE_ACCOUNT_FILE")
+
+    # Concurrency limits for the insight generation sweeps
+    MAX_CONCURRENT_CUSTOMERS = int(os.getenv("MAX_CONCURRENT_CUSTOMERS", 4))
+    MAX_INFLIGHT_LLM_CALLS = int(os.getenv("MAX_INFLIGHT_LLM_CALLS", 8))
+
+    # Gemini quota shared by all LLM calls of the process, with backoff on 429s
+    LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 60))
+    LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 1_000_000))
+    LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", 5))
+    LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 2.0))
+    LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 60.0))
+
+    # JSON overrides of the per task model routes, e.g. {"retention_risk": {"model": "models/gemini-1.5-pro-latest"}}
+    LLM_MODEL_ROUTES = os.getenv("LLM_MODEL_ROUTES")
+
+    # Document storage: firestore | local (SQLite file, use with SWEEP_CHECKPOINT_BACKEND=sqlite)
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "firestore")
+    LOCAL_STORE_PATH = os.getenv("LOCAL_STORE_PATH", "local_store.db")
+
+    # Concurrent Firestore reads while loading customer data
+    FIRESTORE_READ_WORKERS = int(os.getenv("FIRESTORE_READ_WORKERS", 16))
+    FIRESTORE_PREFETCH_CUSTOMERS = int(os.getenv("FIRESTORE_PREFETCH_CUSTOMERS", 8))
+
+    # Storage layout of app sessions: document | daily | monthly
+    APP_ACTIVITY_LAYOUT = os.getenv("APP_ACTIVITY_LAYOUT", "document")
+    # Comma separated layouts new sessions are appended to, e.g. "document,daily" while
+    # migrating to a bucketed layout. Defaults to APP_ACTIVITY_LAYOUT
+    APP_ACTIVITY_WRITE_LAYOUTS = os.getenv("APP_ACTIVITY_WRITE_LAYOUTS")
+
+    # Write-behind batching of Firestore writes
+    FIRESTORE_WRITE_BATCH_SIZE = int(os.getenv("FIRESTORE_WRITE_BATCH_SIZE", 500))
+    FIRESTORE_WRITE_FLUSH_SECONDS = float(os.getenv("FIRESTORE_WRITE_FLUSH_SECONDS", 2.0))
+    FIRESTORE_WRITE_MAX_PENDING = int(os.getenv("FIRESTORE_WRITE_MAX_PENDING", 2000))
+    FIRESTORE_WRITE_MAX_RETRIES = int(os.getenv("FIRESTORE_WRITE_MAX_RETRIES", 3))
+
+    # Background job queue for the long-running analytics endpoints
+    JOB_STORE_BACKEND = os.getenv("JOB_STORE_BACKEND", "memory")  # memory | sqlite
+    JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "jobs.db")
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+
+    # Trigger-driven analyses of single customers from the event ingestion endpoint
+    REALTIME_TRIGGER_WORKERS = int(os.getenv("REALTIME_TRIGGER_WORKERS", 2))
+
+    # Sharded, resumable adaptive analytics sweeps
+    SWEEP_CHECKPOINT_BACKEND = os.getenv("SWEEP_CHECKPOINT_BACKEND", "firestore")  # firestore | sqlite
+    SWEEP_CHECKPOINT_PATH = os.getenv("SWEEP_CHECKPOINT_PATH", "sweep_checkpoints.db")
+    SWEEP_LEASE_SECONDS = int(os.getenv("SWEEP_LEASE_SECONDS", 600))
+
+    # Content addressed cache of Gemini responses. Off by default: most prompts are sampled at
+    # temperature 1, so a cached generation is served again only where that is opted into
+    LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "none")  # none | memory | sqlite | redis
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+    LLM_CACHE_REDIS_URL = os.getenv("LLM_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 50000))
+
+    # Approximate token budget for transaction history embedded in each prompt
+    PROMPT_TRANSACTION_TOKEN_BUDGET = int(os.getenv("PROMPT_TRANSACTION_TOKEN_BUDGET", 8000))
+
+    # Run the four initial insight analyzers as one combined LLM call
+    FUSED_INSIGHT_ANALYSIS = os.getenv("FUSED_INSIGHT_ANALYSIS", "false").lower() == "true"
+
+    # Score life stage and retention risk statistically, asking the LLM only about borderline customers
+    STATISTICAL_INSIGHT_SCORERS = os.getenv("STATISTICAL_INSIGHT_SCORERS", "false").lower() == "true"
+
+    # Bulk mode of the insight sweeps: all prompts go to one batch prediction job
+    BULK_LLM_SWEEPS = os.getenv("BULK_LLM_SWEEPS", "false").lower() == "true"
+    # vertex | local. No default: 'local' makes the same interactive calls as a normal sweep,
+    # so bulk sweeps are rejected until a backend is chosen explicitly
+    LLM_BATCH_BACKEND = os.getenv("LLM_BATCH_BACKEND")
+    LLM_BATCH_DIR = os.getenv("LLM_BATCH_DIR", "llm_batch_jobs")
+    # Job files hold the full prompts; they are deleted locally and from the GCS staging prefix
+    # once the results are read unless kept for debugging
+    LLM_BATCH_KEEP_FILES = os.getenv("LLM_BATCH_KEEP_FILES", "false").lower() == "true"
+    LLM_BATCH_GCS_URI = os.getenv("LLM_BATCH_GCS_URI")
+    LLM_BATCH_MODEL = os.getenv("LLM_BATCH_MODEL", "gemini-1.5-pro-002")
+    LLM_BATCH_PROJECT = os.getenv("LLM_BATCH_PROJECT")
+    LLM_BATCH_LOCATION = os.getenv("LLM_BATCH_LOCATION", "us-central1")
+    LLM_BATCH_POLL_SECONDS = float(os.getenv("LLM_BATCH_POLL_SECONDS", 60))
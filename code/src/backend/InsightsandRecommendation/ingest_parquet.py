@@ -0,0 +1,34 @@
+import argparse
+import logging
+from app.db.ParquetStore import DEFAULT_NUM_BUCKETS, ingest_app_activity, ingest_transactions
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load transaction and app activity exports into a "
+                                                 "Parquet store partitioned by client bucket and month")
+    parser.add_argument("--transactions", help="CSV, JSON lines, JSON or Parquet export of transactions")
+    parser.add_argument("--app-activity", help="CSV, JSON lines, JSON or Parquet export of app activity")
+    parser.add_argument("--output", required=True, help="Root directory of the Parquet store")
+    parser.add_argument("--num-buckets", type=int, default=DEFAULT_NUM_BUCKETS,
+                        help="Number of client hash buckets. Match the sweep's --num-shards to read one bucket per shard")
+    parser.add_argument("--client-id-column", default="client_id", help="Column of the exports holding the client id")
+    parser.add_argument("--overwrite", action="store_true", help="Replace previously ingested data")
+    args = parser.parse_args()
+
+    if not args.transactions and not args.app_activity:
+        parser.error("Nothing to ingest: pass --transactions and/or --app-activity")
+
+    if args.transactions:
+        count = ingest_transactions(args.transactions, args.output, args.num_buckets,
+                                    args.client_id_column, overwrite=args.overwrite)
+        logging.info(f"Ingested {count} transactions into {args.output}")
+    if args.app_activity:
+        count = ingest_app_activity(args.app_activity, args.output, args.num_buckets,
+                                    args.client_id_column, overwrite=args.overwrite)
+        logging.info(f"Ingested {count} app sessions into {args.output}")
+
+
+if __name__ == '__main__':
+    main()
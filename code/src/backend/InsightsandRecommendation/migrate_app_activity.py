@@ -0,0 +1,35 @@
+import argparse
+import logging
+from app.init import create_app
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy AppActivity session arrays into daily or monthly bucket documents. "
+                                                 "Start dual-writing new sessions with "
+                                                 "APP_ACTIVITY_WRITE_LAYOUTS=document,<layout> first")
+    parser.add_argument("--layout", choices=["daily", "monthly"], required=True, help="Target bucket layout")
+    parser.add_argument("--client-id", action="append", dest="client_ids", default=None,
+                        help="Client to migrate. Repeat for several clients. Defaults to all clients")
+    args = parser.parse_args()
+
+    # Initializes the Firestore client
+    create_app()
+
+    from app.init import db_client
+    from app.db.AppActivityStore import migrate_app_activity
+    from app.db.BatchedWriter import BatchedFirestoreWriter
+
+    with BatchedFirestoreWriter(db_client) as writer:
+        summary = migrate_app_activity(db_client, writer, args.layout, args.client_ids)
+
+    if writer.errors:
+        logging.error(f"{len(writer.errors)} bucket write batches failed; re-run the migration")
+    logging.info(f"Migrated {summary['sessions']} sessions of {summary['clients']} clients "
+                 f"into {summary['buckets']} buckets. Set APP_ACTIVITY_LAYOUT={args.layout} to read them; "
+                 f"keep APP_ACTIVITY_WRITE_LAYOUTS=document,{args.layout} until no reader uses the document layout")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+
+from app.init import create_app
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score life stage and retention risk of all customers statistically, "
+                                                 "asking the LLM only about borderline customers")
+    parser.add_argument("--parquet-root", required=True, help="Root directory of the Parquet store")
+    parser.add_argument("--as-of", type=datetime.fromisoformat, default=None,
+                        help="Date to score at (ISO format). Defaults to now")
+    parser.add_argument("--explain-borderline", action="store_true",
+                        help="Have the LLM review customers whose statistical result is borderline")
+    parser.add_argument("--dry-run", action="store_true", help="Score and log a summary without writing results")
+    args = parser.parse_args()
+
+    # Initializes the Firestore client
+    create_app()
+
+    from config import Config
+    from app.init import db_client
+    from app.db.BatchedWriter import BatchedFirestoreWriter
+    from app.db.ParquetStore import read_app_activity, read_transactions
+    from app.InsightGenerator.StatisticalScorers import (
+        borderline_customers, explain_with_llm, feature_summary, score_customers)
+    from app.utils.ModelRouting import task_usage
+    from app.utils.RateLimiter import PRIORITY_BATCH, llm_priority
+
+    started = time.monotonic()
+    customers = pd.DataFrame([{**doc.to_dict(), 'client_id': doc.id}
+                              for doc in db_client.collection('CustomerData').stream()])
+    if customers.empty:
+        logging.info("No customers to score")
+        return
+    transactions = read_transactions(args.parquet_root, columns=[
+        'client_id', 'Transaction_Amount', 'Transaction_Date', 'Merchant_Category'])
+    sessions = read_app_activity(args.parquet_root, columns=['client_id', 'date'])
+    loaded = time.monotonic()
+
+    scored = score_customers(customers, transactions, sessions, as_of=args.as_of)
+    borderline = borderline_customers(scored)
+    logging.info(f"Scored {len(scored)} customers in {time.monotonic() - loaded:.1f}s "
+                 f"(data loaded in {loaded - started:.1f}s); {len(borderline)} borderline")
+
+    if args.explain_borderline and borderline:
+        jobs = [(client_id, insight) for client_id in borderline for insight in ("life_stage", "retention_risk")
+                if scored.at[client_id, f"{insight}_borderline"]]
+
+        def explain(job):
+            client_id, insight = job
+            row = scored.loc[client_id]
+            with llm_priority(PRIORITY_BATCH):
+                return explain_with_llm(insight, row[insight], feature_summary(row))
+
+        with ThreadPoolExecutor(max_workers=Config.MAX_INFLIGHT_LLM_CALLS) as executor:
+            for (client_id, insight), result in zip(jobs, executor.map(explain, jobs)):
+                scored.at[client_id, insight] = result
+        logging.info(f"Explained {len(jobs)} borderline results; LLM usage: {task_usage.summary()}")
+
+    if args.dry_run:
+        logging.info(scored['life_stage'].map(lambda result: result['primary_life_stage']).value_counts().to_dict())
+        logging.info(scored['retention_risk'].map(lambda result: result['attrition_risk_level']).value_counts().to_dict())
+        return
+
+    with BatchedFirestoreWriter(db_client) as writer:
+        for client_id, row in scored.iterrows():
+            operations = []
+            for key in ("life_stage", "retention_risk"):
+                value = {**row[key], "created_at": datetime.now()}
+                history_ref = db_client.collection("CustomerData").document(client_id).collection(key).document()
+                operations.append((history_ref, value, False))
+            # Only the two scored insights of CustomerInsights are replaced
+            operations.append((db_client.collection("CustomerInsights").document(client_id),
+                               {"life_stage": row["life_stage"], "retention_risk": row["retention_risk"]}, True))
+            writer.write(operations)
+    if writer.errors:
+        logging.error(f"Failed to persist scores: {writer.errors}")
+    logging.info(f"Scoring completed in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import argparse
+import logging
+from app.init import create_app
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Join a sharded adaptive analytics sweep and process claimable shards")
+    parser.add_argument("--sweep-id", required=True, help="Identifier shared by all workers of the sweep")
+    parser.add_argument("--num-shards", type=int, required=True, help="Number of shards the sweep is split into")
+    parser.add_argument("--days", type=int, default=30, help="Days of new data analyzed per customer")
+    parser.add_argument("--worker-id", default=None, help="Worker identifier. Defaults to host and pid")
+    args = parser.parse_args()
+
+    # Initializes the Firestore client used by AnalyticsEngine
+    create_app()
+
+    from app.init import db_client
+    from app.AdaptiveAnalyticsEngine.services.sharded_sweep import ShardedSweep
+
+    sweep = ShardedSweep(db_client, args.sweep_id, args.num_shards, worker_id=args.worker_id,
+                         days=args.days)
+    summary = sweep.run()
+    logging.info(f"Worker {summary['worker_id']} finished shards {summary['shards']}: "
+                 f"{summary['processed']} processed, {summary['failed']} failed, "
+                 f"LLM comparisons skipped by drift detection: {summary['llm_skips']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from src.backend.InsightsandRecommendation.app.db.AppActivityStore import (
+    append_sessions, bucket_ids_between, fetch_all_sessions, fetch_sessions_since, migrate_app_activity)
+from src.backend.InsightsandRecommendation.app.db.BatchedWriter import BatchedFirestoreWriter
+
+class FakeFirestore:
+    """Path-keyed Firestore stand-in counting the bytes of every document read"""
+
+    def __init__(self):
+        self.documents = {}
+        self.bytes_read = 0
+
+    def _read(self, path):
+        data = self.documents.get(path)
+        if data is not None:
+            self.bytes_read += len(json.dumps(data))
+        return SimpleNamespace(id=path.rsplit('/', 1)[-1], reference=SimpleNamespace(path=path),
+                               exists=data is not None, to_dict=lambda: data)
+
+    def collection(self, path):
+        db = self
+
+        class Collection:
+            def document(self, doc_id):
+                return Document(f"{path}/{doc_id}")
+
+            def stream(self):
+                children = sorted(p for p in db.documents if p.rsplit('/', 1)[0] == path)
+                return [db._read(p) for p in children]
+
+        class Document:
+            def __init__(self, doc_path):
+                self.path = doc_path
+                self.id = doc_path.rsplit('/', 1)[-1]
+
+            def get(self):
+                return db._read(self.path)
+
+            def collection(self, name):
+                return db.collection(f"{self.path}/{name}")
+
+        return Collection()
+
+    def get_all(self, references):
+        return [self._read(reference.path) for reference in references]
+
+    def batch(self):
+        db = self
+
+        class Batch:
+            def __init__(self):
+                self.operations = []
+
+            def set(self, reference, data, merge=False):
+                self.operations.append((reference.path, data))
+
+            def commit(self):
+                db.documents.update(dict(self.operations))
+
+        return Batch()
+
+def _sessions(days):
+    now = datetime.now()
+    return [{'date': (now - timedelta(days=day, hours=1)).isoformat(), 'visited': ['home', 'cards'],
+             'session_duration': 120} for day in range(days, 0, -1)]
+
+@pytest.fixture
+def db():
+    db = FakeFirestore()
+    db.documents['AppActivity/c1'] = {'sessions': _sessions(720)}
+    db.documents['AppActivity/c2'] = {'sessions': _sessions(3)}
+    return db
+
+def test_bucket_ids_between():
+    """Test that the bucket ids cover the window once each"""
+    start, end = datetime(2024, 1, 30, 15), datetime(2024, 3, 1)
+
+    assert bucket_ids_between(start, end, 'monthly') == ['2024-01', '2024-02', '2024-03']
+    assert bucket_ids_between(start, end, 'daily')[:2] == ['2024-01-30', '2024-01-31']
+    assert len(bucket_ids_between(start, end, 'daily')) == 32
+
+@pytest.mark.parametrize("layout", ["daily", "monthly"])
+def test_migrated_buckets_return_same_sessions(db, layout):
+    """Test that bucketed reads return the same sessions as the single document"""
+    source = db.documents['AppActivity/c1']
+    with BatchedFirestoreWriter(db, flush_interval=0) as writer:
+        summary = migrate_app_activity(db, writer, layout)
+    cutoff = datetime.now() - timedelta(days=30)
+
+    assert summary['clients'] == 2 and summary['sessions'] == 723
+    assert db.documents['AppActivity/c1'] is source
+    for client_id in ('c1', 'c2'):
+        assert fetch_sessions_since(db, client_id, cutoff, layout) == \
+               fetch_sessions_since(db, client_id, cutoff, 'document')
+    assert fetch_all_sessions(db, ['c1', 'c2'], layout) == fetch_all_sessions(db, ['c1', 'c2'], 'document')
+
+def test_append_sessions_dual_writes(db):
+    """Test that appended sessions reach every written layout once, matching on read"""
+    with BatchedFirestoreWriter(db, flush_interval=0) as writer:
+        migrate_app_activity(db, writer, 'daily', client_ids=['c2'])
+    new_sessions = [{'date': (datetime.now() - timedelta(minutes=minutes)).isoformat(), 'visited': ['loans'],
+                     'session_duration': 30} for minutes in (20, 10)]
+
+    append_sessions(db, 'c2', new_sessions, layouts=['document', 'daily'])
+    # A retried append does not duplicate the sessions
+    append_sessions(db, 'c2', new_sessions, layouts=['document', 'daily'])
+
+    cutoff = datetime.now() - timedelta(days=30)
+    sessions = fetch_sessions_since(db, 'c2', cutoff, 'daily')
+    assert len(sessions) == 5 and sessions[-2:] == new_sessions
+    assert fetch_sessions_since(db, 'c2', cutoff, 'document') == sessions
+
+def test_migration_requires_bucketed_layout(db):
+    """Test that migrating to the single document layout is rejected"""
+    with pytest.raises(ValueError):
+        migrate_app_activity(db, None, 'document')
+
+def test_benchmark_bytes_read_for_window(db):
+    """Test that a 30 day window reads a fraction of the bytes of the whole session document"""
+    cutoff = datetime.now() - timedelta(days=30)
+    db.bytes_read = 0
+    fetch_sessions_since(db, 'c1', cutoff, 'document')
+    document_bytes = db.bytes_read
+
+    results = {}
+    for layout in ('daily', 'monthly'):
+        with BatchedFirestoreWriter(db, flush_interval=0) as writer:
+            migrate_app_activity(db, writer, layout, client_ids=['c1'])
+        db.bytes_read = 0
+        fetch_sessions_since(db, 'c1', cutoff, layout)
+        results[layout] = db.bytes_read
+
+    assert results['daily'] < document_bytes / 10
+    assert results['monthly'] < document_bytes / 5
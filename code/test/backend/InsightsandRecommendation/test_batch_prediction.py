@@ -0,0 +1,249 @@
+import json
+import os
+from types import SimpleNamespace
+from unittest.mock import Mock
+import pytest
+from src.backend.InsightsandRecommendation.app.utils import BatchPrediction
+from src.backend.InsightsandRecommendation.app.utils.BatchPrediction import (
+    KEY_LABEL, LocalBatchPredictionBackend, VertexBatchPredictionBackend, batch_request_line, create_batch_backend,
+    read_results, run_batch_job, write_job_file)
+from src.backend.InsightsandRecommendation.app.InsightGenerator.GenerateCustomerInsights import (
+    generate_insights_in_bulk)
+from src.backend.InsightsandRecommendation.app.AdaptiveAnalyticsEngine.services.bulk_analysis import (
+    run_bulk_analysis)
+
+COMBINED_RESPONSE = {
+    'life_stage': {'primary_life_stage': 'family_formation', 'alternative_life_stages': [],
+                   'confidence_level': {'primary_stage': 80}, 'key_indicators': [], 'reasoning': 'Married'},
+    'life_events': {'detected_events': []},
+    'retention_risk': {'attrition_risk_level': 'low', 'risk_factors': [], 'protective_factors': [],
+                       'retention_strategies': [], 'attrition_probability': 0.1},
+    'spending_analysis': {'spending_profile': {}, 'financial_behavior': {}, 'risk_assessment': {},
+                          'personalized_recommendations': {}, 'anomaly_detection': {}},
+}
+
+PROFILE_CHANGE = {
+    "profile_change_summary": {"total_changes_detected": 0, "change_significance": "Minor",
+                               "changed_metrics": []},
+    "overall_profile_shift": {"primary_direction": "neutral", "key_observations": []}
+}
+
+
+def _prompt(request):
+    return request["contents"][0]["parts"][0]["text"]
+
+
+def test_job_file_round_trip(tmp_path):
+    lines = [batch_request_line("c1", "first", json_response=True),
+             batch_request_line("c2", "second", system_instruction="Be brief")]
+    assert lines[0]["request"]["generation_config"]["response_mime_type"] == "application/json"
+    assert lines[1]["request"]["system_instruction"] == {"parts": [{"text": "Be brief"}]}
+
+    input_path, output_path = tmp_path / "input.jsonl", tmp_path / "output.jsonl"
+    assert write_job_file(input_path, lines) == ["c1", "c2"]
+
+    backend = LocalBatchPredictionBackend(predict=lambda request: _prompt(request).upper())
+    backend.run(input_path, output_path)
+    assert read_results(output_path, ["c1", "c2"]) == {"c1": "FIRST", "c2": "SECOND"}
+
+
+def test_failed_and_unkeyed_results(tmp_path):
+    lines = [batch_request_line(key, key) for key in ("c1", "c2", "c3", "c4")]
+    results = [
+        # Services that only echo the request are matched through the key label
+        {"request": lines[0]["request"], "status": "",
+         "response": {"candidates": [{"content": {"parts": [{"text": "a"}, {"text": "b"}]}}]}},
+        {"key": "c2", "status": "RESOURCE_EXHAUSTED"},
+        {"key": "c3", "status": "", "response": {"candidates": []}},
+    ]
+    output_path = tmp_path / "output.jsonl"
+    output_path.write_text("\n".join(json.dumps(result) for result in results) + "\nnot json\n")
+
+    assert lines[0]["request"]["labels"][KEY_LABEL]
+    assert read_results(output_path, ["c1", "c2", "c3", "c4"]) == {"c1": "ab", "c2": None, "c3": None, "c4": None}
+
+
+def test_run_batch_job_deletes_job_files(tmp_path):
+    def predict(request):
+        if _prompt(request) == "boom":
+            raise RuntimeError("quota")
+        return "ok"
+
+    results = run_batch_job([batch_request_line("c1", "fine"), batch_request_line("c2", "boom")],
+                            LocalBatchPredictionBackend(predict), str(tmp_path))
+    assert results == {"c1": "ok", "c2": None}
+    assert run_batch_job([], LocalBatchPredictionBackend(predict), str(tmp_path)) == {}
+    assert os.listdir(tmp_path) == []
+
+    # Retention is opt-in, for debugging a job
+    run_batch_job([batch_request_line("c1", "fine")], LocalBatchPredictionBackend(predict), str(tmp_path),
+                  keep_files=True)
+    job_dir, = os.listdir(tmp_path)
+    assert sorted(os.listdir(tmp_path / job_dir)) == ["input.jsonl", "output.jsonl"]
+
+
+def test_vertex_backend_deletes_staged_files(tmp_path, monkeypatch):
+    """Test that the staged input and output objects are deleted once the results are downloaded"""
+    objects = {}
+
+    class Blob:
+        def __init__(self, name):
+            self.name = name
+
+        @classmethod
+        def from_string(cls, uri, client=None):
+            return cls(uri[len("gs://bucket/"):])
+
+        def upload_from_filename(self, path):
+            objects[self.name] = open(path).read()
+
+        def download_as_text(self):
+            return objects[self.name]
+
+        def delete(self):
+            del objects[self.name]
+
+    client = SimpleNamespace(list_blobs=lambda bucket, prefix: [Blob(name) for name in list(objects)
+                                                                if name.startswith(prefix)])
+
+    def submit(source_model, input_dataset, output_uri_prefix):
+        objects[f"{output_uri_prefix[len('gs://bucket/'):]}/predictions.jsonl"] = json.dumps(
+            {"key": "c1", "response": {"candidates": [{"content": {"parts": [{"text": "ok"}]}}]}})
+        return SimpleNamespace(has_ended=True, has_succeeded=True, resource_name="job",
+                               output_location=output_uri_prefix)
+
+    monkeypatch.setattr(BatchPrediction, "_vertex", lambda: (
+        SimpleNamespace(init=lambda **kwargs: None),
+        SimpleNamespace(Client=lambda project=None: client, Blob=Blob),
+        SimpleNamespace(BatchPredictionJob=SimpleNamespace(submit=submit))))
+
+    backend = VertexBatchPredictionBackend("gs://bucket/staging", "gemini-1.5-pro-002")
+    assert run_batch_job([batch_request_line("c1", "fine")], backend, str(tmp_path)) == {"c1": "ok"}
+    assert objects == {}
+
+
+def test_batch_backend_must_be_chosen(monkeypatch):
+    """Test that bulk mode does not silently fall back to interactive calls"""
+    monkeypatch.setattr(BatchPrediction.Config, "LLM_BATCH_BACKEND", None)
+    with pytest.raises(ValueError, match="LLM_BATCH_BACKEND"):
+        create_batch_backend()
+
+    monkeypatch.setattr(BatchPrediction.Config, "LLM_BATCH_BACKEND", "local")
+    assert isinstance(create_batch_backend(), LocalBatchPredictionBackend)
+
+
+def _customer_data(client_id):
+    return {
+        'customer_info': {'client_id': client_id},
+        'transactions': [
+            {'Transaction_Date': '2024-01-01', 'Transaction_Amount': 1500, 'Merchant': 'Service Stations',
+             'Merchant_Category': 'Automotive Services'},
+        ],
+        'app_activity': [],
+    }
+
+
+def test_initial_insights_in_bulk(tmp_path, monkeypatch):
+    customers = [SimpleNamespace(id=client_id) for client_id in ("c1", "c2", "c3")]
+    loads = []
+
+    def load_customer_data(customer):
+        loads.append(customer.id)
+        if customer.id == "c3":
+            raise ValueError("no transactions")
+        return _customer_data(customer.id)
+
+    def predict(request):
+        # c2 gets a response without its life_stage section
+        response = dict(COMBINED_RESPONSE)
+        if '"client_id":"c2"' in _prompt(request):
+            del response['life_stage']
+        return "```json\n" + json.dumps(response) + "\n```"
+
+    combined = generate_insights_in_bulk.__globals__['combined_insights_from_response'].__globals__
+    life_stage = Mock(return_value={'primary_life_stage': 'recomputed'})
+    monkeypatch.setitem(combined, 'analyze_life_stage', life_stage)
+
+    persisted, done = {}, []
+    summary = generate_insights_in_bulk(customers, load_customer_data, persisted.__setitem__,
+                                        backend=LocalBatchPredictionBackend(predict), work_dir=str(tmp_path),
+                                        on_customer_done=lambda client_id, error: done.append((client_id, error)))
+
+    assert summary == {"processed": ["c1", "c2"], "failed": {"c3": "no transactions"}}
+    assert sorted(done) == [("c1", None), ("c2", None), ("c3", "no transactions")]
+    assert persisted["c1"]["life_stage"] == COMBINED_RESPONSE["life_stage"]
+    assert persisted["c1"]["spending_patterns"]["llm_analysis"] == COMBINED_RESPONSE["spending_analysis"]
+    assert persisted["c2"]["life_stage"] == {'primary_life_stage': 'recomputed'}
+    # Only the customer needing a fallback analyzer is loaded a second time
+    assert loads == ["c1", "c2", "c3", "c2"]
+    life_stage.assert_called_once()
+
+
+def test_initial_insights_in_bulk_with_statistical_scorers(tmp_path, monkeypatch):
+    customers = [SimpleNamespace(id="c1")]
+    combined = generate_insights_in_bulk.__globals__['combined_insights_from_response'].__globals__
+    monkeypatch.setattr(combined['Config'], 'STATISTICAL_INSIGHT_SCORERS', True)
+    monkeypatch.setitem(combined, 'analyze_statistically', lambda data, insights: {
+        'life_stage': {'primary_life_stage': 'statistical'},
+        'retention_risk': {'attrition_risk_level': 'statistical'}})
+    prompts = []
+
+    def predict(request):
+        prompts.append(_prompt(request))
+        return json.dumps({key: COMBINED_RESPONSE[key] for key in ('life_events', 'spending_analysis')})
+
+    persisted = {}
+    summary = generate_insights_in_bulk(customers, lambda customer: _customer_data(customer.id),
+                                        persisted.__setitem__, backend=LocalBatchPredictionBackend(predict),
+                                        work_dir=str(tmp_path))
+
+    assert summary == {"processed": ["c1"], "failed": {}}
+    assert '"life_stage"' not in prompts[0] and '"retention_risk"' not in prompts[0]
+    assert persisted["c1"]["life_stage"] == {'primary_life_stage': 'statistical'}
+    assert persisted["c1"]["retention_risk"] == {'attrition_risk_level': 'statistical'}
+    assert persisted["c1"]["life_events"] == COMBINED_RESPONSE["life_events"]
+
+
+class FakeEngine:
+    def __init__(self, client_id, prepared):
+        self.client_id = client_id
+        self.prepared = prepared
+        self.completed = None
+
+    def prepare_analysis(self, days):
+        if isinstance(self.prepared, Exception):
+            raise self.prepared
+        return self.prepared
+
+    def complete_analysis(self, prepared, insights):
+        self.completed = insights
+        return insights
+
+
+def test_adaptive_analytics_in_bulk(tmp_path, monkeypatch):
+    skipped = {'profile_change_summary': {'changed_metrics': []}, 'llm_skipped': True}
+    engines = [
+        FakeEngine("c1", {'prompt': 'drifted c1', 'current_insights': {}}),
+        FakeEngine("c2", {'result': skipped}),
+        FakeEngine("c3", {'prompt': 'drifted c3', 'current_insights': {}}),
+        FakeEngine("c4", RuntimeError("fetch failed")),
+    ]
+
+    def predict(request):
+        # c3 answers off-schema and is retried interactively
+        return json.dumps(PROFILE_CHANGE) if _prompt(request).endswith("c1") else '{"unexpected": 1}'
+
+    interactive = Mock(return_value={"interactive": True})
+    monkeypatch.setitem(run_bulk_analysis.__globals__, 'analyze_with_llm', interactive)
+
+    done = []
+    summary = run_bulk_analysis(engines, backend=LocalBatchPredictionBackend(predict), work_dir=str(tmp_path),
+                                on_customer_done=lambda client_id, result, error: done.append((client_id, error)))
+
+    assert engines[0].completed == PROFILE_CHANGE
+    assert engines[2].completed == {"interactive": True}
+    interactive.assert_called_once_with('drifted c3')
+    assert sorted(done) == [("c1", None), ("c2", None), ("c3", None), ("c4", "fetch failed")]
+    assert summary["processed"] == 3 and summary["failed"] == 1
+    assert summary["batch_requests"] == 2 and summary["interactive_fallbacks"] == 1
+    assert summary["llm_skips"]["llm_calls_saved"] == 1
@@ -0,0 +1,63 @@
+import json
+import pandas as pd
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeSpendingPattern import (
+    compute_spending_statistics)
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.BatchSpendingStatistics import (
+    build_transactions_frame, compute_spending_statistics_batch, compute_spending_statistics_chunks)
+
+def _transactions_by_client():
+    return {
+        'C1': [
+            {'Merchant': 'UNITED AIRLINES', 'Merchant_Category': 'Travel',
+             'Transaction_Amount': '100.0', 'Transaction_Date': '2024-01-05'},
+            {'Merchant': 'Grocery Stores, Supermarkets', 'Merchant_Category': 'Groceries',
+             'Transaction_Amount': '50.5', 'Transaction_Date': '2024-01-20'},
+            {'Merchant': 'UNITED AIRLINES', 'Merchant_Category': 'Travel',
+             'Transaction_Amount': '200.0', 'Transaction_Date': '2024-02-03'},
+            {'Merchant': 'Unknown Shop', 'Merchant_Category': 'Retail',
+             'Transaction_Amount': '10.0', 'Transaction_Date': '2024-03-15'},
+        ],
+        'C2': [
+            {'Merchant': 'Grocery Stores, Supermarkets', 'Merchant_Category': 'Groceries',
+             'Transaction_Amount': '80.0', 'Transaction_Date': '2023-06-01'},
+            {'Merchant': 'Grocery Stores, Supermarkets', 'Merchant_Category': 'Groceries',
+             'Transaction_Amount': '20.0', 'Transaction_Date': '2024-06-30'},
+            {'Merchant': 'Unknown Shop', 'Merchant_Category': 'Retail',
+             'Transaction_Amount': 'invalid', 'Transaction_Date': '2024-07-01'},
+        ],
+        'C3': [],
+    }
+
+def _normalized(statistics):
+    # Round-trip through JSON so NaN and numpy scalars compare like the API payload
+    return json.loads(json.dumps(statistics, default=str, sort_keys=True))
+
+def test_batch_matches_per_customer_statistics():
+    """Test that the batch analysis emits the per-customer insight dicts"""
+    transactions_by_client = _transactions_by_client()
+    batch = compute_spending_statistics_batch(build_transactions_frame(transactions_by_client))
+
+    assert set(batch) == {'C1', 'C2'}
+    for client_id in batch:
+        expected = compute_spending_statistics(transactions_by_client[client_id])
+        assert _normalized(batch[client_id]) == _normalized(expected)
+
+def test_batch_does_not_mutate_input():
+    """Test that the caller's frame keeps its raw columns"""
+    frame = build_transactions_frame(_transactions_by_client())
+    compute_spending_statistics_batch(frame)
+
+    assert len(frame) == 7
+    assert not pd.api.types.is_numeric_dtype(frame['Transaction_Amount'])
+
+def test_batch_empty_input():
+    """Test that an empty batch yields no statistics"""
+    assert compute_spending_statistics_batch(pd.DataFrame()) == {}
+    assert compute_spending_statistics_batch(build_transactions_frame({'C3': []})) == {}
+
+def test_chunked_statistics_match_one_batch():
+    """Test that analyzing a customer stream in chunks gives the same statistics as one batch"""
+    transactions_by_client = _transactions_by_client()
+    chunked = dict(compute_spending_statistics_chunks(iter(transactions_by_client.items()), chunk_size=1))
+    batch = compute_spending_statistics_batch(build_transactions_frame(transactions_by_client))
+    assert _normalized(chunked) == _normalized(batch)
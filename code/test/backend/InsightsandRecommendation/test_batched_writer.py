@@ -0,0 +1,132 @@
+import threading
+import time
+import pytest
+from src.backend.InsightsandRecommendation.app.db.BatchedWriter import BatchedFirestoreWriter
+
+class FakeBatch:
+    def __init__(self, db):
+        self.db = db
+        self.operations = []
+
+    def set(self, reference, data, merge=False):
+        self.operations.append((reference.path, data, merge))
+
+    def commit(self):
+        if len(self.operations) > 500:
+            raise ValueError("maximum 500 writes allowed per request")
+        with self.db.lock:
+            if self.db.failures:
+                self.db.failures -= 1
+                raise ConnectionError("deadline exceeded")
+        time.sleep(self.db.commit_delay)
+        with self.db.lock:
+            self.db.commits.append(self.operations)
+            for path, data, _ in self.operations:
+                self.db.documents[path] = data
+
+class FakeReference:
+    def __init__(self, path):
+        self.path = path
+
+    def collection(self, name):
+        return FakeCollection(f"{self.path}/{name}")
+
+class FakeCollection:
+    counter = 0
+
+    def __init__(self, path):
+        self.path = path
+
+    def document(self, doc_id=None):
+        if doc_id is None:
+            FakeCollection.counter += 1
+            doc_id = f"auto{FakeCollection.counter}"
+        return FakeReference(f"{self.path}/{doc_id}")
+
+class FakeFirestore:
+    """Local Firestore stand-in recording committed write batches"""
+
+    def __init__(self, failures=0, commit_delay=0.0):
+        self.failures = failures
+        self.commit_delay = commit_delay
+        self.commits = []
+        self.documents = {}
+        self.lock = threading.Lock()
+
+    def collection(self, name):
+        return FakeCollection(name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+def test_writes_grouped_into_batches_of_at_most_500():
+    """Test that queued writes are committed in full batches without splitting a group"""
+    db = FakeFirestore()
+    with BatchedFirestoreWriter(db, flush_interval=60) as writer:
+        for i in range(300):
+            writer.write([(db.collection("CustomerInsights").document(f"c{i}"), {"i": i}, False),
+                          (db.collection("CustomerData").document(f"c{i}").collection("life_stage").document(),
+                           {"i": i}, False)])
+
+    assert writer.committed == 600
+    assert len(db.documents) == 600
+    assert all(len(commit) <= 500 and len(commit) % 2 == 0 for commit in db.commits)
+    assert len(db.commits) < 10
+
+def test_flush_on_time_threshold():
+    """Test that a partial batch is committed once the flush interval has passed"""
+    db = FakeFirestore()
+    writer = BatchedFirestoreWriter(db, flush_interval=0.05)
+    writer.set(db.collection("CustomerInsights").document("c1"), {"a": 1})
+    time.sleep(0.3)
+
+    assert db.documents == {"CustomerInsights/c1": {"a": 1}}
+    writer.close()
+
+def test_failed_commits_are_retried():
+    """Test that a transient commit failure is retried and a permanent one recorded"""
+    db = FakeFirestore(failures=2)
+    with BatchedFirestoreWriter(db, max_retries=3, retry_backoff=0.01) as writer:
+        writer.add(db.collection("CustomerData"), {"a": 1})
+    assert writer.committed == 1
+    assert writer.errors == []
+
+    db = FakeFirestore(failures=10)
+    with BatchedFirestoreWriter(db, max_retries=1, retry_backoff=0.01) as writer:
+        writer.set(db.collection("CustomerInsights").document("c1"), {"a": 1})
+    assert writer.committed == 0
+    assert len(writer.errors) == 1
+
+def test_failed_commits_are_reported_to_their_writers():
+    """Test that every write in a permanently failed batch has its error handler called"""
+    db = FakeFirestore(failures=10)
+    failed = []
+    with BatchedFirestoreWriter(db, max_retries=1, retry_backoff=0.01, flush_interval=60) as writer:
+        for client_id in ("c1", "c2"):
+            customer_writer = writer.with_error_handler(lambda error, client_id=client_id: failed.append(client_id))
+            customer_writer.set(db.collection("CustomerInsights").document(client_id), {"a": 1})
+        writer.set(db.collection("CustomerInsights").document("c3"), {"a": 1})
+
+    assert failed == ["c1", "c2"]
+    assert len(writer.errors) == 1
+
+def test_backpressure_bounds_pending_writes():
+    """Test that writers block while max_pending writes are queued or in flight"""
+    db = FakeFirestore(commit_delay=0.05)
+    peak = 0
+    with BatchedFirestoreWriter(db, max_batch_size=10, max_pending=20, flush_interval=0) as writer:
+        for i in range(100):
+            writer.set(db.collection("CustomerInsights").document(f"c{i}"), {"i": i})
+            peak = max(peak, writer._queued + writer._in_flight)
+
+    assert peak <= 20
+    assert len(db.documents) == 100
+
+def test_closed_writer_rejects_writes():
+    """Test that writes after close are rejected"""
+    db = FakeFirestore()
+    writer = BatchedFirestoreWriter(db)
+    writer.close()
+
+    with pytest.raises(RuntimeError):
+        writer.set(db.collection("CustomerInsights").document("c1"), {"a": 1})
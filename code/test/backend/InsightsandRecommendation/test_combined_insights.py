@@ -0,0 +1,90 @@
+import json
+import pytest
+from unittest.mock import patch
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeCombinedInsights import analyze_combined_insights
+
+MODULE = 'src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeCombinedInsights'
+
+@pytest.fixture
+def customer_data():
+    return {
+        'customer_info': {'age': 35, 'marital_status': 'married'},
+        'transactions': [
+            {'Transaction_Date': '2024-01-01', 'Transaction_Amount': 1500, 'Merchant': 'Service Stations',
+             'Merchant_Category': 'Automotive Services'},
+            {'Transaction_Date': '2024-02-15', 'Transaction_Amount': 450, 'Merchant': 'HILTON HOTELS',
+             'Merchant_Category': 'Hotels & Accommodations'},
+        ]
+    }
+
+@pytest.fixture
+def combined_response():
+    return {
+        'life_stage': {'primary_life_stage': 'family_formation', 'alternative_life_stages': [],
+                       'confidence_level': {'primary_stage': 80}, 'key_indicators': [], 'reasoning': 'Married'},
+        'life_events': {'detected_events': []},
+        'retention_risk': {'attrition_risk_level': 'low', 'risk_factors': [], 'protective_factors': [],
+                           'retention_strategies': [], 'attrition_probability': 0.1},
+        'spending_analysis': {'spending_profile': {}, 'financial_behavior': {}, 'risk_assessment': {},
+                              'personalized_recommendations': {}, 'anomaly_detection': {}},
+    }
+
+def test_single_call_splits_sections(customer_data, combined_response):
+    """Test that one response is split into the four insight documents"""
+    with patch(f'{MODULE}.generate_content', return_value=json.dumps(combined_response)) as generate, \
+            patch(f'{MODULE}.analyze_life_stage') as life_stage:
+        insights = analyze_combined_insights(customer_data)
+
+    generate.assert_called_once()
+    life_stage.assert_not_called()
+    assert insights['life_stage']['primary_life_stage'] == 'family_formation'
+    assert insights['retention_risk']['attrition_risk_level'] == 'low'
+    assert insights['spending_patterns']['llm_analysis'] == combined_response['spending_analysis']
+    assert insights['spending_patterns']['statistical_spend_insights']['additional_insights']['total_transactions'] == 2
+
+def test_invalid_section_falls_back(customer_data, combined_response):
+    """Test that only the malformed section is recomputed individually"""
+    del combined_response['retention_risk']['attrition_probability']
+    with patch(f'{MODULE}.generate_content', return_value=json.dumps(combined_response)), \
+            patch(f'{MODULE}.analyze_retention_risk', return_value={'attrition_risk_level': 'high'}) as retention, \
+            patch(f'{MODULE}.detect_life_events') as life_events:
+        insights = analyze_combined_insights(customer_data)
+
+    retention.assert_called_once_with(customer_data)
+    life_events.assert_not_called()
+    assert insights['retention_risk'] == {'attrition_risk_level': 'high'}
+
+def test_unparseable_response_falls_back_to_all(customer_data):
+    """Test that a non-JSON response falls back for every section"""
+    with patch(f'{MODULE}.generate_content', return_value='not json'), \
+            patch(f'{MODULE}.analyze_life_stage', return_value={'a': 1}), \
+            patch(f'{MODULE}.detect_life_events', return_value={'b': 2}), \
+            patch(f'{MODULE}.analyze_retention_risk', return_value={'c': 3}), \
+            patch(f'{MODULE}.llm_analyze_spending_insights', return_value={'d': 4}):
+        insights = analyze_combined_insights(customer_data)
+
+    assert insights['life_stage'] == {'a': 1}
+    assert insights['life_events'] == {'b': 2}
+    assert insights['retention_risk'] == {'c': 3}
+    assert insights['spending_patterns']['llm_analysis'] == {'d': 4}
+
+def test_statistical_scorers_replace_llm_sections(customer_data, combined_response):
+    """Test that the statistical scorers answer life stage and retention risk and leave them out of the prompt"""
+    del combined_response['life_stage'], combined_response['retention_risk']
+    with patch(f'{MODULE}.Config.STATISTICAL_INSIGHT_SCORERS', True), \
+            patch(f'{MODULE}.generate_content', return_value=json.dumps(combined_response)) as generate, \
+            patch(f'{MODULE}.analyze_statistically', return_value={
+                'life_stage': {'primary_life_stage': 'statistical'},
+                'retention_risk': {'attrition_risk_level': 'statistical'}}), \
+            patch(f'{MODULE}.analyze_life_stage') as life_stage, \
+            patch(f'{MODULE}.analyze_retention_risk') as retention:
+        insights = analyze_combined_insights(customer_data)
+
+    prompt = generate.call_args.args[0]
+    assert '"life_stage"' not in prompt and '"retention_risk"' not in prompt
+    assert '1. life_events' in prompt and '2. spending_analysis' in prompt
+    life_stage.assert_not_called()
+    retention.assert_not_called()
+    assert insights['life_stage'] == {'primary_life_stage': 'statistical'}
+    assert insights['retention_risk'] == {'attrition_risk_level': 'statistical'}
+    assert insights['life_events'] == combined_response['life_events']
@@ -0,0 +1,65 @@
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from src.backend.InsightsandRecommendation.app.db.CustomerDataLoader import CustomerDataLoader
+
+def _snapshot(doc_id, data):
+    return SimpleNamespace(id=doc_id, to_dict=lambda: data)
+
+def _fake_db(delay=0.05):
+    """Firestore stand-in whose reads sleep and count concurrent and batch calls"""
+    state = {"active": 0, "peak": 0, "get_all_calls": 0}
+    lock = threading.Lock()
+
+    def read(result):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(delay)
+        with lock:
+            state["active"] -= 1
+        return result
+
+    def collection(name):
+        def document(doc_id):
+            doc = MagicMock()
+            doc.id = doc_id
+            doc.collection.return_value.stream.side_effect = lambda: read(
+                [_snapshot("t1", {"Transaction_Amount": "10", "client": doc_id})])
+            return doc
+        return SimpleNamespace(document=document)
+
+    def get_all(references):
+        state["get_all_calls"] += 1
+        return read([_snapshot(ref.id, {"sessions": [{"client": ref.id}]}) for ref in references
+                     if ref.id != "client_2"])
+
+    return SimpleNamespace(collection=collection, get_all=get_all), state
+
+def test_prefetch_loads_customers_concurrently_with_batched_reads():
+    """Test that prefetched customers are read concurrently and AppActivity is batch read"""
+    db, state = _fake_db()
+    customers = [_snapshot(f"client_{i}", {"name": i}) for i in range(6)]
+
+    with CustomerDataLoader(db, max_workers=8, lookahead=3) as loader:
+        ordered = list(loader.prefetch(customers))
+        data = [loader.load(customer) for customer in ordered]
+
+    assert [customer.id for customer in ordered] == [customer.id for customer in customers]
+    assert data[0] == {"customer_info": {"name": 0},
+                       "transactions": [{"Transaction_Amount": "10", "client": "client_0"}],
+                       "app_activity": [{"client": "client_0"}]}
+    assert data[2]["app_activity"] == []
+    assert state["get_all_calls"] == 2
+    assert state["peak"] > 1
+
+def test_load_without_prefetch():
+    """Test that a customer that was not prefetched is loaded on demand"""
+    db, state = _fake_db(delay=0)
+
+    with CustomerDataLoader(db, max_workers=2) as loader:
+        data = loader.load(_snapshot("client_1", {"name": 1}))
+
+    assert data["app_activity"] == [{"client": "client_1"}]
+    assert loader._pending == {}
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+import pandas as pd
+import pytest
+from src.backend.InsightsandRecommendation.app.AdaptiveAnalyticsEngine.analytics_engine import AnalyticsEngine
+from src.backend.InsightsandRecommendation.app.AdaptiveAnalyticsEngine.services.drift_detector import (
+    DriftSkipCounter, detect_drift)
+from src.backend.InsightsandRecommendation.app.AdaptiveAnalyticsEngine.services.summarize_data import summarize_data
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeSpendingPattern import (
+    compute_spending_statistics)
+
+ENGINE_MODULE = 'src.backend.InsightsandRecommendation.app.AdaptiveAnalyticsEngine.analytics_engine'
+
+def _transactions(days, scale=1.0, category='Groceries'):
+    today = datetime(2024, 6, 30)
+    return [{'Merchant': 'Grocery Stores, Supermarkets' if day % 2 else 'UNITED AIRLINES',
+             'Merchant_Category': category if day % 2 else 'Travel',
+             'Transaction_Amount': round((40 + day % 7) * scale, 2),
+             'Transaction_Date': (today - timedelta(days=day)).strftime('%Y-%m-%d')}
+            for day in range(days)]
+
+@pytest.fixture
+def historical_context():
+    return {'spending_patterns': {'statistical_spend_insights': compute_spending_statistics(_transactions(360)),
+                                  'llm_analysis': {}}}
+
+def _summaries(transactions):
+    return summarize_data({'transactions': pd.DataFrame(transactions), 'app_activity': pd.DataFrame()})
+
+def test_stable_spending_is_within_threshold(historical_context):
+    """Test that new data in line with the stored profile does not drift"""
+    drift = detect_drift(historical_context, _summaries(_transactions(30)), 30, 0.3)
+
+    assert not drift['exceeded']
+    assert drift['score'] < 0.1
+    assert set(drift['metrics']) == {'monthly_spend', 'average_transaction', 'category_mix'}
+
+def test_spending_shift_exceeds_threshold(historical_context):
+    """Test that a doubled spend or a new category mix is significant"""
+    doubled = detect_drift(historical_context, _summaries(_transactions(30, scale=2)), 30, 0.3)
+    new_mix = detect_drift(historical_context, _summaries(_transactions(30, category='Healthcare')), 30, 0.3)
+
+    assert doubled['exceeded'] and doubled['reason'] in ('monthly_spend', 'average_transaction')
+    assert new_mix['exceeded'] and new_mix['reason'] == 'category_mix'
+
+def test_spending_type_mix_covers_the_window_only(historical_context):
+    """Test that the spending type mix is compared for the new transactions, not the lifetime totals"""
+    stable = _transactions(30)
+    drift = detect_drift(historical_context, _summaries(stable), 30, 0.3, transactions=pd.DataFrame(stable))
+    assert not drift['exceeded'] and drift['metrics']['spending_type_mix'] < 0.1
+
+    # Same merchant categories, but every purchase is now travel
+    travel_only = [dict(transaction, Merchant='UNITED AIRLINES') for transaction in stable]
+    drift = detect_drift(historical_context, _summaries(travel_only), 30, 0.3, transactions=travel_only)
+    assert drift['exceeded'] and drift['reason'] == 'spending_type_mix'
+
+def test_missing_baseline_or_new_data():
+    """Test that customers without a baseline go to the LLM and customers without new data do not"""
+    assert detect_drift({}, _summaries(_transactions(30)), 30, 0.3)['reason'] == 'no_baseline'
+    assert detect_drift({'spending_patterns': {'error': 'failed'}}, {}, 30, 0.3)['exceeded']
+
+    context = {'spending_patterns': compute_spending_statistics(_transactions(60))}
+    drift = detect_drift(context, _summaries([]), 30, 0.3)
+    assert not drift['exceeded'] and drift['reason'] == 'no_new_transactions'
+
+def test_engine_skips_llm_without_drift(historical_context):
+    """Test that run_analysis only calls the LLM when the drift exceeds the threshold"""
+    with patch(f'{ENGINE_MODULE}.db_client', Mock()):
+        engine = AnalyticsEngine(client_id='c1')
+    engine.data_fetcher = Mock()
+    engine.data_fetcher.fetch_historical_context.return_value = historical_context
+    engine.update_spending_statistics = Mock(return_value={})
+    engine.customer_insights_updater = Mock()
+    counter = DriftSkipCounter()
+
+    with patch(f'{ENGINE_MODULE}.analyze_with_llm', return_value={'profile_change_summary': {}}) as llm:
+        engine.data_fetcher.fetch_new_data.return_value = {
+            'transactions': pd.DataFrame(_transactions(30)), 'app_activity': pd.DataFrame()}
+        counter.record(engine.run_analysis(30))
+        assert llm.call_count == 0
+
+        engine.data_fetcher.fetch_new_data.return_value = {
+            'transactions': pd.DataFrame(_transactions(30, scale=3)), 'app_activity': pd.DataFrame()}
+        counter.record(engine.run_analysis(30))
+        assert llm.call_count == 1
+
+    assert engine.customer_insights_updater.update_customer_insights.call_count == 1
+    assert counter.summary() == {'analyzed': 2, 'llm_calls': 1, 'llm_calls_saved': 1, 'skip_rate': 0.5}
+
+def test_skip_drift_check_always_runs_the_llm(historical_context):
+    """Test that skip_drift_check sends customers without drift to the LLM comparison"""
+    with patch(f'{ENGINE_MODULE}.db_client', Mock()):
+        engine = AnalyticsEngine(client_id='c1')
+    engine.data_fetcher = Mock()
+    engine.data_fetcher.fetch_historical_context.return_value = historical_context
+    engine.data_fetcher.fetch_new_data.return_value = {
+        'transactions': pd.DataFrame(_transactions(30)), 'app_activity': pd.DataFrame()}
+    engine.update_spending_statistics = Mock(return_value={})
+    engine.customer_insights_updater = Mock()
+
+    with patch(f'{ENGINE_MODULE}.analyze_with_llm', return_value={'profile_change_summary': {}}) as llm:
+        assert engine.run_analysis(30)['llm_skipped']
+        engine.run_analysis(30, skip_drift_check=True)
+        assert llm.call_count == 1
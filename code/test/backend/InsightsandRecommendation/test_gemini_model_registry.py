@@ -0,0 +1,75 @@
+import threading
+from types import SimpleNamespace
+import pytest
+from src.backend.InsightsandRecommendation.app.utils import GeminiModelRegistry as registry_module
+from src.backend.InsightsandRecommendation.app.utils.GeminiModelRegistry import GeminiModelRegistry
+
+MODEL_NAME = "models/gemini-1.5-pro-latest"
+GENERATION_CONFIG = {"temperature": 1, "response_mime_type": "application/json"}
+
+@pytest.fixture
+def genai(monkeypatch):
+    """Fake google.generativeai counting configure calls and model constructions"""
+    fake = SimpleNamespace(configure_calls=[], models=[])
+
+    class FakeGenerativeModel:
+        def __init__(self, model_name, system_instruction=None, generation_config=None, safety_settings=None):
+            self.model_name = model_name
+            self.system_instruction = system_instruction
+            self.generation_config = generation_config
+            fake.models.append(self)
+
+    fake.GenerativeModel = FakeGenerativeModel
+    fake.configure = lambda api_key: fake.configure_calls.append(api_key)
+    monkeypatch.setattr(registry_module, "genai", fake)
+    return fake
+
+@pytest.fixture
+def registry(genai):
+    return GeminiModelRegistry(api_key="test-key")
+
+def test_registry_reuses_model_per_configuration(registry, genai):
+    """Test that the same configuration returns the same model instance"""
+    model = registry.get_model(MODEL_NAME, " ", GENERATION_CONFIG)
+    assert registry.get_model(MODEL_NAME, " ", dict(reversed(GENERATION_CONFIG.items()))) is model
+    assert registry.get_model(MODEL_NAME, "You are an analyst", GENERATION_CONFIG) is not model
+    assert registry.get_model(MODEL_NAME, " ", {"temperature": 0}) is not model
+
+    assert len(genai.models) == 3
+    assert model.system_instruction == " " and model.generation_config == GENERATION_CONFIG
+    assert genai.configure_calls == ["test-key"]
+
+def test_registry_is_thread_safe(registry, genai):
+    """Test that concurrent first use builds a single model"""
+    models = []
+    barrier = threading.Barrier(16)
+
+    def get_model():
+        barrier.wait()
+        models.append(registry.get_model(MODEL_NAME, " ", GENERATION_CONFIG))
+
+    threads = [threading.Thread(target=get_model) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(model) for model in models}) == 1
+    assert len(genai.models) == 1 and len(genai.configure_calls) == 1
+
+def test_registry_requires_api_key(monkeypatch, genai):
+    """Test that a missing API key is reported"""
+    monkeypatch.setattr(registry_module.Config, "GEMINI_API_KEY", None)
+    with pytest.raises(ValueError, match="GEMINI_API_KEY is not set"):
+        GeminiModelRegistry().get_model(MODEL_NAME)
+    assert not genai.models
+
+def test_repeated_calls_skip_model_setup(registry, genai):
+    """Test that per-call lookups neither reconfigure the SDK nor rebuild the model"""
+    for _ in range(500):
+        registry.get_model(MODEL_NAME, " ", GENERATION_CONFIG)
+    assert len(genai.models) == 1 and len(genai.configure_calls) == 1
+
+    registry.clear()
+    registry.get_model(MODEL_NAME, " ", GENERATION_CONFIG)
+    assert len(genai.models) == 2 and len(genai.configure_calls) == 2
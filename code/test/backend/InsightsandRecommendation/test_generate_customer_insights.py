@@ -0,0 +1,79 @@
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from src.backend.InsightsandRecommendation.app.InsightGenerator import GenerateCustomerInsights
+from src.backend.InsightsandRecommendation.app.InsightGenerator.GenerateCustomerInsights import generate_insights_for_customers
+
+@pytest.fixture
+def customers():
+    return [SimpleNamespace(id=f"client_{i}") for i in range(6)]
+
+@pytest.fixture
+def slow_analyzers():
+    """Analyzers that sleep and track the peak number of concurrent calls"""
+    state = {"active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def make_analyzer(key):
+        def analyzer(data):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.05)
+            with lock:
+                state["active"] -= 1
+            if data["customer_info"]["fail"] and key == "retention_risk":
+                raise RuntimeError("Gemini unavailable")
+            return {"key": key}
+        return analyzer
+
+    analyzers = {key: make_analyzer(key) for key in GenerateCustomerInsights.INSIGHT_ANALYZERS}
+    with patch.dict(GenerateCustomerInsights.INSIGHT_ANALYZERS, analyzers):
+        yield state
+
+def test_customers_processed_concurrently(customers, slow_analyzers):
+    """Test that analyzers of several customers run at the same time"""
+    persisted = {}
+    summary = generate_insights_for_customers(
+        customers,
+        load_customer_data=lambda customer: {"customer_info": {"fail": False}, "transactions": []},
+        persist_insights=lambda client_id, insights: persisted.setdefault(client_id, insights),
+        max_customers=2)
+
+    assert sorted(summary["processed"]) == sorted(c.id for c in customers)
+    assert summary["failed"] == {}
+    assert set(persisted["client_0"]) == set(GenerateCustomerInsights.INSIGHT_ANALYZERS)
+    assert slow_analyzers["peak"] > 1
+    assert slow_analyzers["peak"] <= 2 * len(GenerateCustomerInsights.INSIGHT_ANALYZERS)
+
+def test_customer_failure_does_not_abort_batch(customers, slow_analyzers):
+    """Test that a failing customer is reported while the rest are processed"""
+    persisted = {}
+    summary = generate_insights_for_customers(
+        customers,
+        load_customer_data=lambda customer: {"customer_info": {"fail": customer.id == "client_3"},
+                                             "transactions": []},
+        persist_insights=lambda client_id, insights: persisted.setdefault(client_id, insights),
+        max_customers=3)
+
+    assert list(summary["failed"]) == ["client_3"]
+    assert "Gemini unavailable" in summary["failed"]["client_3"]
+    assert len(summary["processed"]) == len(customers) - 1
+    assert "client_3" not in persisted
+
+def test_analyzers_run_with_the_sweep_priority(customers):
+    """Test that analyzer threads inherit the priority class of the calling sweep"""
+    rate_limiter = GenerateCustomerInsights.with_current_priority.__globals__
+    seen = set()
+    analyzers = {key: lambda data: seen.add(rate_limiter["current_priority"]()) or {}
+                 for key in GenerateCustomerInsights.INSIGHT_ANALYZERS}
+
+    with patch.dict(GenerateCustomerInsights.INSIGHT_ANALYZERS, analyzers), \
+            rate_limiter["llm_priority"](rate_limiter["PRIORITY_BATCH"]):
+        generate_insights_for_customers(
+            customers, load_customer_data=lambda customer: {}, persist_insights=lambda client_id, insights: None,
+            max_customers=2, fused=False)
+
+    assert seen == {rate_limiter["PRIORITY_BATCH"]}
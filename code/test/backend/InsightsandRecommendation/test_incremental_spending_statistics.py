@@ -0,0 +1,123 @@
+import json
+import pandas as pd
+import pytest
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeSpendingPattern import (
+    compute_spending_statistics)
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.IncrementalSpendingStatistics import (
+    HISTOGRAM_RELATIVE_ACCURACY, SpendingStatisticsState)
+
+def _transactions():
+    merchants = [('UNITED AIRLINES', 'Travel'), ('Grocery Stores, Supermarkets', 'Groceries'),
+                 ('Unknown Shop', 'Retail'), ('Grocery Stores, Supermarkets', 'Groceries')]
+    dates = pd.date_range('2023-01-03', '2024-06-30', freq='5D')
+    return [{
+        'Merchant': merchants[i % len(merchants)][0],
+        'Merchant_Category': merchants[i % len(merchants)][1],
+        'Transaction_Amount': f"{(i * 37) % 250 + 10.25:.2f}",
+        'Transaction_Date': date.strftime('%Y-%m-%d'),
+    } for i, date in enumerate(dates)]
+
+def _normalized(statistics):
+    # Round floats so running sums compare equal to full recomputation
+    def normalize(value):
+        if isinstance(value, float):
+            return None if value != value else round(value, 6)
+        if isinstance(value, dict):
+            return {key: normalize(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [normalize(item) for item in value]
+        return value
+    return normalize(json.loads(json.dumps(statistics, default=str)))
+
+def assert_matches_full_recomputation(statistics, transactions):
+    """Compare with compute_spending_statistics; the histogram median is approximate"""
+    expected = _normalized(compute_spending_statistics(transactions))
+    statistics = _normalized(statistics)
+    summary, expected_summary = (stats['spending_category_insights']['spending_summary']
+                                 for stats in (statistics, expected))
+    assert summary.pop('median_transaction_amount') == pytest.approx(
+        expected_summary.pop('median_transaction_amount'), rel=HISTOGRAM_RELATIVE_ACCURACY)
+    assert statistics == expected
+
+def test_incremental_matches_full_recomputation():
+    """Test that statistics folded in daily batches match a full-history recomputation"""
+    transactions = _transactions()
+    state = SpendingStatisticsState()
+    state.fold(transactions[:60])
+    for day_end in range(60, len(transactions), 7):
+        # Overlapping fetch windows re-deliver the most recent transactions
+        state.fold(transactions[day_end - 3:day_end + 7])
+
+    assert state.count == len(transactions)
+    assert_matches_full_recomputation(state.statistics(), transactions)
+
+def test_state_round_trips_through_dict():
+    """Test that a persisted state keeps folding where it left off"""
+    transactions = _transactions()
+    state = SpendingStatisticsState()
+    state.fold(transactions[:50])
+    restored = SpendingStatisticsState(json.loads(json.dumps(state.to_dict())))
+
+    assert restored.fold(transactions[45:]) == len(transactions) - 50
+    assert_matches_full_recomputation(restored.statistics(), transactions)
+    assert min(restored.daily) >= str((restored.most_recent_date - pd.DateOffset(months=12)).date())
+
+def test_same_day_transactions_are_not_dropped():
+    """Test that new transactions on the last folded day are still folded"""
+    transactions = _transactions()
+    state = SpendingStatisticsState()
+    state.fold(transactions)
+    late = dict(transactions[-1], Merchant='Unknown Shop', Transaction_Amount='5.00')
+
+    assert state.fold([transactions[-1], late]) == 1
+    assert state.count == len(transactions) + 1
+
+def test_history_netting_to_zero():
+    """Test that a purchase and its full refund yield the pandas path's inf/nan instead of raising"""
+    transactions = [
+        {'Merchant': 'Unknown Shop', 'Merchant_Category': 'Retail', 'Transaction_Amount': '50.00',
+         'Transaction_Date': '2024-06-01'},
+        {'Merchant': 'Unknown Shop', 'Merchant_Category': 'Retail', 'Transaction_Amount': '-50.00',
+         'Transaction_Date': '2024-06-03'},
+    ]
+    state = SpendingStatisticsState()
+    state.fold(transactions)
+    statistics = state.statistics()
+
+    assert statistics['spending_discipline']['spending_volatility'] == float('inf')
+    assert_matches_full_recomputation(statistics, transactions)
+
+def test_empty_state():
+    """Test that an empty state folds nothing and has no statistics"""
+    state = SpendingStatisticsState()
+
+    assert state.fold(pd.DataFrame()) == 0
+    with pytest.raises(ValueError):
+        state.statistics()
+
+def test_histogram_stays_bounded():
+    """Test that distinct amounts share log-spaced bins instead of one entry per cent"""
+    dates = pd.date_range('2020-01-01', periods=20_000, freq='h')
+    transactions = [{'Merchant': 'Unknown Shop', 'Merchant_Category': 'Retail',
+                     'Transaction_Amount': f"{1 + i * 0.37:.2f}", 'Transaction_Date': date.strftime('%Y-%m-%d')}
+                    for i, date in enumerate(dates)]
+    state = SpendingStatisticsState()
+    state.fold(transactions)
+
+    assert len(state.amount_histogram) < 1000
+    assert len(json.dumps(state.to_dict())) < 1024 * 1024
+    assert_matches_full_recomputation(state.statistics(), transactions)
+
+def test_version_1_state_is_migrated():
+    """Test that a persisted cent-resolution histogram is rebinned on load"""
+    transactions = _transactions()
+    state = SpendingStatisticsState()
+    state.fold(transactions)
+    legacy = dict(state.to_dict(), version=1, amount_histogram={})
+    for transaction in transactions:
+        amount = f"{float(transaction['Transaction_Amount']):.2f}"
+        legacy['amount_histogram'][amount] = legacy['amount_histogram'].get(amount, 0) + 1
+
+    restored = SpendingStatisticsState(legacy)
+    assert restored.amount_histogram == state.amount_histogram
+    assert restored.to_dict()['version'] == 2
@@ -0,0 +1,101 @@
+import sqlite3
+import time
+import pytest
+from src.backend.InsightsandRecommendation.app.JobQueue.JobStore import InMemoryJobStore, SQLiteJobStore
+from src.backend.InsightsandRecommendation.app.JobQueue.JobRunner import JobRunner
+
+@pytest.fixture(params=["memory", "sqlite"])
+def job_store(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryJobStore()
+    return SQLiteJobStore(str(tmp_path / "jobs.db"))
+
+def wait_for_job(runner, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = runner.get_job(job_id)
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.01)
+    raise TimeoutError(f"Job {job_id} did not finish")
+
+def test_job_store_tracks_progress(job_store):
+    """Test job creation, progress counters and per-customer results"""
+    job_id = job_store.create_job("run_adaptive_analytics", {"days": 7})
+    job_store.update_job(job_id, status="running", total=2)
+    job_store.record_result(job_id, "client_1", result={"changes_detected": 2})
+    job_store.record_result(job_id, "client_2", error="Gemini unavailable")
+
+    job = job_store.get_job(job_id, include_results=True)
+    assert job["status"] == "running"
+    assert job["params"] == {"days": 7}
+    assert job["total"] == 2
+    assert job["processed"] == 1
+    assert job["failed"] == 1
+    assert job["results"]["client_1"]["result"] == {"changes_detected": 2}
+    assert job["results"]["client_2"]["error"] == "Gemini unavailable"
+
+def test_failed_commit_replaces_recorded_success(job_store):
+    """Test that a customer recorded again is counted once and an error outranks a success"""
+    job_id = job_store.create_job("generate_initial_insights")
+    job_store.record_result(job_id, "client_1", result={"ok": True})
+    job_store.record_result(job_id, "client_1", error="Failed to persist results: deadline exceeded")
+    job_store.record_result(job_id, "client_2", error="Failed to persist results: deadline exceeded")
+    job_store.record_result(job_id, "client_2", result={"ok": True})
+
+    job = job_store.get_job(job_id, include_results=True)
+    assert job["processed"] == 0
+    assert job["failed"] == 2
+    assert job["results"]["client_1"]["status"] == "failed"
+    assert job["results"]["client_2"]["status"] == "failed"
+
+def test_job_store_unknown_job(job_store):
+    """Test that unknown job ids return None"""
+    assert job_store.get_job("missing") is None
+
+def test_job_runner_runs_in_background(job_store):
+    """Test that submitted jobs complete and report progress"""
+    runner = JobRunner(store=job_store, max_workers=1)
+
+    def job(reporter):
+        reporter.set_total(2)
+        reporter.record("client_1", result={"ok": True})
+        reporter.record("client_2", result={"ok": True})
+
+    job_id = runner.submit("generate_initial_insights", job)
+    job = wait_for_job(runner, job_id)
+    assert job["status"] == "completed"
+    assert job["processed"] == 2
+
+def test_job_runner_records_job_failure(job_store):
+    """Test that an exception in the job marks it as failed"""
+    runner = JobRunner(store=job_store, max_workers=1)
+
+    def job(reporter):
+        raise RuntimeError("Firestore unavailable")
+
+    job = wait_for_job(runner, runner.submit("run_adaptive_analytics", job))
+    assert job["status"] == "failed"
+    assert job["error"] == "Firestore unavailable"
+
+def test_sqlite_job_store_closes_connections(tmp_path, monkeypatch):
+    """Test that every SQLite connection of the job store is closed after use"""
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    connect, opened = sqlite3.connect, []
+
+    class TrackedConnection(sqlite3.Connection):
+        def close(self):
+            opened.remove(self)
+            super().close()
+
+    def tracked_connect(*args, **kwargs):
+        conn = connect(*args, factory=TrackedConnection, **kwargs)
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(sqlite3, "connect", tracked_connect)
+    job_id = store.create_job("run_adaptive_analytics")
+    store.update_job(job_id, total=1)
+    store.record_result(job_id, "client_1", result={"ok": True})
+    assert store.get_job(job_id)["processed"] == 1
+    assert opened == []
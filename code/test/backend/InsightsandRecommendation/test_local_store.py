@@ -0,0 +1,77 @@
+import math
+from datetime import datetime, timedelta
+import pytest
+from src.backend.InsightsandRecommendation.app.db.LocalStore import LocalDocumentStore
+from src.backend.InsightsandRecommendation.app.db.BatchedWriter import BatchedFirestoreWriter
+from src.backend.InsightsandRecommendation.app.db.CustomerDataLoader import CustomerDataLoader
+from src.backend.InsightsandRecommendation.app.AdaptiveAnalyticsEngine.services.data_fetcher import DataFetcher
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalDocumentStore(str(tmp_path / "store.db"))
+    today = datetime.now()
+    with BatchedFirestoreWriter(store, flush_interval=0) as writer:
+        for client_id in ("c1", "c2"):
+            writer.set(store.collection('CustomerData').document(client_id), {'name': client_id})
+            writer.set(store.collection('AppActivity').document(client_id), {'sessions': [
+                {'date': (today - timedelta(days=days)).isoformat(), 'visited': ['home'], 'session_duration': 60}
+                for days in (1, 40)]})
+            for days in range(0, 60, 10):
+                writer.add(store.collection('TransactionData').document(client_id).collection('transactions'), {
+                    'Transaction_Date': (today - timedelta(days=days)).strftime('%Y-%m-%d'),
+                    'Transaction_Amount': days,
+                    'Merchant': 'Unknown Shop',
+                    'Merchant_Category': 'Retail'})
+            for version in range(3):
+                writer.add(store.collection('CustomerData').document(client_id).collection('life_stage'), {
+                    'stage': f"v{version}", 'created_at': today - timedelta(days=3 - version)})
+    return store
+
+def test_documents_round_trip(store):
+    """Test that set, merge, get_all and delete behave like Firestore"""
+    reference = store.collection('CustomerInsights').document('c1')
+    reference.set({'a': {'x': 1}, 'score': float('nan'), 'at': datetime(2024, 1, 2, 3, 4)})
+    reference.set({'a': {'y': 2}}, merge=True)
+
+    data = reference.get().to_dict()
+    assert data['a'] == {'x': 1, 'y': 2}
+    assert math.isnan(data['score'])
+    assert data['at'] == datetime(2024, 1, 2, 3, 4)
+
+    snapshots = store.get_all([reference, store.collection('CustomerInsights').document('missing')])
+    assert [snapshot.exists for snapshot in snapshots] == [True, False]
+
+    reference.delete()
+    assert not reference.get().exists
+
+def test_queries_filter_order_and_limit_in_sqlite(store):
+    """Test the where/order_by/limit queries used by DataFetcher"""
+    fetcher = DataFetcher(store, 'c1')
+    new_data = fetcher.fetch_new_data(days=25)
+    context = fetcher.fetch_historical_context()
+
+    assert sorted(new_data['transactions']['Transaction_Amount']) == [0, 10, 20]
+    assert len(new_data['app_activity']) == 1
+    assert context['basic_customer_data'] == {'name': 'c1'}
+    assert context['life_stage']['stage'] == 'v2'
+    assert [doc.id for doc in store.collection('CustomerData').select([]).stream()] == ['c1', 'c2']
+
+def test_loader_bulk_reads_transactions(store):
+    """Test that the customer data loader reads a batch of clients through stream_many"""
+    customers = list(store.collection('CustomerData').stream())
+    with CustomerDataLoader(store, max_workers=2) as loader:
+        data = [loader.load(customer) for customer in loader.prefetch(customers)]
+
+    assert [len(customer['transactions']) for customer in data] == [6, 6]
+    assert [len(customer['app_activity']) for customer in data] == [2, 2]
+    assert data[1]['customer_info'] == {'name': 'c2'}
+
+def test_failed_batch_is_rolled_back(store):
+    """Test that a write batch is applied atomically"""
+    batch = store.batch()
+    batch.set(store.collection('CustomerInsights').document('c1'), {'a': 1})
+    batch.set(store.collection('CustomerInsights').document('c2'), {'a': object()})
+
+    with pytest.raises(TypeError):
+        batch.commit()
+    assert not store.collection('CustomerInsights').document('c1').get().exists
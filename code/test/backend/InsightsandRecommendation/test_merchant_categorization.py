@@ -0,0 +1,76 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.MerchantServiceEssence import (
+    merchant_spending_type, categorize_merchant, categorize_merchants)
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.MerchantMatcher import (
+    MerchantMatcher, normalize_merchant)
+
+def test_vectorized_matches_scalar_lookup():
+    """Test that the vectorized lookup agrees with categorize_merchant"""
+    merchants = pd.Series(list(merchant_spending_type) + ["UNMAPPED MERCHANT", None], index=range(10, 611))
+    result = categorize_merchants(merchants)
+
+    assert list(result.index) == list(merchants.index)
+    assert list(result.iloc[:-2]) == [categorize_merchant(m) for m in merchant_spending_type]
+    assert list(result.iloc[-2:]) == ["semi-essential", "semi-essential"]
+    assert list(result.cat.categories) == ["discretionary", "essential", "semi-essential"]
+
+def test_normalize_merchant():
+    """Test upper-casing, punctuation stripping and store number removal"""
+    assert normalize_merchant("United Airlines 0162345") == ("UNITED", "AIRLINES")
+    assert normalize_merchant("SQ *Hilton Hotels #12") == ("SQ", "HILTON", "HOTELS")
+    assert normalize_merchant("Paint Shops – Automotive") == ("PAINT", "SHOPS", "AUTOMOTIVE")
+
+@pytest.mark.parametrize("raw, expected", [
+    ("UNITED AIRLINES 0162345", "UNITED AIRLINES"),
+    ("Hilton Hotels NYC", "HILTON HOTELS"),
+    ("SQ *HILTON HOTELS #12", "HILTON HOTELS"),
+    ("service stations", "Service Stations"),
+    ("DELTA 0061234", "DELTA"),
+])
+def test_matcher_resolves_raw_feed_strings(raw, expected):
+    """Test that raw card feed strings resolve to the known merchant"""
+    matcher = MerchantMatcher({"Service Stations": "essential", "UNITED AIRLINES": "semi-essential"},
+                              {"Airlines": ["UNITED AIRLINES", "DELTA"], "Hotels": ["HILTON HOTELS"]},
+                              default_spending_type="semi-essential")
+    assert matcher.resolve(raw)[0] == expected
+
+def test_matcher_group_members_inherit_group_type():
+    """Test that merchants only listed in a group take the group's most common type"""
+    matcher = MerchantMatcher({"Service Stations": "essential", "Towing Services": "essential"},
+                              {"Automotive Services": ["Service Stations", "Towing Services", "Car Washes"]},
+                              default_spending_type="semi-essential")
+    assert matcher.spending_type("CAR WASHES 0042") == "essential"
+    assert matcher.spending_type("Unknown Merchant") is None
+
+def test_matcher_single_word_names_must_lead():
+    """Test that single word names do not match inside longer strings"""
+    matcher = MerchantMatcher({}, {"Airlines": ["DELTA"]}, default_spending_type="semi-essential")
+    assert matcher.resolve("RIO DELTA CAFE") is None
+
+def test_categorization_uses_fuzzy_matching():
+    """Test that both scalar and vectorized categorization resolve raw strings"""
+    assert categorize_merchant("Service Stations 00123") == "essential"
+    result = categorize_merchants(pd.Series(["Service Stations 00123", "Service Stations 00456", "UNMAPPED"]))
+    assert list(result) == ["essential", "essential", "semi-essential"]
+
+@pytest.mark.slow
+@pytest.mark.parametrize("rows, min_speedup", [(10_000, 1), (100_000, 3), (1_000_000, 3)])
+def test_benchmark_vectorized_categorization(rows, min_speedup):
+    """Benchmark row-wise apply against the vectorized lookup"""
+    rng = np.random.default_rng(0)
+    merchants = pd.Series(rng.choice(list(merchant_spending_type), size=rows))
+
+    start = time.perf_counter()
+    expected = merchants.apply(categorize_merchant)
+    apply_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = categorize_merchants(merchants)
+    vectorized_seconds = time.perf_counter() - start
+
+    assert (result.astype(str) == expected).all()
+    # The fixed cost of the lookup dominates small frames; larger ones must be several times faster
+    assert apply_seconds / vectorized_seconds > min_speedup
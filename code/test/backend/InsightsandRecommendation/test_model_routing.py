@@ -0,0 +1,126 @@
+import json
+import random
+from types import SimpleNamespace
+import pytest
+from src.backend.InsightsandRecommendation.app.utils import GenerateContentService
+from src.backend.InsightsandRecommendation.app.utils import ModelRouting
+from src.backend.InsightsandRecommendation.app.utils.ModelRouting import (
+    FLASH_MODEL, PRO_MODEL, TaskUsageTracker, build_model_routes, estimate_cost, get_route, response_confidence,
+    route_models)
+from src.backend.InsightsandRecommendation.app.utils.RateLimiter import AdaptiveRateLimiter
+
+RETENTION_SCHEMA = {
+    "type": "object",
+    "properties": {"attrition_risk_level": {"type": "string", "enum": ["low", "medium", "high"]}},
+    "required": ["attrition_risk_level"],
+    "additionalProperties": True
+}
+
+
+class FakeModel:
+    """Fake Gemini model answering every call with a fixed text"""
+
+    def __init__(self, text, prompt_tokens=100, response_tokens=20):
+        self.text = text
+        self.usage = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=response_tokens)
+        self.calls = []
+
+    def generate_content(self, prompt, stream=False):
+        self.calls.append(stream)
+        if stream:
+            return [SimpleNamespace(text=self.text[i:i + 5]) for i in range(0, len(self.text), 5)]
+        return SimpleNamespace(text=self.text, usage_metadata=self.usage)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    usage = TaskUsageTracker()
+    models = {}
+    limiter = AdaptiveRateLimiter(requests_per_minute=60_000, tokens_per_minute=10**9, rng=random.Random(1))
+    monkeypatch.setattr(GenerateContentService, "get_rate_limiter", lambda: limiter)
+    monkeypatch.setattr(GenerateContentService, "get_response_cache", lambda: None)
+    monkeypatch.setattr(GenerateContentService, "task_usage", usage)
+    monkeypatch.setattr(GenerateContentService.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(GenerateContentService.model_registry, "get_model",
+                        lambda model_name, *args, **kwargs: models[model_name])
+    return SimpleNamespace(models=models, usage=usage)
+
+
+def test_routes():
+    assert get_route("retention_risk")["model"] == FLASH_MODEL
+    assert route_models(get_route("retention_risk")) == [FLASH_MODEL, PRO_MODEL]
+    assert route_models(get_route("unknown_task")) == [PRO_MODEL]
+    assert get_route()["temperature"] == 1
+
+
+def test_route_overrides(monkeypatch):
+    monkeypatch.setattr(ModelRouting, "MODEL_ROUTES", build_model_routes(
+        json.dumps({"retention_risk": {"model": PRO_MODEL}, "new_task": {"model": FLASH_MODEL}})))
+    assert route_models(get_route("retention_risk")) == [PRO_MODEL]
+    assert get_route("retention_risk")["temperature"] == 0.2
+    assert get_route("new_task") == {"model": FLASH_MODEL, "temperature": 1}
+
+
+@pytest.mark.parametrize("overrides", [
+    "{not json", '["life_stage"]', '{"life_stage": "flash"}', '{"life_stage": {"modle": "flash"}}',
+    '{"life_stage": {"min_confidence": "high"}}', '{"life_stage": {"temperature": true}}'])
+def test_invalid_route_overrides(overrides):
+    with pytest.raises(ValueError, match="LLM_MODEL_ROUTES"):
+        build_model_routes(overrides)
+
+
+def test_confidence_and_cost():
+    assert response_confidence({"confidence_level": {"primary_stage": "75"}}, "confidence_level.primary_stage") == 75
+    assert response_confidence({"confidence_level": 3}, "confidence_level.primary_stage") is None
+    assert estimate_cost(FLASH_MODEL, 1_000_000, 0) == pytest.approx(0.075)
+    assert estimate_cost("unknown", 10, 10) == 0.0
+
+
+def test_fast_model_answer_is_kept(service):
+    flash = service.models[FLASH_MODEL] = FakeModel('{"detected_events": []}')
+    pro = service.models[PRO_MODEL] = FakeModel('{"detected_events": ["pro"]}')
+
+    assert GenerateContentService.generate_content("prompt", json_response=True, task="life_events") == \
+        '{"detected_events": []}'
+    assert len(flash.calls) == 1 and not pro.calls
+
+    usage = service.usage.summary()["life_events"][FLASH_MODEL]
+    assert usage["calls"] == 1 and usage["escalations"] == 0
+    assert usage["prompt_tokens"] == 100 and usage["response_tokens"] == 20
+    assert usage["cost_usd"] == pytest.approx(estimate_cost(FLASH_MODEL, 100, 20), abs=1e-6)
+
+
+def test_low_confidence_escalates(service):
+    service.models[FLASH_MODEL] = FakeModel(json.dumps({"confidence_level": {"primary_stage": 40}}))
+    pro_answer = json.dumps({"confidence_level": {"primary_stage": 45}})
+    service.models[PRO_MODEL] = FakeModel(pro_answer)
+
+    # The last model of the cascade is kept whatever its confidence
+    assert GenerateContentService.generate_content("prompt", json_response=True, task="life_stage") == pro_answer
+    usage = service.usage.summary()["life_stage"]
+    assert usage[FLASH_MODEL]["escalations"] == 1 and usage[FLASH_MODEL]["escalation_rate"] == 1.0
+    assert usage[PRO_MODEL]["calls"] == 1
+
+
+def test_off_schema_fast_answer_escalates_without_resampling(service):
+    flash = service.models[FLASH_MODEL] = FakeModel('{"attrition_risk_level": "elevated"}')
+    pro = service.models[PRO_MODEL] = FakeModel('{"attrition_risk_level": "High", "note": "extra keys allowed"}')
+
+    response = GenerateContentService.generate_content("prompt", json_response=True, response_schema=RETENTION_SCHEMA,
+                                                       task="retention_risk")
+    assert json.loads(response)["attrition_risk_level"] == "High"
+    assert flash.calls == [True] and pro.calls == [True]
+
+
+def test_unparseable_fast_answer_escalates(service):
+    service.models[FLASH_MODEL] = FakeModel('not json')
+    service.models[PRO_MODEL] = FakeModel('{"ok": 1}')
+    assert GenerateContentService.generate_content("prompt", json_response=True, task="repeating_patterns") == \
+        '{"ok": 1}'
+
+
+def test_untagged_calls_use_the_default_route(service):
+    pro = service.models[PRO_MODEL] = FakeModel('plain text')
+    assert GenerateContentService.generate_content("prompt") == 'plain text'
+    assert len(pro.calls) == 1
+    assert list(service.usage.summary()) == ["default"]
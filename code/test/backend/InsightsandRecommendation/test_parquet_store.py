@@ -0,0 +1,110 @@
+import json
+from datetime import datetime
+import pandas as pd
+import pytest
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeSpendingPattern import (
+    compute_spending_statistics)
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.BatchSpendingStatistics import (
+    compute_spending_statistics_parquet)
+from src.backend.InsightsandRecommendation.app.AdaptiveAnalyticsEngine.services.sharded_sweep import (
+    shard_for_client)
+from src.backend.InsightsandRecommendation.app.db.ParquetStore import (
+    ingest_app_activity, ingest_transactions, iter_transaction_buckets, read_app_activity, read_transactions)
+
+pytest.importorskip("pyarrow")
+
+def _transactions():
+    rows = []
+    for index, client_id in enumerate(['C1', 'C2', 'C3', 'C4']):
+        for month in range(1, 7):
+            rows.append({'customer': client_id, 'Merchant': 'UNITED AIRLINES', 'Merchant_Category': 'Travel',
+                         'Transaction_Amount': str(10.0 * month + index),
+                         'Transaction_Date': f"2024-{month:02d}-{5 + index:02d}"})
+            rows.append({'customer': client_id, 'Merchant': 'Grocery Stores, Supermarkets',
+                         'Merchant_Category': 'Groceries', 'Transaction_Amount': str(3.5 * month),
+                         'Transaction_Date': f"2024-{month:02d}-20"})
+    rows.append({'customer': 'C1', 'Merchant': 'Unknown Shop', 'Merchant_Category': 'Retail',
+                 'Transaction_Amount': 'invalid', 'Transaction_Date': '2024-03-01'})
+    return rows
+
+@pytest.fixture
+def root(tmp_path):
+    export = tmp_path / "transactions.csv"
+    pd.DataFrame(_transactions()).to_csv(export, index=False)
+    root = str(tmp_path / "store")
+    assert ingest_transactions(str(export), root, num_buckets=4, client_id_column='customer', chunk_rows=10) == 48
+    return root
+
+def test_ingestion_types_and_partitions(root):
+    """Test that amounts and dates are typed once and rows land in their client's bucket"""
+    df = read_transactions(root)
+
+    assert len(df) == 48
+    assert pd.api.types.is_float_dtype(df['Transaction_Amount'])
+    assert pd.api.types.is_datetime64_any_dtype(df['Transaction_Date'])
+    for client_id, bucket in df.groupby('client_id')['client_bucket'].unique().items():
+        assert list(bucket) == [shard_for_client(client_id, 4)]
+
+def test_projection_and_pushdown(root):
+    """Test that reads return only the requested columns, clients and dates"""
+    df = read_transactions(root, client_ids=['C2'], columns=['client_id', 'Transaction_Amount'],
+                           start=datetime(2024, 3, 1), end=datetime(2024, 4, 30))
+
+    assert list(df.columns) == ['client_id', 'Transaction_Amount']
+    assert set(df['client_id']) == {'C2'}
+    assert sorted(df['Transaction_Amount']) == [10.5, 14.0, 31.0, 41.0]
+
+def test_reads_prune_with_the_ingested_bucket_count(root, monkeypatch):
+    """Test that client reads use the bucket count stored at ingestion, not a default"""
+    filters = []
+    original = read_transactions.__globals__['_filter']
+    monkeypatch.setitem(read_transactions.__globals__, '_filter',
+                        lambda *args: filters.append(args) or original(*args))
+
+    for client_id in ['C1', 'C2', 'C3', 'C4']:
+        assert set(read_transactions(root, client_ids=[client_id])['client_id']) == {client_id}
+    assert all(num_buckets == 4 for _, _, num_buckets, _, _ in filters)
+
+def test_existing_data_requires_overwrite(root, tmp_path):
+    """Test that ingesting twice does not silently duplicate transactions"""
+    export = tmp_path / "transactions.csv"
+    with pytest.raises(ValueError):
+        ingest_transactions(str(export), root, num_buckets=4, client_id_column='customer')
+    assert ingest_transactions(str(export), root, num_buckets=4, client_id_column='customer', overwrite=True) == 48
+
+def test_bucket_iteration_covers_every_client_once(root):
+    """Test that the per-bucket reads partition the clients"""
+    seen = []
+    for bucket, df in iter_transaction_buckets(root, columns=['client_id']):
+        assert all(shard_for_client(client_id, 4) == bucket for client_id in df['client_id'].unique())
+        seen.extend(df['client_id'].unique())
+
+    assert sorted(seen) == ['C1', 'C2', 'C3', 'C4']
+
+def test_full_book_statistics_match_per_customer(root):
+    """Test that the Parquet recompute emits the per-customer insight dicts"""
+    transactions = pd.DataFrame(_transactions())
+    statistics = dict(compute_spending_statistics_parquet(root))
+
+    assert set(statistics) == {'C1', 'C2', 'C3', 'C4'}
+    for client_id, result in statistics.items():
+        expected = compute_spending_statistics(
+            transactions[transactions['customer'] == client_id].drop(columns='customer').to_dict('records'))
+        assert json.loads(json.dumps(result, default=str, sort_keys=True)) == \
+               json.loads(json.dumps(expected, default=str, sort_keys=True))
+
+def test_app_activity_sessions_are_flattened(tmp_path):
+    """Test that per-client session arrays are stored one row per session"""
+    export = tmp_path / "app_activity.jsonl"
+    export.write_text("\n".join(json.dumps(row) for row in [
+        {'client_id': 'C1', 'sessions': [
+            {'date': '2024-01-05T10:00:00', 'visited': ['home'], 'session_duration': 60},
+            {'date': '2024-02-05T10:00:00', 'visited': ['cards', 'loans'], 'session_duration': 90}]},
+        {'client_id': 'C2', 'sessions': []},
+    ]))
+    root = str(tmp_path / "store")
+
+    assert ingest_app_activity(str(export), root, num_buckets=4) == 2
+    df = read_app_activity(root, client_ids=['C1'], start=datetime(2024, 2, 1))
+    assert df['visited'].map(list).tolist() == [['cards', 'loans']]
+    assert df['session_duration'].tolist() == [90.0]
@@ -0,0 +1,44 @@
+import json
+import pytest
+from src.backend.InsightsandRecommendation.app.utils.PromptCompactor import compact_transactions, estimate_tokens
+
+@pytest.fixture
+def transactions():
+    return [
+        {
+            "Transaction_Date": f"2024-{month:02d}-{day:02d}",
+            "Transaction_Amount": 10.0 * day,
+            "Merchant": "HILTON HOTELS" if day % 2 else "Service Stations",
+            "Merchant_Category": "Hotels & Accommodations" if day % 2 else "Automotive Services",
+        }
+        for month in range(1, 13) for day in range(1, 29)
+    ]
+
+def test_small_history_kept_verbatim(transactions):
+    """Test that a history within budget is rendered in full, most recent first"""
+    result = json.loads(compact_transactions(transactions[:5], token_budget=10000))
+    assert len(result["rows"]) == 5
+    date_index = result["columns"].index("Transaction_Date")
+    assert result["rows"][0][date_index] == "2024-01-05"
+
+def test_compact_form_uses_fewer_tokens(transactions):
+    """Test that the columnar form is much smaller than the indented dump"""
+    compact = compact_transactions(transactions, token_budget=10 ** 6)
+    assert estimate_tokens(compact) < estimate_tokens(json.dumps(transactions, indent=2)) / 2
+
+def test_long_history_fits_budget(transactions):
+    """Test that older history is summarized by month to fit the budget"""
+    rendered = compact_transactions(transactions, token_budget=1000)
+    result = json.loads(rendered)
+
+    assert estimate_tokens(rendered) <= 1000
+    recent = result["recent_transactions"]["rows"]
+    summary = result["older_history_monthly_summary"]
+    assert 0 < len(recent) < len(transactions)
+    assert summary[0]["month"] >= summary[-1]["month"]
+    summarized = sum(month["count"] for month in summary)
+    assert len(recent) + summarized == len(transactions)
+
+def test_empty_history():
+    """Test that no transactions renders an empty table"""
+    assert json.loads(compact_transactions([])) == {"columns": [], "rows": []}
@@ -0,0 +1,169 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import pytest
+from google.api_core.exceptions import ResourceExhausted
+from src.backend.InsightsandRecommendation.app.utils import GenerateContentService
+from src.backend.InsightsandRecommendation.app.utils.RateLimiter import (
+    PRIORITY_BATCH, PRIORITY_REALTIME, AdaptiveRateLimiter, current_priority, llm_priority, with_current_priority)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyModel:
+    """Fake Gemini client answering 429 for the first `failures` calls"""
+
+    def __init__(self, failures, text='{"ok": true}'):
+        self.failures = failures
+        self.text = text
+        self.calls = 0
+
+    def generate_content(self, prompt, stream=False):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ResourceExhausted("429 Quota exceeded")
+        return SimpleNamespace(text=self.text, usage_metadata=SimpleNamespace(total_token_count=50))
+
+
+def _limiter(**kwargs):
+    kwargs.setdefault("requests_per_minute", 60)
+    kwargs.setdefault("tokens_per_minute", 100_000)
+    return AdaptiveRateLimiter(backoff_base=1.0, backoff_max=30.0, rng=random.Random(7), **kwargs)
+
+
+def test_request_bucket_limits_burst():
+    clock = FakeClock()
+    limiter = _limiter(requests_per_minute=3, clock=clock)
+    assert all(limiter.acquire(timeout=0) for _ in range(3))
+    assert not limiter.acquire(timeout=0)
+
+    clock.now += 20  # one request refills every 20 seconds
+    assert limiter.acquire(timeout=0)
+    assert not limiter.acquire(timeout=0)
+
+
+def test_token_bucket_limits_large_prompts():
+    clock = FakeClock()
+    limiter = _limiter(tokens_per_minute=1000, clock=clock)
+    assert limiter.acquire(tokens=800, timeout=0)
+    assert not limiter.acquire(tokens=400, timeout=0)
+    clock.now += 12  # 200 tokens refilled
+    assert limiter.acquire(tokens=400, timeout=0)
+
+
+def test_rate_limited_halves_rate_and_pauses_callers():
+    clock = FakeClock()
+    limiter = _limiter(clock=clock)
+    limiter.on_rate_limited()
+    assert limiter.stats()["rate_factor"] == 0.5
+    assert not limiter.acquire(timeout=0)
+
+    # At half of 60 RPM the next request is admitted after two seconds
+    clock.now += 2
+    assert limiter.acquire(timeout=0)
+
+    for _ in range(10):
+        limiter.on_rate_limited()
+    assert limiter.stats()["rate_factor"] == limiter.min_rate_factor
+
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.stats()["rate_factor"] == 1.0
+
+
+def test_backoff_is_jittered_and_capped():
+    limiter = _limiter()
+    delays = [limiter.backoff(attempt) for attempt in range(10) for _ in range(20)]
+    assert all(0 <= delay <= 30.0 for delay in delays)
+    assert len(set(delays)) == len(delays)
+    assert max(limiter.backoff(0) for _ in range(50)) <= 1.0
+
+
+def test_realtime_waiters_are_served_before_batch():
+    limiter = _limiter(requests_per_minute=240)
+    while limiter.acquire(timeout=0):
+        pass
+
+    admitted = []
+
+    def call(name, priority):
+        limiter.acquire(priority=priority)
+        admitted.append(name)
+
+    batch = [threading.Thread(target=call, args=(f"batch-{i}", PRIORITY_BATCH)) for i in range(3)]
+    for thread in batch:
+        thread.start()
+    while limiter.stats()["waiting"] < 3:
+        time.sleep(0.001)
+    realtime = threading.Thread(target=call, args=("realtime", PRIORITY_REALTIME))
+    realtime.start()
+    for thread in batch + [realtime]:
+        thread.join(timeout=5)
+
+    assert admitted[0] == "realtime"
+    assert sorted(admitted[1:]) == ["batch-0", "batch-1", "batch-2"]
+
+
+def test_priority_context_is_per_thread():
+    seen = []
+    with llm_priority(PRIORITY_REALTIME):
+        thread = threading.Thread(target=lambda: seen.append(current_priority()))
+        thread.start()
+        thread.join()
+        assert current_priority() == PRIORITY_REALTIME
+        with llm_priority(PRIORITY_BATCH):
+            assert current_priority() == PRIORITY_BATCH
+        assert current_priority() == PRIORITY_REALTIME
+    assert seen == [current_priority()]
+
+def test_submitted_tasks_keep_the_submitting_priority():
+    """Test that pool threads run wrapped tasks with the priority at submit time"""
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with llm_priority(PRIORITY_BATCH):
+            wrapped = executor.submit(with_current_priority(current_priority))
+        unwrapped = executor.submit(current_priority)
+        assert wrapped.result() == PRIORITY_BATCH
+        assert unwrapped.result() == current_priority()
+
+
+@pytest.fixture
+def service(monkeypatch):
+    limiter = _limiter(requests_per_minute=60_000)
+    sleeps = []
+    monkeypatch.setattr(GenerateContentService, "get_rate_limiter", lambda: limiter)
+    monkeypatch.setattr(GenerateContentService, "get_response_cache", lambda: None)
+    monkeypatch.setattr(GenerateContentService.time, "sleep", sleeps.append)
+    return SimpleNamespace(limiter=limiter, sleeps=sleeps, monkeypatch=monkeypatch)
+
+
+def _use_model(service, model):
+    service.monkeypatch.setattr(GenerateContentService.model_registry, "get_model", lambda *args, **kwargs: model)
+
+
+def test_generate_content_backs_off_on_429(service):
+    model = FlakyModel(failures=3)
+    _use_model(service, model)
+
+    assert GenerateContentService.generate_content("prompt", json_response=True) == '{"ok": true}'
+    assert model.calls == 4
+    assert service.limiter.rate_limited == 3
+    assert len(service.sleeps) == 3
+    assert all(0 <= delay <= 30.0 for delay in service.sleeps)
+
+
+def test_generate_content_gives_up_after_max_attempts(service):
+    model = FlakyModel(failures=100)
+    _use_model(service, model)
+
+    assert GenerateContentService.generate_content("prompt") is None
+    assert model.calls == GenerateContentService.Config.LLM_MAX_ATTEMPTS
+    # No pointless sleep after the last attempt
+    assert len(service.sleeps) == model.calls - 1
@@ -0,0 +1,130 @@
+import threading
+from datetime import datetime, timedelta
+import pytest
+from src.backend.InsightsandRecommendation.app.AdaptiveAnalyticsEngine.services.realtime_triggers import (
+    RealtimeTriggerPipeline, TriggerRules, parse_frequency)
+
+def test_parse_frequency():
+    """Test the config frequency strings"""
+    assert parse_frequency('15 Days') == timedelta(days=15)
+    assert parse_frequency('6 Hours') == timedelta(hours=6)
+    assert parse_frequency('1 week') == timedelta(weeks=1)
+    with pytest.raises(ValueError):
+        parse_frequency('fortnightly')
+
+def test_rules_trip_on_matching_events():
+    """Test each trigger rule on matching and non-matching events"""
+    rules = TriggerRules()
+
+    assert rules.evaluate_transaction({'Transaction_Amount': '2500', 'Merchant': 'Best Buy',
+                                       'Merchant_Category': 'Electronics'}) == {'large_transaction'}
+    assert rules.evaluate_transaction({'Transaction_Amount': 'n/a', 'Merchant': 'Bridal Boutique',
+                                       'Merchant_Category': 'Retail'}) == {'life_event'}
+    assert rules.evaluate_transaction({'Transaction_Amount': 12, 'Merchant': 'Starbucks',
+                                       'Merchant_Category': 'Restaurants'}) == set()
+    assert rules.evaluate_session({'visited': ['home', 'Loans']}) == {'new_product_interaction'}
+    assert rules.evaluate_session({'visited': ['home', 'Loans']}, known_products={'loans'}) == set()
+    assert rules.evaluate_session({'visited': ['home']}) == set()
+
+def test_disabled_triggers_are_not_evaluated():
+    """Test that only the configured realtime_triggers trip"""
+    rules = TriggerRules({'realtime_triggers': ['life_event']})
+
+    assert rules.evaluate([{'Transaction_Amount': 5000, 'Merchant': 'Tuition Payment'}],
+                          [{'visited': ['loans']}]) == {'life_event'}
+
+def test_pipeline_queues_only_triggered_customers():
+    """Test that untriggered customers are not analyzed and repeated events are coalesced"""
+    release = threading.Event()
+    analyzed = []
+
+    def analyze(client_id, days):
+        analyzed.append((client_id, days))
+        release.wait(5)
+
+    now = [0.0]
+    pipeline = RealtimeTriggerPipeline(analyze=analyze, max_workers=2, clock=lambda: now[0],
+                                       visited_pages=lambda client_id, before: [], schedule=lambda delay, run: None)
+    large = [{'Transaction_Amount': 5000, 'Merchant': 'Apple Store'}]
+
+    assert pipeline.ingest('c1', large)['status'] == 'queued'
+    assert pipeline.ingest('c1', sessions=[{'visited': ['loans']}])['status'] == 'coalesced'
+    assert pipeline.ingest('c2', [{'Transaction_Amount': 5, 'Merchant': 'Cafe'}]) == {
+        'client_id': 'c2', 'triggers': [], 'status': 'not_triggered'}
+    release.set()
+    pipeline.shutdown()
+
+    assert analyzed == [('c1', 30)]
+
+def test_pipeline_cooldown():
+    """Test that a customer is analyzed at most once per cooldown"""
+    analyzed = []
+    now = [0.0]
+    pipeline = RealtimeTriggerPipeline({'realtime_cooldown': '1 Hours'}, analyze=lambda c, d: analyzed.append(c),
+                                       max_workers=1, clock=lambda: now[0], schedule=lambda delay, run: None)
+    large = [{'Transaction_Amount': 5000, 'Merchant': 'Apple Store'}]
+
+    assert pipeline.ingest('c1', large)['status'] == 'queued'
+    pipeline.executor.submit(lambda: None).result()
+    now[0] = 1800
+    assert pipeline.ingest('c1', large)['status'] == 'cooling_down'
+    now[0] = 3600
+    assert pipeline.ingest('c1', large)['status'] == 'queued'
+    pipeline.shutdown()
+
+    assert analyzed == ['c1', 'c1']
+
+def test_only_new_product_pages_trip():
+    """Test that product pages from the customer's session history do not trip the trigger"""
+    history_reads = []
+
+    def visited_pages(client_id, before):
+        history_reads.append((client_id, before))
+        return ['home', 'Cards']
+
+    pipeline = RealtimeTriggerPipeline(analyze=lambda c, d: None, visited_pages=visited_pages,
+                                       schedule=lambda delay, run: None)
+    cards = {'date': '2024-06-01T10:00:00', 'visited': ['cards']}
+    loans = {'date': '2024-06-02T10:00:00', 'visited': ['home', 'loans']}
+
+    assert pipeline.ingest('c1', sessions=[cards])['status'] == 'not_triggered'
+    assert pipeline.ingest('c1', sessions=[loans])['triggers'] == ['new_product_interaction']
+    # Loans is known once visited, and the history is read once per customer
+    assert pipeline.ingest('c1', sessions=[loans])['triggers'] == []
+    assert history_reads == [('c1', datetime(2024, 6, 1, 10))]
+    pipeline.shutdown()
+
+def test_deferred_triggers_run_after_the_cooldown():
+    """Test that triggers during a running analysis or cooldown queue one follow-up analysis"""
+    release = threading.Event()
+    analyzed = []
+    scheduled = []
+    now = [0.0]
+
+    def analyze(client_id, days):
+        analyzed.append(client_id)
+        release.wait(5)
+
+    pipeline = RealtimeTriggerPipeline({'realtime_cooldown': '1 Hours'}, analyze=analyze, max_workers=1,
+                                       clock=lambda: now[0], schedule=lambda delay, run: scheduled.append((delay, run)))
+    large = [{'Transaction_Amount': 5000, 'Merchant': 'Apple Store'}]
+
+    assert pipeline.ingest('c1', large)['status'] == 'queued'
+    assert pipeline.ingest('c1', large)['status'] == 'coalesced'
+    now[0] = 600
+    release.set()
+    pipeline.executor.submit(lambda: None).result()
+    assert pipeline.ingest('c1', large)['status'] == 'cooling_down'
+
+    # The finished analysis scheduled the follow-up for the end of the cooldown
+    assert [delay for delay, _ in scheduled] == [3000]
+    scheduled.pop()[1]()
+    pipeline.executor.submit(lambda: None).result()
+    assert analyzed == ['c1']
+
+    now[0] = 3600
+    scheduled.pop()[1]()
+    pipeline.executor.submit(lambda: None).result()
+    assert analyzed == ['c1', 'c1']
+    assert not scheduled
+    pipeline.shutdown()
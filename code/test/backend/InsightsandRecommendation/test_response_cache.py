@@ -0,0 +1,54 @@
+import time
+import pytest
+from src.backend.InsightsandRecommendation.app.utils.ResponseCache import (
+    InMemoryCacheBackend, SQLiteCacheBackend, LLMResponseCache)
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return InMemoryCacheBackend(max_entries=2)
+    return SQLiteCacheBackend(str(tmp_path / "llm_cache.db"), max_entries=2)
+
+def test_cache_key_covers_all_inputs():
+    """Test that the key changes with any input and ignores dict ordering"""
+    key = LLMResponseCache.make_key("gemini", "prompt", " ", {"temperature": 1, "response_mime_type": "application/json"})
+    assert key == LLMResponseCache.make_key("gemini", "prompt", " ", {"response_mime_type": "application/json", "temperature": 1})
+    assert key != LLMResponseCache.make_key("gemini-flash", "prompt", " ", {"temperature": 1, "response_mime_type": "application/json"})
+    assert key != LLMResponseCache.make_key("gemini", "prompt 2", " ", {"temperature": 1, "response_mime_type": "application/json"})
+    assert key != LLMResponseCache.make_key("gemini", "prompt", "system", {"temperature": 1, "response_mime_type": "application/json"})
+    assert key != LLMResponseCache.make_key("gemini", "prompt", " ", {"temperature": 0})
+
+def test_cache_hits_and_misses(backend):
+    """Test hit/miss counters"""
+    cache = LLMResponseCache(backend, ttl_seconds=60)
+    assert cache.get("a") is None
+    cache.set("a", '{"risk": "low"}')
+    assert cache.get("a") == '{"risk": "low"}'
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+def test_cache_evicts_least_recently_used(backend):
+    """Test size bounded LRU eviction"""
+    cache = LLMResponseCache(backend, ttl_seconds=60)
+    cache.set("a", "1")
+    time.sleep(0.01)
+    cache.set("b", "2")
+    time.sleep(0.01)
+    assert cache.get("a") == "1"
+    time.sleep(0.01)
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+def test_cache_entries_expire(backend):
+    """Test TTL expiry"""
+    cache = LLMResponseCache(backend, ttl_seconds=0)
+    cache.set("a", "1")
+    time.sleep(0.01)
+    assert cache.get("a") is None
+
+def test_sqlite_cache_persists(tmp_path):
+    """Test that the on-disk cache survives a new cache instance"""
+    path = str(tmp_path / "llm_cache.db")
+    LLMResponseCache(SQLiteCacheBackend(path, max_entries=10), ttl_seconds=60).set("a", "1")
+    assert LLMResponseCache(SQLiteCacheBackend(path, max_entries=10), ttl_seconds=60).get("a") == "1"
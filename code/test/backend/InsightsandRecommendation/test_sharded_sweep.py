@@ -0,0 +1,105 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock
+from src.backend.InsightsandRecommendation.app.APIs.RunAdaptiveAnalytics import _run_sharded_sweep
+from src.backend.InsightsandRecommendation.app.AdaptiveAnalyticsEngine.services.sharded_sweep import (
+    ShardedSweep, SQLiteCheckpointStore, shard_for_client)
+
+CLIENT_IDS = [f"client_{i:03d}" for i in range(40)]
+
+class WorkerCrash(BaseException):
+    """Simulates the worker process dying mid-shard"""
+
+@pytest.fixture
+def mock_db():
+    db = Mock()
+    db.collection.return_value.select.return_value.stream.side_effect = \
+        lambda: iter([SimpleNamespace(id=client_id) for client_id in CLIENT_IDS])
+    return db
+
+@pytest.fixture
+def checkpoint_store(tmp_path):
+    return SQLiteCheckpointStore(str(tmp_path / "checkpoints.db"))
+
+def test_shard_for_client_is_stable():
+    """Test that shard assignment is deterministic and covers all shards"""
+    shards = {shard_for_client(client_id, 4) for client_id in CLIENT_IDS}
+    assert shards == {0, 1, 2, 3}
+    assert shard_for_client("client_007", 4) == shard_for_client("client_007", 4)
+
+def test_workers_split_shards(mock_db, checkpoint_store):
+    """Test that two workers never process the same customer"""
+    processed = []
+    sweep_a = ShardedSweep(mock_db, "2025-03-01", 4, checkpoint_store, worker_id="a",
+                           process_customer=lambda client_id, days: processed.append(client_id))
+    sweep_b = ShardedSweep(mock_db, "2025-03-01", 4, checkpoint_store, worker_id="b",
+                           process_customer=lambda client_id, days: processed.append(client_id))
+
+    summary_a = sweep_a.run()
+    summary_b = sweep_b.run()
+
+    assert summary_a["shards"] == [0, 1, 2, 3]
+    assert summary_b["shards"] == []
+    assert sorted(processed) == CLIENT_IDS
+
+def test_interrupted_sweep_resumes_from_checkpoint(mock_db, checkpoint_store):
+    """Test that a crashed worker's shard resumes after the last completed customer"""
+    calls = []
+
+    def crash_on_fifth(client_id, days):
+        if len(calls) == 5:
+            raise WorkerCrash()
+        calls.append(client_id)
+
+    sweep = ShardedSweep(mock_db, "2025-03-01", 1, checkpoint_store, worker_id="a",
+                         process_customer=crash_on_fifth)
+    with pytest.raises(WorkerCrash):
+        sweep.run()
+
+    # Expire worker a's lease so another worker can take over the shard
+    checkpoint_store.save_checkpoint("2025-03-01", 0, "a", calls[-1], len(calls), [], lease_seconds=-1)
+
+    resumed = []
+    ShardedSweep(mock_db, "2025-03-01", 1, checkpoint_store, worker_id="b",
+                 process_customer=lambda client_id, days: resumed.append(client_id)).run()
+
+    assert calls + resumed == CLIENT_IDS
+
+def test_customer_failure_is_recorded_and_skipped(mock_db, checkpoint_store):
+    """Test that a failing customer does not stop the shard"""
+    def fail_one(client_id, days):
+        if client_id == "client_010":
+            raise RuntimeError("Gemini unavailable")
+
+    on_done = Mock()
+    summary = ShardedSweep(mock_db, "2025-03-01", 2, checkpoint_store, worker_id="a",
+                           process_customer=fail_one).run(on_customer_done=on_done)
+
+    assert summary["failed"] == 1
+    assert summary["processed"] == len(CLIENT_IDS) - 1
+    on_done.assert_any_call("client_010", None, "Gemini unavailable")
+
+def test_customers_are_listed_once_per_run(mock_db, checkpoint_store):
+    """Test that a worker lists CustomerData once, not once per shard"""
+    sweep = ShardedSweep(mock_db, "2025-03-01", 8, checkpoint_store, worker_id="a", process_customer=Mock())
+    assert sweep.run()["shards"] == list(range(8))
+    assert mock_db.collection.return_value.select.return_value.stream.call_count == 1
+
+def test_sharded_job_reports_total_and_days(mock_db, checkpoint_store, monkeypatch):
+    """Test that the sharded sweep job analyzes the requested days and reports its total"""
+    process_customer = Mock(return_value=None)
+    sweeps = []
+
+    def sharded_sweep(db, sweep_id, num_shards, days):
+        sweeps.append(ShardedSweep(mock_db, sweep_id, num_shards, checkpoint_store, worker_id="a",
+                                   process_customer=process_customer, days=days))
+        return sweeps[-1]
+
+    monkeypatch.setitem(_run_sharded_sweep.__globals__, "ShardedSweep", sharded_sweep)
+    reporter = Mock()
+    _run_sharded_sweep(reporter, "2025-03-01", 4, 7)
+
+    reporter.set_total.assert_called_once_with(len(CLIENT_IDS))
+    assert reporter.record.call_count == len(CLIENT_IDS)
+    assert {call.args for call in process_customer.call_args_list} == {(client_id, 7) for client_id in CLIENT_IDS}
+    assert mock_db.collection.return_value.select.return_value.stream.call_count == 1
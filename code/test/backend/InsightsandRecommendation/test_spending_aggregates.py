@@ -0,0 +1,40 @@
+import pandas as pd
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.SpendingAggregates import (
+    SpendingAggregates)
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeTimePatterns import (
+    analyze_time_patterns)
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.AnalyzeSpendingDiscipline import (
+    analyze_spending_discipline)
+
+def _transactions():
+    return pd.DataFrame({
+        'Merchant': ['UNITED AIRLINES', 'Grocery Stores, Supermarkets', 'UNITED AIRLINES', 'Unknown Shop'],
+        'Merchant_Category': ['Travel', 'Groceries', 'Travel', 'Retail'],
+        'Transaction_Amount': ['100.0', '50.5', '200.0', '10.0'],
+        'Transaction_Date': ['2024-01-05', '2024-01-20', '2024-02-03', '2024-03-15'],
+    })
+
+def test_aggregates_type_columns_once_without_mutating_input():
+    """Test that amounts and dates are typed on a copy of the frame"""
+    df = _transactions()
+    aggregates = SpendingAggregates(df)
+
+    assert aggregates.amount_summary['sum'] == 360.5
+    assert aggregates.most_recent_date == pd.Timestamp('2024-03-15')
+    assert list(aggregates.months.astype(str)) == ['2024-01', '2024-01', '2024-02', '2024-03']
+    assert aggregates.category_stats.loc['Travel', 'count'] == 2
+    assert not pd.api.types.is_numeric_dtype(df['Transaction_Amount'])
+
+def test_analyzers_share_aggregates():
+    """Test that analyzers reuse the cached groupbys and leave the frame untouched"""
+    df = _transactions()
+    aggregates = SpendingAggregates(df)
+    columns = list(df.columns)
+
+    analyze_time_patterns(df, aggregates)
+    discipline = analyze_spending_discipline(df, aggregates)
+
+    assert list(df.columns) == columns
+    assert 'spending_types' in vars(aggregates)
+    assert round(sum(row['percentage'] for row in discipline['spending_breakdown'])) == 100
+    assert set(discipline['monthly_spending_trend']) == set(aggregates.spending_types.unique())
@@ -0,0 +1,117 @@
+import json
+from unittest.mock import Mock
+import pandas as pd
+import pytest
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeLifeStage import schema as life_stage_schema
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeRetentionRisk import RETENTION_RISK_KEYS
+from src.backend.InsightsandRecommendation.app.InsightGenerator.StatisticalScorers import (
+    analyze_life_stage_statistically, analyze_retention_risk_statistically, analyze_statistically,
+    borderline_customers, customer_features, explain_with_llm, score_customers)
+
+AS_OF = "2024-06-30"
+
+CUSTOMERS = pd.DataFrame([
+    {"client_id": "student", "age": 21, "marital_status": "Single"},
+    {"client_id": "parent", "age": 34, "marital_status": "Married"},
+    {"client_id": "retiree", "age": 72, "marital_status": "Married"},
+    {"client_id": "unknown", "age": None, "marital_status": None},
+])
+
+
+def _transactions(client_id, days_ago, category, amount=100.0):
+    return [{"client_id": client_id, "Transaction_Date": pd.Timestamp(AS_OF) - pd.Timedelta(days=day),
+             "Transaction_Amount": amount, "Merchant_Category": category} for day in days_ago]
+
+
+TRANSACTIONS = pd.DataFrame(
+    _transactions("student", range(1, 60, 5), "Education") +
+    _transactions("parent", range(1, 170, 10), "Childcare") +
+    _transactions("parent", range(2, 170, 10), "Groceries") +
+    # A long relationship that went quiet three months ago
+    _transactions("retiree", range(100, 1500, 20), "Pharmacy"))
+
+SESSIONS = pd.DataFrame([{"client_id": "parent", "date": f"2024-06-{day:02d}", "session_duration": 5}
+                         for day in range(1, 29)])
+
+
+def test_customer_features():
+    features = customer_features(CUSTOMERS, TRANSACTIONS, SESSIONS, as_of=AS_OF)
+
+    parent = features.loc["parent"]
+    assert parent["married"] and parent["transaction_count"] == 34
+    assert parent["recent_count"] == 18 and parent["prior_count"] == 16
+    assert parent["family_share"] == pytest.approx(0.5)
+    assert parent["days_since_session"] == 2 and parent["recent_sessions"] == 28
+
+    assert features.loc["student", "education_share"] == pytest.approx(1.0)
+    assert features.loc["retiree", "days_since_transaction"] == 100
+    assert features.loc["unknown"].drop(["age", "married"]).isna().all()
+
+
+def test_scores_follow_the_llm_schemas():
+    scored = score_customers(CUSTOMERS, TRANSACTIONS, SESSIONS, as_of=AS_OF)
+
+    stages = scored["life_stage"].map(lambda result: result["primary_life_stage"])
+    assert stages[["student", "parent", "retiree"]].tolist() == ["student", "family_formation", "retirement"]
+    levels = scored["retention_risk"].map(lambda result: result["attrition_risk_level"])
+    assert levels["parent"] == "low" and levels["retiree"] == "high"
+
+    for life_stage, retention_risk in zip(scored["life_stage"], scored["retention_risk"]):
+        assert all(key in life_stage for key in life_stage_schema["required"])
+        assert 0 <= life_stage["confidence_level"]["primary_stage"] <= 100
+        assert set(retention_risk) == set(RETENTION_RISK_KEYS)
+        assert retention_risk["retention_strategies"]
+    json.dumps(scored[["life_stage", "retention_risk"]].to_dict("records"))
+
+    assert "No card transactions in the last 100 days" in scored.loc["retiree", "retention_risk"]["risk_factors"]
+    assert scored.loc["parent", "retention_risk"]["protective_factors"] == [
+        "Stable or growing transaction activity", "Active app user in the last week"]
+
+    # Customers without an age or transaction history are left for the LLM
+    assert scored.loc["unknown", "life_stage_borderline"] and scored.loc["unknown", "retention_risk_borderline"]
+    assert not scored.loc["parent", "life_stage_borderline"]
+    assert "unknown" in borderline_customers(scored)
+
+
+def _customer_data(age):
+    return {
+        "customer_info": {"age": age, "marital_status": "Married"},
+        "transactions": [{"Transaction_Date": "2024-06-01", "Transaction_Amount": 120, "Merchant": "Daycare",
+                          "Merchant_Category": "Childcare"}],
+        "app_activity": [],
+    }
+
+
+def test_llm_only_explains_borderline_customers(monkeypatch):
+    explained = {"primary_life_stage": "mid_career", "alternative_life_stages": [],
+                 "confidence_level": {"primary_stage": 70}, "key_indicators": [], "reasoning": "LLM"}
+    generate_content = Mock(return_value=json.dumps(explained))
+    monkeypatch.setitem(explain_with_llm.__globals__, "generate_content", generate_content)
+
+    assert analyze_life_stage_statistically(_customer_data(34))["primary_life_stage"] == "family_formation"
+    generate_content.assert_not_called()
+
+    assert analyze_life_stage_statistically(_customer_data(None)) == explained
+    assert generate_content.call_args.kwargs["task"] == "life_stage"
+    assert '"age":null' in generate_content.call_args.args[0]
+
+
+def test_invalid_explanation_keeps_the_statistical_result(monkeypatch):
+    monkeypatch.setitem(explain_with_llm.__globals__, "generate_content", Mock(return_value='{"risk": "high"}'))
+    result = analyze_retention_risk_statistically(_customer_data(40))
+    assert set(result) == set(RETENTION_RISK_KEYS)
+
+    with pytest.raises(ValueError):
+        analyze_retention_risk_statistically({"customer_info": {}})
+
+
+def test_insights_share_one_scoring(monkeypatch):
+    """Test that life stage and retention risk are derived from a single scoring of the customer"""
+    score = Mock(wraps=score_customers)
+    monkeypatch.setitem(analyze_statistically.__globals__, "score_customers", score)
+
+    insights = analyze_statistically(_customer_data(34), explain=False)
+
+    score.assert_called_once()
+    assert insights["life_stage"]["primary_life_stage"] == "family_formation"
+    assert set(insights["retention_risk"]) == set(RETENTION_RISK_KEYS)
@@ -0,0 +1,143 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+import pytest
+from src.backend.InsightsandRecommendation.app.AdaptiveAnalyticsEngine.services.llm_based_analysis import (
+    PROFILE_CHANGE_SCHEMA, analyze_with_llm)
+from src.backend.InsightsandRecommendation.app.utils.StreamingJsonValidator import (
+    SchemaViolation, StreamingJsonValidator)
+
+ANALYSIS = {
+    "profile_change_summary": {
+        "total_changes_detected": 1,
+        "change_significance": "Moderate",
+        "changed_metrics": [{
+            "metric_name": "retention_risk",
+            "old_value": {"score": 0.2},
+            "new_value": "high",
+            "change_percentage": 150.5,
+            "change_significance": "significant",
+            "confidence_level": "high",
+            "potential_implications": ["Fewer logins \"since\" March"],
+            "rationale": "extra keys are allowed on metrics"
+        }]
+    },
+    "overall_profile_shift": {"primary_direction": "negative", "key_observations": []}
+}
+
+def _feed(text, chunk_size=7):
+    validator = StreamingJsonValidator(PROFILE_CHANGE_SCHEMA)
+    fed = 0
+    try:
+        for start in range(0, len(text), chunk_size):
+            validator.feed(text[start:start + chunk_size])
+            fed = start + chunk_size
+        return validator.close(), fed
+    except SchemaViolation as e:
+        e.fed = fed
+        raise
+
+@pytest.mark.parametrize("text", [json.dumps(ANALYSIS), json.dumps(ANALYSIS, indent=2),
+                                  "```json\n" + json.dumps(ANALYSIS) + "\n```"])
+def test_valid_response_passes(text):
+    """Test that conforming responses, fenced or not, validate in small chunks"""
+    document, _ = _feed(text)
+    assert json.loads(document) == ANALYSIS
+
+@pytest.mark.parametrize("mutate", [
+    lambda a: a["profile_change_summary"].update(total_changes_detected="one"),
+    lambda a: a["profile_change_summary"]["changed_metrics"][0].update(metric_name="credit_score"),
+    lambda a: a["profile_change_summary"].pop("changed_metrics"),
+    lambda a: a.update(unexpected_section={}),
+    lambda a: a["overall_profile_shift"].update(primary_direction="sideways"),
+])
+def test_off_schema_response_is_rejected(mutate):
+    """Test wrong types, enums, missing and unknown keys"""
+    analysis = json.loads(json.dumps(ANALYSIS))
+    mutate(analysis)
+    with pytest.raises(SchemaViolation):
+        _feed(json.dumps(analysis))
+
+def test_violation_is_detected_before_the_end():
+    """Test that an off-schema token aborts the stream early"""
+    text = '{"summary": "The customer profile changed in many ways. ' + "x" * 5000 + '"}'
+    with pytest.raises(SchemaViolation) as error:
+        _feed(text)
+    assert error.value.fed < 50
+
+@pytest.mark.parametrize("mutate, message", [
+    (lambda a: a.update(extra={}), "Unexpected key 'extra' at $"),
+    (lambda a: a["profile_change_summary"].update(extra=1), "Unexpected key 'extra' at $.profile_change_summary"),
+    (lambda a: a["profile_change_summary"].pop("changed_metrics"),
+     "Missing required keys ['changed_metrics'] at $.profile_change_summary"),
+])
+def test_violation_path_points_at_the_enclosing_object(mutate, message):
+    """Test that errors after a closed value are reported at the object, not at its previous key"""
+    analysis = json.loads(json.dumps(ANALYSIS))
+    mutate(analysis)
+    with pytest.raises(SchemaViolation) as error:
+        _feed(json.dumps(analysis))
+    assert str(error.value) == message
+
+def test_truncated_response_is_rejected():
+    """Test that a response cut off mid-document is incomplete"""
+    with pytest.raises(SchemaViolation, match="ended before"):
+        _feed(json.dumps(ANALYSIS)[:-3])
+
+def test_generate_content_retries_off_schema_stream(monkeypatch):
+    """Test that an off-schema stream is abandoned and the call retried"""
+    consumed = []
+
+    def stream(chunks):
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield SimpleNamespace(text=chunk)
+
+    good = json.dumps(ANALYSIS)
+    model = Mock()
+    model.generate_content.side_effect = [
+        stream(['{"profile_change_summary": {"total_changes_detected": "many"', ', "more": 1', '}}']),
+        stream([good[:40], good[40:]]),
+    ]
+    # The service module the analysis actually calls, whichever import path loaded it
+    service = analyze_with_llm.__globals__['generate_content'].__globals__
+    monkeypatch.setattr(service['model_registry'], "get_model", lambda *args, **kwargs: model)
+    monkeypatch.setitem(service, "get_response_cache", lambda: None)
+
+    result = analyze_with_llm("prompt")
+
+    assert result == ANALYSIS
+    assert model.generate_content.call_count == 2
+    assert len(consumed) == 3
+
+def test_streamed_calls_settle_their_token_estimate(monkeypatch):
+    """Test that validated and aborted streams refund the unused part of their token estimate"""
+    bad_chunk = '{"profile_change_summary": {"total_changes_detected": "many"'
+    good = json.dumps(ANALYSIS)
+    model = Mock()
+    model.generate_content.side_effect = [
+        iter([SimpleNamespace(text=bad_chunk), SimpleNamespace(text="}}")]),
+        iter([SimpleNamespace(text=good)]),
+    ]
+    limiter = Mock()
+    service = analyze_with_llm.__globals__['generate_content'].__globals__
+    monkeypatch.setattr(service['model_registry'], "get_model", lambda *args, **kwargs: model)
+    monkeypatch.setitem(service, "get_response_cache", lambda: None)
+    monkeypatch.setitem(service, "get_rate_limiter", lambda: limiter)
+
+    assert analyze_with_llm("prompt") == ANALYSIS
+
+    estimate_tokens = service['estimate_tokens']
+    (aborted_estimate, aborted_actual), (estimate, actual) = [call.args for call in limiter.on_success.call_args_list]
+    assert aborted_estimate == estimate == limiter.acquire.call_args.args[0]
+    prompt_tokens = aborted_actual - estimate_tokens(bad_chunk)
+    assert actual == prompt_tokens + estimate_tokens(good)
+    assert actual < estimate
+
+def test_analyze_with_llm_reports_failures():
+    """Test that failed generation returns an error instead of raising"""
+    module = 'src.backend.InsightsandRecommendation.app.AdaptiveAnalyticsEngine.services.llm_based_analysis'
+    with patch(f'{module}.generate_content', return_value=None):
+        assert "error" in analyze_with_llm("prompt")
+    with patch(f'{module}.generate_content', return_value="not json"):
+        assert analyze_with_llm("prompt")["raw_response"] == "not json"
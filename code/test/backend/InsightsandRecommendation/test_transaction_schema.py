@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.SpendingAggregates import (
+    SpendingAggregates)
+from src.backend.InsightsandRecommendation.app.InsightGenerator.AnalyzeSpendingPattern.TransactionSchema import (
+    category_dictionaries, transactions_frame, validate_transactions)
+
+def _raw_transactions(count):
+    merchants = ['UNITED AIRLINES', 'Grocery Stores, Supermarkets', 'Unknown Shop', 'Netflix']
+    categories = ['Travel', 'Groceries', 'Retail', 'Entertainment']
+    return pd.DataFrame({
+        'Merchant': [merchants[i % 4] for i in range(count)],
+        'Merchant_Category': [categories[i % 4] for i in range(count)],
+        'Transaction_Amount': [str(10 + i % 97) for i in range(count)],
+        'Transaction_Date': [f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}" for i in range(count)],
+    })
+
+def test_frame_is_typed_and_invalid_rows_dropped():
+    """Test the column dtypes of a typed frame"""
+    raw = _raw_transactions(8)
+    raw.loc[3, 'Transaction_Amount'] = 'invalid'
+    df = transactions_frame(raw)
+
+    assert len(df) == 7
+    assert df['Transaction_Amount'].dtype == np.float64
+    assert df['Transaction_Date'].dtype == np.dtype('datetime64[ns]')
+    assert isinstance(df['Merchant'].dtype, pd.CategoricalDtype)
+    assert validate_transactions(df) is df
+
+def test_frames_share_the_category_dictionary():
+    """Test that separate customer frames encode a value with the same code"""
+    first = transactions_frame(_raw_transactions(4))
+    second = transactions_frame(_raw_transactions(4).assign(Merchant_Category='Brand New Category'))
+    first = transactions_frame(first)
+
+    assert first['Merchant_Category'].dtype == second['Merchant_Category'].dtype
+    combined = pd.concat([first, second])
+    assert isinstance(combined['Merchant_Category'].dtype, pd.CategoricalDtype)
+    assert list(category_dictionaries['Merchant_Category'].dtype.categories) == \
+           sorted(category_dictionaries['Merchant_Category'].dtype.categories)
+
+def test_groupbys_match_string_columns():
+    """Test that categorical groupbys list only observed groups, in string order"""
+    raw = _raw_transactions(40)
+    transactions_frame(_raw_transactions(4).assign(Merchant='Aaa Not In This Frame'))
+    typed = SpendingAggregates(raw).category_stats
+    expected = raw.assign(Transaction_Amount=pd.to_numeric(raw['Transaction_Amount'])) \
+        .groupby('Merchant_Category')['Transaction_Amount'].agg(['sum', 'count'])
+
+    assert typed.index.tolist() == expected.index.tolist()
+    assert typed.to_numpy().tolist() == expected.to_numpy().tolist()
+    assert 'Aaa Not In This Frame' not in SpendingAggregates(raw).merchant_stats.index
+
+def test_validator_rejects_untyped_frames():
+    """Test that the validator reports missing columns and raw dtypes"""
+    with pytest.raises(ValueError, match="Missing required column"):
+        validate_transactions(_raw_transactions(2).drop(columns='Merchant_Category'))
+    with pytest.raises(ValueError, match="Transaction_Date"):
+        validate_transactions(_raw_transactions(2))
+
+def test_typed_frame_uses_less_memory():
+    """Test that the typed frame is much smaller than the object frame"""
+    raw = _raw_transactions(20_000)
+    typed = transactions_frame(raw)
+    raw_bytes = raw.memory_usage(deep=True).sum()
+    typed_bytes = typed.memory_usage(deep=True).sum()
+
+    assert typed_bytes < raw_bytes / 3